@@ -3,6 +3,18 @@ import json
 import os
 
 CONFIG_FILE = "rsc1_config.json"
+SESSION_FILE = "kozy_session.json"
+SESSION_VERSION = 1
+DEFAULT_CONFIG = {"resolution": "1280x720", "fps": 30}
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over `path`, so readers never see half a file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as temp_file:
+        json.dump(data, temp_file, indent=4)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
 
 def load_config():
     """Load configuration from file, with default values if file doesn't exist."""
@@ -12,13 +24,45 @@ def load_config():
                 return json.load(config_file)
         except Exception:
             pass
-    return {"resolution": "1280x720", "fps": 30}
+    return dict(DEFAULT_CONFIG)
+
+def validate_config(config, supports):
+    """Check stream settings with `supports(resolution, fps)`; returns (config, problems).
+
+    Unsupported settings are replaced by the defaults, or dropped when the
+    defaults are not supported either, so callers keep their current choice.
+    """
+    resolution = config.get("resolution", DEFAULT_CONFIG["resolution"])
+    fps = config.get("fps", DEFAULT_CONFIG["fps"])
+    if supports(resolution, fps):
+        return config, []
+
+    problems = [f"{resolution} @ {fps} FPS is not supported by the connected camera"]
+    validated = dict(config)
+    if supports(DEFAULT_CONFIG["resolution"], DEFAULT_CONFIG["fps"]):
+        validated.update(DEFAULT_CONFIG)
+    else:
+        validated.pop("resolution", None)
+        validated.pop("fps", None)
+    return validated, problems
+
+def load_session(path=SESSION_FILE):
+    """Load the last session snapshot, or None if there is no usable one."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as session_file:
+            session = json.load(session_file)
+    except Exception:
+        return None
+    if session.get("version") != SESSION_VERSION:
+        return None
+    return session
 
-def save_config(resolution: str, fps: int):
-    """Save configuration to file."""
+def save_session(session: dict, path=SESSION_FILE):
+    """Save a session snapshot (modules, device settings, graph, theme) atomically."""
     try:
-        with open(CONFIG_FILE, 'w') as config_file:
-            json.dump({"resolution": resolution, "fps": fps}, config_file, indent=4)
+        write_json_atomic(path, {"version": SESSION_VERSION, **session})
         return True
-    except Exception as e:
+    except Exception:
         return False
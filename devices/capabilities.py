@@ -0,0 +1,215 @@
+# devices/capabilities.py
+import json
+import logging
+import os
+import threading
+import time
+
+from devices.realsense import load_realsense
+
+CACHE_FILE = "device_cache.json"
+CACHE_VERSION = 1
+
+# Offered when no camera (or no driver) is present, matching the old hard-coded combos
+DEFAULT_RESOLUTIONS = ["640x480", "1280x720", "1920x1080"]
+DEFAULT_FPS = [15, 30, 60]
+
+
+def _enum_name(value):
+    """pyrealsense2 enums print as "stream.depth"; keep only the last part."""
+    return str(value).split(".")[-1]
+
+
+def query_stream_profiles(device):
+    """List every stream profile a device supports as [stream, format, width, height, fps]."""
+    profiles = set()
+    for sensor in device.query_sensors():
+        for profile in sensor.get_stream_profiles():
+            width = height = 0
+            if profile.is_video_stream_profile():
+                video_profile = profile.as_video_stream_profile()
+                width, height = video_profile.width(), video_profile.height()
+            profiles.add((_enum_name(profile.stream_type()), _enum_name(profile.format()),
+                          width, height, profile.fps()))
+    return [list(profile) for profile in sorted(profiles)]
+
+
+class CapabilityCache:
+    """Supported stream profiles per camera, persisted per serial and firmware version.
+
+    Devices are enumerated once and then only again on hotplug events from
+    librealsense; profiles are queried only for serial/firmware pairs that are
+    not already on disk. A camera seen with new firmware replaces its old entry.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}    # "serial@firmware" -> entry
+        self.connected = {}  # serial -> entry of the currently connected device
+        self.context = None
+        self.enumerated = False
+        self.listeners = []
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as cache_file:
+                data = json.load(cache_file)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("devices", {})
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable device cache {self.path}: {e}")
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as cache_file:
+                json.dump({"version": CACHE_VERSION, "devices": self.entries}, cache_file, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logging.error(f"Failed to save device cache: {e}")
+
+    def add_listener(self, callback):
+        """Call `callback()` (from a librealsense thread) whenever devices change."""
+        self.listeners.append(callback)
+
+    def ensure_enumerated(self):
+        """Enumerate devices on first use and subscribe to hotplug events.
+
+        Returns False if the driver is missing or enumeration failed.
+        """
+        if self.enumerated:
+            return True
+        rs = load_realsense()
+        if rs is None:
+            return False
+        with self.lock:
+            if self.enumerated:
+                return True
+            try:
+                self.context = rs.context()
+                self.context.set_devices_changed_callback(self._on_devices_changed)
+                self._enumerate()
+            except Exception as e:
+                logging.error(f"RealSense enumeration error: {e}")
+                return False
+            self.enumerated = True
+        return True
+
+    def _enumerate(self):
+        """Rebuild the connected-device map; call with the lock held."""
+        rs = load_realsense()
+        connected = {}
+        changed = False
+        for device in self.context.query_devices():
+            serial = device.get_info(rs.camera_info.serial_number)
+            firmware = device.get_info(rs.camera_info.firmware_version)
+            key = f"{serial}@{firmware}"
+            entry = self.entries.get(key)
+            if entry is None:
+                start = time.perf_counter()
+                entry = {
+                    "serial": serial,
+                    "name": device.get_info(rs.camera_info.name),
+                    "firmware": firmware,
+                    "queried": time.time(),
+                    "profiles": query_stream_profiles(device),
+                }
+                self.entries[key] = entry
+                changed = True
+                logging.info(f"Queried {len(entry['profiles'])} stream profiles for {serial} "
+                             f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+            stale = [other for other, cached in self.entries.items() if cached["serial"] == serial and other != key]
+            for other in stale:
+                # Same camera, other firmware: those profiles no longer apply
+                del self.entries[other]
+                changed = True
+            connected[serial] = entry
+        self.connected = connected
+        if changed:
+            self._save()
+
+    def _on_devices_changed(self, event):
+        with self.lock:
+            try:
+                self._enumerate()
+            except Exception as e:
+                logging.error(f"RealSense hotplug handling failed: {e}")
+        for callback in self.listeners:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Device change listener failed: {e}")
+
+    def refresh(self):
+        """Force a re-enumeration, e.g. from a "Detect devices" action."""
+        self.ensure_enumerated()
+        if self.context is not None:
+            with self.lock:
+                self._enumerate()
+
+    def devices(self):
+        """Connected cameras as a list of cache entries."""
+        self.ensure_enumerated()
+        with self.lock:
+            return list(self.connected.values())
+
+    def profiles(self, serial=None, stream=None):
+        """Profiles for a serial (default: first connected camera), optionally one stream.
+
+        Only reads what is already cached, so it is safe on the GUI thread;
+        known cameras that are unplugged are still answered from disk.
+        """
+        with self.lock:
+            if serial is None and self.connected:
+                serial = next(iter(self.connected))
+            entry = self.connected.get(serial)
+            if entry is None:
+                known = [entry for entry in self.entries.values() if entry["serial"] == serial]
+                entry = max(known, key=lambda known_entry: known_entry["queried"], default=None)
+            if entry is None:
+                return []
+            return [profile for profile in entry["profiles"] if stream is None or profile[0] == stream]
+
+    def stream_modes(self, serial=None):
+        """(width, height, fps) modes where rgb8 color and z16 depth are both available."""
+        color = {(w, h, fps) for _, fmt, w, h, fps in self.profiles(serial, "color") if fmt == "rgb8"}
+        depth = {(w, h, fps) for _, fmt, w, h, fps in self.profiles(serial, "depth") if fmt == "z16"}
+        return sorted(color & depth)
+
+    def resolutions(self, serial=None):
+        """Resolutions usable for the combined color+depth stream, as "WxH" strings."""
+        modes = self.stream_modes(serial)
+        if not modes:
+            return list(DEFAULT_RESOLUTIONS)
+        sizes = sorted({(width, height) for width, height, _ in modes})
+        return [f"{width}x{height}" for width, height in sizes]
+
+    def fps_options(self, resolution, serial=None):
+        """Frame rates supported at a "WxH" resolution."""
+        modes = self.stream_modes(serial)
+        if not modes:
+            return list(DEFAULT_FPS)
+        width, height = map(int, resolution.split("x"))
+        return sorted({fps for w, h, fps in modes if (w, h) == (width, height)})
+
+    def supports(self, resolution, fps, serial=None):
+        """Whether a camera can stream color+depth at this resolution and FPS.
+
+        With no camera known, anything from the default lists is accepted.
+        """
+        return int(fps) in self.fps_options(resolution, serial) and resolution in self.resolutions(serial)
+
+
+_cache = None
+
+
+def get_capability_cache():
+    """Process-wide capability cache."""
+    global _cache
+    if _cache is None:
+        _cache = CapabilityCache()
+    return _cache
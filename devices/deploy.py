@@ -0,0 +1,317 @@
+# devices/deploy.py
+"""Incremental firmware deploys to Picos over the MicroPython raw REPL.
+
+This uses the Pico's USB serial port, the same one PicoLink (devices/pico.py)
+talks to, so close the link first. For each board, deploy_board:
+
+1. interrupts the running firmware and enters the raw REPL;
+2. hashes the firmware files on the board (SHA-256, computed there);
+3. uploads only the files whose hash differs from the local copy;
+4. checks each upload's hash before it replaces the old file, so a failed
+   upload leaves the previous version in place;
+5. soft-resets the board, which starts main.py again.
+
+deploy_boards does the same for several boards at once, one thread each.
+
+Code goes over in raw-paste mode when the board supports it (MicroPython
+1.14+). The board grants a window of bytes and asks for more as it compiles,
+so file data streams without the fixed pauses of the plain raw REPL. File
+contents are base64-encoded, `chunk_size` bytes per call.
+"""
+import ast
+import base64
+import hashlib
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRMWARE_DIRECTORY = os.path.join(REPO_ROOT, "rpip_firmware")
+RAW_REPL_BANNER = b"raw REPL; CTRL-B to exit\r\n"
+DEFAULT_CHUNK_SIZE = 4096
+
+# Defined on the board once per deploy. It has to run on MicroPython and CPython (the simulator).
+BOARD_HELPERS = """
+import os, hashlib, binascii
+def _kz_hash(path):
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    h = hashlib.sha256()
+    buf = bytearray(1024)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        h.update(view[:n])
+    f.close()
+    return binascii.hexlify(h.digest()).decode()
+def _kz_hashes(paths):
+    print(repr([_kz_hash(p) for p in paths]))
+def _kz_open(path):
+    global _kz_file
+    parts = path.split('/')
+    for i in range(1, len(parts)):
+        try:
+            os.mkdir('/'.join(parts[:i]))
+        except OSError:
+            pass
+    _kz_file = open(path + '.part', 'wb')
+def _kz_write(data):
+    _kz_file.write(binascii.a2b_base64(data))
+def _kz_commit(path, digest):
+    _kz_file.close()
+    got = _kz_hash(path + '.part')
+    if got == digest:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        os.rename(path + '.part', path)
+    else:
+        os.remove(path + '.part')
+    print(repr(got))
+"""
+
+
+class DeployError(Exception):
+    """The board did not answer as expected, or an upload failed verification."""
+
+
+def firmware_files(directory=FIRMWARE_DIRECTORY):
+    """{path on the board: contents} of the .py files under `directory`, skipping caches."""
+    files = {}
+    for folder, subfolders, names in os.walk(directory):
+        subfolders[:] = sorted(name for name in subfolders if not name.startswith((".", "__")))
+        for name in sorted(names):
+            if name.endswith(".py"):
+                path = os.path.join(folder, name)
+                with open(path, "rb") as source:
+                    files[os.path.relpath(path, directory).replace(os.sep, "/")] = source.read()
+    return files
+
+
+class RawRepl:
+    """The raw REPL of a MicroPython board on a serial port."""
+
+    def __init__(self, port, baudrate=115200, timeout=5.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.serial_connection = None
+        self.pending = b""
+        self.raw_paste = True  # cleared once the board turns out not to support it
+        self.bytes_sent = 0
+
+    def open(self):
+        self.serial_connection = serial.Serial(self.port, baudrate=self.baudrate, timeout=0.05)
+        return self
+
+    def close(self):
+        if self.serial_connection:
+            self.serial_connection.close()
+            self.serial_connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, data):
+        self.serial_connection.write(data)
+        self.bytes_sent += len(data)
+
+    def _fill(self, deadline, waiting_for):
+        if time.monotonic() > deadline:
+            raise DeployError(f"{self.port}: no {waiting_for} from the board (last bytes {self.pending[-40:]!r})")
+        self.pending += self.serial_connection.read(max(1, self.serial_connection.in_waiting))
+
+    def read_until(self, ending, timeout=None):
+        """Bytes up to and including `ending`; the rest stays buffered."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while (index := self.pending.find(ending)) < 0:
+            self._fill(deadline, repr(ending))
+        end = index + len(ending)
+        data, self.pending = self.pending[:end], self.pending[end:]
+        return data
+
+    def read_exactly(self, count, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while len(self.pending) < count:
+            self._fill(deadline, f"{count} byte reply")
+        data, self.pending = self.pending[:count], self.pending[count:]
+        return data
+
+    def enter(self):
+        """Interrupt whatever runs on the board and switch to the raw REPL."""
+        self.write(b"\r\x03\x03")  # twice: the first may only end a blocking read
+        time.sleep(0.1)
+        self.serial_connection.reset_input_buffer()
+        self.pending = b""
+        self.write(b"\r\x01")
+        self.read_until(RAW_REPL_BANNER)
+
+    def exec(self, code, timeout=None):
+        """Run `code` on the board and return what it printed; errors raise DeployError."""
+        code = code.encode("utf-8") if isinstance(code, str) else code
+        self.read_until(b">")
+        if self.raw_paste:
+            self.write(b"\x05A\x01")
+            reply = self.read_exactly(2)
+            if reply == b"R\x01":
+                self._paste(code)
+            else:
+                if reply != b"R\x00":
+                    # Firmware older than raw-paste took the request as code and printed the banner again
+                    self.read_until(RAW_REPL_BANNER[2:] + b">")
+                logging.info(f"{self.port}: no raw-paste mode, using the plain raw REPL")
+                self.raw_paste = False
+        if not self.raw_paste:
+            # Without flow control, small writes with pauses keep the board's input buffer from overflowing
+            for start in range(0, len(code), 256):
+                self.write(code[start:start + 256])
+                time.sleep(0.01)
+            self.write(b"\x04")
+            if self.read_exactly(2) != b"OK":
+                raise DeployError(f"{self.port}: the board did not accept the code")
+        output = self.read_until(b"\x04", timeout)[:-1]
+        error = self.read_until(b"\x04", timeout)[:-1]
+        if error:
+            lines = error.decode("utf-8", errors="replace").strip().splitlines()
+            raise DeployError(f"{self.port}: {lines[-1] if lines else 'error'}")
+        return output.decode("utf-8", errors="replace")
+
+    def _paste(self, code):
+        window = struct.unpack("<H", self.read_exactly(2))[0]
+        remaining = window
+        sent = 0
+        while sent < len(code):
+            while remaining == 0 or self.pending or self.serial_connection.in_waiting:
+                flag = self.read_exactly(1)
+                if flag == b"\x01":
+                    remaining += window
+                elif flag == b"\x04":  # the board stopped reading early, e.g. on a syntax error
+                    self.write(b"\x04")
+                    return
+                else:
+                    raise DeployError(f"{self.port}: unexpected {flag!r} during raw-paste")
+            piece = code[sent:sent + remaining]
+            self.write(piece)
+            remaining -= len(piece)
+            sent += len(piece)
+        self.write(b"\x04")
+        self.read_until(b"\x04")
+
+    def evaluate(self, code, timeout=None):
+        """Run `code`, which prints one Python literal, and return its value."""
+        output = self.exec(code, timeout).strip()
+        try:
+            return ast.literal_eval(output)
+        except (ValueError, SyntaxError):
+            raise DeployError(f"{self.port}: unexpected output {output[:80]!r}")
+
+    def soft_reset(self):
+        """Leave the raw REPL and soft-reset the board, which runs main.py."""
+        self.read_until(b">")
+        self.write(b"\x02")
+        self.read_until(b">>> ")
+        self.write(b"\x04")
+        self.read_until(b"soft reboot")
+
+
+def upload_file(repl, path, data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write `data` to `path` on the board and swap it into place once its hash checks out."""
+    digest = hashlib.sha256(data).hexdigest()
+    chunks = [data[start:start + chunk_size] for start in range(0, len(data), chunk_size)] or [b""]
+    for index, chunk in enumerate(chunks):
+        statements = [f"_kz_open({path!r})"] if index == 0 else []
+        if chunk:
+            statements.append(f"_kz_write({base64.b64encode(chunk)!r})")
+        if index == len(chunks) - 1:
+            statements.append(f"_kz_commit({path!r}, {digest!r})")
+        output = repl.exec("\n".join(statements))
+    got = ast.literal_eval(output.strip())
+    if got != digest:
+        raise DeployError(f"{repl.port}: {path} failed verification (board {got}, local {digest})")
+
+
+def deploy_board(port, files, chunk_size=DEFAULT_CHUNK_SIZE, force=False, check=False, reset=True,
+                 baudrate=115200, timeout=5.0):
+    """Bring `files` ({path: bytes}) up to date on the board at `port`; returns a report dict.
+
+    `check` only compares hashes. `force` uploads every file. Errors end up
+    in the report's "error" instead of being raised.
+    """
+    report = {"port": port, "files": {}, "uploaded_bytes": 0, "wire_bytes": 0, "seconds": 0.0,
+              "upload_seconds": 0.0, "throughput": 0.0, "reset": False, "error": None}
+    start = time.perf_counter()
+    repl = RawRepl(port, baudrate, timeout)
+    try:
+        repl.open()
+        repl.enter()
+        repl.exec(BOARD_HELPERS)
+        paths = sorted(files)
+        board_hashes = repl.evaluate(f"_kz_hashes({paths!r})", timeout=timeout + len(files))
+        changed = [path for path, board_hash in zip(paths, board_hashes)
+                   if force or board_hash != hashlib.sha256(files[path]).hexdigest()]
+        for path in paths:
+            report["files"][path] = "changed" if path in changed else "unchanged"
+        if not check:
+            upload_start = time.perf_counter()
+            try:
+                for path in changed:
+                    report["files"][path] = "failed"
+                    upload_file(repl, path, files[path], chunk_size)
+                    report["files"][path] = "uploaded"
+                    report["uploaded_bytes"] += len(files[path])
+            finally:
+                report["upload_seconds"] = time.perf_counter() - upload_start
+        if reset:
+            repl.soft_reset()
+            report["reset"] = True
+    except (DeployError, serial.SerialException, OSError, SyntaxError, ValueError) as e:
+        report["error"] = str(e)
+        logging.error(f"Firmware deploy to {port} failed: {e}")
+        if reset and not report["reset"] and repl.serial_connection:
+            try:
+                repl.soft_reset()  # get the old firmware running again
+                report["reset"] = True
+            except (DeployError, serial.SerialException, OSError):
+                pass
+    finally:
+        repl.close()
+    report["wire_bytes"] = repl.bytes_sent
+    report["seconds"] = time.perf_counter() - start
+    if report["upload_seconds"]:
+        report["throughput"] = report["uploaded_bytes"] / report["upload_seconds"]
+    return report
+
+
+def deploy_boards(ports, files, workers=None, **options):
+    """deploy_board on every port in parallel; reports come back in the order of `ports`."""
+    if not ports:
+        return []
+    with ThreadPoolExecutor(workers or len(ports), thread_name_prefix="deploy") as executor:
+        return list(executor.map(lambda port: deploy_board(port, files, **options), ports))
+
+
+def format_report(report):
+    """One line per board, e.g. "/dev/ttyACM0: main.py uploaded, trajectory.py unchanged; ..."."""
+    files = ", ".join(f"{path} {state}" for path, state in report["files"].items()) or "no files checked"
+    line = f"{report['port']}: {files}"
+    if report["uploaded_bytes"]:
+        line += (f"; {report['uploaded_bytes'] / 1024:.1f} KB in {report['upload_seconds']:.2f} s "
+                 f"({report['throughput'] / 1024:.1f} KB/s, {report['wire_bytes'] / 1024:.1f} KB on the wire)")
+    line += f"; {report['seconds']:.2f} s total"
+    if report["reset"]:
+        line += ", soft reset"
+    if report["error"]:
+        line += f"; FAILED: {report['error']}"
+    return line
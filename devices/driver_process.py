@@ -0,0 +1,81 @@
+# devices/driver_process.py
+"""Child process of an isolated device driver (see devices/plugins.py).
+
+    python -m devices.driver_process <fd>
+
+Started by IsolatedDriverHost, never by hand. It runs as its own program
+rather than a multiprocessing child, so it does not re-import the GUI's main
+module. `fd` is this end of a socket pair. The first message is the plugin
+spec and its settings. After that come (method, args) calls, each answered
+with (ok, result). Frames go into the shared memory ring named by `start`.
+"""
+import logging
+import sys
+import threading
+from multiprocessing.connection import Connection
+
+from devices.plugins import frame_layout, load_driver_class, read_loop
+from utils.framebus import _Ring
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def serve(connection):
+    spec, settings = connection.recv()
+    driver = None
+    ring = None
+    thread = None
+    stop = threading.Event()
+    counters = {"frames": 0, "read_errors": 0, "last_error": None}
+
+    def write(data, timestamp):
+        payload = memoryview(np.ascontiguousarray(data)).cast("B") if isinstance(data, np.ndarray) else \
+            memoryview(data).cast("B")
+        if len(payload) > ring.slot_size:
+            raise ValueError(f"frame of {len(payload)} bytes exceeds the {ring.slot_size} byte slot")
+        ring.write(ring.write_seq() + 1, payload, timestamp)
+
+    while True:
+        try:
+            method, args = connection.recv()
+        except (EOFError, OSError):
+            break  # the GUI went away
+        try:
+            result = None
+            if method == "detect":
+                result = load_driver_class(spec).detect(settings)
+            elif method == "open":
+                driver = load_driver_class(spec)(settings)
+                result = frame_layout(driver.open()) or driver.max_bytes
+            elif method == "start":
+                ring = _Ring.attach(args[0])
+                driver.start()
+                stop.clear()
+                thread = threading.Thread(target=read_loop, args=(driver, write, stop, counters),
+                                          name="driver-reader", daemon=True)
+                thread.start()
+            elif method in ("stop", "close"):
+                stop.set()
+                if thread:
+                    thread.join(timeout=2)
+                    thread = None
+                if driver:
+                    driver.stop()
+                    if method == "close":
+                        driver.close()
+            elif method == "stats":
+                result = {**(driver.stats() if driver else {}), **counters}
+            else:
+                raise ValueError(f"unknown method {method}")
+        except Exception as e:
+            connection.send((False, f"{type(e).__name__}: {e}"))
+            continue
+        connection.send((True, result))
+        if method == "close":
+            break
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="driver %(process)d %(levelname)s: %(message)s")
+    serve(Connection(int(sys.argv[1])))
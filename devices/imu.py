@@ -0,0 +1,229 @@
+# devices/imu.py
+"""IMU (accelerometer and gyroscope) streaming for D435i/D455 cameras.
+
+Motion samples arrive through a librealsense callback on a pipeline of their
+own, so they never wait on the color/depth polling loop or on the GUI. Each
+sample is written into a preallocated ring of timestamps and xyz values;
+readers take short locks only to copy or look up what they need.
+
+The control panel streams both at their highest rates (up to 400 Hz) while
+the camera runs, unless the config file sets "imu": false. Timestamps share
+the camera frames' clock, so `window.imu_store.interpolate("gyro",
+frames.timestamp)` gives the gyro at a frame. `imu` in the console shows rates
+and lost samples.
+"""
+import bisect
+import logging
+import threading
+
+from devices.realsense import load_realsense
+from utils.lazy import lazy_import
+from utils.metrics import get_metrics
+
+np = lazy_import("numpy")
+
+IMU_STREAMS = ("accel", "gyro")
+
+
+class ImuRing:
+    """Fixed-size ring of (timestamp, x, y, z) samples in time order."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, np.float64)
+        self.values = np.zeros((capacity, 3), np.float32)
+        self.count = 0  # samples written since the start
+        self.lost = 0  # samples the device numbered but never delivered
+        self.out_of_order = 0
+        self.last_frame_number = None
+        self.lock = threading.Lock()
+
+    def write(self, timestamp, x, y, z, frame_number=None):
+        with self.lock:
+            if self.count and timestamp <= self.times[(self.count - 1) % self.capacity]:
+                self.out_of_order += 1
+                return
+            index = self.count % self.capacity
+            self.times[index] = timestamp
+            self.values[index] = (x, y, z)
+            self.count += 1
+            if frame_number is not None:
+                if self.last_frame_number is not None and frame_number > self.last_frame_number + 1:
+                    self.lost += frame_number - self.last_frame_number - 1
+                self.last_frame_number = frame_number
+
+    def _span(self):
+        """(first ring index, number of stored samples); call with the lock held."""
+        stored = min(self.count, self.capacity)
+        return (self.count - stored) % self.capacity, stored
+
+    def samples(self, since=None):
+        """(times, values) copies in time order, optionally only those after `since`."""
+        with self.lock:
+            first, stored = self._span()
+            order = (np.arange(stored) + first) % self.capacity
+            times, values = self.times[order], self.values[order]
+        if since is not None:
+            start = np.searchsorted(times, since, side="right")
+            times, values = times[start:], values[start:]
+        return times, values
+
+    def latest(self):
+        """(timestamp, xyz) of the newest sample, or None."""
+        with self.lock:
+            if not self.count:
+                return None
+            index = (self.count - 1) % self.capacity
+            return float(self.times[index]), self.values[index].copy()
+
+    def interpolate(self, timestamp):
+        """xyz linearly interpolated at `timestamp`, or None outside the stored span."""
+        with self.lock:
+            first, stored = self._span()
+            if stored < 2:
+                return None
+            times, capacity = self.times, self.capacity
+            position = bisect.bisect_left(range(stored), timestamp,
+                                          key=lambda logical: times[(first + logical) % capacity])
+            if position == 0:
+                if timestamp < times[first]:
+                    return None
+                position = 1
+            if position == stored:
+                return None
+            before, after = (first + position - 1) % capacity, (first + position) % capacity
+            t0, t1 = times[before], times[after]
+            weight = (timestamp - t0) / (t1 - t0)
+            return (self.values[before] * (1 - weight) + self.values[after] * weight).astype(np.float32)
+
+    def interpolate_many(self, timestamps):
+        """(N, 3) xyz at each timestamp; NaN rows outside the stored span."""
+        times, values = self.samples()
+        timestamps = np.asarray(timestamps, np.float64)
+        result = np.full((len(timestamps), 3), np.nan, np.float32)
+        if len(times) < 2:
+            return result
+        for axis in range(3):
+            result[:, axis] = np.interp(timestamps, times, values[:, axis], left=np.nan, right=np.nan)
+        return result
+
+    def rate(self, window=1.0):
+        """Samples per second over the newest `window` seconds of data."""
+        with self.lock:
+            first, stored = self._span()
+            if stored < 2:
+                return 0.0
+            newest = self.times[(self.count - 1) % self.capacity]
+            times, capacity = self.times, self.capacity
+            start = bisect.bisect_left(range(stored), newest - window,
+                                       key=lambda logical: times[(first + logical) % capacity])
+            span = newest - times[(first + start) % capacity]
+            return (stored - 1 - start) / span if span > 0 else 0.0
+
+
+class ImuStore:
+    """One ImuRing per motion stream, shared by the producer and any number of readers.
+
+    About 20 s of 400 Hz gyro fits in the default capacity.
+    """
+
+    def __init__(self, capacity=8192):
+        self.rings = {stream: ImuRing(capacity) for stream in IMU_STREAMS}
+
+    def write(self, stream, timestamp, x, y, z, frame_number=None):
+        self.rings[stream].write(timestamp, x, y, z, frame_number)
+
+    def interpolate(self, stream, timestamp):
+        """xyz of `stream` at a camera frame timestamp (seconds), or None if not covered."""
+        return self.rings[stream].interpolate(timestamp)
+
+    def interpolate_many(self, stream, timestamps):
+        return self.rings[stream].interpolate_many(timestamps)
+
+    def samples(self, stream, since=None):
+        return self.rings[stream].samples(since)
+
+    def latest(self, stream):
+        return self.rings[stream].latest()
+
+    def stats(self):
+        """{stream: {"count", "lost", "out_of_order", "rate_hz"}}."""
+        return {stream: {"count": ring.count, "lost": ring.lost, "out_of_order": ring.out_of_order,
+                         "rate_hz": ring.rate()}
+                for stream, ring in self.rings.items()}
+
+
+class ImuCapture:
+    """Streams accel and gyro of one camera at their highest rates into an ImuStore.
+
+    Uses a second pipeline on the camera's motion module, started with a
+    frame callback; the color/depth pipeline is left untouched.
+    """
+
+    def __init__(self, serial, store, rates=None):
+        self.serial = serial
+        self.store = store
+        self.rates = rates or {}  # stream -> fps; 0 lets librealsense choose
+        self.pipeline = None
+        self.running = False
+        self.seq = 0
+        metrics = get_metrics()
+        self.samples_counters = {stream: metrics.counter("kozy_imu_samples_total", "IMU samples received",
+                                                         stream=stream) for stream in IMU_STREAMS}
+
+    @staticmethod
+    def motion_rates(serial):
+        """{stream: highest fps} of a camera's motion module, empty if it has none."""
+        from devices.capabilities import get_capability_cache
+        cache = get_capability_cache()
+        rates = {}
+        for stream in IMU_STREAMS:
+            fps = [profile[4] for profile in cache.profiles(serial, stream)]
+            if fps:
+                rates[stream] = max(fps)
+        return rates
+
+    def start(self):
+        rs = load_realsense()
+        if rs is None:
+            raise RuntimeError("pyrealsense2 not installed")
+        config = rs.config()
+        if self.serial:
+            config.enable_device(self.serial)
+        config.enable_stream(rs.stream.accel, rs.format.motion_xyz32f, self.rates.get("accel", 0))
+        config.enable_stream(rs.stream.gyro, rs.format.motion_xyz32f, self.rates.get("gyro", 0))
+        self.pipeline = rs.pipeline()
+        self.running = True
+        try:
+            self.pipeline.start(config, self._on_frame)
+        except RuntimeError:
+            self.running = False
+            self.pipeline = None
+            raise
+        logging.info(f"IMU streaming from {self.serial}: " +
+                     ", ".join(f"{stream} {fps or 'default'} Hz" for stream, fps in self.rates.items()))
+
+    def _on_frame(self, frame):
+        """librealsense callback thread: store the sample and return."""
+        try:
+            frames = frame.as_frameset() if frame.is_frameset() else (frame,)
+            for motion_frame in frames:
+                stream = str(motion_frame.get_profile().stream_type()).split(".")[-1]
+                if stream not in self.store.rings:
+                    continue
+                data = motion_frame.as_motion_frame().get_motion_data()
+                self.store.write(stream, motion_frame.get_timestamp() / 1000.0, data.x, data.y, data.z,
+                                 motion_frame.get_frame_number())
+                self.samples_counters[stream].inc()
+                self.seq += 1
+        except Exception as e:
+            logging.debug(f"IMU frame dropped: {e}")
+
+    def stop(self):
+        self.running = False
+        if self.pipeline:
+            try:
+                self.pipeline.stop()
+            except RuntimeError:
+                pass
+            self.pipeline = None
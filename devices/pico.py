@@ -1,20 +1,25 @@
 # devices/pico.py
 import serial
 import serial.tools.list_ports
+import threading
 import time
 import logging
 
-def find_pico_port():
-    """Find the port to which the Pico is connected (by VID/PID or name)."""
+from utils.metrics import get_metrics
+
+def find_pico_ports():
+    """Ports of every Pico running MicroPython (by VID/PID), sorted."""
     # VID/PID for Raspberry Pi Pico in MicroPython mode
     PICO_VID = 0x2E8A  # Raspberry Pi
     PICO_PID = 0x0005  # MicroPython CDC
 
     ports = serial.tools.list_ports.comports()
-    for port in ports:
-        if port.vid == PICO_VID and port.pid == PICO_PID:
-            return port.device
-    return None
+    return sorted(port.device for port in ports if port.vid == PICO_VID and port.pid == PICO_PID)
+
+def find_pico_port():
+    """Find the port to which the Pico is connected (by VID/PID or name)."""
+    ports = find_pico_ports()
+    return ports[0] if ports else None
 
 def connect_to_pico(timeout=3):
     """Connect to the Pico and request its identification code."""
@@ -47,3 +52,160 @@ def connect_to_pico(timeout=3):
     except Exception as e:
         logging.error(f"Failed to communicate with Pico: {e}")
         return None
+
+def parse_pico_line(line):
+    """Split a line from the Pico into (kind, payload), e.g. "CODE:123456" -> ("CODE", "123456")."""
+    kind, separator, payload = line.partition(":")
+    if separator and kind.isupper():
+        return kind, payload
+    return "RAW", line
+
+
+class PicoLineBuffer:
+    """Reassemble newline-terminated lines from arbitrary serial chunks."""
+
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, chunk):
+        """Add received bytes; returns the complete, non-empty lines they finished."""
+        *raw_lines, self.pending = (self.pending + chunk).split(b"\n")
+        lines = []
+        for raw_line in raw_lines:
+            line = raw_line.decode("utf-8", errors="ignore").strip()
+            if line:
+                lines.append(line)
+        return lines
+
+
+class PicoLink:
+    """Persistent serial link to the Pico with a background reader thread."""
+
+    def __init__(self, port=None, baudrate=115200, on_message=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.on_message = on_message
+        self.serial_connection = None
+        self.reader_thread = None
+        self.running = False
+        self.write_lock = threading.Lock()
+        # One request() in flight at a time: replies carry no request ID, so the
+        # next ACK/ERR/BUF belongs to whichever command was sent last
+        self.request_lock = threading.Lock()
+        self.pending_code = None
+        self.code_event = threading.Event()
+        self.bytes_received = 0
+        self.last_rx_time = None
+        self.reply_waiters = []  # [kinds, event, reply] for request()
+        metrics = get_metrics()
+        self.rx_counter = metrics.counter("kozy_pico_rx_bytes_total", "Bytes received from the Pico")
+        self.tx_counter = metrics.counter("kozy_pico_tx_bytes_total", "Bytes sent to the Pico")
+        self.lines_counter = metrics.counter("kozy_pico_lines_total", "Lines received from the Pico")
+        self.connects_counter = metrics.counter("kozy_pico_connects_total", "Serial ports opened to the Pico")
+
+    def open(self):
+        """Open the serial port and start reading. Returns False on failure."""
+        port = self.port or find_pico_port()
+        if not port:
+            logging.warning("Pico not found")
+            return False
+        try:
+            self.serial_connection = serial.Serial(port, baudrate=self.baudrate, timeout=0.1)
+        except Exception as e:
+            logging.error(f"Failed to open Pico port {port}: {e}")
+            return False
+
+        self.port = port
+        self.running = True
+        self.connects_counter.inc()
+        self.reader_thread = threading.Thread(target=self._read_loop, name="pico-reader", daemon=True)
+        self.reader_thread.start()
+        logging.info(f"Connected to Pico on {port}")
+        return True
+
+    def send(self, text):
+        """Send one line to the Pico."""
+        data = text.encode("utf-8") + b"\n"
+        with self.write_lock:
+            self.serial_connection.write(data)
+            self.serial_connection.flush()
+        self.tx_counter.inc(len(data))
+
+    def request_code(self, timeout=3):
+        """Ask the Pico for its identification code and wait for the reply."""
+        self.code_event.clear()
+        self.pending_code = None
+        self.send("GET_CODE")
+        if self.code_event.wait(timeout):
+            return self.pending_code
+        logging.warning("Pico did not respond with CODE in time")
+        return None
+
+    def request(self, text, reply_kinds=("ACK", "ERR"), timeout=1.0):
+        """Send a command and wait for the first reply of one of `reply_kinds`.
+
+        Concurrent callers take turns, each holding the link from its send
+        until its reply. Returns (kind, payload), or None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        if not self.request_lock.acquire(timeout=timeout):
+            return None
+        try:
+            waiter = [tuple(reply_kinds), threading.Event(), None]
+            with self.write_lock:
+                self.reply_waiters.append(waiter)
+            try:
+                self.send(text)
+                if waiter[1].wait(max(deadline - time.monotonic(), 0.0)):
+                    return waiter[2]
+                return None
+            finally:
+                with self.write_lock:
+                    self.reply_waiters.remove(waiter)
+        finally:
+            self.request_lock.release()
+
+    def _read_loop(self):
+        line_buffer = PicoLineBuffer()
+        while self.running:
+            try:
+                chunk = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+            except Exception as e:
+                if self.running:
+                    logging.error(f"Pico read failed: {e}")
+                break
+            if not chunk:
+                continue
+            self.bytes_received += len(chunk)
+            self.last_rx_time = time.time()
+            self.rx_counter.inc(len(chunk))
+            for line in line_buffer.feed(chunk):
+                self.lines_counter.inc()
+                self._dispatch(line)
+        self.running = False
+
+    def _dispatch(self, line):
+        kind, payload = parse_pico_line(line)
+        if kind == "CODE":
+            self.pending_code = payload
+            self.code_event.set()
+        for waiter in list(self.reply_waiters):
+            if kind in waiter[0] and not waiter[1].is_set():
+                waiter[2] = (kind, payload)
+                waiter[1].set()
+                break
+        if self.on_message:
+            try:
+                self.on_message(kind, payload)
+            except Exception as e:
+                logging.error(f"Pico message handler failed: {e}")
+
+    def close(self):
+        """Stop the reader and close the port."""
+        self.running = False
+        if self.reader_thread:
+            self.reader_thread.join(timeout=1)
+            self.reader_thread = None
+        if self.serial_connection:
+            self.serial_connection.close()
+            self.serial_connection = None
@@ -0,0 +1,431 @@
+# devices/plugins.py
+"""Device-driver plugins: discovery, lazy loading and optional process isolation.
+
+A driver subclasses DeviceDriver. Drivers are found through the `kozy.devices`
+entry point group and in plugin directories (`plugins/` by default). Discovery
+reads only metadata: entry point names, and the class attributes of drivers in
+plugin files, parsed without running the file. A driver's code is imported
+when a module of its type is added.
+
+An isolated driver runs in a child process. Method calls go over a socket
+pair with a timeout. The child writes frames straight into the frame bus ring of the
+module's topic, which is shared memory. A hung `read()` or a crash then
+costs a restart of that child, never the GUI.
+
+In the control panel, plugin devices appear in "Add Module" and in
+`module add <id prefix>`, and publish on `device/<module id>/frame`.
+`plugins/synthetic_lidar.py` is a working example. In the config file,
+"plugin_dirs" lists the directories to search and "plugins" sets per-type options, e.g.
+{"Synthetic Lidar": {"isolate": false, "settings": {"rate_hz": 20}}}. `plugins`
+in the console lists what was found.
+"""
+import ast
+import importlib.util
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from importlib import metadata
+from multiprocessing.connection import Connection
+
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+ENTRY_POINT_GROUP = "kozy.devices"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_DIRECTORY = os.path.join(REPO_ROOT, "plugins")
+
+
+class DriverError(Exception):
+    """A driver call failed, timed out, or its process died."""
+
+
+class DeviceDriver:
+    """Base class of device plugins.
+
+    Class attributes describe the module type; keep them plain literals so
+    discovery can read them without importing the file. Methods other than
+    `read()` are called one at a time, from a worker thread or the driver's
+    process. `read()` runs on the driver's own reader thread.
+    """
+
+    name = None  # module type shown in "Add Module", e.g. "Synthetic Lidar"
+    id_prefix = None  # module IDs are <id_prefix>-<n>; derived from `name` if not set
+    single_instance = False
+    isolate = False  # run in a child process unless the config says otherwise
+    max_bytes = 4096  # slot size for drivers whose frames are bytes, not arrays
+
+    def __init__(self, settings=None):
+        self.settings = dict(settings or {})
+
+    @classmethod
+    def detect(cls, settings):
+        """(found, message) for the module status, without opening the device."""
+        return True, "Available"
+
+    def open(self):
+        """Open the device; returns the (shape, dtype) of its frames, or None for bytes."""
+        return None
+
+    def start(self):
+        pass
+
+    def read(self, timeout):
+        """Wait up to `timeout` seconds for the next frame; (data, timestamp) or None."""
+        time.sleep(timeout)
+        return None
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self):
+        """Driver-specific counters shown by `plugins` and on the module."""
+        return {}
+
+
+class PluginSpec:
+    """What discovery knows about a driver without importing it."""
+
+    def __init__(self, name, source, location, id_prefix=None, single_instance=False, isolate=False):
+        self.name = name
+        self.source = source  # "entry_point" or "file"
+        self.location = location  # "package.module:Class", or (path, class name)
+        self.id_prefix = id_prefix or name.lower().replace(" ", "-")
+        self.single_instance = single_instance
+        self.isolate = isolate
+
+    def describe(self):
+        where = self.location if self.source == "entry_point" else f"{self.location[0]}:{self.location[1]}"
+        return f"{self.source} {where}"
+
+
+def _scan_plugin_file(path):
+    """PluginSpecs of the DeviceDriver subclasses defined in a file, read with `ast`."""
+    with open(path, "r", encoding="utf-8") as plugin_file:
+        tree = ast.parse(plugin_file.read(), path)
+    specs = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        if not any(getattr(base, "id", None) == "DeviceDriver" or getattr(base, "attr", None) == "DeviceDriver"
+                   for base in node.bases):
+            continue
+        attributes = {}
+        for statement in node.body:
+            if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                    and isinstance(statement.targets[0], ast.Name)):
+                try:
+                    attributes[statement.targets[0].id] = ast.literal_eval(statement.value)
+                except (ValueError, TypeError, SyntaxError):
+                    pass
+        if isinstance(attributes.get("name"), str):
+            specs.append(PluginSpec(attributes["name"], "file", (path, node.name), attributes.get("id_prefix"),
+                                    bool(attributes.get("single_instance")), bool(attributes.get("isolate"))))
+    return specs
+
+
+def load_driver_class(spec):
+    """Import a driver's code and return its class."""
+    if spec.source == "entry_point":
+        driver_class = metadata.EntryPoint(spec.name, spec.location, ENTRY_POINT_GROUP).load()
+    else:
+        path, class_name = spec.location
+        module_name = f"kozy_plugins.{os.path.splitext(os.path.basename(path))[0]}"
+        module = sys.modules.get(module_name)
+        if module is None:
+            import_spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(import_spec)
+            sys.modules[module_name] = module
+            try:
+                import_spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+        driver_class = getattr(module, class_name)
+    if not (isinstance(driver_class, type) and issubclass(driver_class, DeviceDriver)):
+        raise TypeError(f"{spec.describe()} is not a DeviceDriver")
+    return driver_class
+
+
+class PluginRegistry:
+    """Discovered driver plugins by module type; classes are imported on first use."""
+
+    def __init__(self):
+        self.specs = {}
+        self.classes = {}
+        self.lock = threading.Lock()
+
+    def discover(self, directories=(PLUGIN_DIRECTORY,)):
+        """Find drivers in the entry point group and the plugin directories; returns {name: spec}."""
+        found = {}
+        try:
+            for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+                found[entry_point.name] = PluginSpec(entry_point.name, "entry_point", entry_point.value)
+        except Exception as e:
+            logging.error(f"Reading {ENTRY_POINT_GROUP} entry points failed: {e}")
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".py") or filename.startswith("_"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    specs = _scan_plugin_file(path)
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    logging.error(f"Skipping plugin {path}: {e}")
+                    continue
+                for spec in specs:
+                    if spec.name in found:
+                        logging.warning(f"Plugin '{spec.name}' in {path} ignored; already provided by "
+                                        f"{found[spec.name].describe()}")
+                        continue
+                    found[spec.name] = spec
+        self.specs = found
+        if found:
+            logging.info(f"Device plugins: {', '.join(found)}")
+        return found
+
+    def driver_class(self, name):
+        with self.lock:
+            driver_class = self.classes.get(name)
+            if driver_class is None:
+                driver_class = self.classes[name] = load_driver_class(self.specs[name])
+                logging.info(f"Loaded device plugin '{name}' from {self.specs[name].describe()}")
+            return driver_class
+
+
+_registry = None
+
+
+def get_plugin_registry():
+    global _registry
+    if _registry is None:
+        _registry = PluginRegistry()
+    return _registry
+
+
+def frame_layout(layout):
+    """Normalize open()'s return value to ([shape], dtype string) or None."""
+    if layout is None:
+        return None
+    shape, dtype = layout
+    return [int(size) for size in shape], np.dtype(dtype).str
+
+
+def advertise_layout(bus, topic, layout):
+    """Bus publisher for frames of `layout`: ([shape], dtype) from frame_layout(), or a byte size."""
+    if isinstance(layout, int):
+        return bus.advertise(topic, max_bytes=layout)
+    return bus.advertise(topic, layout[0], layout[1])
+
+
+def read_loop(driver, write, stop, counters):
+    """Reader thread: pass every frame the driver produces to `write(data, timestamp)`."""
+    while not stop.is_set():
+        try:
+            item = driver.read(0.1)
+            if item is None:
+                continue
+            write(*item)
+            counters["frames"] += 1
+        except Exception as e:
+            counters["read_errors"] += 1
+            counters["last_error"] = f"{type(e).__name__}: {e}"
+            time.sleep(0.1)  # a failing device must not spin the core
+
+
+class DriverHost:
+    """Runs a driver in this process; frames are published to the bus from a reader thread.
+
+    Cheapest option, but a driver that hangs or crashes takes the GUI with it.
+    """
+
+    isolated = False
+
+    def __init__(self, spec, settings, bus, topic, registry=None):
+        self.spec = spec
+        self.settings = dict(settings or {})
+        self.bus = bus
+        self.topic = topic
+        self.registry = registry or get_plugin_registry()
+        self.driver = None
+        self.publisher = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.counters = {"frames": 0, "read_errors": 0, "last_error": None}
+
+    def detect(self):
+        return self.registry.driver_class(self.spec.name).detect(self.settings)
+
+    def open(self):
+        self.driver = self.registry.driver_class(self.spec.name)(self.settings)
+        layout = frame_layout(self.driver.open())
+        self.publisher = advertise_layout(self.bus, self.topic, layout or self.driver.max_bytes)
+        return layout
+
+    def start(self):
+        self.driver.start()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=read_loop,
+                                       args=(self.driver, self.publisher.publish, self.stop_event, self.counters),
+                                       name=f"driver-{self.topic}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.driver:
+            self.driver.stop()
+
+    def close(self):
+        self.stop()
+        if self.driver:
+            self.driver.close()
+            self.driver = None
+
+    def progress(self):
+        return self.counters["frames"]
+
+    def alive(self):
+        return self.thread is None or self.thread.is_alive()
+
+    def stats(self):
+        driver_stats = self.driver.stats() if self.driver else {}
+        return {**driver_stats, **self.counters, "isolated": False}
+
+
+class IsolatedDriverHost:
+    """Runs a driver in a child process (devices/driver_process.py) and talks to it over a socket pair.
+
+    Calls that do not answer within `call_timeout` kill the child and raise
+    DriverError, as does a child that died. The next call starts a fresh
+    child. Frames go from the child into the topic's bus ring without passing
+    through this process.
+    """
+
+    isolated = True
+
+    def __init__(self, spec, settings, bus, topic, call_timeout=5.0):
+        self.spec = spec
+        self.settings = dict(settings or {})
+        self.bus = bus
+        self.topic = topic
+        self.call_timeout = call_timeout
+        self.process = None
+        self.connection = None
+        self.publisher = None
+        self.exit_code = None
+        self.lock = threading.Lock()
+
+    def _spawn(self):
+        # A fresh interpreter, not a fork of the GUI with its Qt and device threads
+        parent_end, child_end = socket.socketpair()
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, environment.get("PYTHONPATH")]))
+        try:
+            self.process = subprocess.Popen([sys.executable, "-m", "devices.driver_process", str(child_end.fileno())],
+                                            pass_fds=(child_end.fileno(),), env=environment)
+        finally:
+            child_end.close()
+        self.connection = Connection(parent_end.detach())
+        self.connection.send((self.spec, self.settings))
+        logging.info(f"Driver '{self.spec.name}' for {self.topic} running in process {self.process.pid}")
+
+    def call(self, method, *args, timeout=None):
+        timeout = timeout or self.call_timeout
+        with self.lock:
+            if self.process is None:
+                self._spawn()
+            try:
+                self.connection.send((method, args))
+                if not self.connection.poll(timeout):
+                    self._kill()
+                    raise DriverError(f"{self.spec.name}: {method}() did not answer within {timeout:g} s; "
+                                      f"driver process killed")
+                ok, result = self.connection.recv()
+            except (EOFError, OSError) as e:
+                self._kill()
+                raise DriverError(f"{self.spec.name}: driver process exited (code {self.exit_code})") from e
+        if not ok:
+            raise DriverError(f"{self.spec.name}: {result}")
+        return result
+
+    def _kill(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(1.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.exit_code = self.process.returncode
+        self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def detect(self):
+        return tuple(self.call("detect"))
+
+    def open(self):
+        layout = self.call("open")
+        self.publisher = advertise_layout(self.bus, self.topic, layout)
+        return None if isinstance(layout, int) else layout
+
+    def start(self):
+        self.call("start", self.publisher.shm_name)
+
+    def stop(self):
+        if self.process is not None:
+            self.call("stop")
+
+    def close(self):
+        """Close the driver and end the child; kills it if it does not cooperate."""
+        try:
+            if self.alive():
+                self.call("close")
+        except DriverError as e:
+            logging.warning(f"{e}")
+        with self.lock:
+            if self.process is not None:
+                try:
+                    self.process.wait(2.0)
+                except subprocess.TimeoutExpired:
+                    pass
+            self._kill()
+
+    def progress(self):
+        ring = self.publisher.ring if self.publisher else None
+        return ring.write_seq() if ring is not None and ring.buf is not None else 0
+
+    def alive(self):
+        if self.process is None:
+            return False
+        exit_code = self.process.poll()
+        if exit_code is not None:
+            self.exit_code = exit_code
+        return exit_code is None
+
+    def stats(self):
+        stats = {"isolated": True, "pid": self.process.pid if self.process else None, "exit_code": self.exit_code}
+        if self.alive():
+            stats.update(self.call("stats", timeout=1.0))
+        return stats
+
+
+def create_driver_host(spec, settings, bus, topic, isolate=None, call_timeout=5.0):
+    """DriverHost or IsolatedDriverHost; `isolate=None` takes the driver's own preference."""
+    if spec.isolate if isolate is None else isolate:
+        return IsolatedDriverHost(spec, settings, bus, topic, call_timeout)
+    return DriverHost(spec, settings, bus, topic)
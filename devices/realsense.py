@@ -1,35 +1,408 @@
 # devices/realsense.py
+import importlib.util
 import logging
-import numpy as np
+import threading
+import time
+
+from utils.metrics import get_metrics
+
+# pyrealsense2 and numpy are slow to import, so both are loaded on first use
+_rs = None
+_rs_import_failed = False
+
+
+def realsense_available():
+    """Check whether pyrealsense2 is installed without importing it."""
+    return not _rs_import_failed and importlib.util.find_spec("pyrealsense2") is not None
+
+
+def load_realsense():
+    """Import pyrealsense2 on first use; returns the module or None if unusable."""
+    global _rs, _rs_import_failed
+    if _rs is None and realsense_available():
+        try:
+            import pyrealsense2
+            _rs = pyrealsense2
+        except ImportError as e:
+            # Installed but broken (e.g. missing libusb) counts as not available
+            _rs_import_failed = True
+            logging.warning(f"pyrealsense2 could not be loaded: {e}")
+    return _rs
+
+
+def __getattr__(name):
+    # Keep `from devices.realsense import rs, REAL_SENSE_AVAILABLE` working, lazily
+    if name == "rs":
+        return load_realsense()
+    if name == "REAL_SENSE_AVAILABLE":
+        return realsense_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:
-    import pyrealsense2 as rs
-    REAL_SENSE_AVAILABLE = True
-except ImportError:
-    REAL_SENSE_AVAILABLE = False
-    rs = None
 
 def detect_realsense():
-    """Detect if a RealSense camera is connected."""
-    if not REAL_SENSE_AVAILABLE:
+    """Detect if a RealSense camera is connected (answered from the capability cache)."""
+    from devices.capabilities import get_capability_cache
+    if load_realsense() is None:
         return False, "Driver missing"
 
-    try:
-        context = rs.context()
-        devices = context.query_devices()
-        if devices:
-            device = devices[0]
-            name = device.get_info(rs.camera_info.name)
-            serial = device.get_info(rs.camera_info.serial_number)
-            return True, f"Connected ({serial})"
-        else:
-            return False, "Not found"
-    except Exception as e:
-        logging.error(f"RealSense detection error: {e}")
+    cache = get_capability_cache()
+    if not cache.ensure_enumerated():
         return False, "Detection error"
+    devices = cache.devices()
+    if devices:
+        return True, f"Connected ({devices[0]['serial']})"
+    else:
+        return False, "Not found"
+
+_colormap_lut = None
+
+
+def depth_colormap_lut():
+    """256-entry RGB lookup table (blue = near, red = far), built once."""
+    global _colormap_lut
+    if _colormap_lut is None:
+        import numpy as np
+        x = np.linspace(0.0, 1.0, 256)
+        red = np.clip(1.5 - np.abs(4.0 * x - 3.0), 0.0, 1.0)
+        green = np.clip(1.5 - np.abs(4.0 * x - 2.0), 0.0, 1.0)
+        blue = np.clip(1.5 - np.abs(4.0 * x - 1.0), 0.0, 1.0)
+        _colormap_lut = (np.stack([red, green, blue], axis=1) * 255).astype(np.uint8)
+        # Level 0 is "no depth" (closer than one step is below the minimum range anyway)
+        _colormap_lut[0] = 0
+    return _colormap_lut
+
+
+def colorize_depth(depth_array, max_distance_mm=3000):
+    """Map depth to an RGB image; pixels without depth (0) stay black."""
+    import numpy as np
+    return np.take(depth_colormap_lut(), normalize_depth_for_display(depth_array, max_distance_mm), axis=0)
+
 
 def normalize_depth_for_display(depth_array, max_distance_mm=3000):
     """Normalize depth values for display purposes."""
+    import numpy as np
     depth_clipped = np.clip(depth_array, 0, max_distance_mm)
     depth_normalized = (depth_clipped.astype(np.float32) / max_distance_mm) * 255.0
     return depth_normalized.astype(np.uint8)
+
+
+# Distance histograms of depth regions: 2 cm bins up to 10 m, farther pixels in the last bin
+DISTANCE_BIN_WIDTH = 0.02
+DISTANCE_BINS = 500
+_region_labels = {}
+_distance_bin_luts = {}
+
+
+def depth_region_histograms(depth_array, depth_scale=0.001, grid=(3, 3)):
+    """Per-region distance histograms of a depth frame, shape (rows, cols, 1 + DISTANCE_BINS).
+
+    The frame is split into a `grid` of (rows, cols) regions. Bin 0 counts
+    pixels without depth and bin i > 0 counts distances in
+    [(i - 1) * DISTANCE_BIN_WIDTH, i * DISTANCE_BIN_WIDTH) metres. Histograms of
+    many frames add up, so statistics over a recording can be merged from pieces.
+    """
+    import numpy as np
+    height, width = depth_array.shape
+    rows, cols = grid
+    key = (height, width, rows, cols)
+    labels = _region_labels.get(key)
+    if labels is None:
+        row_labels = (np.arange(height) * rows // height)[:, None]
+        col_labels = (np.arange(width) * cols // width)[None, :]
+        labels = _region_labels[key] = ((row_labels * cols + col_labels) * (DISTANCE_BINS + 1)).astype(np.int32)
+    lut = _distance_bin_luts.get(depth_scale)
+    if lut is None:
+        # Histogram bin of every possible z16 value; a table lookup beats the arithmetic per pixel
+        lut = np.minimum(np.arange(65536) * (depth_scale / DISTANCE_BIN_WIDTH), DISTANCE_BINS - 1)
+        lut = lut.astype(np.int32) + 1
+        lut[0] = 0
+        _distance_bin_luts[depth_scale] = lut
+    bins = np.take(lut, depth_array)
+    bins += labels
+    counts = np.bincount(bins.ravel(), minlength=rows * cols * (DISTANCE_BINS + 1))
+    return counts.reshape(rows, cols, DISTANCE_BINS + 1)
+
+
+def summarize_distance_histogram(histogram, percentiles=(5, 50, 95)):
+    """Fill rate, mean and percentile distances (m) from a depth_region_histograms() histogram."""
+    import numpy as np
+    histogram = np.asarray(histogram, np.float64)
+    valid = histogram[1:].sum()
+    total = valid + histogram[0]
+    summary = {"fill": float(valid / total) if total else 0.0, "mean_m": None}
+    summary.update({f"p{percentile}_m": None for percentile in percentiles})
+    if valid:
+        centers = (np.arange(DISTANCE_BINS) + 0.5) * DISTANCE_BIN_WIDTH
+        summary["mean_m"] = float(histogram[1:] @ centers / valid)
+        cumulative = np.cumsum(histogram[1:])
+        for percentile in percentiles:
+            position = int(np.searchsorted(cumulative, valid * percentile / 100.0))
+            summary[f"p{percentile}_m"] = float(centers[min(position, DISTANCE_BINS - 1)])
+    return summary
+
+
+class CapturedFrames:
+    """One color/depth pair held in capture-owned buffers."""
+
+    __slots__ = ("seq", "timestamp", "captured", "color", "depth")
+
+    def __init__(self, color, depth):
+        self.seq = 0
+        self.timestamp = 0.0
+        self.captured = 0.0  # perf_counter() when the pair landed in this buffer
+        self.color = color
+        self.depth = depth
+
+    def copy(self, out=None):
+        """Copy this pair into `out` (allocated if None or the wrong shape).
+
+        The capture thread zeroes `seq` while it rewrites a buffer, so a copy
+        that starts and ends on the same nonzero `seq` holds one whole pair.
+        Returns None if the buffer was rewritten during the copy.
+        """
+        import numpy as np
+        seq = self.seq
+        if not seq:
+            return None
+        if out is None or out.color.shape != self.color.shape or out.depth.shape != self.depth.shape:
+            out = CapturedFrames(np.empty_like(self.color), np.empty_like(self.depth))
+        timestamp, captured = self.timestamp, self.captured
+        np.copyto(out.color, self.color)
+        np.copyto(out.depth, self.depth)
+        if self.seq != seq:
+            return None
+        out.seq, out.timestamp, out.captured = seq, timestamp, captured
+        return out
+
+
+class RealSenseCapture:
+    """Runs the RealSense pipeline on its own thread and keeps the newest frames.
+
+    Frames are copied into a small ring of preallocated buffers, so readers on
+    other threads (GUI timer, bus publisher) never wait on `wait_for_frames`.
+    """
+
+    BUFFER_COUNT = 3
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.pipeline = None
+        self.profile = None
+        self.width = self.height = self.fps = None
+        self.depth_intrinsics = None  # (fx, fy, cx, cy) of the depth stream
+        self.depth_scale = 0.001  # metres per depth unit
+        self.buffers = []
+        self.buffer_index = 0
+        self.latest_frames = None
+        self.seq = 0
+        self.consumers = []
+        self.thread = None
+        self.running = False
+        self.switching = threading.Event()
+        self.switch_lock = threading.Lock()
+        self.last_frame_time = None
+        self.last_switch = None
+        self.pending_switch = None
+        self.last_frame_number = None
+        metrics = get_metrics()
+        self.frames_counter = metrics.counter("kozy_camera_frames_total", "Frame pairs captured")
+        self.dropped_counter = metrics.counter("kozy_camera_frames_dropped_total",
+                                               "Frames the device produced that the capture thread missed")
+        self.copy_histogram = metrics.histogram("kozy_capture_copy_seconds", "Copying a frame pair into a buffer")
+        self.consumers_histogram = metrics.histogram("kozy_capture_consumers_seconds",
+                                                     "Capture-thread consumers (bus, recording) per frame pair")
+
+    def add_consumer(self, callback):
+        """Call `callback(frames)` on the capture thread for every new frame pair."""
+        self.consumers.append(callback)
+
+    def _make_config(self, width, height, fps):
+        rs = load_realsense()
+        config = rs.config()
+        if self.serial:
+            config.enable_device(self.serial)
+        config.enable_stream(rs.stream.color, width, height, rs.format.rgb8, fps)
+        config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
+        return config
+
+    def _ensure_buffers(self, width, height):
+        """Reuse the frame buffers when the resolution is unchanged."""
+        import numpy as np
+        if self.buffers and self.buffers[0].depth.shape == (height, width):
+            return False
+        self.buffers = [
+            CapturedFrames(np.empty((height, width, 3), np.uint8), np.empty((height, width), np.uint16))
+            for _ in range(self.BUFFER_COUNT)
+        ]
+        return True
+
+    def _read_depth_calibration(self):
+        rs = load_realsense()
+        try:
+            stream = self.profile.get_stream(rs.stream.depth).as_video_stream_profile()
+            intrinsics = stream.get_intrinsics()
+            self.depth_intrinsics = (intrinsics.fx, intrinsics.fy, intrinsics.ppx, intrinsics.ppy)
+            self.depth_scale = self.profile.get_device().first_depth_sensor().get_depth_scale()
+        except RuntimeError as e:
+            logging.warning(f"Could not read depth intrinsics, using defaults: {e}")
+            self.depth_intrinsics = None
+
+    def start(self, width, height, fps):
+        """Start streaming; raises on failure like pipeline.start does."""
+        rs = load_realsense()
+        if rs is None:
+            raise RuntimeError("pyrealsense2 not installed")
+        self.pipeline = rs.pipeline()
+        self.profile = self.pipeline.start(self._make_config(width, height, fps))
+        self.serial = self.profile.get_device().get_info(rs.camera_info.serial_number)
+        self.width, self.height, self.fps = width, height, fps
+        self._ensure_buffers(width, height)
+        self._read_depth_calibration()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="realsense-capture", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.pipeline:
+            try:
+                self.pipeline.stop()
+            except RuntimeError:
+                pass
+            self.pipeline = None
+        self.latest_frames = None
+
+    def validate(self, width, height, fps):
+        """Return None if the mode can be streamed, otherwise the reason it can't."""
+        from devices.capabilities import get_capability_cache
+        rs = load_realsense()
+        resolution = f"{width}x{height}"
+        if not get_capability_cache().supports(resolution, fps, self.serial):
+            return f"{resolution} @ {fps} FPS is not supported by camera {self.serial}"
+        try:
+            if not self._make_config(width, height, fps).can_resolve(rs.pipeline_wrapper(self.pipeline)):
+                return f"{resolution} @ {fps} FPS cannot be resolved"
+        except RuntimeError as e:
+            # The cache already vouched for the mode; don't block on a busy device
+            logging.debug(f"can_resolve failed, trusting the capability cache: {e}")
+        return None
+
+    def reconfigure(self, width, height, fps):
+        """Switch a running stream to a new mode with the shortest possible gap.
+
+        The mode is validated before anything is torn down; the pipeline
+        object, device selection, capture thread and (for same-size modes) the
+        frame buffers are reused. Returns seconds spent switching.
+        """
+        if (width, height, fps) == (self.width, self.height, self.fps):
+            return 0.0
+        problem = self.validate(width, height, fps)
+        if problem:
+            raise ValueError(problem)
+
+        with self.switch_lock:
+            start = time.perf_counter()
+            self.switching.set()
+            try:
+                self.pipeline.stop()
+                try:
+                    self.profile = self.pipeline.start(self._make_config(width, height, fps))
+                except RuntimeError:
+                    # Put the old mode back so the stream keeps running
+                    self.profile = self.pipeline.start(self._make_config(self.width, self.height, self.fps))
+                    raise
+                reallocated = self._ensure_buffers(width, height)
+                self.width, self.height, self.fps = width, height, fps
+                self.last_frame_number = None  # Numbering restarts with the new stream
+                self._read_depth_calibration()
+            finally:
+                self.switching.clear()
+            elapsed = time.perf_counter() - start
+            self.last_switch = {"switch_ms": elapsed * 1000.0, "gap_ms": None,
+                                "buffers_reused": not reallocated}
+            self.pending_switch = self.last_frame_time
+        return elapsed
+
+    def create_imu(self, store):
+        """ImuCapture for this camera's motion module (D435i/D455), or None if it has none."""
+        from devices.imu import ImuCapture
+        rates = ImuCapture.motion_rates(self.serial)
+        return ImuCapture(self.serial, store, rates) if rates else None
+
+    def latest(self):
+        """Newest frame pair, or None before the first frame.
+
+        This is the capture's own buffer, rewritten BUFFER_COUNT frames later;
+        check `seq` here and use read() to take the pixels.
+        """
+        return self.latest_frames
+
+    def read(self, out=None, attempts=3):
+        """Copy of the newest frame pair that the capture thread cannot overwrite, or None."""
+        for _ in range(attempts):
+            frames = self.latest_frames
+            if frames is None:
+                return None
+            copied = frames.copy(out)
+            if copied is not None:
+                return copied
+        return None
+
+    def _run(self):
+        while self.running:
+            if self.switching.is_set():
+                time.sleep(0.001)
+                continue
+            try:
+                success, frames = self.pipeline.try_wait_for_frames(100)
+            except RuntimeError:
+                continue
+            if not success:
+                continue
+            color_frame = frames.get_color_frame()
+            depth_frame = frames.get_depth_frame()
+            if not color_frame or not depth_frame:
+                continue
+
+            import numpy as np
+            copy_start = time.perf_counter()
+            buffer = self.buffers[self.buffer_index]
+            color = np.asanyarray(color_frame.get_data())
+            depth = np.asanyarray(depth_frame.get_data())
+            if color.shape != buffer.color.shape or depth.shape != buffer.depth.shape:
+                # A frame from the previous mode still in flight during a switch
+                continue
+            buffer.seq = 0  # being rewritten; see CapturedFrames.copy()
+            np.copyto(buffer.color, color)
+            np.copyto(buffer.depth, depth)
+            now = time.perf_counter()
+            buffer.timestamp = depth_frame.get_timestamp() / 1000.0
+            buffer.captured = now
+            self.seq += 1
+            buffer.seq = self.seq
+            self.latest_frames = buffer
+            self.buffer_index = (self.buffer_index + 1) % len(self.buffers)
+
+            self.frames_counter.inc()
+            self.copy_histogram.observe(now - copy_start)
+            frame_number = depth_frame.get_frame_number()
+            if self.last_frame_number is not None and frame_number > self.last_frame_number + 1:
+                self.dropped_counter.inc(frame_number - self.last_frame_number - 1)
+            self.last_frame_number = frame_number
+            if self.last_switch and self.last_switch["gap_ms"] is None and self.pending_switch:
+                self.last_switch["gap_ms"] = (now - self.pending_switch) * 1000.0
+                logging.info(f"Stream switched to {self.width}x{self.height} @ {self.fps} FPS: "
+                             f"{self.last_switch['switch_ms']:.0f} ms reconfigure, "
+                             f"{self.last_switch['gap_ms']:.0f} ms frame gap")
+            self.last_frame_time = now
+
+            for callback in self.consumers:
+                try:
+                    callback(buffer)
+                except Exception as e:
+                    logging.error(f"Capture consumer failed: {e}")
+            self.consumers_histogram.observe(time.perf_counter() - now)
@@ -0,0 +1,610 @@
+# devices/synthetic.py
+"""Stand-ins for the camera and the Pico, for load tests and benchmarks without hardware."""
+import builtins
+import errno
+import logging
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from devices.realsense import CapturedFrames
+from utils.metrics import get_metrics
+from utils.occupancy import default_intrinsics
+from rpip_firmware.trajectory import TrajectoryQueue, RUNNING
+
+
+def synthetic_depth(width, height, seed=0):
+    """A depth frame with a floor gradient, a box and some invalid (0) pixels."""
+    rng = np.random.default_rng(seed)
+    rows = np.linspace(4000, 600, height, dtype=np.float32)[:, None]
+    depth = np.repeat(rows, width, axis=1)
+    depth[height // 3:height // 2, width // 3:width // 2] = 900
+    depth += rng.normal(0, 8, depth.shape).astype(np.float32)
+    depth = depth.astype(np.uint16)
+    depth[rng.random(depth.shape) < 0.05] = 0
+    return depth
+
+
+def synthetic_color(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+class SyntheticCapture:
+    """Drop-in for RealSenseCapture that renders a moving box over a static scene.
+
+    `stall()` freezes the frame loop without stopping it, like a hung pipeline.
+    """
+
+    BUFFER_COUNT = 3
+
+    def __init__(self, serial="SYNTHETIC", moving=True):
+        self.serial = serial
+        self.moving = moving
+        self.width = self.height = self.fps = None
+        self.depth_intrinsics = None
+        self.depth_scale = 0.001
+        self.buffers = []
+        self.buffer_index = 0
+        self.latest_frames = None
+        self.seq = 0
+        self.consumers = []
+        self.thread = None
+        self.running = False
+        self.last_frame_time = None
+        self.last_switch = None
+        self.stalled_until = 0.0
+        self.lock = threading.Lock()
+        metrics = get_metrics()
+        self.frames_counter = metrics.counter("kozy_camera_frames_total", "Frame pairs captured")
+        self.dropped_counter = metrics.counter("kozy_camera_frames_dropped_total",
+                                               "Frames the device produced that the capture thread missed")
+        self.copy_histogram = metrics.histogram("kozy_capture_copy_seconds", "Copying a frame pair into a buffer")
+        self.consumers_histogram = metrics.histogram("kozy_capture_consumers_seconds",
+                                                     "Capture-thread consumers (bus, recording) per frame pair")
+
+    def add_consumer(self, callback):
+        self.consumers.append(callback)
+
+    def _prepare(self, width, height, fps):
+        self.base_color = synthetic_color(width, height)
+        self.base_depth = synthetic_depth(width, height)
+        self.buffers = [
+            CapturedFrames(np.empty((height, width, 3), np.uint8), np.empty((height, width), np.uint16))
+            for _ in range(self.BUFFER_COUNT)
+        ]
+        self.width, self.height, self.fps = width, height, fps
+        self.depth_intrinsics = default_intrinsics(width, height)
+
+    def start(self, width, height, fps):
+        self._prepare(width, height, fps)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="synthetic-capture", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        self.latest_frames = None
+
+    def validate(self, width, height, fps):
+        return None
+
+    def reconfigure(self, width, height, fps):
+        if (width, height, fps) == (self.width, self.height, self.fps):
+            return 0.0
+        start = time.perf_counter()
+        with self.lock:
+            self._prepare(width, height, fps)
+        elapsed = time.perf_counter() - start
+        self.last_switch = {"switch_ms": elapsed * 1000.0, "gap_ms": None, "buffers_reused": False}
+        return elapsed
+
+    def latest(self):
+        return self.latest_frames
+
+    def read(self, out=None, attempts=3):
+        for _ in range(attempts):
+            frames = self.latest_frames
+            if frames is None:
+                return None
+            copied = frames.copy(out)
+            if copied is not None:
+                return copied
+        return None
+
+    def create_imu(self, store):
+        return SyntheticImu(store)
+
+    def stall(self, seconds=None):
+        """Stop producing frames for `seconds` (None: until stopped)."""
+        self.stalled_until = float("inf") if seconds is None else time.monotonic() + seconds
+
+    def _render(self, buffer):
+        np.copyto(buffer.color, self.base_color)
+        np.copyto(buffer.depth, self.base_depth)
+        if self.moving:
+            box = max(self.height // 6, 1)
+            x = (self.seq * 4) % max(self.width - box, 1)
+            y = self.height // 2 - box // 2
+            buffer.color[y:y + box, x:x + box] = (255, 80, 40)
+            buffer.depth[y:y + box, x:x + box] = 700
+
+    def _run(self):
+        next_frame = time.perf_counter()
+        while self.running:
+            if time.monotonic() < self.stalled_until:
+                time.sleep(0.01)
+                next_frame = time.perf_counter()
+                continue
+            copy_start = time.perf_counter()
+            with self.lock:
+                buffer = self.buffers[self.buffer_index]
+                buffer.seq = 0
+                self._render(buffer)
+                now = self.last_frame_time = buffer.captured = time.perf_counter()
+                buffer.timestamp = time.time()
+                self.seq += 1
+                buffer.seq = self.seq
+                self.latest_frames = buffer
+                self.buffer_index = (self.buffer_index + 1) % len(self.buffers)
+            self.frames_counter.inc()
+            self.copy_histogram.observe(now - copy_start)
+            for callback in self.consumers:
+                try:
+                    callback(buffer)
+                except Exception as e:
+                    logging.error(f"Capture consumer failed: {e}")
+            self.consumers_histogram.observe(time.perf_counter() - now)
+
+            next_frame += 1.0 / self.fps
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind the frame clock: frames a camera would have produced are lost
+                self.dropped_counter.inc(int(-delay * self.fps))
+                next_frame = time.perf_counter()
+
+
+class SyntheticImu:
+    """Drop-in for ImuCapture: gravity plus noise on accel, a slow wobble on gyro.
+
+    Each stream has its own thread at its own rate, timestamped with time.time()
+    like SyntheticCapture frames. `drop(n)` skips frame numbers as if the device
+    had lost samples.
+    """
+
+    def __init__(self, store, rates=None):
+        self.store = store
+        self.rates = rates or {"accel": 250, "gyro": 400}
+        self.running = False
+        self.seq = 0
+        self.threads = []
+        self.pending_drops = {stream: 0 for stream in self.rates}
+        metrics = get_metrics()
+        self.samples_counters = {stream: metrics.counter("kozy_imu_samples_total", "IMU samples received",
+                                                         stream=stream) for stream in self.rates}
+
+    def start(self):
+        self.running = True
+        for stream, rate in self.rates.items():
+            thread = threading.Thread(target=self._run, args=(stream, rate), name=f"synthetic-imu-{stream}",
+                                      daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def drop(self, count, stream="gyro"):
+        self.pending_drops[stream] += count
+
+    def _run(self, stream, rate):
+        rng = np.random.default_rng()
+        frame_number = 0
+        interval = 1.0 / rate
+        next_sample = time.perf_counter()
+        while self.running:
+            frame_number += 1 + self.pending_drops[stream]
+            self.pending_drops[stream] = 0
+            now = time.time()
+            if stream == "accel":
+                x, y, z = rng.normal(0, 0.05, 3) + (0.0, -9.81, 0.0)
+            else:
+                x, y, z = 0.2 * np.sin(now), 0.1 * np.cos(now * 0.5), rng.normal(0, 0.002)
+            self.store.write(stream, now, x, y, z, frame_number)
+            self.samples_counters[stream].inc()
+            self.seq += 1
+            next_sample += interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=1)
+        self.threads = []
+
+
+class PicoSimulator:
+    """A fake Pico on a pseudo-terminal, speaking the rpip_firmware line protocol.
+
+    Open `simulator.port` with PicoLink (or pyserial) like a real board. It
+    answers GET_CODE, PING, MOVE and TRAJ and streams `TEL:` lines at `telemetry_hz`.
+    `mute()` makes it go silent for a while, like a hung board. `stall_link()`
+    delays incoming commands, like a congested USB link. Trajectories are
+    queued by the firmware's own TrajectoryQueue and played back on a timer
+    thread. Linux/macOS only.
+    """
+
+    def __init__(self, code="123456", telemetry_hz=100):
+        import pty
+        import tty
+        self.code = code
+        self.telemetry_hz = telemetry_hz
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.running = False
+        self.threads = []
+        self.write_lock = threading.Lock()
+        self.lines_sent = 0
+        self.commands = []
+        self.muted_until = 0.0
+        self.stalled_until = 0.0
+        self.servo_targets = {}
+        self.trajectory = TrajectoryQueue(capacity=256, max_joints=16)
+        self.trajectory_generation = 0
+
+    def start(self):
+        self.running = True
+        for target, name in ((self._command_loop, "pico-sim-commands"), (self._telemetry_loop, "pico-sim-telemetry")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def mute(self, seconds):
+        """Ignore commands and stop telemetry for `seconds`."""
+        self.muted_until = time.monotonic() + seconds
+
+    def stall_link(self, seconds):
+        """Hold commands for `seconds` before answering them; trajectory playback goes on."""
+        self.stalled_until = time.monotonic() + seconds
+
+    def write_line(self, line):
+        if time.monotonic() < self.muted_until:
+            return
+        with self.write_lock:
+            os.write(self.master_fd, line.encode("utf-8") + b"\r\n")
+            self.lines_sent += 1
+
+    def handle_command(self, command):
+        """Reply to one command line; subclasses extend the protocol."""
+        if command == "GET_CODE":
+            self.write_line(f"CODE:{self.code}")
+        elif command == "PING":
+            self.write_line("PONG:ok")
+        elif command.startswith("MOVE "):
+            try:
+                servo, angle = command.split()[1:3]
+                self.write_line(f"ACK:MOVE {int(servo)} {float(angle):g}")
+            except ValueError:
+                self.write_line("ERR:usage MOVE <servo> <angle>")
+        elif command.startswith("TRAJ "):
+            arguments = command.split()[1:]
+            if arguments and arguments[0] in ("BEGIN", "ABORT"):
+                self.trajectory_generation += 1  # stops the playback thread
+            reply = self.trajectory.handle(arguments)
+            if self.trajectory.should_start():
+                self.trajectory.start()
+                self.trajectory_generation += 1
+                thread = threading.Thread(target=self._trajectory_loop, args=(self.trajectory_generation,),
+                                          name="pico-sim-trajectory", daemon=True)
+                thread.start()
+                reply = self.trajectory.status()
+            self.write_line(reply)
+
+    def _trajectory_loop(self, generation):
+        """Stands in for the firmware's periodic timer."""
+        period = self.trajectory.period_us / 1e6
+        next_tick = time.perf_counter() + period
+        while self.running and generation == self.trajectory_generation and self.trajectory.state == RUNNING:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.trajectory.tick(self.servo_targets)
+            next_tick += period
+
+    def _command_loop(self):
+        import select
+        pending = b""
+        while self.running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                pending += os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            *lines, pending = pending.split(b"\n")
+            for raw_line in lines:
+                command = raw_line.decode("utf-8", errors="ignore").strip()
+                if command:
+                    self.commands.append(command)
+                    delay = self.stalled_until - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.handle_command(command)
+
+    def _telemetry_loop(self):
+        if not self.telemetry_hz:
+            return
+        interval = 1.0 / self.telemetry_hz
+        count = 0
+        next_line = time.perf_counter()
+        while self.running:
+            count += 1
+            try:
+                self.write_line(f"TEL:t={count},pos={count * 7 % 180},cur={count % 900}")
+            except OSError:
+                break
+            next_line += interval
+            delay = next_line - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=1)
+        self.threads = []
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class _BoardOS:
+    """The `os` module seen by code on a MicroPythonBoardSimulator: paths stay inside the board's flash."""
+
+    sep = "/"
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, path):
+        full = os.path.realpath(os.path.join(self.root, str(path).lstrip("/")))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            raise OSError(errno.ENOENT, "ENOENT")
+        return full
+
+    def listdir(self, path="/"):
+        return sorted(os.listdir(self.path(path)))
+
+    def stat(self, path):
+        return tuple(os.stat(self.path(path)))[:10]
+
+    def remove(self, path):
+        os.remove(self.path(path))
+
+    def rename(self, old, new):
+        os.rename(self.path(old), self.path(new))
+
+    def mkdir(self, path):
+        os.mkdir(self.path(path))
+
+    def rmdir(self, path):
+        os.rmdir(self.path(path))
+
+    def getcwd(self):
+        return "/"
+
+
+class MicroPythonBoardSimulator:
+    """A fake MicroPython board on a pseudo-terminal, for firmware deploys (devices/deploy.py).
+
+    It implements enough of the REPL for a deploy. Ctrl-C stops the "running"
+    main.py, Ctrl-A enters the raw REPL, Ctrl-D runs the code sent so far,
+    and Ctrl-B returns to the friendly REPL, where Ctrl-D soft-resets.
+    Raw-paste mode grants `window` bytes at a time; with `raw_paste=False`
+    the board acts like firmware older than MicroPython 1.14. Code runs in
+    this process, with `open` and `os` confined to `root`, the board's flash
+    (a temporary directory unless given). `files` seeds it.
+    `bytes_per_second` paces reading, like a slow link. Linux/macOS only.
+    """
+
+    BANNER = (b"MicroPython v1.22.2 on 2024-02-22; Raspberry Pi Pico with RP2040\r\n"
+              b"Type \"help()\" for more information.\r\n")
+
+    def __init__(self, root=None, files=None, window=128, raw_paste=True, bytes_per_second=None):
+        import pty
+        import tempfile
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.tempdir = None
+        if root is None:
+            self.tempdir = tempfile.TemporaryDirectory(prefix="kozy-board-")
+            root = self.tempdir.name
+        self.root = os.path.realpath(root)
+        self.board_os = _BoardOS(self.root)
+        for path, data in (files or {}).items():
+            os.makedirs(os.path.dirname(self.board_os.path(path)), exist_ok=True)
+            with open(self.board_os.path(path), "wb") as board_file:
+                board_file.write(data)
+        self.window = window
+        self.raw_paste = raw_paste
+        self.bytes_per_second = bytes_per_second
+        self.mode = "running"  # running (main.py), friendly, raw or paste
+        self.code = bytearray()
+        self.paste_unacknowledged = 0
+        self.namespace = None
+        self.output = None
+        self.resets = 0
+        self.executions = 0
+        self.bytes_received = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="board-sim", daemon=True)
+        self.thread.start()
+        return self
+
+    def files(self):
+        """{path: contents} of everything on the board's flash."""
+        contents = {}
+        for folder, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(folder, name)
+                with open(path, "rb") as board_file:
+                    contents[os.path.relpath(path, self.root).replace(os.sep, "/")] = board_file.read()
+        return contents
+
+    def write(self, data):
+        os.write(self.master_fd, data)
+
+    def _soft_reset(self):
+        self.resets += 1
+        self.namespace = None
+        self.write(b"MPY: soft reboot\r\n")
+
+    def _print(self, *values, sep=" ", end="\n", file=None):
+        self.output.append(sep.join(str(value) for value in values) + end)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name in ("os", "uos"):
+            return self.board_os
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def _open(self, path, mode="r", *args, **kwargs):
+        return open(self.board_os.path(path), mode, *args, **kwargs)
+
+    def _execute(self, code):
+        """Run one raw REPL submission; returns (stdout, stderr) as the board would send them."""
+        if self.namespace is None:
+            board_builtins = dict(vars(builtins))
+            board_builtins.update(open=self._open, print=self._print, __import__=self._import)
+            self.namespace = {"__builtins__": board_builtins, "__name__": "__main__"}
+        self.executions += 1
+        self.output = []
+        error = ""
+        try:
+            exec(compile(code.decode("utf-8"), "<stdin>", "exec"), self.namespace)
+        except Exception as e:
+            error = f"Traceback (most recent call last):\n  File \"<stdin>\"\n{type(e).__name__}: {e}\n"
+        return ("".join(self.output).replace("\n", "\r\n").encode("utf-8"),
+                error.replace("\n", "\r\n").encode("utf-8"))
+
+    def _feed(self, byte):
+        if self.mode == "paste":
+            if byte == 0x04:
+                self.write(b"\x04")
+                output, error = self._execute(bytes(self.code))
+                self.code.clear()
+                self.mode = "raw"
+                self.write(output + b"\x04" + error + b"\x04>")
+                return
+            self.code.append(byte)
+            self.paste_unacknowledged += 1
+            if self.paste_unacknowledged >= self.window:
+                self.paste_unacknowledged -= self.window
+                self.write(b"\x01")
+        elif self.mode == "raw":
+            if self.code[:1] == b"\x05":  # the rest of a raw-paste request, Ctrl-E A Ctrl-A
+                self.code.append(byte)
+                if len(self.code) < 3:
+                    return
+                request = bytes(self.code)
+                self.code.clear()
+                if request == b"\x05A\x01" and self.raw_paste:
+                    self.mode = "paste"
+                    self.paste_unacknowledged = 0
+                    self.write(b"R\x01" + struct.pack("<H", self.window))
+                elif request == b"\x05A\x01":
+                    self.write(b"R\x00")
+            elif byte == 0x01:
+                self.code.clear()
+                self.write(b"\r\n" + b"raw REPL; CTRL-B to exit\r\n>")
+            elif byte == 0x02:
+                self.code.clear()
+                self.mode = "friendly"
+                self.write(b"\r\n" + self.BANNER + b">>> ")
+            elif byte == 0x03:
+                self.code.clear()
+            elif byte == 0x04:
+                if not self.code:
+                    self.write(b"OK")
+                    self._soft_reset()
+                    self.write(b"raw REPL; CTRL-B to exit\r\n>")
+                    return
+                self.write(b"OK")
+                output, error = self._execute(bytes(self.code))
+                self.code.clear()
+                self.write(output + b"\x04" + error + b"\x04>")
+            else:
+                self.code.append(byte)
+        elif self.mode == "friendly":
+            if byte == 0x01:
+                self.mode = "raw"
+                self.code.clear()
+                self.write(b"\r\nraw REPL; CTRL-B to exit\r\n>")
+            elif byte == 0x02:
+                self.write(b"\r\n" + self.BANNER + b">>> ")
+            elif byte in (0x03, 0x0D):
+                self.write(b"\r\n>>> ")
+            elif byte == 0x04:
+                self._soft_reset()
+                self._run_main()
+        elif byte == 0x03:  # interrupt main.py
+            self.write(b"Traceback (most recent call last):\r\n  File \"main.py\"\r\nKeyboardInterrupt: \r\n"
+                       + self.BANNER + b">>> ")
+            self.mode = "friendly"
+
+    def _run_main(self):
+        if os.path.exists(self.board_os.path("main.py")):
+            self.mode = "running"
+        else:
+            self.mode = "friendly"
+            self.write(self.BANNER + b">>> ")
+
+    def _loop(self):
+        import select
+        while self.running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            self.bytes_received += len(data)
+            if self.bytes_per_second:
+                time.sleep(len(data) / self.bytes_per_second)
+            try:
+                for byte in data:
+                    self._feed(byte)
+            except OSError:
+                break
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.tempdir:
+            self.tempdir.cleanup()
+            self.tempdir = None
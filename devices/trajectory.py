@@ -0,0 +1,222 @@
+# devices/trajectory.py
+"""Multi-servo trajectories planned on the host and played back by the Pico.
+
+`plan()` samples min-jerk or trapezoidal moves through a list of waypoints
+at a fixed rate. All segments and joints are computed in one set of numpy
+operations. `TrajectoryStreamer` sends the samples in chunks to the bounded
+queue in rpip_firmware/trajectory.py. The Pico plays them back on its own
+timer, so motion no longer depends on USB or host scheduling latency. Each
+reply carries the queue level, and the streamer sends more whenever there
+is room.
+
+In the console, `servo traj minjerk 0,1,2 10,20,30 170,160,150` moves servos
+0-2 from their last commanded angles through each waypoint; `servo traj status`
+and `servo traj stop` follow it. The limits are TRAJECTORY in gui/main_window.py.
+"""
+import itertools
+import logging
+import threading
+import time
+
+from utils.lazy import lazy_import
+from utils.metrics import get_metrics
+
+np = lazy_import("numpy")
+
+PROFILES = ("minjerk", "trapezoid")
+QUEUE_CAPACITY = 256  # points; matches rpip_firmware/main.py
+MIN_JERK_PEAK_VELOCITY = 1.875  # peak speed of a min-jerk move, in units of distance / duration
+MIN_JERK_PEAK_ACCELERATION = 5.7735  # ... in units of distance / duration**2
+
+_trajectory_ids = itertools.count(1)
+
+
+def min_jerk(tau):
+    """Min-jerk progress (0..1) at normalised time tau (0..1)."""
+    return tau ** 3 * (10.0 - 15.0 * tau + 6.0 * tau ** 2)
+
+
+def plan(waypoints, rate_hz=100.0, profile="minjerk", max_velocity=90.0, max_acceleration=360.0,
+         durations=None):
+    """Sample a trajectory through `waypoints`; returns (N, joints) angles, one row per tick.
+
+    `waypoints` is (segments + 1, joints) and its first row is where the servos
+    are now (it is not repeated in the output). Each segment takes the shortest
+    time that keeps every joint within `max_velocity` (deg/s) and
+    `max_acceleration` (deg/s^2), or `durations[i]` seconds if that is longer.
+    All joints of a segment start and stop together.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile '{profile}'; choose from {', '.join(PROFILES)}")
+    waypoints = np.asarray(waypoints, np.float64)
+    if waypoints.ndim != 2 or len(waypoints) < 2:
+        raise ValueError("need at least two waypoints of one or more joints")
+    deltas = np.diff(waypoints, axis=0)
+    distance = np.abs(deltas).max(axis=1)
+
+    if profile == "minjerk":
+        shortest = np.maximum(MIN_JERK_PEAK_VELOCITY * distance / max_velocity,
+                              np.sqrt(MIN_JERK_PEAK_ACCELERATION * distance / max_acceleration))
+    else:
+        # Triangular when max velocity is never reached, trapezoidal otherwise
+        ramp = np.minimum(max_velocity / max_acceleration, np.sqrt(distance / max_acceleration))
+        shortest = 2 * ramp + np.where(ramp > 0, distance / np.maximum(max_acceleration * ramp, 1e-12) - ramp, 0)
+    total = shortest if durations is None else np.maximum(shortest, np.asarray(durations, np.float64))
+    if profile == "trapezoid":
+        # Ramp time that covers the distance at max_acceleration within `total`
+        ramp = (total - np.sqrt(np.maximum(total ** 2 - 4 * distance / max_acceleration, 0.0))) / 2
+
+    steps = np.maximum(1, np.ceil(total * rate_hz - 1e-9).astype(np.int64))
+    segment = np.repeat(np.arange(len(steps)), steps)
+    first_sample = np.repeat(np.cumsum(steps) - steps, steps)
+    t = np.minimum((np.arange(steps.sum()) - first_sample + 1) / rate_hz, total[segment])
+    if profile == "minjerk":
+        progress = min_jerk(np.divide(t, total[segment], out=np.ones_like(t), where=total[segment] > 0))
+    else:
+        seg_total, seg_ramp, seg_distance = total[segment], ramp[segment], distance[segment]
+        velocity = np.divide(seg_distance, seg_total - seg_ramp, out=np.zeros_like(t), where=seg_total > seg_ramp)
+        acceleration = np.divide(velocity, seg_ramp, out=np.zeros_like(t), where=seg_ramp > 0)
+        covered = np.where(t < seg_ramp, 0.5 * acceleration * t ** 2,
+                           np.where(t <= seg_total - seg_ramp, velocity * (t - 0.5 * seg_ramp),
+                                    seg_distance - 0.5 * acceleration * (seg_total - t) ** 2))
+        progress = np.divide(covered, seg_distance, out=np.ones_like(t), where=seg_distance > 0)
+    return waypoints[segment] + progress[:, None] * deltas[segment]
+
+
+def parse_buffer_report(payload):
+    """Payload of a `BUF:` line as a dict."""
+    traj_id, state, queued, capacity, executed, underruns, late_us = payload.split()
+    return {"id": int(traj_id), "state": state, "queued": int(queued), "capacity": int(capacity),
+            "executed": int(executed), "underruns": int(underruns), "late_us": int(late_us)}
+
+
+class TrajectoryStreamer:
+    """Streams planned angles into the Pico's trajectory queue and keeps it fed.
+
+    Runs on its own thread. A chunk goes out whenever the last reported level
+    leaves room for it. When the queue is full, the streamer waits for about
+    half a chunk of playback and asks for the level again.
+
+    The timing error is how far the Pico's playback lags the plan, as seen
+    from the host. The plan starts when the prefill is acknowledged, and a
+    report with `executed` points at host time t gives
+    t - (start + executed * period). It grows with underruns and includes link
+    latency and clock drift.
+    """
+
+    def __init__(self, link, servos, positions, rate_hz=100.0, chunk_points=16, prefill=32,
+                 capacity=QUEUE_CAPACITY, reply_timeout=5.0, on_done=None):
+        self.link = link
+        self.servos = [int(servo) for servo in servos]
+        self.positions = np.asarray(positions, np.float64).reshape(-1, len(self.servos))
+        self.period_us = int(round(1e6 / rate_hz))
+        self.chunk_points = chunk_points
+        self.prefill = min(prefill, len(self.positions))
+        self.capacity = capacity
+        # Generous: the queue keeps playing while a congested link holds up replies
+        self.reply_timeout = reply_timeout
+        self.on_done = on_done
+        self.traj_id = next(_trajectory_ids)
+        self.thread = None
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        self.report = None  # last BUF report
+        self.sent = 0
+        self.chunks = 0
+        self.start_time = None
+        self.timing_errors = []
+        metrics = get_metrics()
+        self.points_counter = metrics.counter("kozy_traj_points_total", "Trajectory points sent to the Pico")
+        self.underruns_counter = metrics.counter("kozy_traj_underruns_total",
+                                                 "Pico trajectory ticks with an empty queue")
+        self.error_histogram = metrics.histogram("kozy_traj_timing_error_seconds",
+                                                 "Trajectory playback lag behind the plan, seen from the host")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"trajectory-{self.traj_id}", daemon=True)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wait(self, timeout=None):
+        """True once the trajectory has finished playing, failed or been cancelled."""
+        return self.finished.wait(timeout)
+
+    def _request(self, text):
+        reply = self.link.request(f"TRAJ {text}", reply_kinds=("BUF", "ERR"), timeout=self.reply_timeout)
+        if reply is None:
+            raise RuntimeError(f"no reply to TRAJ {text.split()[0]} within {self.reply_timeout:g} s")
+        kind, payload = reply
+        if kind == "ERR":
+            raise RuntimeError(f"Pico: {payload}")
+        report = parse_buffer_report(payload)
+        received = time.monotonic()
+        if self.report is not None and report["underruns"] > self.report["underruns"]:
+            self.underruns_counter.inc(report["underruns"] - self.report["underruns"])
+        self.report = report
+        if report["state"] != "wait" and self.start_time is None:
+            self.start_time = received
+        elif self.start_time is not None and report["state"] == "run":
+            error = received - (self.start_time + report["executed"] * self.period_us / 1e6)
+            self.timing_errors.append(error)
+            self.error_histogram.observe(max(error, 0.0))
+        return report
+
+    def _send_chunk(self):
+        rows = self.positions[self.sent:self.sent + self.chunk_points]
+        text = ";".join(",".join(f"{angle:.1f}" for angle in row) for row in rows.tolist())
+        self._request(f"PTS {self.traj_id} {self.chunks} {text}")
+        self.sent += len(rows)
+        self.chunks += 1
+        self.points_counter.inc(len(rows))
+
+    def _run(self):
+        period = self.period_us / 1e6
+        try:
+            self._request(f"BEGIN {self.traj_id} {self.period_us} {','.join(map(str, self.servos))} {self.prefill}")
+            while self.sent < len(self.positions):
+                if self.cancelled.is_set():
+                    raise RuntimeError("cancelled")
+                room = self.capacity - self.report["queued"]
+                if room >= min(self.chunk_points, len(self.positions) - self.sent):
+                    self._send_chunk()
+                else:
+                    time.sleep(self.chunk_points * period / 2)
+                    self._request("STATUS")
+            self._request(f"END {self.traj_id}")
+            while self.report["state"] != "done":
+                if self.cancelled.is_set():
+                    raise RuntimeError("cancelled")
+                time.sleep(min(max(self.report["queued"] * period, period), 0.1))
+                self._request("STATUS")
+            logging.info(f"Trajectory {self.traj_id} played: {self.report['executed']} points, "
+                         f"{self.report['underruns']} underruns, max lag {self.max_timing_error() * 1000:.1f} ms")
+        except Exception as e:
+            self.error = str(e)
+            try:
+                self.link.send("TRAJ ABORT")
+            except Exception:
+                pass
+            if str(e) != "cancelled":
+                logging.error(f"Trajectory {self.traj_id} failed: {e}")
+        finally:
+            self.finished.set()
+            if self.on_done:
+                self.on_done(self)
+
+    def max_timing_error(self):
+        return max(self.timing_errors, default=0.0)
+
+    def stats(self):
+        report = self.report or {}
+        errors = self.timing_errors
+        return {"id": self.traj_id, "points": len(self.positions), "sent": self.sent,
+                "state": report.get("state", "idle"), "queued": report.get("queued", 0),
+                "executed": report.get("executed", 0), "underruns": report.get("underruns", 0),
+                "late_us": report.get("late_us", 0), "error": self.error,
+                "timing_error_ms": {"last": errors[-1] * 1000 if errors else 0.0,
+                                    "mean": float(np.mean(errors)) * 1000 if errors else 0.0,
+                                    "max": self.max_timing_error() * 1000}}
@@ -0,0 +1,597 @@
+# gui/commands.py
+"""Console commands for the control panel's modules, registered on a CommandRegistry.
+
+Handlers run on command worker threads. Anything touching widgets goes
+through `context.gui()`; serial I/O and waits stay on the worker.
+"""
+import threading
+import time
+
+from devices.realsense import depth_region_histograms, summarize_distance_histogram
+from devices.trajectory import PROFILES, TrajectoryStreamer, plan
+from gui.modules import ID_PREFIXES, MODULE_TYPES
+from gui.styles import theme_names
+from utils.commands import CommandError, expect_args, parse_number
+
+SERVO_COUNT = 16  # matches rpip_firmware
+
+
+def _wait_ready(context, start, timeout, what):
+    """Call `start(on_ready)` on the GUI thread and wait for on_ready(ok)."""
+    done = threading.Event()
+    outcome = {}
+
+    def on_ready(ok):
+        outcome["ok"] = ok
+        done.set()
+
+    context.gui(start, on_ready)
+    context.wait(done, timeout, what)
+    return outcome["ok"]
+
+
+def register_window_commands(registry, window):
+    """Register theme, module, plugins, cam, pico, servo, rec, preview, metrics, watchdog, occupancy, imu and graph commands for `window`."""
+
+    def require_realsense():
+        if not window.realsense_module_id:
+            raise CommandError("no RealSense Camera module; try 'module add realsense'")
+
+    def require_pico():
+        link = window.pico_link
+        if link is None or not link.running:
+            raise CommandError("Pico not connected; try 'pico connect'")
+        return link
+
+    def find_module(module_id):
+        if window.module_list.entry(module_id) is None:
+            raise CommandError(f"no module '{module_id}'; see 'module list'")
+        return module_id
+
+    # Theme and modules
+
+    def theme(context, args):
+        expect_args(args, 1, usage="theme <name>")
+        if args[0] not in theme_names():
+            raise CommandError(f"unknown theme '{args[0]}'; choose from {', '.join(theme_names())}")
+        context.gui(window.change_theme, args[0])
+        return f"theme {args[0]} applied in {window.last_theme_switch_ms:.1f} ms"
+
+    def module_list(context, args):
+        rows = context.gui(lambda: [(entry.module_id, entry.name, entry.enabled, entry.status)
+                                    for entry in window.module_list.entries])
+        if not rows:
+            return "no modules"
+        return "\n".join(f"{module_id:<14} {name:<22} {'on ' if enabled else 'off'} {status}"
+                         for module_id, name, enabled, status in rows)
+
+    def module_add(context, args):
+        expect_args(args, 1, 3, usage="module add <type>")
+        name = " ".join(args)
+        aliases = {prefix: module_type for module_type, prefix in ID_PREFIXES.items()}
+        module_type = aliases.get(name.lower(), name)
+        if module_type not in MODULE_TYPES:
+            raise CommandError(f"unknown module type '{name}'; choose from {', '.join(aliases)}")
+        return f"added {context.gui(window.add_module, module_type)}"
+
+    def module_remove(context, args):
+        expect_args(args, 1, usage="module remove <id>")
+        context.gui(window.remove_module, find_module(args[0]))
+        return f"removed {args[0]}"
+
+    def module_toggle(context, args):
+        expect_args(args, 1, usage="module toggle <id>")
+        context.gui(window.toggle_module, find_module(args[0]))
+        enabled = window.module_list.entry(args[0]).enabled
+        return f"{args[0]} {'enabled' if enabled else 'disabled'}"
+
+    def find_plugin_module(module_id):
+        entry = window.module_list.entry(find_module(module_id))
+        if entry.module_type not in window.plugins.specs:
+            raise CommandError(f"{module_id} is not a plugin device")
+        return module_id
+
+    def module_start(context, args):
+        expect_args(args, 1, usage="module start <id>")
+        module_id = find_plugin_module(args[0])
+        if module_id in window.plugin_frames:
+            return "already streaming"
+        if not _wait_ready(context, lambda on_ready: window.start_plugin(module_id, on_ready), 15,
+                           f"{module_id} to start"):
+            raise CommandError(f"{module_id} failed to start (see log)")
+        return f"{module_id} streaming to {window.driver_hosts[module_id].topic}"
+
+    def module_stop(context, args):
+        expect_args(args, 1, usage="module stop <id>")
+        context.gui(window.stop_plugin, find_plugin_module(args[0]))
+        return f"stopping {args[0]}"
+
+    def plugins(context, args):
+        specs = window.plugins.specs
+        if not specs:
+            return "no device plugins found"
+        lines = []
+        for name, spec in specs.items():
+            in_use = name in window.plugins.classes or any(module_id in window.driver_hosts
+                                                           for module_id in window.module_list.ids(name))
+            loaded = "loaded" if in_use else "not loaded"
+            lines.append(f"{name} ({spec.id_prefix}): {spec.describe()}, {loaded}"
+                         f"{', isolated' if spec.isolate else ''}")
+            for module_id in window.module_list.ids(name):
+                host = window.driver_hosts.get(module_id)
+                if host is None:
+                    continue
+                try:
+                    stats = host.stats()
+                except Exception as e:
+                    stats = {"error": str(e)}
+                details = ", ".join(f"{key} {value}" for key, value in stats.items() if value is not None)
+                lines.append(f"  {module_id}: {host.topic}, {details}")
+        return "\n".join(lines)
+
+    # Camera
+
+    def cam_start(context, args):
+        require_realsense()
+        if window.capture is not None:
+            return "already streaming"
+        if not _wait_ready(context, window.start_realsense, 15, "the camera to start"):
+            raise CommandError("camera failed to start (see log)")
+        width, height, fps = context.gui(window.selected_stream_mode)
+        return f"streaming {width}x{height} @ {fps} FPS"
+
+    def cam_stop(context, args):
+        if window.capture is None:
+            return "not streaming"
+        context.gui(window.stop_realsense)
+        return "stopped"
+
+    def cam_status(context, args):
+        capture = window.capture
+        if capture is None:
+            return "not streaming"
+        width, height, fps = context.gui(window.selected_stream_mode)
+        lines = [f"{capture.serial}: {width}x{height} @ {fps} FPS, frame {capture.seq}, "
+                 f"{window.frames_displayed} displayed"]
+        if capture.last_switch:
+            lines.append(f"last switch {capture.last_switch['switch_ms']:.0f} ms")
+        frames = capture.read()
+        if frames is not None:
+            # Same statistics as `python -m tools.analyze` reports for recordings
+            histograms = depth_region_histograms(frames.depth, getattr(capture, "depth_scale", 0.001))
+            whole = summarize_distance_histogram(histograms.sum(axis=(0, 1)))
+            centre = summarize_distance_histogram(histograms[1, 1])
+            median = f"{centre['p50_m']:.2f} m" if centre["p50_m"] is not None else "no depth"
+            lines.append(f"depth fill {whole['fill']:.0%}, centre median {median}")
+        return "\n".join(lines)
+
+    def select_combo(combo, text, what):
+        options = [combo.itemText(i) for i in range(combo.count())]
+        if text not in options:
+            raise CommandError(f"{what} {text} not supported; options: {', '.join(options)}")
+        combo.setCurrentText(text)
+
+    def cam_set_fps(context, args):
+        expect_args(args, 1, usage="cam set fps <fps>")
+        require_realsense()
+        fps = parse_number(args[0], int, "fps", 1, 300)
+        context.gui(select_combo, window.fps_combo, str(fps), "fps")
+        return f"fps set to {fps}" + (" (switching stream)" if window.capture else "")
+
+    def cam_set_resolution(context, args):
+        expect_args(args, 1, usage="cam set resolution <WxH>")
+        require_realsense()
+        context.gui(select_combo, window.resolution_combo, args[0], "resolution")
+        return f"resolution set to {args[0]}" + (" (switching stream)" if window.capture else "")
+
+    # Pico and servos
+
+    def pico_connect(context, args):
+        if not window.pico_module_id:
+            raise CommandError("no RPi Pico module; try 'module add pico'")
+        if not _wait_ready(context, window.connect_pico, 10, "the Pico"):
+            raise CommandError("Pico did not answer")
+        return f"connected on {window.pico_link.port}"
+
+    def pico_send(context, args):
+        expect_args(args, 1, 64, usage="pico send <text>")
+        link = require_pico()
+        link.send(" ".join(args))
+        return "sent"
+
+    def pico_code(context, args):
+        code = require_pico().request_code()
+        if not code:
+            raise CommandError("no CODE reply")
+        return f"code {code}"
+
+    def pico_deploy(context, args):
+        from devices.deploy import deploy_board, firmware_files, format_report
+        expect_args(args, 0, 1, usage="pico deploy [check|force]")
+        if args and args[0] not in ("check", "force"):
+            raise CommandError("usage: pico deploy [check|force]")
+        if window.trajectory is not None and not window.trajectory.finished.is_set():
+            raise CommandError("a trajectory is playing; try 'servo traj stop'")
+        port = context.gui(window.release_pico)
+        try:
+            if not port:
+                raise CommandError("Pico not found")
+            deadline = time.monotonic() + 5
+            while window.pico_connecting is not None and time.monotonic() < deadline:
+                time.sleep(0.05)  # a reconnect that was under way lets go of the port
+            files = firmware_files()
+            context.write(f"deploying {len(files)} file(s) to {port}...")
+            report = deploy_board(port, files, check=args == ["check"], force=args == ["force"])
+        finally:
+            reconnected = _wait_ready(context, window.reclaim_pico, 10, "the Pico")
+        result = format_report(report)
+        if not reconnected:
+            result += "; Pico did not answer after the reset"
+        if report["error"]:
+            raise CommandError(result)
+        return result
+
+    def servo_move(context, args):
+        expect_args(args, 2, usage="servo move <servo> <angle>")
+        servo = parse_number(args[0], int, "servo", 0, SERVO_COUNT - 1)
+        angle = parse_number(args[1], float, "angle", 0, 180)
+        start = time.perf_counter()
+        reply = require_pico().request(f"MOVE {servo} {angle:g}", timeout=1.0)
+        if reply is None:
+            raise CommandError("no reply from the Pico within 1 s")
+        kind, payload = reply
+        if kind == "ERR":
+            raise CommandError(f"Pico: {payload}")
+        window.servo_angles[servo] = angle
+        return f"{payload} (round trip {(time.perf_counter() - start) * 1000:.1f} ms)"
+
+    def servo_traj(context, args):
+        expect_args(args, 3, 34, usage="servo traj <minjerk|trapezoid> <servo,...> <angle,...> [<angle,...> ...]")
+        if args[0] not in PROFILES:
+            raise CommandError(f"unknown profile '{args[0]}'; choose from {', '.join(PROFILES)}")
+        servos = [parse_number(text, int, "servo", 0, SERVO_COUNT - 1) for text in args[1].split(",")]
+        if len(set(servos)) != len(servos):
+            raise CommandError("each servo may appear once")
+        waypoints = [[window.servo_angles.get(servo, 90.0) for servo in servos]]
+        for text in args[2:]:
+            angles = [parse_number(value, float, "angle", 0, 180) for value in text.split(",")]
+            if len(angles) != len(servos):
+                raise CommandError(f"each waypoint needs {len(servos)} angle(s), one per servo")
+            waypoints.append(angles)
+        link = require_pico()
+        if window.trajectory is not None and not window.trajectory.finished.is_set():
+            raise CommandError("a trajectory is playing; try 'servo traj stop'")
+
+        options = window.trajectory_options
+        rate = float(options["rate_hz"])
+        start = time.perf_counter()
+        positions = plan(waypoints, rate, args[0], options["max_velocity"], options["max_acceleration"])
+        plan_ms = (time.perf_counter() - start) * 1000
+        streamer = TrajectoryStreamer(link, servos, positions, rate, options["chunk_points"], options["prefill"])
+        window.trajectory = streamer.start()
+        context.write(f"trajectory {streamer.traj_id}: {len(positions)} points over {len(positions) / rate:.2f} s "
+                      f"(planned in {plan_ms:.1f} ms)")
+        while not streamer.wait(0.05):
+            if context.cancelled.is_set():
+                streamer.cancel()
+                streamer.wait(2)
+                raise CommandError("cancelled")
+        stats = streamer.stats()
+        final = ""
+        if stats["executed"]:
+            # Where playback stopped, which is the end unless it was stopped or failed
+            angles = positions[stats["executed"] - 1].tolist()
+            window.servo_angles.update(zip(servos, angles))
+            final = "; servos at " + ", ".join(f"{servo}: {angle:.1f}°" for servo, angle in zip(servos, angles))
+        if streamer.error:
+            raise CommandError((f"trajectory {streamer.traj_id} stopped after {stats['executed']} points"
+                                if streamer.error == "cancelled" else streamer.error) + final)
+        return trajectory_summary(stats) + final
+
+    def trajectory_summary(stats):
+        lag = stats["timing_error_ms"]
+        return (f"trajectory {stats['id']} {stats['state']}: {stats['executed']}/{stats['points']} points played, "
+                f"{stats['queued']} queued, {stats['underruns']} underruns; lag behind plan mean {lag['mean']:.1f} ms, "
+                f"max {lag['max']:.1f} ms; worst tick {stats['late_us'] / 1000:.1f} ms late")
+
+    def servo_traj_stop(context, args):
+        streamer = window.trajectory
+        if streamer is None or streamer.finished.is_set():
+            return "no trajectory playing"
+        streamer.cancel()
+        if not streamer.wait(2):
+            raise CommandError("trajectory did not stop within 2 s")
+        return f"trajectory {streamer.traj_id} stopped after {streamer.stats()['executed']} points"
+
+    def servo_traj_status(context, args):
+        if window.trajectory is None:
+            return "no trajectory yet"
+        return trajectory_summary(window.trajectory.stats())
+
+    def servo_init(context, args):
+        expect_args(args, 1, usage="servo init <module id>")
+        module_id = find_module(args[0])
+        if window.module_list.entry(module_id).module_type != "Servo Drives":
+            raise CommandError(f"{module_id} is not a Servo Drives module")
+        if not _wait_ready(context, lambda on_ready: window.servo_initialize(module_id, on_ready), 5, module_id):
+            raise CommandError(f"{module_id} failed to initialize")
+        return f"{module_id} initialized"
+
+    # Recording
+
+    def rec_start(context, args):
+        expect_args(args, 0, 1, usage="rec start [directory]")
+        if window.capture is None:
+            raise CommandError("camera not streaming; try 'cam start'")
+        if window.recorder is not None:
+            raise CommandError(f"already recording to {window.recorder.path}")
+        return f"recording to {window.start_recording(args[0] if args else None)}"
+
+    def rec_stop(context, args):
+        if window.recorder is None:
+            return "not recording"
+        path, frames, seconds = window.stop_recording()
+        return f"recorded {frames} frames in {seconds:.1f} s to {path}"
+
+    def rec_status(context, args):
+        recorder = window.recorder
+        if recorder is None:
+            return "not recording"
+        lines = [f"recording to {recorder.path}: {window.recorded_frames} frames"]
+        for name, stats in recorder.codec_stats().items():
+            lines.append(f"{name}: {stats['backend']} ratio {stats['ratio']:.2f}, "
+                         f"{stats['compressed_mb']:.1f} of {stats['raw_mb']:.1f} MB, "
+                         f"{stats['mb_per_core_s']:.0f} MB/s per core, {stats['dropped']} dropped")
+        return "\n".join(lines)
+
+    # Preview server
+
+    def preview_start(context, args):
+        expect_args(args, 0, 1, usage="preview start [port]")
+        port = parse_number(args[0], int, "port", 1, 65535) if args else None
+        try:
+            url = context.gui(window.start_preview_server, port)
+        except OSError as e:
+            raise CommandError(f"cannot serve on port {port or 'default'}: {e.strerror}")
+        return f"preview at {url} (color.mjpg, depth.mjpg)"
+
+    def preview_stop(context, args):
+        context.gui(window.stop_preview_server)
+        return "stopped"
+
+    def preview_status(context, args):
+        server = window.preview_server
+        if server is None:
+            return "preview server not running"
+        stats = server.stats()
+        average = stats["encode_ms_avg"]
+        lines = [f"{stats['url']}: {stats['frames_encoded']} frames, {stats['encodings']} encodings"
+                 f"{f', {average:.1f} ms each' if average else ''}, {stats['skipped_busy']} skipped"]
+        lines += [f"  {client['address']} {client['stream']}: level {client['level']} "
+                  f"(1/{1 / client['scale']:g} scale, q{client['quality']}), {client['sent']} sent, "
+                  f"{client['dropped']} dropped" for client in stats["clients"]]
+        return "\n".join(lines)
+
+    # Metrics
+
+    def metrics_serve(context, args):
+        expect_args(args, 0, 1, usage="metrics serve [port]")
+        port = parse_number(args[0], int, "port", 1, 65535) if args else None
+        try:
+            return f"metrics at {context.gui(window.start_metrics_server, port)}"
+        except OSError as e:
+            raise CommandError(f"cannot serve on port {port or 'default'}: {e.strerror}")
+
+    def metrics_stop(context, args):
+        context.gui(window.stop_metrics_server)
+        return "stopped"
+
+    def metrics_show(context, args):
+        expect_args(args, 0, 1, usage="metrics show [name filter]")
+        pattern = args[0] if args else ""
+        lines = [line for line in window.metrics.render().splitlines()
+                 if not line.startswith("#") and pattern in line and "_bucket{" not in line]
+        return "\n".join(lines) or f"no metrics match '{pattern}'"
+
+    # Watchdog
+
+    def watchdog_status(context, args):
+        metrics = window.watchdog.metrics()
+        if not metrics:
+            return "no devices watched"
+        lines = []
+        for name, health in metrics.items():
+            lines.append(f"{name}: {health['state']}, last progress {health['since_progress_s']:.1f} s ago "
+                         f"(deadline {health['deadline_s']:g} s), {health['stalls']} stalls, "
+                         f"{health['restarts']} restarts, {health['recoveries']} recoveries, "
+                         f"downtime {health['downtime_s']:.1f} s, {health['errors']} errors")
+        for stamp, name, event, detail in list(window.watchdog.events)[-5:]:
+            lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(stamp))} {name} {event}: {detail}")
+        return "\n".join(lines)
+
+    def watchdog_deadline(context, args):
+        expect_args(args, 2, usage="watchdog deadline <camera|pico|imu|plugin> <seconds>")
+        if args[0] not in window.watchdog_deadlines:
+            raise CommandError(f"unknown device '{args[0]}'; choose from {', '.join(window.watchdog_deadlines)}")
+        seconds = parse_number(args[1], float, "seconds", 0.2, 600)
+        window.watchdog_deadlines[args[0]] = seconds
+        names = list(window.driver_hosts) if args[0] == "plugin" else [args[0]]
+        for name in names:
+            health = window.watchdog.devices.get(name)
+            if health is not None:
+                health.deadline = seconds
+        return f"{args[0]} deadline {seconds:g} s"
+
+    # Occupancy
+
+    def occupancy_status(context, args):
+        grid = window.occupancy.grid
+        if grid is None:
+            return "no grid yet (start the camera)"
+        seq, _, values = grid.snapshot()
+        histogram = window.occupancy.update_histogram
+        _, count, total = histogram.value()
+        mean = f", mean update {total / count * 1000:.2f} ms" if count else ""
+        return (f"{grid.nx}x{grid.ny} cells of {grid.cell_size * 100:g} cm from {grid.width}x{grid.height} depth "
+                f"(stride {grid.stride}), update {seq}: {grid.points} points, "
+                f"{int((values > 0.5).sum())} cells occupied{mean}")
+
+    def occupancy_set(context, args):
+        from utils.occupancy import DEFAULT_PARAMS
+        expect_args(args, 2, usage="occupancy set <parameter> <value>")
+        name = args[0]
+        if name not in DEFAULT_PARAMS:
+            raise CommandError(f"unknown parameter '{name}'; choose from {', '.join(DEFAULT_PARAMS)}")
+        kind = type(DEFAULT_PARAMS[name])
+        value = parse_number(args[1], kind, name)
+        if name in ("cell_size", "range", "span", "stride") and value <= 0:
+            raise CommandError(f"{name} must be positive")
+        if name == "decay" and not 0 <= value < 1:
+            raise CommandError("decay must be in [0, 1)")
+        window.occupancy.configure(**{name: value})
+        return f"occupancy {name} = {value:g}"
+
+    # Change detection
+
+    def change_status(context, args):
+        detector = window.change_detector.stats()
+        lines = [f"detector: {detector['frames']} frames scored, {detector['changed']} changed "
+                 f"({detector['change_rate']:.0%}), last score {detector['score']:.3f} "
+                 f"(threshold {window.change_detector.params['threshold']:g})"]
+        _, count, total = window.change_detector.detect_histogram.value()
+        if count:
+            lines[0] += f", {total / count * 1000:.2f} ms per frame"
+        gates = dict(window.change_gates)
+        if not gates:
+            lines.append("no consumer skips unchanged frames; try 'cam change gate display 2'")
+        for name, gate in gates.items():
+            stats = gate.stats()
+            lines.append(f"{name}: {stats['processed']} processed, {stats['skipped']} skipped "
+                         f"({stats['skip_rate']:.0%}), {stats['cost_ms']:.2f} ms each, "
+                         f"{stats['saved_s']:.1f} s saved, refresh >= {stats['min_refresh_hz']:g} Hz")
+        return "\n".join(lines)
+
+    def change_gate(context, args):
+        expect_args(args, 2, usage="cam change gate <consumer> <min_hz|off>")
+        min_refresh_hz = None if args[1] == "off" else parse_number(args[1], float, "min_hz", 0, 1000)
+        try:
+            context.gui(window.set_change_gate, args[0], min_refresh_hz)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if min_refresh_hz is None:
+            return f"{args[0]} processes every frame"
+        return f"{args[0]} skips unchanged frames" + (f", refreshing at least {min_refresh_hz:g} times a second"
+                                                      if min_refresh_hz else "")
+
+    def change_set(context, args):
+        from utils.changedetect import DEFAULT_PARAMS
+        expect_args(args, 2, usage="cam change set <parameter> <value>")
+        name = args[0]
+        if name not in DEFAULT_PARAMS:
+            raise CommandError(f"unknown parameter '{name}'; choose from {', '.join(DEFAULT_PARAMS)}")
+        value = parse_number(args[1], type(DEFAULT_PARAMS[name]), name, 0)
+        if name == "step" and value < 1:
+            raise CommandError("step must be at least 1")
+        window.change_detector.configure(**{name: value})
+        return f"change detection {name} = {value:g}"
+
+    # IMU
+
+    def imu_status(context, args):
+        if window.imu is None:
+            return "IMU not streaming (needs a camera with an IMU, e.g. D435i or D455)"
+        lines = []
+        for stream, stats in window.imu_store.stats().items():
+            latest = window.imu_store.latest(stream)
+            values = ", ".join(f"{value:+.3f}" for value in latest[1]) if latest else "-"
+            lines.append(f"{stream}: {stats['rate_hz']:.0f} Hz, {stats['count']} samples, {stats['lost']} lost, "
+                         f"{stats['out_of_order']} out of order, latest ({values})")
+        capture = window.capture
+        frames = capture.read() if capture else None
+        if frames is not None:
+            gyro = window.imu_store.interpolate("gyro", frames.timestamp)
+            at_frame = ", ".join(f"{value:+.3f}" for value in gyro) if gyro is not None else "not covered"
+            lines.append(f"gyro at frame {frames.seq}: ({at_frame})")
+        return "\n".join(lines)
+
+    def log_status(context, args):
+        stats = window.log_store.stats()
+        lines = [f"{stats['records']:,} records stored, {stats['dropped']:,} dropped "
+                 f"(capacity {window.log_store.capacity:,})",
+                 "levels: " + ", ".join(f"{name} {count:,}" for name, count in stats["levels"].items()),
+                 "sources: " + ", ".join(f"{name} {count:,}" for name, count in
+                                         sorted(stats["sources"].items(), key=lambda item: -item[1]))]
+        return "\n".join(lines)
+
+    # Graphs
+
+    def graph_load(context, args):
+        expect_args(args, 1, usage="graph load <file>")
+        context.gui(window.start_graph, args[0])
+        if window.graph is None:
+            raise CommandError(f"could not start {args[0]} (see log)")
+        return f"graph {args[0]} running"
+
+    def graph_stop(context, args):
+        context.gui(window.stop_graph)
+        return "stopped"
+
+    def graph_stats(context, args):
+        graph = window.graph
+        if graph is None:
+            return "no graph running"
+        stats = graph.stats()
+        lines = [f"node {name}: cpu {node['cpu_time']:.2f}s, {node['processed']} items, alive={node['alive']}"
+                 for name, node in stats["nodes"].items()]
+        lines += [f"edge {name}: depth {edge['depth']}/{edge['maxsize']}, dropped {edge['dropped']}"
+                  for name, edge in stats["edges"].items()]
+        return "\n".join(lines)
+
+    for path, handler, usage, help in (
+        ("theme", theme, "<name>", "Switch the colour theme"),
+        ("module list", module_list, "", "List modules with their IDs"),
+        ("module add", module_add, "<type>", "Add realsense, servo, pico or a plugin device"),
+        ("module remove", module_remove, "<id>", "Remove a module"),
+        ("module toggle", module_toggle, "<id>", "Enable or disable a module"),
+        ("module start", module_start, "<id>", "Start a plugin device"),
+        ("module stop", module_stop, "<id>", "Stop a plugin device"),
+        ("plugins", plugins, "", "Device plugins, where they come from and their drivers' stats"),
+        ("cam start", cam_start, "", "Start the camera stream"),
+        ("cam stop", cam_stop, "", "Stop the camera stream"),
+        ("cam status", cam_status, "", "Show the stream mode and frame counters"),
+        ("cam set fps", cam_set_fps, "<fps>", "Change the frame rate (live)"),
+        ("cam set resolution", cam_set_resolution, "<WxH>", "Change the resolution (live)"),
+        ("cam change", change_status, "", "Change detection: skip rates and time saved per consumer"),
+        ("cam change gate", change_gate, "<display|occupancy|preview|bus> <min_hz|off>",
+         "Skip unchanged frames for a consumer, refreshing at least min_hz times a second"),
+        ("cam change set", change_set, "<parameter> <value>", "Change a detector parameter (threshold, step, ...)"),
+        ("pico connect", pico_connect, "", "Connect to the Pico"),
+        ("pico send", pico_send, "<text>", "Send a raw line to the Pico"),
+        ("pico code", pico_code, "", "Ask the Pico for its code"),
+        ("pico deploy", pico_deploy, "[check|force]", "Upload changed firmware files and soft-reset the Pico"),
+        ("servo move", servo_move, "<servo> <angle>", "Move a servo (0-180 degrees)"),
+        ("servo traj", servo_traj, "<minjerk|trapezoid> <servo,...> <angle,...> ...",
+         "Play a trajectory through the waypoints on the Pico's timer"),
+        ("servo traj stop", servo_traj_stop, "", "Stop the playing trajectory"),
+        ("servo traj status", servo_traj_status, "", "Queue level, underruns and timing of the last trajectory"),
+        ("servo init", servo_init, "<module id>", "Initialize a Servo Drives module"),
+        ("rec start", rec_start, "[directory]", "Record camera frames"),
+        ("rec stop", rec_stop, "", "Stop recording"),
+        ("rec status", rec_status, "", "Show recording progress"),
+        ("preview start", preview_start, "[port]", "Serve the camera as MJPEG on localhost"),
+        ("preview stop", preview_stop, "", "Stop the preview server"),
+        ("preview status", preview_status, "", "Preview clients, levels and drops"),
+        ("metrics serve", metrics_serve, "[port]", "Serve Prometheus metrics on localhost"),
+        ("metrics stop", metrics_stop, "", "Stop the metrics endpoint"),
+        ("metrics show", metrics_show, "[filter]", "Print current metric values"),
+        ("watchdog", watchdog_status, "", "Device health, restarts and downtime"),
+        ("watchdog deadline", watchdog_deadline, "<device> <seconds>", "Stall deadline of a device"),
+        ("occupancy", occupancy_status, "", "Occupancy grid size, points and update time"),
+        ("occupancy set", occupancy_set, "<parameter> <value>", "Change a grid parameter (cell_size, pitch, ...)"),
+        ("imu", imu_status, "", "IMU rates, lost samples and gyro at the newest frame"),
+        ("log", log_status, "", "Console log records per level and source"),
+        ("graph load", graph_load, "<file>", "Load and start a node graph"),
+        ("graph stop", graph_stop, "", "Stop the node graph"),
+        ("graph stats", graph_stats, "", "Per-node CPU time and queue depths"),
+    ):
+        registry.register(path, handler, usage, help)
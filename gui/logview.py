@@ -0,0 +1,309 @@
+# gui/logview.py
+"""System Console log view over a LogStore.
+
+The model only holds the numbers of the matching rows; text is fetched from
+the store when a row is painted, so a million matches cost no more than the
+rows on screen. The view polls the store for new records instead of taking a
+signal per record. Re-filtering runs on a worker thread and the newest
+filter wins.
+
+Filter by level, by source (the module that logged, e.g. `pico`) and by text,
+case-insensitive unless the filter has capitals. `Live` follows new records;
+scrolling up pauses the view and counts what arrives meanwhile, and scrolling
+back to the bottom resumes. The store keeps "log_capacity" records (a million
+by default); `log` in the console shows counts per level and source.
+"""
+import time
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, QSize, QRect
+from PySide6.QtGui import QColor, QFontDatabase
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QListView, QComboBox, QLineEdit, QPushButton, QLabel,
+    QStyledItemDelegate, QStyle, QAbstractItemView
+)
+
+from gui.styles import PALETTES, DEFAULT_THEME
+from gui.workers import run_in_background
+from utils.lazy import lazy_import
+from utils.logstore import LEVELS
+
+np = lazy_import("numpy")
+
+RecordRole = Qt.UserRole + 1
+
+# Level filter choices: label -> minimum level
+LEVEL_FILTERS = {"All levels": "DEBUG", "Info+": "INFO", "Warning+": "WARNING", "Error+": "ERROR"}
+# Palette entry used to draw each level
+LEVEL_COLORS = {"DEBUG": "muted", "INFO": "text_fg", "WARNING": "warning", "ERROR": "error", "CRITICAL": "error"}
+LEVEL_TAGS = {"DEBUG": "DBG", "INFO": "INF", "WARNING": "WRN", "ERROR": "ERR", "CRITICAL": "CRT"}
+
+
+def format_record(record):
+    timestamp, level, source, message = record
+    clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+    return f"{clock}.{int(timestamp * 1000) % 1000:03d} {level:<8} {source:<12} {message}"
+
+
+class LogListModel(QAbstractListModel):
+    """Rows of a LogStore that pass the current filters, in order."""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.rows = np.empty(0, np.int64)
+        self.scanned = 0  # store rows before this one have been filtered into self.rows
+        self.filters = {"levels": None, "sources": None, "text": None}
+        self.generation = 0
+        self.querying = False
+        self.last_query_ms = 0.0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole, RecordRole):
+            return None
+        record = self.store.record(int(self.rows[index.row()]))
+        if record is None:
+            return None
+        if role == RecordRole:
+            return record
+        if role == Qt.ToolTipRole:
+            return record[3] if "\n" in record[3] or len(record[3]) > 120 else None
+        return format_record(record)
+
+    def set_filters(self, on_done=None, **filters):
+        """Re-run the query for new filters on a worker thread; stale results are discarded."""
+        self.filters.update(filters)
+        self.generation += 1
+        self.querying = True
+        generation, query = self.generation, dict(self.filters)
+        started = time.perf_counter()
+
+        def run():
+            end = self.store.total
+            return self.store.query(end=end, **query), end
+
+        def done(result):
+            if generation != self.generation:
+                return
+            self.querying = False
+            self.last_query_ms = (time.perf_counter() - started) * 1000.0
+            self.beginResetModel()
+            self.rows, self.scanned = result
+            self.endResetModel()
+            if on_done:
+                on_done()
+
+        def failed(message):
+            if generation == self.generation:
+                self.querying = False
+
+        run_in_background(run, done, failed)
+
+    def pending(self):
+        """Records stored since the last poll, before filtering."""
+        return self.store.total - self.scanned
+
+    def poll(self):
+        """Fold in records stored since the last poll and drop rows the store forgot.
+
+        Returns the number of rows added.
+        """
+        if self.querying:
+            return 0
+        first = self.store.first
+        if len(self.rows) and self.rows[0] < first:
+            forgotten = int(np.searchsorted(self.rows, first))
+            self.beginRemoveRows(QModelIndex(), 0, forgotten - 1)
+            self.rows = self.rows[forgotten:]
+            self.endRemoveRows()
+        end = self.store.total
+        if end == self.scanned:
+            return 0
+        new_rows = self.store.query(start=self.scanned, end=end, **self.filters)
+        self.scanned = end
+        if len(new_rows):
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(new_rows) - 1)
+            self.rows = np.concatenate([self.rows, new_rows])
+            self.endInsertRows()
+        return len(new_rows)
+
+
+class LogDelegate(QStyledItemDelegate):
+    """Paints one record per row: time, level, source and the first line of the message.
+
+    The source column is left out when the console is too narrow for it.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.set_theme(DEFAULT_THEME)
+
+    def set_theme(self, theme_name):
+        palette = PALETTES.get(theme_name, PALETTES[DEFAULT_THEME])
+        self.colors = {name: QColor(value) for name, value in palette.items()}
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), option.fontMetrics.height() + 2)
+
+    def paint(self, painter, option, index):
+        record = index.data(RecordRole)
+        if record is None:
+            return
+        timestamp, level, source, message = record
+        colors = self.colors
+        metrics = option.fontMetrics
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, colors["selection"])
+        rect = option.rect.adjusted(4, 0, -4, 0)
+        x = rect.left()
+        columns = [(time.strftime("%H:%M:%S", time.localtime(timestamp)), colors["muted"], "00:00:00  "),
+                   (LEVEL_TAGS.get(level, level[:3]), colors[LEVEL_COLORS.get(level, "text_fg")], "WRN  "),
+                   (source, colors["accent"] if source == "console" else colors["muted"], "realsense ")]
+        if rect.width() < metrics.horizontalAdvance("0" * 60):
+            del columns[2]  # narrow console: leave the room to the message
+        for text, color, sample in columns:
+            width = metrics.horizontalAdvance(sample)
+            painter.setPen(color)
+            if text is source:
+                text = metrics.elidedText(text, Qt.ElideRight, width - metrics.horizontalAdvance(" "))
+            painter.drawText(QRect(x, rect.top(), width, rect.height()), Qt.AlignLeft | Qt.AlignVCenter, text)
+            x += width
+        first_line, _, rest = message.partition("\n")
+        if rest:
+            first_line += " ..."
+        painter.setPen(colors[LEVEL_COLORS.get(level, "text_fg")] if level not in ("INFO", "DEBUG")
+                       else colors["text_fg"])
+        message_rect = QRect(x, rect.top(), max(0, rect.right() - x), rect.height())
+        painter.drawText(message_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         metrics.elidedText(first_line, Qt.ElideRight, message_rect.width()))
+        painter.restore()
+
+
+class LogView(QWidget):
+    """Filter bar plus the virtualized log list, with live tail or pause.
+
+    Live: new records are appended and the list follows the newest one.
+    Paused: the list stays as it is and the button counts what arrived since.
+    Scrolling up pauses; scrolling back to the bottom resumes.
+    """
+
+    def __init__(self, store, poll_ms=100, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.live = True
+        self.model = LogListModel(store, self)
+        self.delegate = LogDelegate(self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        filter_bar = QHBoxLayout()
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(list(LEVEL_FILTERS))
+        self.level_combo.currentTextChanged.connect(self.schedule_refilter)
+        self.source_combo = QComboBox()
+        self.source_combo.addItem("All sources")
+        self.source_combo.currentTextChanged.connect(self.schedule_refilter)
+        self.search_edit = QLineEdit(placeholderText="filter text", clearButtonEnabled=True)
+        self.search_edit.setObjectName("consoleFilter")
+        self.search_edit.textChanged.connect(self.schedule_refilter)
+        self.live_button = QPushButton("Live", checkable=True, checked=True)
+        self.live_button.toggled.connect(self.set_live)
+        filter_bar.addWidget(self.level_combo)
+        filter_bar.addWidget(self.source_combo)
+        filter_bar.addWidget(self.search_edit, 1)
+        filter_bar.addWidget(self.live_button)
+        layout.addLayout(filter_bar)
+
+        self.list_view = QListView()
+        self.list_view.setObjectName("consoleLog")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.verticalScrollBar().actionTriggered.connect(
+            lambda _: QTimer.singleShot(0, self.follow_scrollbar))
+        layout.addWidget(self.list_view, 1)
+        self.status_label = QLabel()
+        self.status_label.setObjectName("consoleStatus")
+        layout.addWidget(self.status_label)
+
+        self.refilter_timer = QTimer(self)
+        self.refilter_timer.setSingleShot(True)
+        self.refilter_timer.setInterval(150)
+        self.refilter_timer.timeout.connect(self.refilter)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_ms)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start()
+        self.known_sources = 0
+
+    def set_theme(self, theme_name):
+        self.delegate.set_theme(theme_name)
+        self.list_view.viewport().update()
+
+    def schedule_refilter(self, *_):
+        self.refilter_timer.start()
+
+    def current_filters(self):
+        minimum = LEVELS.index(LEVEL_FILTERS[self.level_combo.currentText()])
+        levels = None if minimum == 0 else [level for level in self.store.levels()
+                                             if level not in LEVELS or LEVELS.index(level) >= minimum]
+        source = self.source_combo.currentText()
+        return {"levels": levels, "sources": None if source == "All sources" else [source],
+                "text": self.search_edit.text() or None}
+
+    def refilter(self):
+        self.model.set_filters(on_done=self.on_refiltered, **self.current_filters())
+
+    def on_refiltered(self):
+        if self.live:
+            self.list_view.scrollToBottom()
+        self.update_status()
+
+    def poll(self):
+        sources = self.store.sources()
+        if len(sources) != self.known_sources:
+            self.known_sources = len(sources)
+            current = self.source_combo.currentText()
+            self.source_combo.blockSignals(True)
+            self.source_combo.clear()
+            self.source_combo.addItems(["All sources"] + sources)
+            self.source_combo.setCurrentText(current)
+            self.source_combo.blockSignals(False)
+        if self.live and self.model.poll():
+            self.list_view.scrollToBottom()
+        self.update_status()
+
+    def set_live(self, live):
+        self.live = live
+        if live:
+            self.model.poll()
+            self.list_view.scrollToBottom()
+        self.update_status()
+
+    def follow_scrollbar(self):
+        """Pause when the user scrolls away from the newest record, resume at the bottom."""
+        scrollbar = self.list_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        if at_bottom != self.live:
+            self.live_button.setChecked(at_bottom)
+
+    def update_status(self):
+        pending = self.model.pending()
+        self.live_button.setText("Live" if self.live else f"Paused (+{pending})" if pending else "Paused")
+        shown = len(self.model.rows)
+        self.status_label.setText(f"{shown:,} of {len(self.store):,} records" +
+                                  (f" ({self.model.last_query_ms:.0f} ms)" if shown != len(self.store) else ""))
+
+    def lines(self, count=None):
+        """Formatted text of the last `count` matching rows (all by default)."""
+        rows = self.model.rows if count is None else self.model.rows[-count:]
+        records = (self.store.record(int(row)) for row in rows)
+        return [format_record(record) for record in records if record is not None]
@@ -2,38 +2,91 @@
 import sys
 import logging
 import os
+import shlex
+import threading
+import time
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QTabWidget, QLabel, QTextEdit, QPushButton, QSplitter, QFrame,
-    QPlainTextEdit, QSizePolicy, QGroupBox, QComboBox, QMenuBar, QMenu,
-    QToolButton, QMenu, QScrollArea, QStyle
+    QSizePolicy, QComboBox, QMenu,
+    QToolButton, QListView, QStackedWidget
 )
-from PySide6.QtGui import QAction, QIcon, QPalette, QColor
-from PySide6.QtCore import Qt, QTimer, QSize
-from PySide6.QtGui import QImage, QPixmap, QIcon
+from PySide6.QtCore import Qt, QTimer, QObject, Signal
+from PySide6.QtGui import QImage, QPixmap
 
 # Импорты наших модулей
-from gui.styles import get_raw_cyber_stylesheet, get_dark_stylesheet, get_light_stylesheet
+from gui.styles import DEFAULT_THEME, get_stylesheet
 from gui.panels import DevicePanel
+from gui.modules import (
+    ModuleListModel, ModuleDelegate, ModuleIdRole, MODULE_TYPES, SINGLE_INSTANCE_TYPES, register_module_type
+)
 from gui.dialogs import AboutDialog, SettingsDialog
 from utils.logger import setup_logger
-from config import load_config, save_config
-from devices.realsense import REAL_SENSE_AVAILABLE, rs, detect_realsense, normalize_depth_for_display
+from utils.logstore import LogStore
+from utils.framebus import FrameBus
+from utils.lazy import preload_modules
+from gui.workers import run_in_background
+from gui.commands import register_window_commands
+from utils.commands import CommandRegistry, CommandRunner, CommandError
+from utils.watchdog import Watchdog
+from utils.metrics import get_metrics, MetricsServer
+from gui.stats import StatsPanel
+from gui.occupancy import OccupancyView
+from gui.logview import LogView
+from utils.occupancy import OccupancyMapper
+from config import load_config, validate_config, load_session, save_session
+from devices.realsense import (
+    realsense_available, load_realsense, detect_realsense, normalize_depth_for_display, RealSenseCapture
+)
+from devices.capabilities import get_capability_cache
+from devices.plugins import get_plugin_registry, create_driver_host, PLUGIN_DIRECTORY
+from utils.changedetect import ChangeDetector, ChangeGate
+
+# Heavy modules are imported on first use (or preloaded after the first paint)
+PRELOAD_MODULES = ["numpy", "pyrealsense2", "serial", "serial.tools.list_ports"]
+
+# Seconds without frames / serial bytes before the watchdog restarts a device
+# (override with "watchdog_deadlines" in the config file)
+WATCHDOG_DEADLINES = {"camera": 2.0, "pico": 3.0, "imu": 1.0, "plugin": 3.0}
+# Lossless depth encoding (utils/depthcodec.py) for recordings (on by default) and for the bus (opt-in)
+# (override with "depth_codec" in the config file; "level" and "workers" may be set too)
+DEPTH_CODEC = {"recording": True, "bus": False, "backend": "zlib", "key_interval": 30}
+# Servo trajectories: sample rate on the Pico and the planner's limits (deg/s, deg/s^2)
+# (override with "trajectory" in the config file)
+TRAJECTORY = {"rate_hz": 100, "max_velocity": 90.0, "max_acceleration": 360.0, "chunk_points": 16, "prefill": 32}
+# Frame consumers that may skip unchanged frames; each opts in with its minimum refresh rate
+# ("change_detection": {"consumers": {"display": 2}, "threshold": 0.004, ...} in the config file)
+CHANGE_CONSUMERS = ("display", "occupancy", "preview", "bus")
+
+
+class GraphDisplayBridge(QObject):
+    """Carries frames from graph display nodes (worker threads) to the GUI thread."""
+    frame_ready = Signal(str, object)
+
 
-if REAL_SENSE_AVAILABLE:
-    import numpy as np
+class DeviceEventBridge(QObject):
+    """Carries hotplug notifications from librealsense's thread to the GUI thread."""
+    devices_changed = Signal()
+
+
+class CommandBridge(QObject):
+    """Carries console output, results and GUI-thread calls from command workers."""
+    output = Signal(str)
+    finished = Signal(object)
+    call = Signal(object)
 
 
 class RobotGUI(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.modules = {}  # Dictionary to store active modules
-        self.module_widgets = {}  # Dictionary to store module widgets
-        self.current_theme = "raw_cyber"  # Default theme
+        self.realsense_module_id = None  # Camera and Pico are single-instance modules
+        self.pico_module_id = None
+        self.current_theme = DEFAULT_THEME
         self.initialize_window()
         self.create_widgets()
         self.setup_layout()
         self.setup_logging()
+        self.setup_commands()
         self.initialize_devices()
     
     def initialize_window(self):
@@ -45,24 +98,110 @@ class RobotGUI(QMainWindow):
         self.setup_menu()
         
         # Initialize RealSense variables
-        self.pipeline = None
+        self.capture_factory = RealSenseCapture
+        self.capture = None
         self.timer = None
+        self.last_displayed_seq = 0
+        self.display_frames = None  # the GUI's own copy of the shown pair
+        self.frames_displayed = 0
+        self.reconfigure_timer = QTimer(self)
+        self.reconfigure_timer.setSingleShot(True)
+        self.reconfigure_timer.setInterval(50)
+        self.reconfigure_timer.timeout.connect(self.apply_stream_settings)
+        self.camera_serial = None
+        self.pico_link = None
+        self.pico_port = None  # None: find the Pico by USB ID
+        self.pico_connecting = None  # PicoLink that connect_pico is still opening
+        self.pico_deploying = False  # the port is lent to a firmware deploy
+        self.graph = None
+        self.graph_path = None
+        self.graph_bridge = GraphDisplayBridge()
+        self.graph_bridge.frame_ready.connect(self.show_graph_frame)
+        self.recorder = None
+        self.recorder_lock = threading.Lock()
+        self.recorded_frames = 0
+        self.recording_started = 0.0
+        self.recorded_imu_until = {}  # IMU stream -> timestamp of the last sample recorded
+
+        # Stream modes come from the capability cache, refreshed on hotplug only
+        self.capabilities = get_capability_cache()
+        self.device_events = DeviceEventBridge()
+        self.device_events.devices_changed.connect(self.on_devices_changed)
+        self.capabilities.add_listener(self.device_events.devices_changed.emit)
+
+        # Local publish/subscribe bus for external processes
+        self.frame_bus = FrameBus()
+        self.preview_server = None
+
+        # Occupancy grid from depth, folded in on its own thread
+        self.occupancy = OccupancyMapper(lambda: self.capture, self.config.get("occupancy", {}),
+                                         on_update=self.publish_occupancy)
+
+        # Motion samples from the camera's IMU, stored on the driver's callback thread
+        self.imu_store = None  # ImuStore, created when the first IMU stream starts
+        self.imu = None
+
+        self.depth_codec = {**DEPTH_CODEC, **self.config.get("depth_codec", {})}
+        self.bus_depth_encoder = None
+
+        # Servo trajectories are played by the Pico; the host only keeps its queue fed
+        self.trajectory_options = {**TRAJECTORY, **self.config.get("trajectory", {})}
+        self.trajectory = None  # TrajectoryStreamer of the newest trajectory
+        self.servo_angles = {}  # servo -> last angle commanded from here
+
+        # Change detection on the capture thread; opted-in consumers skip frames of an idle scene
+        change_options = dict(self.config.get("change_detection", {}))
+        self.change_detector = ChangeDetector({key: value for key, value in change_options.items()
+                                               if key != "consumers"})
+        self.change_gates = {}
+        for consumer, min_refresh_hz in change_options.get("consumers", {}).items():
+            try:
+                self.set_change_gate(consumer, min_refresh_hz)
+            except ValueError as e:
+                logging.error(f"change_detection: {e}")
+
+        # Device plugins: found by metadata at startup, imported when a module of their type is added
+        self.plugins = get_plugin_registry()
+        self.plugin_options = self.config.get("plugins", {})  # type -> {"isolate": bool, "settings": {...}}
+        for spec in self.plugins.discover(self.config.get("plugin_dirs", [PLUGIN_DIRECTORY])).values():
+            register_module_type(spec.name, spec.id_prefix, spec.single_instance)
+        self.driver_hosts = {}  # module ID -> DriverHost / IsolatedDriverHost
+        self.plugin_frames = {}  # module ID -> frame count at the last status update
+        self.plugin_status_timer = QTimer(self)
+        self.plugin_status_timer.setInterval(1000)
+        self.plugin_status_timer.timeout.connect(self.update_plugin_status)
+
+        # Device health: stalled devices are restarted one by one with backoff
+        self.watchdog = Watchdog()
+        self.watchdog_deadlines = {**WATCHDOG_DEADLINES, **self.config.get("watchdog_deadlines", {})}
+        self.watchdog_timer = QTimer(self)
+        self.watchdog_timer.setInterval(250)
+        self.watchdog_timer.timeout.connect(self.watchdog.check)
+
+        self.metrics = get_metrics()
+        self.metrics.add_collector(self.collect_device_metrics)
+        self.metrics_server = None
+        self.display_histogram = self.metrics.histogram("kozy_display_seconds", "Showing one frame pair in the GUI")
+        self.latency_histogram = self.metrics.histogram("kozy_capture_to_display_seconds",
+                                                        "From a frame pair landing in its buffer to being shown")
+        self.displayed_counter = self.metrics.counter("kozy_frames_displayed_total", "Frame pairs shown in the GUI")
+        self.skipped_counter = self.metrics.counter("kozy_frames_display_skipped_total",
+                                                    "Captured frame pairs never shown (GUI slower than the camera)")
     
     def get_current_stylesheet(self):
-        """Get the current theme stylesheet."""
-        if self.current_theme == "raw_cyber":
-            return get_raw_cyber_stylesheet()
-        elif self.current_theme == "dark":
-            return get_dark_stylesheet()
-        elif self.current_theme == "light":
-            return get_light_stylesheet()
-        else:
-            return get_raw_cyber_stylesheet()
+        """Get the current theme stylesheet (built once per theme and cached)."""
+        return get_stylesheet(self.current_theme)
     
     def change_theme(self, theme_name):
         """Change the application theme."""
+        start = time.perf_counter()
         self.current_theme = theme_name
         self.setStyleSheet(self.get_current_stylesheet())
+        self.module_delegate.set_theme(theme_name)
+        self.module_view.viewport().update()
+        self.log_view.set_theme(theme_name)
+        self.last_theme_switch_ms = (time.perf_counter() - start) * 1000.0
+        logging.info(f"Theme '{theme_name}' applied in {self.last_theme_switch_ms:.1f} ms")
     
     def create_widgets(self):
         """Create all the main widgets for the interface."""
@@ -85,47 +224,197 @@ class RobotGUI(QMainWindow):
     
     def setup_logging(self):
         """Initialize logging system."""
-        setup_logger(self.log_text)
+        setup_logger(self.log_store)
+
+    def setup_commands(self):
+        """Console commands run on worker threads; results come back through a signal bridge."""
+        self.command_bridge = CommandBridge()
+        self.command_bridge.output.connect(self.console_output)
+        self.command_bridge.finished.connect(self.on_command_finished)
+        self.command_bridge.call.connect(self.run_gui_call)
+        self.commands = CommandRegistry()
+        self.command_runner = CommandRunner(self.commands, self.call_in_gui)
+        register_window_commands(self.commands, self)
+
+    def call_in_gui(self, function, *args, **kwargs):
+        """Run `function` on the GUI thread from a command worker and return its result."""
+        if threading.current_thread() is threading.main_thread():
+            return function(*args, **kwargs)
+        request = {"function": function, "args": args, "kwargs": kwargs, "done": threading.Event()}
+        self.command_bridge.call.emit(request)
+        if not request["done"].wait(10):
+            raise CommandError("GUI did not respond within 10 s")
+        if "error" in request:
+            raise request["error"]
+        return request.get("result")
+
+    def run_gui_call(self, request):
+        try:
+            request["result"] = request["function"](*request["args"], **request["kwargs"])
+        except Exception as e:
+            request["error"] = e
+        finally:
+            request["done"].set()
     
     def initialize_devices(self):
-        """Detect and initialize connected devices."""
-        self.detect_devices()
-        QTimer.singleShot(100, self.auto_connect_pico)
+        """Detect and initialize connected devices once the window is on screen."""
+        QTimer.singleShot(0, self.start_background_services)
+
+    def start_background_services(self):
+        """Start the bus and warm up heavy imports without delaying the first paint."""
+        self.frame_bus.start()
+        self.watchdog_timer.start()
+        self.plugin_status_timer.start()
+        if "metrics_port" in self.config:
+            self.toggle_metrics_server(True)
+        # Give the first frames of the window a head start before warming up imports
+        QTimer.singleShot(500, lambda: preload_modules(PRELOAD_MODULES, self.log_preload_timings))
+        session = load_session()
+        if session:
+            self.restore_session(session)
+        else:
+            self.detect_devices()
+            QTimer.singleShot(100, self.auto_connect_pico)
+
+    def log_preload_timings(self, timings):
+        """Log how long each background import took (runs on the preload thread)."""
+        loaded = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()
+                           if seconds is not None)
+        logging.info(f"Preloaded modules: {loaded or 'none'}")
 
     def auto_connect_pico(self):
         """Automatically connect to the Pico on startup."""
+        if not self.pico_module_id:
+            return
         logging.info("Auto-connecting to Pico...")
         self.connect_pico()
 
-    def connect_pico(self):
-        """Connect to the Raspberry Pi Pico and get its identification code."""
-        from devices.pico import connect_to_pico
+    def connect_pico(self, on_ready=None):
+        """Connect to the Raspberry Pi Pico and get its identification code.
+
+        The port is opened and queried on a worker thread; `on_ready(ok)` is
+        called on the GUI thread when the attempt finishes.
+        """
+        from devices.pico import PicoLink
+        if self.pico_deploying:
+            logging.info("Not connecting to the Pico during a firmware deploy")
+            if on_ready:
+                on_ready(False)
+            return
         self.btn_pico_connect.setEnabled(False)
-        self.pico_panel.set_status("Connecting...", "#ffaa6b")
+        self.module_list.set_status(self.pico_module_id, "Connecting...", "warning")
 
-        pico_code = connect_to_pico()
+        if self.pico_link:
+            self.pico_link.close()
+            self.pico_link = None
+        link = PicoLink(port=self.pico_port, on_message=self.publish_pico_message)
+        self.pico_connecting = link
 
-        if pico_code:
-            self.pico_panel.set_status(f"Code: {pico_code}", "#6bff9b")
-            logging.info(f"Pico connected! Code: {pico_code}")
-        else:
-            self.pico_panel.set_status("Failed", "#ff6b6b")
+        def open_and_identify():
+            return link.request_code() if link.open() else None
+
+        def finished(pico_code):
+            if self.pico_connecting is link:
+                self.pico_connecting = None
+            if self.pico_deploying:
+                link.close()  # the port was lent to a deploy meanwhile
+                self.btn_pico_connect.setEnabled(True)
+                return
+            self.pico_link = link
+            if not self.pico_module_id:
+                link.close()  # Module removed while connecting
+                return
+            self.watch_pico()
+            if pico_code:
+                self.module_list.set_status(self.pico_module_id, f"Code: {pico_code}", "ok")
+                logging.info(f"Pico connected! Code: {pico_code}")
+                self.watchdog.beat("pico")
+            else:
+                self.module_list.set_status(self.pico_module_id, "Failed", "error")
+                self.watchdog.fail("pico", "no answer to GET_CODE")
+            self.btn_pico_connect.setEnabled(True)
+            if on_ready:
+                on_ready(bool(pico_code))
+
+        run_in_background(open_and_identify, finished, lambda error: finished(None))
+
+    def release_pico(self):
+        """Lend the Pico's port to a firmware deploy: close the link and hold off reconnects.
+
+        Returns the port, or None if no Pico is found. A connect still in
+        flight gives up when it finishes (wait for `pico_connecting` to clear).
+        """
+        from devices.pico import find_pico_port
+        self.pico_deploying = True
+        self.watchdog.unwatch("pico")
+        port = self.pico_link.port if self.pico_link else self.pico_port
+        for link in (self.pico_link, self.pico_connecting):
+            if link:
+                link.close()
+        self.pico_link = None
+        if self.pico_module_id:
+            self.module_list.set_status(self.pico_module_id, "Deploying firmware...", "warning")
+        return port or find_pico_port()
+
+    def reclaim_pico(self, on_ready=None):
+        """End a deploy: reconnect the Pico module, if there is one; then on_ready(ok)."""
+        self.pico_deploying = False
+        if self.pico_module_id:
+            self.connect_pico(on_ready)
+        elif on_ready:
+            on_ready(True)
+
+    def watch_pico(self):
+        """Restart the Pico link when it dies or stays silent (it is pinged when quiet)."""
+        def link_alive():
+            return self.pico_link is None or self.pico_link.running
+
+        def ping():
+            if self.pico_link and self.pico_link.running:
+                self.pico_link.send("PING")
 
-        self.btn_pico_connect.setEnabled(True)
+        self.watchdog.watch("pico", lambda: self.pico_link.bytes_received if self.pico_link else None,
+                            self.restart_pico, self.watchdog_deadlines["pico"], alive=link_alive, probe=ping)
+
+    def restart_pico(self):
+        """Watchdog restart: reconnect the Pico link; nothing else is touched."""
+        attempt = self.watchdog.devices["pico"].restarts
+        logging.warning(f"Reconnecting to Pico (attempt {attempt})")
+        self.connect_pico()
+        self.module_list.set_status(self.pico_module_id, f"Reconnecting (attempt {attempt})...", "warning")
+
+    def publish_pico_message(self, kind, payload):
+        """Forward Pico messages other than the identification code and pings to the bus."""
+        if kind not in ("CODE", "PONG"):
+            self.frame_bus.publish("pico/telemetry", f"{kind}:{payload}")
+        if kind == "TEL" and self.recorder is not None:
+            self.record_telemetry(payload)
 
     def setup_menu(self):
         """Set up the application menu bar."""
         menu_bar = self.menuBar()
-        menu_bar.setStyleSheet("background: #0c0d15; color: #c0b0ff;")
         
         file_menu = menu_bar.addMenu("File")
-        file_menu.addAction("Save Configuration", self.save_configuration)
         file_menu.addAction("Load Configuration", self.load_configuration)
+        file_menu.addAction("Save Session", self.save_session_snapshot)
+        file_menu.addAction("Run Script...", self.run_script_file)
         file_menu.addSeparator()
         file_menu.addAction("Exit", self.close)
 
         program_menu = menu_bar.addMenu("Program")
         program_menu.addAction("Settings", self.open_settings)
+        program_menu.addSeparator()
+        program_menu.addAction("Load Graph...", self.load_graph_file)
+        program_menu.addAction("Graph Stats", self.log_graph_stats)
+        program_menu.addAction("Stop Graph", self.stop_graph)
+        program_menu.addSeparator()
+        self.metrics_action = program_menu.addAction("Metrics Endpoint (localhost)")
+        self.metrics_action.setCheckable(True)
+        self.metrics_action.toggled.connect(self.toggle_metrics_server)
+        self.preview_action = program_menu.addAction("Preview Server (localhost)")
+        self.preview_action.setCheckable(True)
+        self.preview_action.toggled.connect(self.toggle_preview_server)
+        program_menu.addSeparator()
         
         # Theme submenu
         theme_menu = program_menu.addMenu("Theme")
@@ -145,55 +434,58 @@ class RobotGUI(QMainWindow):
         settings_dialog.exec()
 
     def create_control_panel(self):
-        """Create the control panel with module management."""
+        """Create the control panel: module list, details of the selected module, add button."""
         panel = QFrame()
         layout = QVBoxLayout(panel)
-        layout.setAlignment(Qt.AlignCenter)  # Center the content
 
         # Add title
         title = QLabel("MODULES")
         title.setAlignment(Qt.AlignCenter)
-        title.setStyleSheet("font-weight: bold; color: #b8a0ff; margin-bottom: 8px;")
+        title.setObjectName("modulesTitle")
         layout.addWidget(title)
 
-        # Create a scroll area for modules
-        self.modules_scroll = QScrollArea()
-        self.modules_scroll.setWidgetResizable(True)
-        self.modules_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.modules_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
-        # Create a container widget for the modules
-        self.modules_container = QWidget()
-        self.modules_layout = QVBoxLayout(self.modules_container)
-        self.modules_layout.setAlignment(Qt.AlignTop)
-        
-        # Initially empty - will be populated by add_module
-        self.modules_scroll.setWidget(self.modules_container)
-        
-        # Add the scroll area to the main layout
-        layout.addWidget(self.modules_scroll)
+        # Rows are painted by the delegate, so the list stays cheap with hundreds of modules
+        self.module_list = ModuleListModel(self)
+        self.module_delegate = ModuleDelegate(self)
+        self.module_view = QListView()
+        self.module_view.setObjectName("moduleList")
+        self.module_view.setModel(self.module_list)
+        self.module_view.setItemDelegate(self.module_delegate)
+        self.module_view.setUniformItemSizes(True)
+        self.module_view.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.module_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.module_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.module_view.customContextMenuRequested.connect(self.show_module_context_menu)
+        self.module_view.selectionModel().currentChanged.connect(self.show_module_details)
+        self.module_list.dataChanged.connect(self.on_modules_changed)
+        self.module_list.rowsRemoved.connect(self.show_module_details)
+        layout.addWidget(self.module_view, 1)
+
+        # Controls of the selected module; one panel per module type, built on first use
+        self.detail_panels = {}
+        self.module_details = QStackedWidget()
+        placeholder = QLabel("No module selected")
+        placeholder.setAlignment(Qt.AlignCenter)
+        self.module_details.addWidget(placeholder)
+        layout.addWidget(self.module_details)
+
+        module_buttons_layout = QHBoxLayout()
+        self.btn_module_toggle = QPushButton("Disable", enabled=False)
+        self.btn_module_toggle.setProperty("role", "module-action")
+        self.btn_module_toggle.clicked.connect(lambda: self.toggle_module(self.selected_module_id()))
+        self.btn_module_remove = QPushButton("Remove", enabled=False)
+        self.btn_module_remove.setProperty("role", "module-remove")
+        self.btn_module_remove.clicked.connect(lambda: self.remove_module(self.selected_module_id()))
+        module_buttons_layout.addWidget(self.btn_module_toggle)
+        module_buttons_layout.addWidget(self.btn_module_remove)
+        module_buttons_layout.addStretch()
+        layout.addLayout(module_buttons_layout)
 
         # Create the circular add button
         self.add_module_button = QToolButton()
         self.add_module_button.setText("+")
         self.add_module_button.setFixedSize(50, 50)
-        self.add_module_button.setStyleSheet("""
-            QToolButton {
-                background-color: #2a2b40;
-                color: white;
-                border-radius: 25px;
-                font-size: 24px;
-                font-weight: bold;
-                border: 2px solid #5a5080;
-            }
-            QToolButton:hover {
-                background-color: #3a3b50;
-                border: 2px solid #7a70a0;
-            }
-            QToolButton:pressed {
-                background-color: #4a4b60;
-            }
-        """)
+        self.add_module_button.setObjectName("addModuleButton")
         self.add_module_button.clicked.connect(self.show_add_module_menu)
         
         layout.addWidget(self.add_module_button)
@@ -204,109 +496,106 @@ class RobotGUI(QMainWindow):
     def show_add_module_menu(self):
         """Show a menu to add new modules."""
         menu = QMenu(self)
-        
-        # Add sample module options
-        real_sense_action = menu.addAction("RealSense Camera")
-        real_sense_action.triggered.connect(lambda: self.add_module("RealSense Camera"))
-        
-        servo_action = menu.addAction("Servo Drives")
-        servo_action.triggered.connect(lambda: self.add_module("Servo Drives"))
-        
-        pico_action = menu.addAction("RPi Pico")
-        pico_action.triggered.connect(lambda: self.add_module("RPi Pico"))
+        for module_type in MODULE_TYPES:
+            action = menu.addAction(module_type)
+            action.triggered.connect(lambda checked=False, module_type=module_type: self.add_module(module_type))
+            if module_type in SINGLE_INSTANCE_TYPES and self.module_list.ids(module_type):
+                action.setEnabled(False)
         
         # Show the menu at the position of the add button
         pos = self.add_module_button.mapToGlobal(self.add_module_button.rect().bottomLeft())
         menu.exec(pos)
+
+    def show_module_context_menu(self, position):
+        """Enable/disable or remove the module under the cursor."""
+        module_id = self.module_view.indexAt(position).data(ModuleIdRole)
+        if not module_id:
+            return
+        entry = self.module_list.entry(module_id)
+        menu = QMenu(self)
+        menu.addAction("Disable" if entry.enabled else "Enable", lambda: self.toggle_module(module_id))
+        menu.addAction("Remove", lambda: self.remove_module(module_id))
+        menu.exec(self.module_view.viewport().mapToGlobal(position))
+
+    def selected_module_id(self):
+        return self.module_view.currentIndex().data(ModuleIdRole)
+
+    def resolve_module_id(self, key):
+        """Accept a module ID, or a module type meaning its first instance."""
+        if key in self.module_list.rows:
+            return key
+        ids = self.module_list.ids(key)
+        return ids[0] if ids else None
+
+    def show_module_details(self, *args):
+        """Show the controls and status of the selected module."""
+        entry = self.module_list.entry(self.selected_module_id())
+        self.btn_module_toggle.setEnabled(entry is not None)
+        self.btn_module_remove.setEnabled(entry is not None)
+        if entry is None:
+            self.module_details.setCurrentIndex(0)
+            return
+        panel = self.detail_panel(entry.module_type)
+        panel.setTitle(entry.name)
+        panel.set_status(entry.status, entry.level)
+        panel.set_state(entry.state)
+        panel.setEnabled(entry.enabled)
+        self.btn_module_toggle.setText("Disable" if entry.enabled else "Enable")
+        self.module_details.setCurrentWidget(panel)
+
+    def on_modules_changed(self, top_left, bottom_right, roles=()):
+        """Refresh the details pane if the selected module is in a coalesced update."""
+        row = self.module_view.currentIndex().row()
+        if top_left.row() <= row <= bottom_right.row():
+            self.show_module_details()
+
+    def detail_panel(self, module_type):
+        """The controls panel for a module type, created on first use."""
+        panel = self.detail_panels.get(module_type)
+        if panel is None:
+            panel = DevicePanel(module_type)
+            if module_type == "RealSense Camera":
+                self.create_realsense_controls(panel)
+            elif module_type == "Servo Drives":
+                self.create_servo_controls(panel)
+            elif module_type == "RPi Pico":
+                self.create_pico_controls(panel)
+            elif module_type in self.plugins.specs:
+                self.create_plugin_controls(panel)
+            self.module_details.addWidget(panel)
+            self.detail_panels[module_type] = panel
+        return panel
     
-    def add_module(self, module_name):
-        """Add a new module to the control panel."""
-        # Create a new module panel
-        module_panel = DevicePanel(module_name)
-        
-        # Create buttons for module control
-        module_buttons_layout = QHBoxLayout()
-        
-        # Disable/enable button
-        toggle_button = QPushButton("Disable")
-        toggle_button.setStyleSheet("""
-            QPushButton {
-                background: #1a1b2a;
-                color: #c0b0ff;
-                border: 1px solid #3a3550;
-                padding: 4px 8px;
-                border-radius: 4px;
-                font-size: 9px;
-            }
-            QPushButton:hover { 
-                background: #222335; 
-                border-color: #5a5080; 
-            }
-        """)
-        toggle_button.clicked.connect(lambda: self.toggle_module(module_name))
-        
-        # Remove button
-        remove_button = QPushButton("Remove")
-        remove_button.setStyleSheet("""
-            QPushButton {
-                background: #1a1b2a;
-                color: #ff6b6b;
-                border: 1px solid #3a3550;
-                padding: 4px 8px;
-                border-radius: 4px;
-                font-size: 9px;
-            }
-            QPushButton:hover { 
-                background: #222335; 
-                border-color: #ff6b6b; 
-            }
-        """)
-        remove_button.clicked.connect(lambda: self.remove_module(module_name))
-        
-        module_buttons_layout.addWidget(toggle_button)
-        module_buttons_layout.addWidget(remove_button)
-        module_buttons_layout.addStretch()
-        
-        # Create the module layout
-        module_layout = QVBoxLayout()
-        module_layout.addWidget(module_panel)
-        module_layout.addLayout(module_buttons_layout)
-        
-        # Add to the modules container
-        module_widget = QWidget()
-        module_widget.setLayout(module_layout)
-        self.modules_layout.addWidget(module_widget)
-        
-        # Store references
-        self.modules[module_name] = {
-            'panel': module_panel,
-            'enabled': True,
-            'toggle_button': toggle_button,
-            'remove_button': remove_button
-        }
-        self.module_widgets[module_name] = module_widget
-        
-        # Initialize the module based on its type
-        self.initialize_module(module_name)
+    def add_module(self, module_name, module_id=None):
+        """Add a module of type `module_name` and return its ID."""
+        if module_name in SINGLE_INSTANCE_TYPES and self.module_list.ids(module_name):
+            logging.warning(f"Only one {module_name} module is supported")
+            return self.module_list.ids(module_name)[0]
+        module_id = self.module_list.add_module(module_name, module_id)
+        self.detail_panel(module_name)
+        self.initialize_module(module_id)
+        self.module_view.setCurrentIndex(self.module_list.index_of(module_id))
+        return module_id
     
-    def initialize_module(self, module_name):
+    def initialize_module(self, module_id):
         """Initialize specific module functionality."""
-        if module_name == "RealSense Camera":
-            self.initialize_realsense_module(module_name)
-        elif module_name == "Servo Drives":
-            self.initialize_servo_module(module_name)
-        elif module_name == "RPi Pico":
-            self.initialize_pico_module(module_name)
+        module_type = self.module_list.entry(module_id).module_type
+        if module_type == "RealSense Camera":
+            self.realsense_module_id = module_id
+            self.refresh_realsense_status(module_id)
+        elif module_type == "Servo Drives":
+            self.module_list.set_status(module_id, "Unknown", "warning")
+        elif module_type == "RPi Pico":
+            self.pico_module_id = module_id
+            self.module_list.set_status(module_id, "Disconnected", "warning")
+        elif module_type in self.plugins.specs:
+            self.refresh_plugin_status(module_id)
     
-    def initialize_realsense_module(self, module_name):
-        """Initialize RealSense camera module."""
-        module_info = self.modules[module_name]
-        panel = module_info['panel']
-        
+    def create_realsense_controls(self, panel):
+        """RealSense camera controls."""
         # Add RealSense-specific controls
         realsense_layout = QVBoxLayout()
-        status_label = panel.status_label
-        realsense_layout.addWidget(status_label)
+        realsense_layout.addWidget(panel.status_label)
         
         # Resolution selection
         resolution_layout = self.create_resolution_control()
@@ -320,7 +609,7 @@ class RobotGUI(QMainWindow):
         start_button = QPushButton("Start Stream")
         stop_button = QPushButton("Stop Stream")
         stop_button.setEnabled(False)
-        start_button.clicked.connect(self.start_realsense)
+        start_button.clicked.connect(lambda: self.start_realsense())
         stop_button.clicked.connect(self.stop_realsense)
         
         self.btn_rs_start = start_button
@@ -329,138 +618,242 @@ class RobotGUI(QMainWindow):
         realsense_layout.addWidget(start_button)
         realsense_layout.addWidget(stop_button)
         panel.setLayout(realsense_layout)
-        
-        # Detect RealSense
-        if REAL_SENSE_AVAILABLE:
-            realsense_success, realsense_message = detect_realsense()
-            realsense_color = "#6bff9b" if realsense_success else ("#ff6b6b" if "missing" in realsense_message else "#ffaa6b")
-            panel.set_status(realsense_message, realsense_color)
-        else:
-            panel.set_status("Not available", "#ff6b6b")
+
+    def refresh_realsense_status(self, module_id):
+        """Detect the camera on a worker thread and show the result on the module."""
+        if not realsense_available():
+            self.module_list.set_status(module_id, "Not available", "error")
+            return
+
+        def show_result(result):
+            entry = self.module_list.entry(module_id)
+            if entry is None or not entry.enabled:
+                return
+            self.update_stream_options()
+            if not self.btn_rs_start.isEnabled():
+                return  # Starting or streaming; keep that status
+            realsense_success, realsense_message = result
+            realsense_level = "ok" if realsense_success else ("error" if "missing" in realsense_message else "warning")
+            self.module_list.set_status(module_id, realsense_message, realsense_level)
+
+        self.module_list.set_status(module_id, "Detecting...", "warning")
+        run_in_background(detect_realsense, show_result)
     
-    def initialize_servo_module(self, module_name):
-        """Initialize servo drives module."""
-        module_info = self.modules[module_name]
-        panel = module_info['panel']
-        
+    def create_servo_controls(self, panel):
+        """Servo drive controls; they act on whichever servo module is selected."""
         servo_layout = QVBoxLayout()
         servo_layout.addWidget(panel.status_label)
         init_button = QPushButton("Initialize")
-        init_button.clicked.connect(lambda: self.servo_initialize(module_name))
+        init_button.clicked.connect(lambda: self.servo_initialize(self.selected_module_id()))
         servo_layout.addWidget(init_button)
         panel.setLayout(servo_layout)
-        
-        panel.set_status("Unknown", "#ffaa6b")
     
-    def initialize_pico_module(self, module_name):
-        """Initialize RPi Pico module."""
-        module_info = self.modules[module_name]
-        panel = module_info['panel']
-        
+    def create_pico_controls(self, panel):
+        """RPi Pico controls."""
         pico_layout = QVBoxLayout()
-        self.pico_status = panel.status_label
-        pico_layout.addWidget(self.pico_status)
+        pico_layout.addWidget(panel.status_label)
         
         connect_button = QPushButton("Connect")
-        connect_button.clicked.connect(self.connect_pico)
+        connect_button.clicked.connect(lambda: self.connect_pico())
         pico_layout.addWidget(connect_button)
         
         self.btn_pico_connect = connect_button
         panel.setLayout(pico_layout)
-        
-        panel.set_status("Disconnected", "#ffaa6b")
     
-    def servo_initialize(self, module_name):
+    def servo_initialize(self, module_id, on_ready=None):
         """Placeholder for servo initialization."""
-        self.modules[module_name]['panel'].set_status("Initialized", "#6bff9b")
-        logging.info(f"Servo module {module_name} initialized")
+        module_id = self.resolve_module_id(module_id)
+        entry = self.module_list.entry(module_id)
+        if entry is None:
+            if on_ready:
+                on_ready(False)
+            return
+        self.module_list.set_status(module_id, "Initialized", "ok")
+        entry.settings['initialized'] = True
+        logging.info(f"Servo module {entry.name} initialized")
+        if on_ready:
+            on_ready(True)
     
-    def toggle_module(self, module_name):
+    def create_plugin_controls(self, panel):
+        """Start/Stop for plugin devices; they act on whichever module of the type is selected."""
+        plugin_layout = QVBoxLayout()
+        plugin_layout.addWidget(panel.status_label)
+        start_button = QPushButton("Start")
+        start_button.clicked.connect(lambda: self.start_plugin(self.selected_module_id()))
+        stop_button = QPushButton("Stop")
+        stop_button.clicked.connect(lambda: self.stop_plugin(self.selected_module_id()))
+        plugin_layout.addWidget(start_button)
+        plugin_layout.addWidget(stop_button)
+        panel.setLayout(plugin_layout)
+
+    def driver_host(self, module_id):
+        """The host of a plugin module's driver, created on first use; frames go to device/<id>/frame."""
+        host = self.driver_hosts.get(module_id)
+        if host is None:
+            module_type = self.module_list.entry(module_id).module_type
+            options = self.plugin_options.get(module_type, {})
+            host = create_driver_host(self.plugins.specs[module_type], options.get("settings", {}), self.frame_bus,
+                                      f"device/{module_id}/frame", options.get("isolate"),
+                                      options.get("call_timeout", 5.0))
+            self.driver_hosts[module_id] = host
+        return host
+
+    def refresh_plugin_status(self, module_id):
+        """Ask the driver whether its device is there (imports the plugin, on a worker thread)."""
+        host = self.driver_host(module_id)
+
+        def show_result(result):
+            entry = self.module_list.entry(module_id)
+            if entry is None or not entry.enabled or entry.state == "streaming":
+                return
+            found, message = result
+            self.module_list.set_status(module_id, message, "ok" if found else "warning")
+
+        def failed(error):
+            if self.module_list.entry(module_id) is not None:
+                self.module_list.set_status(module_id, f"Driver failed: {error}", "error")
+            logging.error(f"Plugin driver for {module_id} failed: {error}")
+
+        self.module_list.set_status(module_id, "Detecting...", "warning")
+        run_in_background(host.detect, show_result, failed)
+
+    def start_plugin(self, module_id, on_ready=None):
+        """Open and start a plugin device on a worker thread; the watchdog restarts it when it stalls."""
+        module_id = self.resolve_module_id(module_id)
+        entry = self.module_list.entry(module_id)
+        if entry is None or entry.module_type not in self.plugins.specs:
+            if on_ready:
+                on_ready(False)
+            return
+        host = self.driver_host(module_id)
+
+        def open_and_start():
+            host.open()
+            host.start()
+
+        def started(_):
+            self.module_list.set_state(module_id, "streaming")
+            self.module_list.set_status(module_id, "Streaming", "ok")
+            self.plugin_frames[module_id] = host.progress()
+            self.watchdog.watch(module_id, host.progress, lambda: self.restart_plugin(module_id),
+                                self.watchdog_deadlines["plugin"], alive=host.alive)
+            logging.info(f"{entry.name} streaming to {host.topic}")
+            if on_ready:
+                on_ready(True)
+
+        def failed(error):
+            self.module_list.set_status(module_id, f"Start failed: {error}", "error")
+            logging.error(f"Failed to start {entry.name}: {error}")
+            if on_ready:
+                on_ready(False)
+
+        self.module_list.set_status(module_id, "Starting...", "warning")
+        run_in_background(open_and_start, started, failed)
+
+    def stop_plugin(self, module_id):
+        """Stop a plugin device and close its driver (an isolated driver's process exits)."""
+        module_id = self.resolve_module_id(module_id)
+        host = self.driver_hosts.get(module_id)
+        if host is None:
+            return
+        self.watchdog.unwatch(module_id)
+        self.plugin_frames.pop(module_id, None)
+        self.module_list.set_state(module_id, "enabled")
+        self.module_list.set_status(module_id, "Stopping...", "warning")
+        run_in_background(host.close, lambda _: self.module_list.set_status(module_id, "Stopped", "warning"),
+                          lambda error: logging.error(f"Stopping {module_id} failed: {error}"))
+
+    def restart_plugin(self, module_id):
+        """Watchdog restart: reopen only this driver (a hung or dead driver process is replaced)."""
+        host = self.driver_hosts.get(module_id)
+        if host is None:
+            return
+        attempt = self.watchdog.devices[module_id].restarts
+        logging.warning(f"Restarting {module_id} (attempt {attempt})")
+        self.module_list.set_status(module_id, f"Restarting (attempt {attempt})...", "warning")
+
+        def reopen():
+            host.close()
+            host.open()
+            host.start()
+
+        def failed(error):
+            logging.error(f"Restarting {module_id} failed: {error}")
+            self.watchdog.fail(module_id, f"restart failed: {error}")
+
+        run_in_background(reopen, lambda _: self.module_list.set_status(module_id, "Streaming", "ok"), failed)
+
+    def close_plugin(self, module_id):
+        """Forget a plugin module's driver: stop watching it, close it and drop its bus topic."""
+        self.watchdog.unwatch(module_id)
+        self.plugin_frames.pop(module_id, None)
+        host = self.driver_hosts.pop(module_id)
+        run_in_background(host.close, lambda _: self.frame_bus.unadvertise(host.topic),
+                          lambda error: logging.error(f"Closing {module_id} failed: {error}"))
+
+    def update_plugin_status(self):
+        """Show the frame rate of streaming plugin devices (once a second)."""
+        for module_id, last_frames in list(self.plugin_frames.items()):
+            frames = self.driver_hosts[module_id].progress()
+            self.plugin_frames[module_id] = frames
+            health = self.watchdog.devices.get(module_id)
+            if health is None or health.state != "healthy" or frames < last_frames:
+                continue  # restarting: the watchdog's status stays up
+            self.module_list.set_status(module_id, f"Streaming, {frames - last_frames} frames/s", "ok")
+
+    def toggle_module(self, module_id):
         """Toggle module enabled/disabled state."""
-        module_info = self.modules[module_name]
-        if module_info['enabled']:
-            # Disable the module
-            module_info['toggle_button'].setText("Enable")
-            module_info['panel'].setStyleSheet("""
-                QGroupBox {
-                    font-weight: bold;
-                    color: #555555;
-                    border: 1px solid #2a2740;
-                    border-radius: 4px;
-                    margin-top: 12px;
-                    padding-top: 8px;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    left: 8px;
-                    padding: 0 4px;
-                }
-            """)
-            module_info['panel'].set_status("Disabled", "#555555")
-            module_info['enabled'] = False
-            
-            # Disable any controls in the module
-            for i in range(module_info['panel'].layout().count()):
-                widget = module_info['panel'].layout().itemAt(i).widget()
-                if widget and hasattr(widget, 'setEnabled'):
-                    widget.setEnabled(False)
+        module_id = self.resolve_module_id(module_id)
+        entry = self.module_list.entry(module_id)
+        if entry is None:
+            return
+        if entry.enabled:
+            self.module_list.set_enabled(module_id, False)
+            self.module_list.set_status(module_id, "Disabled", "disabled")
         else:
-            # Enable the module
-            module_info['toggle_button'].setText("Disable")
-            module_info['panel'].setStyleSheet("""
-                QGroupBox {
-                    font-weight: bold;
-                    color: #b8a0ff;
-                    border: 1px solid #2a2740;
-                    border-radius: 4px;
-                    margin-top: 12px;
-                    padding-top: 8px;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    left: 8px;
-                    padding: 0 4px;
-                }
-            """)
-            if module_name == "RealSense Camera":
-                if REAL_SENSE_AVAILABLE:
-                    realsense_success, realsense_message = detect_realsense()
-                    realsense_color = "#6bff9b" if realsense_success else ("#ff6b6b" if "missing" in realsense_message else "#ffaa6b")
-                    module_info['panel'].set_status(realsense_message, realsense_color)
-                else:
-                    module_info['panel'].set_status("Not available", "#ff6b6b")
-            elif module_name == "Servo Drives":
-                module_info['panel'].set_status("Unknown", "#ffaa6b")
-            elif module_name == "RPi Pico":
-                module_info['panel'].set_status("Disconnected", "#ffaa6b")
-            
-            module_info['enabled'] = True
-            
-            # Enable any controls in the module
-            for i in range(module_info['panel'].layout().count()):
-                widget = module_info['panel'].layout().itemAt(i).widget()
-                if widget and hasattr(widget, 'setEnabled'):
-                    widget.setEnabled(True)
+            self.module_list.set_enabled(module_id, True)
+            if entry.module_type == "RealSense Camera":
+                if self.capture is not None:
+                    self.module_list.set_state(module_id, "streaming")
+                self.refresh_realsense_status(module_id)
+            elif entry.module_type == "Servo Drives":
+                self.module_list.set_status(module_id, "Unknown", "warning")
+            elif entry.module_type == "RPi Pico":
+                self.module_list.set_status(module_id, "Disconnected", "warning")
+            elif entry.module_type in self.plugins.specs:
+                self.refresh_plugin_status(module_id)
+        if module_id == self.selected_module_id():
+            self.show_module_details()
     
-    def remove_module(self, module_name):
-        """Remove a module from the control panel."""
-        # Remove from layout
-        module_widget = self.module_widgets[module_name]
-        self.modules_layout.removeWidget(module_widget)
-        module_widget.deleteLater()
-        
-        # Remove from dictionaries
-        del self.modules[module_name]
-        del self.module_widgets[module_name]
-        
-        logging.info(f"Module {module_name} removed")
+    def remove_module(self, module_id):
+        """Remove a module, stopping the device it controls."""
+        module_id = self.resolve_module_id(module_id)
+        entry = self.module_list.entry(module_id)
+        if entry is None:
+            return
+        if module_id == self.realsense_module_id:
+            if self.capture:
+                self.stop_realsense()
+            self.realsense_module_id = None
+        elif module_id == self.pico_module_id:
+            self.watchdog.unwatch("pico")
+            if self.pico_link:
+                self.pico_link.close()
+                self.pico_link = None
+            self.pico_module_id = None
+        elif module_id in self.driver_hosts:
+            self.close_plugin(module_id)
+        self.module_list.remove_module(module_id)
+        logging.info(f"Module {entry.name} removed")
 
     def create_resolution_control(self):
         """Create resolution selection controls."""
         resolution_layout = QHBoxLayout()
         resolution_layout.addWidget(QLabel("Resolution:"))
         self.resolution_combo = QComboBox()
-        self.resolution_combo.addItems(["640x480", "1280x720", "1920x1080"])
+        self.resolution_combo.addItems(self.capabilities.resolutions())
+        self.resolution_combo.setCurrentText(self.config.get("resolution", "1280x720"))
+        self.resolution_combo.currentTextChanged.connect(self.update_fps_options)
         resolution_layout.addWidget(self.resolution_combo)
         return resolution_layout
 
@@ -469,26 +862,58 @@ class RobotGUI(QMainWindow):
         fps_layout = QHBoxLayout()
         fps_layout.addWidget(QLabel("FPS:"))
         self.fps_combo = QComboBox()
-        self.fps_combo.addItems(["15", "30", "60"])
+        self.update_fps_options(self.resolution_combo.currentText())
+        self.fps_combo.setCurrentText(str(self.config.get("fps", 30)))
+        self.fps_combo.currentTextChanged.connect(self.schedule_stream_reconfigure)
         fps_layout.addWidget(self.fps_combo)
         return fps_layout
 
+    def update_stream_options(self):
+        """Offer only the resolutions the connected camera supports, keeping the selection."""
+        if not self.realsense_module_id:
+            return
+        current = self.resolution_combo.currentText()
+        resolutions = self.capabilities.resolutions()
+        self.resolution_combo.blockSignals(True)
+        self.resolution_combo.clear()
+        self.resolution_combo.addItems(resolutions)
+        if current in resolutions:
+            self.resolution_combo.setCurrentText(current)
+        self.resolution_combo.blockSignals(False)
+        self.update_fps_options(self.resolution_combo.currentText())
+
+    def update_fps_options(self, resolution):
+        """Offer only the frame rates supported at the selected resolution."""
+        if not resolution:
+            return
+        current = self.fps_combo.currentText()
+        options = [str(fps) for fps in self.capabilities.fps_options(resolution)]
+        self.fps_combo.clear()
+        self.fps_combo.addItems(options)
+        if current in options:
+            self.fps_combo.setCurrentText(current)
+
+    def on_devices_changed(self):
+        """A camera was plugged in or removed."""
+        logging.info("RealSense devices changed")
+        self.detect_devices()
+
     def detect_devices(self):
         """Detect connected devices and update their status if RealSense module exists."""
-        if "RealSense Camera" in self.modules:
-            if REAL_SENSE_AVAILABLE:
-                realsense_success, realsense_message = detect_realsense()
-                realsense_color = "#6bff9b" if realsense_success else ("#ff6b6b" if "missing" in realsense_message else "#ffaa6b")
-                self.modules["RealSense Camera"]['panel'].set_status(realsense_message, realsense_color)
-            else:
-                self.modules["RealSense Camera"]['panel'].set_status("Not available", "#ff6b6b")
+        if self.realsense_module_id:
+            self.refresh_realsense_status(self.realsense_module_id)
 
         # Update servo and pico statuses if modules exist
-        if "Servo Drives" in self.modules:
-            self.modules["Servo Drives"]['panel'].set_status("Unknown", "#ffaa6b")
+        for module_id in self.module_list.ids("Servo Drives"):
+            self.module_list.set_status(module_id, "Unknown", "warning")
         
-        if "RPi Pico" in self.modules:
-            self.modules["RPi Pico"]['panel'].set_status("Disconnected", "#ffaa6b")
+        if self.pico_module_id:
+            self.module_list.set_status(self.pico_module_id, "Disconnected", "warning")
+
+        for module_type in self.plugins.specs:
+            for module_id in self.module_list.ids(module_type):
+                if module_id not in self.driver_hosts or self.module_list.entry(module_id).state != "streaming":
+                    self.refresh_plugin_status(module_id)
 
     def create_tabs(self):
         """Create the tabbed interface with camera, charts, and AI tabs."""
@@ -496,6 +921,10 @@ class RobotGUI(QMainWindow):
 
         camera_tab = self.create_camera_tab()
         tabs.addTab(camera_tab, "Camera")
+        self.occupancy_view = OccupancyView(self.occupancy)
+        tabs.addTab(self.occupancy_view, "Occupancy")
+        self.stats_panel = StatsPanel(get_metrics())
+        tabs.addTab(self.stats_panel, "Stats")
 
         for tab_name in ["Charts", "AI"]:
             empty_tab = self.create_empty_tab()
@@ -511,14 +940,14 @@ class RobotGUI(QMainWindow):
         # Create RGB video display
         self.video_label_rgb = QLabel("RGB Stream")
         self.video_label_rgb.setAlignment(Qt.AlignCenter)
-        self.video_label_rgb.setStyleSheet("background: #000; color: #a0b0ff; font-size: 14px;")
+        self.video_label_rgb.setProperty("role", "video")
         self.video_label_rgb.setMinimumSize(640, 360)
         self.video_label_rgb.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         # Create depth video display
         self.video_label_depth = QLabel("Depth Stream")
         self.video_label_depth.setAlignment(Qt.AlignCenter)
-        self.video_label_depth.setStyleSheet("background: #000; color: #c0a0ff; font-size: 14px;")
+        self.video_label_depth.setProperty("role", "video")
         self.video_label_depth.setMinimumSize(640, 360)
         self.video_label_depth.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
@@ -539,8 +968,11 @@ class RobotGUI(QMainWindow):
         layout = QVBoxLayout(panel)
         layout.addWidget(QLabel("System Console", alignment=Qt.AlignCenter))
         
-        self.log_text = QPlainTextEdit(readOnly=True, maximumBlockCount=1000)
-        layout.addWidget(self.log_text)
+        # Every log record and command output line is kept in the store; the view
+        # draws only the rows on screen and filters by level, source and text
+        self.log_store = LogStore(capacity=int(self.config.get("log_capacity", 1_000_000)))
+        self.log_view = LogView(self.log_store)
+        layout.addWidget(self.log_view, 1)
 
         self.cmd_input = QTextEdit(maximumHeight=50, placeholderText="command >")
         execute_button = QPushButton("Execute", clicked=self.send_command)
@@ -549,75 +981,364 @@ class RobotGUI(QMainWindow):
         return panel
 
     def send_command(self):
-        """Execute a command from the command input field."""
+        """Run the command(s) in the input field off the GUI thread; several lines run as a script."""
         command_text = self.cmd_input.toPlainText().strip()
         if command_text:
-            logging.info(f"cmd: {command_text}")
+            self.console_output(f"> {command_text}")
+            self.command_runner.submit(command_text, self.command_bridge.output.emit,
+                                       self.command_bridge.finished.emit)
             self.cmd_input.clear()
 
-    def start_realsense(self):
-        """Start the RealSense camera stream."""
-        if not REAL_SENSE_AVAILABLE:
+    def console_output(self, text):
+        """Store command output in the console log, one record per line."""
+        now = time.time()
+        for line in text.splitlines() or [""]:
+            self.log_store.append(now, "INFO", "console", line)
+
+    def on_command_finished(self, result):
+        """Report how a console command ended (GUI thread)."""
+        if result.ok:
+            self.console_output(f"ok ({result.seconds * 1000:.1f} ms)")
+        else:
+            logging.error(f"{result.error} ({result.seconds * 1000:.1f} ms)")
+
+    def run_script_file(self):
+        """Pick a command script and run it in the console."""
+        from PySide6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(self, "Run Script", "", "Command scripts (*.txt *.cmd);;All files (*)")
+        if path:
+            self.console_output(f"> run {path}")
+            self.command_runner.submit(f"run {shlex.quote(path)}", self.command_bridge.output.emit,
+                                       self.command_bridge.finished.emit)
+
+    def start_realsense(self, on_ready=None):
+        """Start the RealSense camera stream.
+
+        The pipeline is started on a worker thread; `on_ready(ok)` is called on
+        the GUI thread once frames are flowing or the start failed.
+        """
+        if self.capture_factory is RealSenseCapture and load_realsense() is None:
             logging.error("Cannot start: pyrealsense2 not installed")
+            if on_ready:
+                on_ready(False)
             return
 
-        try:
-            width, height = map(int, self.resolution_combo.currentText().split("x"))
-            fps = int(self.fps_combo.currentText())
+        width, height, fps = self.selected_stream_mode()
+        capture = self.capture_factory()
+        self.change_detector.reset()
+        capture.add_consumer(lambda frames: self.detect_change(capture, frames))  # first: the others read its result
+        capture.add_consumer(lambda frames: self.publish_frames(capture.serial, frames))
+        capture.add_consumer(self.record_frames)
+        capture.add_consumer(self.occupancy.notify)
+        self.btn_rs_start.setEnabled(False)
+        self.module_list.set_status(self.realsense_module_id, "Starting...", "warning")
 
-            self.pipeline = rs.pipeline()
-            config = rs.config()
-            config.enable_stream(rs.stream.color, width, height, rs.format.rgb8, fps)
-            config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
-            self.pipeline.start(config)
+        def started(_):
+            self.capture = capture
+            self.camera_serial = capture.serial
+            self.last_displayed_seq = 0
 
             self.timer = QTimer()
             self.timer.timeout.connect(self.update_frame)
             self.timer.start(int(1000 / fps))
 
-            self.realsense_panel.set_status("Streaming", "#6bff9b")
-            self.btn_rs_start.setEnabled(False)
+            self.module_list.set_status(self.realsense_module_id, "Streaming", "ok")
+            self.module_list.set_state(self.realsense_module_id, "streaming")
             self.btn_rs_stop.setEnabled(True)
+            if self.occupancy.thread is None:
+                self.occupancy.start()
+            if self.config.get("imu", True):
+                self.start_imu()
+            self.start_bus_depth_encoder(capture.serial)
+            self.watchdog.watch("camera", lambda: self.capture.seq if self.capture else None,
+                                self.restart_realsense, self.watchdog_deadlines["camera"],
+                                alive=lambda: self.capture is None or self.capture.running)
             logging.info(f"RealSense stream started @ {width}x{height} @ {fps} FPS")
+            if on_ready:
+                on_ready(True)
 
-        except Exception as e:
-            self.realsense_panel.set_status("Start failed", "#ff6b6b")
-            logging.error(f"Failed to start stream: {e}")
+        def failed(error):
+            self.module_list.set_status(self.realsense_module_id, "Start failed", "error")
+            self.btn_rs_start.setEnabled(True)
+            logging.error(f"Failed to start stream: {error}")
+            self.watchdog.fail("camera", f"start failed: {error}")
+            if on_ready:
+                on_ready(False)
+
+        run_in_background(capture.start, started, failed, width, height, fps)
 
-    def stop_realsense(self):
-        """Stop the RealSense camera stream."""
+    def stop_realsense(self, keep_watching=False):
+        """Stop the RealSense camera stream (the watchdog forgets it unless `keep_watching`)."""
+        if not keep_watching:
+            self.watchdog.unwatch("camera")
+            self.occupancy.stop()
+        self.stop_imu(keep_watching)
+        self.stop_bus_depth_encoder()
         if self.timer:
             self.timer.stop()
-        if self.pipeline:
-            self.pipeline.stop()
-            self.pipeline = None
-        self.realsense_panel.set_status("Stopped", "#ffaa6b")
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+        self.module_list.set_status(self.realsense_module_id, "Stopped", "warning")
+        entry = self.module_list.entry(self.realsense_module_id)
+        if entry is not None and entry.enabled:
+            self.module_list.set_state(self.realsense_module_id, "enabled")
         self.btn_rs_start.setEnabled(True)
         self.btn_rs_stop.setEnabled(False)
         logging.info("RealSense stream stopped")
 
+    def start_recording(self, path=None):
+        """Record camera frames to `path` (default recordings/<timestamp>); returns the path."""
+        from utils.recording import RecordingWriter
+        path = path or os.path.join("recordings", time.strftime("%Y%m%d-%H%M%S"))
+        capture = self.capture
+        camera = {"serial": getattr(capture, "serial", None), "depth_scale": getattr(capture, "depth_scale", 0.001),
+                  "depth_intrinsics": getattr(capture, "depth_intrinsics", None)}
+        with self.recorder_lock:
+            if self.recorder is not None:
+                return self.recorder.path
+            self.recorder = RecordingWriter(path, self.depth_codec_options("recording"), camera)
+            self.recorded_frames = 0
+            self.recording_started = time.monotonic()
+            # Only IMU samples from now on; the ring holds the last ~20 s
+            self.recorded_imu_until = {}
+            for stream in self.imu_store.rings if self.imu_store else ():
+                latest = self.imu_store.latest(stream)
+                self.recorded_imu_until[stream] = latest[0] if latest else None
+        logging.info(f"Recording to {path}")
+        return path
+
+    def stop_recording(self):
+        """Stop recording; returns (path, frames, seconds) or None if not recording."""
+        with self.recorder_lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        recorder.close()
+        return recorder.path, self.recorded_frames, time.monotonic() - self.recording_started
+
+    def record_frames(self, frames):
+        """Capture-thread consumer: append the frame pair to the active recording."""
+        with self.recorder_lock:
+            recorder = self.recorder
+            if recorder is None:
+                return
+            try:
+                recorder.write("color", frames.color, frames.timestamp)
+                recorder.write("depth", frames.depth, frames.timestamp)
+                self.recorded_frames += 1
+                if self.imu is not None:
+                    for stream, since in self.recorded_imu_until.items():
+                        times, values = self.imu_store.samples(stream, since)
+                        if len(times):
+                            recorder.write_many(stream, values, times)
+                            self.recorded_imu_until[stream] = times[-1]
+            except Exception as e:
+                logging.error(f"Recording stopped: {e}")
+                self.recorder = None
+                recorder.close()
+
+    def record_telemetry(self, payload):
+        """Pico reader thread: record the Pico's own clock (`t=`) against the host time it arrived."""
+        import numpy as np
+        fields = dict(field.partition("=")[::2] for field in payload.split(","))
+        try:
+            pico_time = float(fields.get("t", "nan"))
+        except ValueError:
+            pico_time = float("nan")
+        with self.recorder_lock:
+            if self.recorder is not None:
+                try:
+                    self.recorder.write("telemetry", np.array([pico_time]), time.time())
+                except Exception as e:
+                    logging.error(f"Recording telemetry failed: {e}")
+
+    def restart_realsense(self):
+        """Watchdog restart: tear down and restart only the camera pipeline."""
+        attempt = self.watchdog.devices["camera"].restarts
+        logging.warning(f"Restarting camera stream (attempt {attempt})")
+        self.stop_realsense(keep_watching=True)
+        if self.realsense_module_id:
+            self.start_realsense()
+            self.module_list.set_status(self.realsense_module_id, f"Restarting (attempt {attempt})...", "warning")
+
+    def start_imu(self):
+        """Stream the running camera's accel and gyro into `imu_store`, if it has an IMU."""
+        capture = self.capture
+        if capture is None or self.imu is not None:
+            return
+        if self.imu_store is None:
+            from devices.imu import ImuStore
+            self.imu_store = ImuStore()
+        imu = capture.create_imu(self.imu_store)
+        if imu is None:
+            logging.info(f"Camera {capture.serial} has no IMU")
+            return
+
+        def started(_):
+            self.imu = imu
+            self.watchdog.watch("imu", lambda: self.imu.seq if self.imu else None, self.restart_imu,
+                                self.watchdog_deadlines["imu"], alive=lambda: self.imu is None or self.imu.running)
+
+        def failed(error):
+            logging.error(f"Failed to start IMU: {error}")
+            self.watchdog.fail("imu", f"start failed: {error}")
+
+        run_in_background(imu.start, started, failed)
+
+    def stop_imu(self, keep_watching=False):
+        if not keep_watching:
+            self.watchdog.unwatch("imu")
+        if self.imu:
+            self.imu.stop()
+            self.imu = None
+
+    def restart_imu(self):
+        """Watchdog restart: only the motion pipeline, the camera stream keeps running."""
+        logging.warning(f"Restarting IMU (attempt {self.watchdog.devices['imu'].restarts})")
+        self.stop_imu(keep_watching=True)
+        self.start_imu()
+
+    def selected_stream_mode(self):
+        """(width, height, fps) currently chosen in the combo boxes."""
+        width, height = map(int, self.resolution_combo.currentText().split("x"))
+        return width, height, int(self.fps_combo.currentText())
+
+    def schedule_stream_reconfigure(self):
+        """Coalesce combo changes (resolution also resets FPS) into one switch."""
+        if self.capture:
+            self.reconfigure_timer.start()
+
+    def apply_stream_settings(self):
+        """Switch a running stream to the selected mode without stopping it."""
+        if not self.capture or not self.resolution_combo.currentText() or not self.fps_combo.currentText():
+            return
+        width, height, fps = self.selected_stream_mode()
+        try:
+            elapsed = self.capture.reconfigure(width, height, fps)
+        except Exception as e:
+            logging.error(f"Stream reconfigure failed: {e}")
+            return
+        if elapsed:
+            self.timer.setInterval(int(1000 / fps))
+            logging.info(f"Stream reconfigured to {width}x{height} @ {fps} FPS in {elapsed * 1000:.0f} ms")
+
     def update_frame(self):
-        """Update the camera frames in the display."""
-        if not self.pipeline:
+        """Show the newest frames from the capture thread, if any arrived."""
+        if not self.capture:
             return
 
+        frames = self.capture.latest()
+        if frames is None or frames.seq == self.last_displayed_seq:
+            return
+        frames = self.display_frames = self.capture.read(self.display_frames)
+        if frames is None:
+            return  # rewritten while copying; the next tick gets a newer pair
+        if self.last_displayed_seq and frames.seq > self.last_displayed_seq + 1:
+            self.skipped_counter.inc(frames.seq - self.last_displayed_seq - 1)
+        self.last_displayed_seq = frames.seq
+        gate = self.change_gates.get("display")
+        if gate is not None and not gate.admit(frames):
+            return  # nothing moved; the shown frame still holds
+        start = time.perf_counter()
         try:
-            frames = self.pipeline.wait_for_frames()
-            color_frame = frames.get_color_frame()
-            depth_frame = frames.get_depth_frame()
+            self.update_rgb_frame(frames.color)
+            self.update_depth_frame(frames.depth)
+            self.frames_displayed += 1
+            now = time.perf_counter()
+            self.display_histogram.observe(now - start)
+            if gate is not None:
+                gate.record(now - start)
+            self.latency_histogram.observe(now - frames.captured)
+            self.displayed_counter.inc()
+        except Exception as e:
+            self.watchdog.error("camera", f"frame error: {e}")
+
+    def detect_change(self, capture, frames):
+        """Score each frame pair for change, while any consumer uses the result (capture thread)."""
+        if self.change_gates:
+            self.change_detector.update(frames, capture.depth_scale)
 
-            if color_frame:
-                self.update_rgb_frame(color_frame)
+    def set_change_gate(self, consumer, min_refresh_hz):
+        """Let `consumer` skip unchanged frames, refreshing at least `min_refresh_hz` times a second.
 
-            if depth_frame:
-                self.update_depth_frame(depth_frame)
+        None turns skipping off for it. Raises ValueError for unknown consumers.
+        """
+        if consumer not in CHANGE_CONSUMERS:
+            raise ValueError(f"unknown consumer '{consumer}'; choose from {', '.join(CHANGE_CONSUMERS)}")
+        gate = None if min_refresh_hz is None else ChangeGate(consumer, self.change_detector, float(min_refresh_hz))
+        if gate is None:
+            self.change_gates.pop(consumer, None)
+        else:
+            self.change_gates[consumer] = gate
+        if consumer == "occupancy":
+            self.occupancy.gate = gate
+        elif consumer == "preview" and self.preview_server is not None:
+            self.preview_server.gate = gate
+        return gate
 
+    def publish_frames(self, serial, frames):
+        """Publish each frame pair on the bus as camera/<serial>/<stream> (capture thread)."""
+        gate = self.change_gates.get("bus")
+        if gate is not None and not gate.admit(frames):
+            return
+        start = time.perf_counter()
+        try:
+            self.frame_bus.publish(f"camera/{serial}/color", frames.color, frames.timestamp)
+            self.frame_bus.publish(f"camera/{serial}/depth", frames.depth, frames.timestamp)
         except Exception as e:
-            logging.error(f"frame error: {e}")
+            logging.error(f"bus publish error: {e}")
+        encoder = self.bus_depth_encoder
+        if encoder is not None:
+            encoder.submit(frames.depth, frames.timestamp)
+        if gate is not None:
+            gate.record(time.perf_counter() - start)
+
+    def depth_codec_options(self, use):
+        """DepthEncoderPool options for "recording" or "bus", or None if encoding is off for it."""
+        from utils.depthcodec import available_backends
+        if not self.depth_codec.get(use):
+            return None
+        options = {key: self.depth_codec[key] for key in ("backend", "level", "key_interval", "workers")
+                   if key in self.depth_codec}
+        if options.get("backend", "zlib") not in available_backends():
+            logging.error(f"Depth codec backend '{options['backend']}' is not installed; {use} depth stays raw")
+            return None
+        if use == "bus":
+            options["key_interval"] = 1  # subscribers may skip frames, so each one must decode alone
+        else:
+            options["max_pending"] = self.depth_codec.get("max_pending", 16)  # ride out bursts, ~2 MB a frame
+        return options
+
+    def start_bus_depth_encoder(self, serial):
+        """Also publish depth encoded as camera/<serial>/depth.kzd, if enabled in the config."""
+        options = self.depth_codec_options("bus")
+        if options is None or self.bus_depth_encoder is not None:
+            return
+        from utils.depthcodec import DepthEncoderPool, frame_info
+        topic = f"camera/{serial}/depth.kzd"
 
-    def update_rgb_frame(self, color_frame):
+        def publish(data, timestamp, temporal):
+            width, height, _, _ = frame_info(data)
+            # A worst-case frame can exceed the raw size; those are skipped rather than resized for
+            self.frame_bus.advertise(topic, max_bytes=width * height * 2 + 65536)
+            try:
+                self.frame_bus.publish(topic, data, timestamp)
+            except ValueError as e:
+                logging.debug(f"encoded depth not published: {e}")
+
+        try:
+            self.bus_depth_encoder = DepthEncoderPool(publish, name="bus-depth", **options)
+        except ValueError as e:
+            logging.error(f"Depth encoding for the bus is off: {e}")
+
+    def stop_bus_depth_encoder(self):
+        encoder, self.bus_depth_encoder = self.bus_depth_encoder, None
+        if encoder is not None:
+            encoder.close()
+
+    def update_rgb_frame(self, rgb_image):
         """Update the RGB frame in the display."""
-        rgb_image = np.asanyarray(color_frame.get_data())
         height, width, channels = rgb_image.shape
         qt_image = QImage(rgb_image.data, width, height, channels * width, QImage.Format_RGB888)
         pixmap = QPixmap.fromImage(qt_image).scaled(
@@ -627,9 +1348,8 @@ class RobotGUI(QMainWindow):
         )
         self.video_label_rgb.setPixmap(pixmap)
 
-    def update_depth_frame(self, depth_frame):
+    def update_depth_frame(self, depth_image):
         """Update the depth frame in the display."""
-        depth_image = np.asanyarray(depth_frame.get_data())
         depth_colormap = normalize_depth_for_display(depth_image)
         height, width = depth_colormap.shape
         qt_image = QImage(depth_colormap.data, width, height, width, QImage.Format_Grayscale8)
@@ -640,25 +1360,288 @@ class RobotGUI(QMainWindow):
         )
         self.video_label_depth.setPixmap(pixmap)
 
-    def save_configuration(self):
-        """Save the current configuration to file."""
-        resolution = self.resolution_combo.currentText()
-        fps = int(self.fps_combo.currentText())
-        
-        if save_config(resolution, fps):
-            logging.info("Configuration saved")
+    def collect_device_metrics(self):
+        """Watchdog state per device and IMU sample counts, as metric samples (called when metrics are read)."""
+        samples = []
+        for device, health in self.watchdog.metrics().items():
+            labels = {"device": device}
+            samples += [
+                ("kozy_device_healthy", "gauge", "1 while the device makes progress", labels,
+                 int(health["state"] == "healthy")),
+                ("kozy_device_stalls_total", "counter", "Stalls detected by the watchdog", labels, health["stalls"]),
+                ("kozy_device_restarts_total", "counter", "Watchdog restarts (reconnects)", labels, health["restarts"]),
+                ("kozy_device_recoveries_total", "counter", "Restarts that brought the device back", labels,
+                 health["recoveries"]),
+                ("kozy_device_downtime_seconds_total", "counter", "Time spent stalled", labels, health["downtime_s"]),
+                ("kozy_device_errors_total", "counter", "Errors reported for the device", labels, health["errors"]),
+            ]
+        for stream, stats in (self.imu_store.stats() if self.imu_store else {}).items():
+            labels = {"stream": stream}
+            samples += [
+                ("kozy_imu_samples_lost_total", "counter", "IMU samples numbered by the device but never received",
+                 labels, stats["lost"]),
+                ("kozy_imu_rate_hz", "gauge", "IMU samples per second over the last second of data", labels,
+                 stats["rate_hz"]),
+            ]
+        return samples
+
+    def start_metrics_server(self, port=None):
+        """Serve Prometheus metrics on localhost; returns the URL (raises OSError if the port is taken)."""
+        if self.metrics_server is None:
+            port = port or self.config.get("metrics_port", 9108)
+            self.metrics_server = MetricsServer(self.metrics, port=port).start()
+        self.metrics_action.blockSignals(True)
+        self.metrics_action.setChecked(True)
+        self.metrics_action.blockSignals(False)
+        return self.metrics_server.url
+
+    def stop_metrics_server(self):
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+            logging.info("Metrics endpoint stopped")
+        self.metrics_action.blockSignals(True)
+        self.metrics_action.setChecked(False)
+        self.metrics_action.blockSignals(False)
+
+    def toggle_metrics_server(self, checked):
+        if not checked:
+            self.stop_metrics_server()
+            return
+        try:
+            self.start_metrics_server()
+        except OSError as e:
+            logging.error(f"Metrics endpoint failed to start: {e}")
+            self.stop_metrics_server()
+
+    def publish_occupancy(self, grid):
+        """Mapper-thread callback: put each new grid on the frame bus."""
+        try:
+            _, timestamp, values = grid.snapshot()
+            self.frame_bus.publish("occupancy/grid", values, timestamp)
+        except Exception as e:
+            logging.debug(f"Occupancy publish failed: {e}")
+
+    def preview_frames(self):
+        """Newest frame pair for the preview server (called on its tick thread)."""
+        capture = self.capture
+        return capture.read() if capture else None
+
+    def start_preview_server(self, port=None):
+        """Serve the camera as MJPEG on localhost; returns the URL (raises OSError if the port is taken)."""
+        from utils.preview import PreviewServer
+        if self.preview_server is None:
+            port = port or self.config.get("preview_port", 8090)
+            self.preview_server = PreviewServer(self.preview_frames, port=port).start()
+            self.preview_server.gate = self.change_gates.get("preview")
+        self.preview_action.blockSignals(True)
+        self.preview_action.setChecked(True)
+        self.preview_action.blockSignals(False)
+        return self.preview_server.url
+
+    def stop_preview_server(self):
+        if self.preview_server:
+            self.preview_server.stop()
+            self.preview_server = None
+            logging.info("Preview server stopped")
+        self.preview_action.blockSignals(True)
+        self.preview_action.setChecked(False)
+        self.preview_action.blockSignals(False)
+
+    def toggle_preview_server(self, checked):
+        if not checked:
+            self.stop_preview_server()
+            return
+        try:
+            self.start_preview_server()
+        except OSError as e:
+            logging.error(f"Preview server failed to start: {e}")
+            self.stop_preview_server()
+
+    def load_graph_file(self):
+        """Pick a node graph YAML file and start it."""
+        from PySide6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(self, "Load Graph", "graphs", "Graph files (*.yaml *.yml)")
+        if path:
+            self.start_graph(path)
+
+    def start_graph(self, path):
+        """Load a node graph from YAML and start it."""
+        from utils.graph import load_graph
+        self.stop_graph()
+        context = {
+            "display": self.graph_bridge.frame_ready.emit,
+            "frame_bus": self.frame_bus,
+        }
+        try:
+            self.graph = load_graph(path, context)
+            self.graph.start()
+            self.graph_path = path
+            logging.info(f"Graph loaded from {os.path.basename(path)}")
+        except Exception as e:
+            self.graph = None
+            logging.error(f"Failed to load graph: {e}")
+
+    def stop_graph(self):
+        """Stop the running node graph, if any."""
+        if self.graph:
+            self.graph.stop()
+            self.graph = None
+            self.graph_path = None
+
+    def log_graph_stats(self):
+        """Log per-node CPU time and per-edge queue depth of the running graph."""
+        if not self.graph:
+            logging.info("No graph running")
+            return
+        stats = self.graph.stats()
+        for name, node in stats["nodes"].items():
+            logging.info(f"node {name} [{node['executor']}]: cpu {node['cpu_time']:.2f}s, "
+                         f"{node['processed']} items, alive={node['alive']}")
+        for name, edge in stats["edges"].items():
+            logging.info(f"edge {name}: depth {edge['depth']}/{edge['maxsize']}, "
+                         f"dropped {edge['dropped']} ({edge['policy']})")
+
+    def show_graph_frame(self, node_name, item):
+        """Show a frame from a graph display node: color arrays on RGB, the rest on depth."""
+        image = item[-1] if isinstance(item, tuple) else item
+        if image.ndim == 3:
+            height, width, channels = image.shape
+            qt_image = QImage(image.data, width, height, channels * width, QImage.Format_RGB888)
+            label = self.video_label_rgb
         else:
-            logging.error("Failed to save configuration")
+            height, width = image.shape
+            qt_image = QImage(image.data, width, height, width, QImage.Format_Grayscale8)
+            label = self.video_label_depth
+        pixmap = QPixmap.fromImage(qt_image).scaled(label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        label.setPixmap(pixmap)
 
     def load_configuration(self):
         """Load configuration from file and update UI."""
-        self.config = load_config()
-        self.resolution_combo.setCurrentText(self.config.get("resolution", "1280x720"))
-        self.fps_combo.setCurrentText(str(self.config.get("fps", 30)))
+        self.config, problems = validate_config(load_config(), self.capabilities.supports)
+        for problem in problems:
+            logging.warning(f"Configuration: {problem}")
+        if self.realsense_module_id:
+            self.resolution_combo.setCurrentText(self.config.get("resolution", self.resolution_combo.currentText()))
+            self.fps_combo.setCurrentText(str(self.config.get("fps", self.fps_combo.currentText())))
+            # Apply to a running stream right away instead of waiting for Stop/Start
+            self.apply_stream_settings()
         logging.info("Configuration loaded")
 
+    def snapshot_session(self):
+        """Describe the current modules, device settings, graph and theme."""
+        modules = []
+        for entry in self.module_list.entries:
+            settings = {}
+            if entry.module_type == "RealSense Camera":
+                settings = {
+                    "resolution": self.resolution_combo.currentText(),
+                    "fps": int(self.fps_combo.currentText() or 0),
+                    "serial": self.camera_serial,
+                    "streaming": self.capture is not None,
+                }
+            elif entry.module_type == "RPi Pico":
+                settings = {
+                    "connected": bool(self.pico_link and self.pico_link.running),
+                    "port": self.pico_link.port if self.pico_link else None,
+                }
+            elif entry.module_type == "Servo Drives":
+                settings = {"initialized": entry.settings.get('initialized', False)}
+            elif entry.module_type in self.plugins.specs:
+                settings = {"running": entry.module_id in self.plugin_frames}
+            modules.append({"id": entry.module_id, "type": entry.module_type, "enabled": entry.enabled,
+                            "settings": settings})
+        return {"theme": self.current_theme, "graph": self.graph_path, "modules": modules}
+
+    def save_session_snapshot(self):
+        """Write the session file (temp file + rename, so a crash can't corrupt it)."""
+        if save_session(self.snapshot_session()):
+            logging.info("Session saved")
+        else:
+            logging.error("Failed to save session")
+
+    def restore_session(self, session):
+        """Rebuild modules from a session snapshot and bring their devices up in parallel."""
+        self.change_theme(session.get("theme", self.current_theme))
+        jobs = []
+        for module in session.get("modules", []):
+            module_name, settings = module.get("type"), module.get("settings", {})
+            if module_name not in MODULE_TYPES:
+                continue
+            if module.get("id") in self.module_list.rows:
+                continue
+            if module_name in SINGLE_INSTANCE_TYPES and self.module_list.ids(module_name):
+                continue
+            module_id = self.add_module(module_name, module.get("id"))
+            if module_name == "RealSense Camera":
+                self.resolution_combo.setCurrentText(settings.get("resolution", self.resolution_combo.currentText()))
+                self.fps_combo.setCurrentText(str(settings.get("fps", self.fps_combo.currentText())))
+            if not module.get("enabled", True):
+                self.toggle_module(module_id)
+                continue
+
+            if module_name == "RealSense Camera" and settings.get("streaming"):
+                jobs.append((module_id, self.start_realsense))
+            elif module_name == "RPi Pico":
+                # The Pico was always auto-connected on startup; keep doing that
+                jobs.append((module_id, self.connect_pico))
+            elif module_name == "Servo Drives" and settings.get("initialized"):
+                jobs.append((module_id, lambda on_ready, module_id=module_id: self.servo_initialize(module_id, on_ready)))
+            elif module_name in self.plugins.specs and settings.get("running"):
+                jobs.append((module_id, lambda on_ready, module_id=module_id: self.start_plugin(module_id, on_ready)))
+
+        if session.get("graph") and os.path.exists(session["graph"]):
+            self.start_graph(session["graph"])
+        logging.info(f"Session restored with {self.module_list.rowCount()} modules")
+        self.bring_up_devices(jobs)
+
+    def bring_up_devices(self, jobs):
+        """Start devices concurrently; logs time-to-ready per device and in total.
+
+        `jobs` is a list of (name, start) where start(on_ready) returns at once
+        and later calls on_ready(ok) on the GUI thread.
+        """
+        if not jobs:
+            return
+        started = time.perf_counter()
+        pending = {name for name, _ in jobs}
+        results = {}
+
+        def make_ready_callback(name):
+            def ready(ok):
+                elapsed = time.perf_counter() - started
+                results[name] = (ok, elapsed)
+                pending.discard(name)
+                logging.info(f"{name} {'ready' if ok else 'failed'} after {elapsed * 1000:.0f} ms")
+                if not pending:
+                    ready_count = sum(1 for ok, _ in results.values() if ok)
+                    logging.info(f"Devices up: {ready_count}/{len(results)} ready in "
+                                 f"{elapsed * 1000:.0f} ms total")
+            return ready
+
+        for name, start in jobs:
+            start(make_ready_callback(name))
+
     def closeEvent(self, event):
         """Handle application shutdown."""
-        self.stop_realsense()
+        self.save_session_snapshot()
+        self.watchdog_timer.stop()
+        self.command_runner.shutdown()
+        self.stop_recording()
+        if self.capture:
+            self.stop_realsense()
+        if self.trajectory:
+            self.trajectory.cancel()
+        if self.pico_link:
+            self.pico_link.close()
+        self.plugin_status_timer.stop()
+        for host in self.driver_hosts.values():
+            host.close()
+        self.occupancy.stop()
+        self.stop_graph()
+        self.stop_preview_server()
+        self.stop_metrics_server()
+        self.metrics.remove_collector(self.collect_device_metrics)
+        self.frame_bus.stop()
         logging.info("system shutdown")
         event.accept()
@@ -0,0 +1,227 @@
+# gui/modules.py
+"""Module list: device modules with stable IDs in a list model, drawn by a delegate.
+
+Rows are painted, not built from widgets, so hundreds of modules cost no more
+than the visible rows. Status changes are collected and sent to the view as
+one coalesced dataChanged per flush interval.
+"""
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, QSize, QRect
+from PySide6.QtGui import QColor, QFont, QPen
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+
+from gui.styles import PALETTES, DEFAULT_THEME
+
+MODULE_TYPES = ["RealSense Camera", "Servo Drives", "RPi Pico"]
+ID_PREFIXES = {"RealSense Camera": "realsense", "Servo Drives": "servo", "RPi Pico": "pico"}
+# Bound to the window's single capture / serial link, so only one of each
+SINGLE_INSTANCE_TYPES = {"RealSense Camera", "RPi Pico"}
+
+# Palette entry used to draw each status level
+STATUS_COLORS = {"neutral": "neutral", "ok": "ok", "warning": "warning", "error": "error", "disabled": "muted"}
+
+ModuleIdRole = Qt.UserRole + 1
+ModuleTypeRole = Qt.UserRole + 2
+StatusRole = Qt.UserRole + 3
+StatusLevelRole = Qt.UserRole + 4
+StateRole = Qt.UserRole + 5
+EnabledRole = Qt.UserRole + 6
+
+
+def register_module_type(module_type, id_prefix, single_instance=False):
+    """Offer another module type, e.g. one provided by a device plugin."""
+    if module_type not in MODULE_TYPES:
+        MODULE_TYPES.append(module_type)
+    ID_PREFIXES[module_type] = id_prefix
+    if single_instance:
+        SINGLE_INSTANCE_TYPES.add(module_type)
+
+
+class ModuleEntry:
+    __slots__ = ("module_id", "module_type", "name", "enabled", "status", "level", "state", "settings")
+
+    def __init__(self, module_id, module_type, name):
+        self.module_id = module_id
+        self.module_type = module_type
+        self.name = name
+        self.enabled = True
+        self.status = "Unknown"
+        self.level = "neutral"
+        self.state = "enabled"
+        self.settings = {}
+
+
+class ModuleListModel(QAbstractListModel):
+    """Modules in display order, addressed by ID ("servo-3"), never by row."""
+
+    def __init__(self, parent=None, coalesce_ms=16):
+        super().__init__(parent)
+        self.entries = []
+        self.rows = {}  # module_id -> row
+        self.next_number = {}
+        self.dirty_rows = set()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(coalesce_ms)
+        self.flush_timer.timeout.connect(self.flush)
+        self.updates_requested = 0
+        self.changes_emitted = 0
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return entry.name
+        if role == Qt.ToolTipRole:
+            return f"{entry.module_id}: {entry.status}"
+        if role == ModuleIdRole:
+            return entry.module_id
+        if role == ModuleTypeRole:
+            return entry.module_type
+        if role == StatusRole:
+            return entry.status
+        if role == StatusLevelRole:
+            return entry.level
+        if role == StateRole:
+            return entry.state
+        if role == EnabledRole:
+            return entry.enabled
+        return None
+
+    # Modules
+
+    def add_module(self, module_type, module_id=None):
+        """Append a module and return its ID; `module_id` restores a saved one."""
+        prefix = ID_PREFIXES.get(module_type, module_type.lower().replace(" ", "-"))
+        if module_id is None or module_id in self.rows:
+            number = self.next_number.get(prefix, 1)
+            while f"{prefix}-{number}" in self.rows:
+                number += 1
+            module_id = f"{prefix}-{number}"
+        suffix = module_id.rsplit("-", 1)[-1]
+        number = int(suffix) if suffix.isdigit() else 0
+        self.next_number[prefix] = max(self.next_number.get(prefix, 1), number + 1)
+
+        name = module_type if number <= 1 else f"{module_type} #{number}"
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(ModuleEntry(module_id, module_type, name))
+        self.rows[module_id] = row
+        self.endInsertRows()
+        return module_id
+
+    def remove_module(self, module_id):
+        row = self.rows.get(module_id)
+        if row is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.entries[row]
+        self.rows = {entry.module_id: index for index, entry in enumerate(self.entries)}
+        self.dirty_rows = {dirty for dirty in self.dirty_rows if dirty < row} | \
+                          {dirty - 1 for dirty in self.dirty_rows if dirty > row}
+        self.endRemoveRows()
+        return True
+
+    def entry(self, module_id):
+        row = self.rows.get(module_id)
+        return None if row is None else self.entries[row]
+
+    def ids(self, module_type=None):
+        return [entry.module_id for entry in self.entries
+                if module_type is None or entry.module_type == module_type]
+
+    def index_of(self, module_id):
+        row = self.rows.get(module_id)
+        return QModelIndex() if row is None else self.index(row)
+
+    # Batched updates
+
+    def set_status(self, module_id, text, level="neutral"):
+        entry = self.entry(module_id)
+        if entry is not None and (entry.status, entry.level) != (text, level):
+            entry.status, entry.level = text, level
+            self._touch(module_id)
+
+    def set_state(self, module_id, state):
+        entry = self.entry(module_id)
+        if entry is not None and entry.state != state:
+            entry.state = state
+            self._touch(module_id)
+
+    def set_enabled(self, module_id, enabled):
+        entry = self.entry(module_id)
+        if entry is not None and entry.enabled != enabled:
+            entry.enabled = enabled
+            entry.state = "enabled" if enabled else "disabled"
+            self._touch(module_id)
+
+    def _touch(self, module_id):
+        self.updates_requested += 1
+        self.dirty_rows.add(self.rows[module_id])
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Emit one dataChanged spanning every row changed since the last flush."""
+        self.flush_timer.stop()
+        if not self.dirty_rows:
+            return
+        top, bottom = min(self.dirty_rows), max(self.dirty_rows)
+        self.dirty_rows.clear()
+        self.changes_emitted += 1
+        self.dataChanged.emit(self.index(top), self.index(bottom),
+                              [StatusRole, StatusLevelRole, StateRole, EnabledRole])
+
+
+class ModuleDelegate(QStyledItemDelegate):
+    """Paints a module row: name, ID and a status line coloured by level."""
+
+    ROW_HEIGHT = 46
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.set_theme(DEFAULT_THEME)
+
+    def set_theme(self, theme_name):
+        palette = PALETTES.get(theme_name, PALETTES[DEFAULT_THEME])
+        self.colors = {name: QColor(value) for name, value in palette.items()}
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        colors = self.colors
+        entry_state = index.data(StateRole)
+        selected = bool(option.state & QStyle.State_Selected)
+        rect = option.rect.adjusted(2, 2, -2, -2)
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        border = colors["ok"] if entry_state == "streaming" else (
+            colors["accent"] if selected else colors["frame_border"])
+        painter.setPen(QPen(border, 1))
+        painter.setBrush(colors["button_hover"] if selected else colors["frame_bg"])
+        painter.drawRoundedRect(rect, 4, 4)
+
+        text_rect = rect.adjusted(8, 4, -8, -4)
+        half = text_rect.height() // 2
+        title_rect = QRect(text_rect.left(), text_rect.top(), text_rect.width(), half)
+        status_rect = QRect(text_rect.left(), text_rect.top() + half, text_rect.width(), text_rect.height() - half)
+
+        title_font = QFont(option.font)
+        title_font.setBold(True)
+        painter.setFont(title_font)
+        painter.setPen(colors["muted"] if entry_state == "disabled" else colors["accent"])
+        painter.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter, index.data(Qt.DisplayRole))
+
+        painter.setFont(option.font)
+        painter.setPen(colors["muted"])
+        painter.drawText(title_rect, Qt.AlignRight | Qt.AlignVCenter, index.data(ModuleIdRole))
+        painter.setPen(colors[STATUS_COLORS.get(index.data(StatusLevelRole), "neutral")])
+        painter.drawText(status_rect, Qt.AlignLeft | Qt.AlignVCenter, f"Status: {index.data(StatusRole)}")
+        painter.restore()
@@ -0,0 +1,94 @@
+# gui/occupancy.py
+from PySide6.QtCore import Qt, QTimer, QPointF, QRectF
+from PySide6.QtGui import QImage, QPainter, QColor, QPen, QPolygonF
+from PySide6.QtWidgets import QWidget
+
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def _heat_lut():
+    """256-entry RGB ramp: dark for free, through orange to white for certain obstacles."""
+    ramp = np.linspace(0, 1, 256)
+    lut = np.empty((256, 3), np.uint8)
+    lut[:, 0] = np.clip(30 + ramp * 3 * 225, 0, 255)
+    lut[:, 1] = np.clip(30 + (ramp - 0.33) * 1.5 * 225, 30, 255)
+    lut[:, 2] = np.clip(40 + (ramp - 0.66) * 3 * 215, 40, 255)
+    return lut
+
+
+class OccupancyView(QWidget):
+    """Top-down heatmap of the occupancy grid with the robot at the bottom centre.
+
+    Forward is up and left is left; the view polls the grid snapshot while it is
+    visible and only redraws when a new grid was folded in.
+    """
+
+    LUT = None  # built for the first grid drawn, so numpy stays off the startup path
+
+    def __init__(self, mapper, interval_ms=66, parent=None):
+        super().__init__(parent)
+        self.mapper = mapper
+        self.image = None
+        self.shown_seq = None
+        self.status = "Waiting for depth frames"
+        self.setMinimumSize(200, 200)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        grid = self.mapper.grid
+        if grid is None:
+            return
+        seq, _, values = grid.snapshot()
+        if seq == self.shown_seq:
+            return
+        self.shown_seq = seq
+        if OccupancyView.LUT is None:
+            OccupancyView.LUT = _heat_lut()
+        # Row 0 is nearest the robot and column 0 is rightmost: flip both for a top-down view
+        pixels = self.LUT[(np.clip(values, 0, 1) * 255).astype(np.uint8)[::-1, ::-1]]
+        pixels = np.ascontiguousarray(pixels)
+        height, width, _ = pixels.shape
+        self.image = QImage(pixels.data, width, height, width * 3, QImage.Format_RGB888).copy()
+        self.cell_size = grid.cell_size
+        self.status = (f"{grid.nx}x{grid.ny} cells of {grid.cell_size * 100:g} cm, "
+                       f"{grid.points} points, {int((values > 0.5).sum())} occupied")
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(20, 20, 20))
+        if self.image is not None:
+            # Keep cells square: fit the grid into the widget by its aspect ratio
+            scale = min(self.width() / self.image.width(), (self.height() - 20) / self.image.height())
+            target = QRectF(0, 0, self.image.width() * scale, self.image.height() * scale)
+            target.moveCenter(QPointF(self.width() / 2, (self.height() - 20) / 2))
+            painter.drawImage(target, self.image)
+
+            painter.setPen(QPen(QColor(90, 90, 90), 1, Qt.DotLine))
+            metre = scale / self.cell_size
+            base = QPointF(target.center().x(), target.bottom())
+            radius = metre
+            while radius <= max(target.width(), target.height()):
+                painter.drawArc(QRectF(base.x() - radius, base.y() - radius, 2 * radius, 2 * radius), 0, 180 * 16)
+                radius += metre
+
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(80, 200, 255))
+            size = max(6.0, metre * 0.15)
+            painter.drawPolygon(QPolygonF([base + QPointF(0, -size * 2), base + QPointF(-size, 0),
+                                           base + QPointF(size, 0)]))
+        painter.setPen(QColor(200, 200, 200))
+        painter.drawText(self.rect().adjusted(6, 0, -6, -2), Qt.AlignBottom | Qt.AlignLeft, self.status)
+        painter.end()
@@ -1,27 +1,26 @@
 # gui/panels.py
 from PySide6.QtWidgets import QGroupBox, QLabel
 
+from gui.styles import set_style_state
+
+# Status levels understood by the theme stylesheet (QLabel[status="..."])
+STATUS_LEVELS = ("neutral", "ok", "warning", "error", "disabled")
+
+
 class DevicePanel(QGroupBox):
+    """Module box; look comes from the theme via the `state` and `status` properties."""
+
     def __init__(self, title, parent=None):
         super().__init__(title, parent)
-        self.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                color: #b8a0ff;
-                border: 1px solid #2a2740;
-                border-radius: 4px;
-                margin-top: 12px;
-                padding-top: 8px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 8px;
-                padding: 0 4px;
-            }
-        """)
+        self.setProperty("state", "enabled")
         self.status_label = QLabel("Status: Unknown")
-        self.status_label.setStyleSheet("color: #a0a5c0; font-weight: normal;")
+        self.status_label.setProperty("status", "neutral")
 
-    def set_status(self, text, color="#a0a5c0"):
+    def set_status(self, text, level="neutral"):
+        """Show a status line; `level` is one of STATUS_LEVELS."""
         self.status_label.setText(f"Status: {text}")
-        self.status_label.setStyleSheet(f"color: {color}; font-weight: normal;")
+        set_style_state(self.status_label, "status", level)
+
+    def set_state(self, state):
+        """Module state for the theme: "enabled", "disabled" or "streaming"."""
+        set_style_state(self, "state", state)
@@ -0,0 +1,105 @@
+# gui/stats.py
+import time
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem, \
+    QHeaderView, QAbstractItemView, QLabel
+
+
+def _format(value):
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        return f"{value:.6g}"
+    return str(value)
+
+
+class StatsPanel(QWidget):
+    """Table of every metric in the registry, refreshed while the tab is visible.
+
+    Counters also show their rate since the previous refresh; histograms show
+    count, mean and approximate p50/p95 in milliseconds.
+    """
+
+    COLUMNS = ["Metric", "Labels", "Value", "Rate /s"]
+
+    def __init__(self, registry, interval_ms=1000, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.previous = {}
+        self.previous_time = None
+        self.rows = {}  # (name, labels) -> row
+
+        layout = QVBoxLayout(self)
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Filter:"))
+        self.filter_input = QLineEdit(placeholderText="kozy_camera")
+        self.filter_input.textChanged.connect(self.refresh)
+        filter_row.addWidget(self.filter_input)
+        layout.addLayout(filter_row)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def summarize(self, name, kind, labels, value, now):
+        """(value text, rate text) for one sample."""
+        if kind == "histogram":
+            cumulative, count, total = value
+            if not count:
+                return "0 samples", ""
+            histogram = self.registry.families[name][2][labels]
+            p50, p95 = histogram.quantile(0.5), histogram.quantile(0.95)
+            text = f"{count} samples, mean {total / count * 1000:.2f} ms, p50 <{p50 * 1000:g} ms, p95 <{p95 * 1000:g} ms"
+            value = count
+        else:
+            text = _format(value)
+        rate = ""
+        key = (name, labels)
+        if kind in ("counter", "histogram") and self.previous_time is not None and key in self.previous:
+            rate = f"{(value - self.previous[key]) / (now - self.previous_time):.1f}"
+        self.previous[key] = value
+        return text, rate
+
+    def refresh(self):
+        now = time.monotonic()
+        pattern = self.filter_input.text().strip()
+        samples = sorted((sample for sample in self.registry.samples() if pattern in sample[0]),
+                         key=lambda sample: (sample[0], sample[3]))
+        keys = [(name, labels) for name, _, _, labels, _ in samples]
+        if keys != list(self.rows):
+            self.table.setRowCount(len(samples))
+            self.rows = {key: row for row, key in enumerate(keys)}
+            for row, (name, labels) in enumerate(keys):
+                self._set(row, 0, name)
+                self._set(row, 1, ", ".join(f"{key}={value}" for key, value in labels))
+        for name, kind, help, labels, value in samples:
+            row = self.rows[(name, labels)]
+            text, rate = self.summarize(name, kind, labels, value, now)
+            self._set(row, 2, text)
+            self._set(row, 3, rate)
+            self.table.item(row, 0).setToolTip(help)
+        self.previous_time = now
+
+    def _set(self, row, column, text):
+        item = self.table.item(row, column)
+        if item is None:
+            self.table.setItem(row, column, QTableWidgetItem(text))
+        elif item.text() != text:
+            item.setText(text)
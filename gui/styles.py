@@ -1,175 +1,195 @@
 # gui/styles.py
+"""Themes: one stylesheet template filled from a palette, built once per theme.
 
-def get_raw_cyber_stylesheet():
-    return """
+Widget state (module enabled/disabled/streaming, status level, button role)
+is expressed with dynamic properties that the template selects on, so a
+state change is a property set plus a repolish of that one widget
+(`set_style_state`) instead of a new stylesheet.
+"""
+from functools import lru_cache
+from string import Template
+
+DEFAULT_THEME = "raw_cyber"
+
+PALETTES = {
+    "raw_cyber": {
+        "bg": "#090a0f", "fg": "#c5c8d6", "label": "#d0d3e0",
+        "pane_bg": "#0d0e16", "pane_border": "#3a3550",
+        "tab_bg": "#141522", "tab_fg": "#a0a5c0", "tab_selected_bg": "#1e1f30", "tab_selected_fg": "#b8a0ff",
+        "frame_bg": "#0c0d15", "frame_border": "#2a2740",
+        "button_bg": "#1a1b2a", "button_fg": "#c0b0ff", "button_border": "#3a3550",
+        "button_hover": "#222335", "hover_border": "#5a5080", "button_pressed": "#2a2b40",
+        "input_bg": "#0f101c", "input_fg": "#c5c8d6", "input_border": "#2a2740",
+        "text_bg": "#0b0c14", "text_fg": "#c5c8d6", "text_border": "#2a2740", "selection": "#2a2845",
+        "accent": "#b8a0ff", "muted": "#555555", "video_bg": "#000000", "video_fg": "#a0b0ff",
+        "ok": "#6bff9b", "warning": "#ffaa6b", "error": "#ff6b6b", "neutral": "#a0a5c0",
+    },
+    "dark": {
+        "bg": "#1e1e1e", "fg": "#dcdcdc", "label": "#cccccc",
+        "pane_bg": "#2d2d30", "pane_border": "#3c3c3c",
+        "tab_bg": "#333337", "tab_fg": "#cccccc", "tab_selected_bg": "#3d3d40", "tab_selected_fg": "#ffffff",
+        "frame_bg": "#252526", "frame_border": "#3c3c3c",
+        "button_bg": "#333337", "button_fg": "#ffffff", "button_border": "#454545",
+        "button_hover": "#3d3d40", "hover_border": "#5a5a5a", "button_pressed": "#454545",
+        "input_bg": "#333337", "input_fg": "#ffffff", "input_border": "#454545",
+        "text_bg": "#1e1e1e", "text_fg": "#dcdcdc", "text_border": "#3c3c3c", "selection": "#264f78",
+        "accent": "#9cdcfe", "muted": "#6a6a6a", "video_bg": "#000000", "video_fg": "#9cdcfe",
+        "ok": "#6bd68a", "warning": "#e5a55b", "error": "#f44747", "neutral": "#9d9d9d",
+    },
+    "light": {
+        "bg": "#f0f0f0", "fg": "#000000", "label": "#333333",
+        "pane_bg": "#ffffff", "pane_border": "#cccccc",
+        "tab_bg": "#e0e0e0", "tab_fg": "#333333", "tab_selected_bg": "#ffffff", "tab_selected_fg": "#000000",
+        "frame_bg": "#ffffff", "frame_border": "#cccccc",
+        "button_bg": "#e0e0e0", "button_fg": "#000000", "button_border": "#cccccc",
+        "button_hover": "#d0d0d0", "hover_border": "#bbbbbb", "button_pressed": "#c0c0c0",
+        "input_bg": "#ffffff", "input_fg": "#000000", "input_border": "#cccccc",
+        "text_bg": "#ffffff", "text_fg": "#000000", "text_border": "#cccccc", "selection": "#3399ff",
+        "accent": "#5a3fc0", "muted": "#9e9e9e", "video_bg": "#202020", "video_fg": "#d0d0d0",
+        "ok": "#1a8f3c", "warning": "#b86e00", "error": "#c62828", "neutral": "#555555",
+    },
+}
+
+STYLESHEET_TEMPLATE = Template("""
     QMainWindow, QWidget {
-        background-color: #090a0f;
-        color: #c5c8d6;
+        background-color: $bg;
+        color: $fg;
         font-family: "Cascadia Code", "Fira Code", "Monospace", sans-serif;
         font-size: 10pt;
     }
-    QLabel { color: #d0d3e0; }
+    QLabel { color: $label; }
+    QMenuBar { background: $frame_bg; color: $button_fg; }
     QTabWidget::pane {
-        border: 1px solid #3a3550;
-        background: #0d0e16;
+        border: 1px solid $pane_border;
+        background: $pane_bg;
         border-radius: 4px;
     }
     QTabBar::tab {
-        background: #141522;
-        color: #a0a5c0;
+        background: $tab_bg;
+        color: $tab_fg;
         padding: 8px 16px;
         margin: 2px;
         border-top-left-radius: 4px;
         border-top-right-radius: 4px;
     }
     QTabBar::tab:selected {
-        background: #1e1f30;
-        color: #b8a0ff;
+        background: $tab_selected_bg;
+        color: $tab_selected_fg;
     }
     QFrame {
-        background: #0c0d15;
-        border: 1px solid #2a2740;
+        background: $frame_bg;
+        border: 1px solid $frame_border;
         border-radius: 6px;
         padding: 8px;
     }
     QPushButton {
-        background: #1a1b2a;
-        color: #c0b0ff;
-        border: 1px solid #3a3550;
+        background: $button_bg;
+        color: $button_fg;
+        border: 1px solid $button_border;
         padding: 6px 14px;
         border-radius: 4px;
     }
-    QPushButton:hover { background: #222335; border-color: #5a5080; }
-    QPushButton:pressed { background: #2a2b40; }
+    QPushButton:hover { background: $button_hover; border-color: $hover_border; }
+    QPushButton:pressed { background: $button_pressed; }
+    QPushButton:disabled { color: $muted; }
     QComboBox {
-        background: #0f101c;
-        color: #c5c8d6;
-        border: 1px solid #2a2740;
+        background: $input_bg;
+        color: $input_fg;
+        border: 1px solid $input_border;
         padding: 4px;
         border-radius: 4px;
     }
-    QComboBox:hover { border-color: #5a5080; }
-    QPlainTextEdit, QTextEdit {
-        background: #0b0c14;
-        color: #c5c8d6;
-        border: 1px solid #2a2740;
+    QComboBox:hover { border-color: $hover_border; }
+    QPlainTextEdit, QTextEdit, QListView#consoleLog, QLineEdit#consoleFilter {
+        background: $text_bg;
+        color: $text_fg;
+        border: 1px solid $text_border;
         border-radius: 4px;
-        selection-background-color: #2a2845;
+        selection-background-color: $selection;
     }
-    """
 
-def get_dark_stylesheet():
-    return """
-    QMainWindow, QWidget {
-        background-color: #1e1e1e;
-        color: #dcdcdc;
-        font-family: "Cascadia Code", "Fira Code", "Monospace", sans-serif;
-        font-size: 10pt;
-    }
-    QLabel { color: #cccccc; }
-    QTabWidget::pane {
-        border: 1px solid #3c3c3c;
-        background: #2d2d30;
-        border-radius: 4px;
-    }
-    QTabBar::tab {
-        background: #333337;
-        color: #cccccc;
-        padding: 8px 16px;
-        margin: 2px;
-        border-top-left-radius: 4px;
-        border-top-right-radius: 4px;
-    }
-    QTabBar::tab:selected {
-        background: #3d3d40;
-        color: #ffffff;
-    }
-    QFrame {
-        background: #252526;
-        border: 1px solid #3c3c3c;
-        border-radius: 6px;
-        padding: 8px;
-    }
-    QPushButton {
-        background: #333337;
-        color: #ffffff;
-        border: 1px solid #454545;
-        padding: 6px 14px;
-        border-radius: 4px;
+    QLabel#modulesTitle { font-weight: bold; color: $accent; margin-bottom: 8px; border: none; }
+    QToolButton#addModuleButton {
+        background-color: $button_pressed;
+        color: $button_fg;
+        border-radius: 25px;
+        font-size: 24px;
+        font-weight: bold;
+        border: 2px solid $hover_border;
+    }
+    QToolButton#addModuleButton:hover { background-color: $button_hover; border-color: $accent; }
+    QListView#moduleList {
+        background: $frame_bg;
+        border: 1px solid $frame_border;
+        padding: 2px;
+        outline: none;
+    }
+    QLabel#consoleStatus { color: $muted; }
+    QLabel[role="video"] { background: $video_bg; color: $video_fg; font-size: 14px; }
+
+    QPushButton[role="module-action"], QPushButton[role="module-remove"] {
+        padding: 4px 8px;
+        font-size: 9px;
     }
-    QPushButton:hover { background: #3d3d40; border-color: #5a5a5a; }
-    QPushButton:pressed { background: #454545; }
-    QComboBox {
-        background: #333337;
-        color: #ffffff;
-        border: 1px solid #454545;
-        padding: 4px;
+    QPushButton[role="module-remove"] { color: $error; }
+    QPushButton[role="module-remove"]:hover { border-color: $error; }
+
+    QGroupBox {
+        font-weight: bold;
+        color: $accent;
+        border: 1px solid $frame_border;
         border-radius: 4px;
+        margin-top: 12px;
+        padding-top: 8px;
     }
-    QComboBox:hover { border-color: #5a5a5a; }
-    QPlainTextEdit, QTextEdit {
-        background: #1e1e1e;
-        color: #dcdcdc;
-        border: 1px solid #3c3c3c;
-        border-radius: 4px;
-        selection-background-color: #264f78;
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 8px;
+        padding: 0 4px;
     }
+    QGroupBox[state="disabled"] { color: $muted; }
+    QGroupBox[state="streaming"] { border-color: $ok; }
+
+    QLabel[status="neutral"] { color: $neutral; font-weight: normal; }
+    QLabel[status="ok"] { color: $ok; font-weight: normal; }
+    QLabel[status="warning"] { color: $warning; font-weight: normal; }
+    QLabel[status="error"] { color: $error; font-weight: normal; }
+    QLabel[status="disabled"] { color: $muted; font-weight: normal; }
+""")
+
+
+def theme_names():
+    return list(PALETTES)
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet(theme_name):
+    """The full application stylesheet for a theme (unknown names fall back to the default)."""
+    palette = PALETTES.get(theme_name, PALETTES[DEFAULT_THEME])
+    return STYLESHEET_TEMPLATE.substitute(palette)
+
+
+def set_style_state(widget, name, value):
+    """Set a dynamic property the stylesheet selects on and repolish only this widget.
+
+    Returns False (and does nothing) if the property already has that value.
     """
+    if widget.property(name) == value:
+        return False
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    return True
+
+
+def get_raw_cyber_stylesheet():
+    return get_stylesheet("raw_cyber")
+
+
+def get_dark_stylesheet():
+    return get_stylesheet("dark")
+
 
 def get_light_stylesheet():
-    return """
-    QMainWindow, QWidget {
-        background-color: #f0f0f0;
-        color: #000000;
-        font-family: "Cascadia Code", "Fira Code", "Monospace", sans-serif;
-        font-size: 10pt;
-    }
-    QLabel { color: #333333; }
-    QTabWidget::pane {
-        border: 1px solid #cccccc;
-        background: #ffffff;
-        border-radius: 4px;
-    }
-    QTabBar::tab {
-        background: #e0e0e0;
-        color: #333333;
-        padding: 8px 16px;
-        margin: 2px;
-        border-top-left-radius: 4px;
-        border-top-right-radius: 4px;
-    }
-    QTabBar::tab:selected {
-        background: #ffffff;
-        color: #000000;
-    }
-    QFrame {
-        background: #ffffff;
-        border: 1px solid #cccccc;
-        border-radius: 6px;
-        padding: 8px;
-    }
-    QPushButton {
-        background: #e0e0e0;
-        color: #000000;
-        border: 1px solid #cccccc;
-        padding: 6px 14px;
-        border-radius: 4px;
-    }
-    QPushButton:hover { background: #d0d0d0; border-color: #bbbbbb; }
-    QPushButton:pressed { background: #c0c0c0; }
-    QComboBox {
-        background: #ffffff;
-        color: #000000;
-        border: 1px solid #cccccc;
-        padding: 4px;
-        border-radius: 4px;
-    }
-    QComboBox:hover { border-color: #bbbbbb; }
-    QPlainTextEdit, QTextEdit {
-        background: #ffffff;
-        color: #000000;
-        border: 1px solid #cccccc;
-        border-radius: 4px;
-        selection-background-color: #3399ff;
-    }
-    """
+    return get_stylesheet("light")
@@ -0,0 +1,45 @@
+# gui/workers.py
+import logging
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+# Keeps tasks (and their signal objects) alive until their result is delivered
+_pending_tasks = set()
+
+
+class TaskSignals(QObject):
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class BackgroundTask(QRunnable):
+    """Run a blocking call on the global thread pool and report back on the GUI thread."""
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as e:
+            logging.error(f"Background task {getattr(self.function, '__name__', self.function)} failed: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+def run_in_background(function, on_done=None, on_failed=None, *args, **kwargs):
+    """Queue `function(*args, **kwargs)`; `on_done(result)` or `on_failed(message)` runs on the GUI thread."""
+    task = BackgroundTask(function, *args, **kwargs)
+    if on_done:
+        task.signals.finished.connect(on_done)
+    if on_failed:
+        task.signals.failed.connect(on_failed)
+    _pending_tasks.add(task)
+    task.signals.finished.connect(lambda _: _pending_tasks.discard(task))
+    task.signals.failed.connect(lambda _: _pending_tasks.discard(task))
+    QThreadPool.globalInstance().start(task)
+    return task
@@ -1,15 +1,43 @@
 # main.py
+from utils import startup
+import argparse
 import sys
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QFont
+from PySide6.QtCore import QTimer
+startup.mark("qt_imported")
 from gui.main_window import RobotGUI
+startup.mark("gui_imported")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Kozy Control Panel")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print the startup timeline after the first paint")
+    parser.add_argument("--exit-after-paint", action="store_true",
+                        help="quit right after the first paint (used by tools.startup_report)")
+    return parser.parse_known_args(argv[1:])
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    app = QApplication([sys.argv[0], *qt_args])
     font = QFont("Monospace", 10)
     font.setStyleHint(QFont.TypeWriter)
     app.setFont(font)
+    startup.mark("app_created")
+
+    def on_first_paint():
+        if args.startup_report or args.exit_after_paint:
+            print(startup.report(), flush=True)
+        if args.exit_after_paint:
+            # Lets tools.startup_report ignore imports that happen after this point
+            print(startup.FIRST_PAINT_MARKER, file=sys.stderr, flush=True)
+            QTimer.singleShot(0, app.quit)
 
+    startup.watch_first_paint(app, on_first_paint)
     window = RobotGUI()
+    startup.mark("window_created")
     window.show()
+    startup.mark("window_shown")
     sys.exit(app.exec())
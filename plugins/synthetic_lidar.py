@@ -0,0 +1,55 @@
+# plugins/synthetic_lidar.py
+"""Example device plugin: a simulated 2-D lidar, 360 ranges per scan.
+
+A starting point for real drivers. Settings, under "plugins" -> "Synthetic
+Lidar" -> "settings" in the config file:
+- rate_hz: scans per second (10)
+- stall_after: hang in read() after this many scans, like a stuck serial read
+- crash_after: kill the process after this many scans
+The last two exist to try out process isolation and the watchdog.
+"""
+import os
+import time
+
+import numpy as np
+
+from devices.plugins import DeviceDriver
+
+
+class SyntheticLidar(DeviceDriver):
+    name = "Synthetic Lidar"
+    id_prefix = "lidar"
+    isolate = True
+
+    def open(self):
+        self.rate = float(self.settings.get("rate_hz", 10))
+        self.stall_after = self.settings.get("stall_after")
+        self.crash_after = self.settings.get("crash_after")
+        self.scans = 0
+        self.next_scan = time.monotonic()
+        self.angles = np.radians(np.arange(360, dtype=np.float32))
+        self.rng = np.random.default_rng(0)
+        return (360,), np.float32
+
+    def start(self):
+        self.next_scan = time.monotonic()
+
+    def read(self, timeout):
+        delay = self.next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return None
+        time.sleep(max(delay, 0.0))
+        self.next_scan += 1.0 / self.rate
+        self.scans += 1
+        if self.crash_after and self.scans > self.crash_after:
+            os._exit(3)
+        if self.stall_after and self.scans > self.stall_after:
+            time.sleep(3600)
+        # A room about 2 m around, with a wall that moves slowly
+        ranges = 2.0 + 0.5 * np.sin(self.angles * 3 + self.scans * 0.05)
+        ranges += self.rng.normal(0.0, 0.01, 360).astype(np.float32)
+        return ranges.astype(np.float32), time.time()
+
+    def stats(self):
+        return {"scans": self.scans, "rate_hz": self.rate}
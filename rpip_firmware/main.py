@@ -2,14 +2,63 @@
 import random
 import sys
 
+from trajectory import TrajectoryQueue, DONE
+
+try:
+    from machine import Timer
+except ImportError:  # not on a board
+    Timer = None
+
+SERVO_COUNT = 16
+servo_targets = {}
+trajectory = TrajectoryQueue(capacity=256, max_joints=SERVO_COUNT)
+trajectory_timer = Timer() if Timer else None
+
 def generate_code():
     return ''.join(str(random.randint(0, 9)) for _ in range(6))
 
+def handle_move(arguments):
+    """MOVE <servo> <angle>: remember the target angle and acknowledge it."""
+    try:
+        servo, angle = int(arguments[0]), float(arguments[1])
+    except (IndexError, ValueError):
+        return "ERR:usage MOVE <servo> <angle>"
+    if not 0 <= servo < SERVO_COUNT or not 0 <= angle <= 180:
+        return f"ERR:out of range MOVE {servo} {angle}"
+    servo_targets[servo] = angle
+    return f"ACK:MOVE {servo} {angle:g}"
+
+def trajectory_tick(timer):
+    """Timer callback: play one trajectory point, and stop the timer after the last one."""
+    trajectory.tick(servo_targets)
+    if trajectory.state == DONE:
+        timer.deinit()
+
+def handle_traj(arguments):
+    """TRAJ ...: queue trajectory points; playback runs on the timer, not in this loop."""
+    if arguments and arguments[0] in ("BEGIN", "ABORT") and trajectory_timer:
+        trajectory_timer.deinit()
+    reply = trajectory.handle(arguments)
+    if trajectory.should_start():
+        if trajectory_timer is None:
+            return "ERR:traj no timer"
+        trajectory.start()
+        trajectory_timer.init(mode=Timer.PERIODIC, freq=1000000 / trajectory.period_us,
+                              callback=trajectory_tick)
+        reply = trajectory.status()
+    return reply
+
 while True:
     try:
         line = sys.stdin.readline().strip()
         if line == "GET_CODE":
             code = generate_code()
             print(f"CODE:{code}")
+        elif line == "PING":
+            print("PONG:ok")
+        elif line.startswith("MOVE "):
+            print(handle_move(line.split()[1:]))
+        elif line.startswith("TRAJ "):
+            print(handle_traj(line.split()[1:]))
     except Exception as e:
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,162 @@
+# trajectory.py
+"""Bounded queue of multi-servo setpoints, played back one point per timer tick.
+
+The host plans a trajectory and streams it in chunks:
+
+    TRAJ BEGIN <id> <period_us> <servo,servo,...> [prefill]
+    TRAJ PTS <id> <chunk> <a,b,...;a,b,...;...>
+    TRAJ END <id>
+    TRAJ STATUS
+    TRAJ ABORT
+
+Every command is answered with the buffer level,
+`BUF:<id> <state> <queued> <capacity> <executed> <underruns> <late_us>`, or
+with `ERR:traj ...`. Playback starts once `prefill` points are queued (or the
+trajectory has ended). If the queue runs dry before TRAJ END, that tick is an
+underrun: the servos hold still and the rest plays one period later.
+
+Plain MicroPython; the host-side simulator imports this file unchanged.
+"""
+from array import array
+
+try:
+    from time import ticks_us, ticks_add, ticks_diff
+except ImportError:  # CPython
+    import time
+
+    def ticks_us():
+        return int(time.perf_counter() * 1000000)
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(new, old):
+        return new - old
+
+IDLE = "idle"
+WAITING = "wait"  # queueing points until the prefill is reached
+RUNNING = "run"
+DONE = "done"
+
+
+class TrajectoryQueue:
+    def __init__(self, capacity=256, max_joints=16):
+        self.capacity = capacity
+        self.max_joints = max_joints
+        self.points = array("f", [0.0] * (capacity * max_joints))
+        self.reset()
+
+    def reset(self):
+        self.traj_id = 0
+        self.state = IDLE
+        self.servos = ()
+        self.period_us = 10000
+        self.prefill = 1
+        # Only the command loop advances `written` and only the timer advances
+        # `executed`, so neither needs a lock against the other
+        self.written = 0
+        self.next_chunk = 0
+        self.ended = False
+        self.executed = 0
+        self.underruns = 0
+        self.start_us = None
+        self.late_us = 0  # worst tick lateness against the timer schedule
+
+    def queued(self):
+        return self.written - self.executed
+
+    def status(self):
+        return (f"BUF:{self.traj_id} {self.state} {self.queued()} {self.capacity} {self.executed} "
+                f"{self.underruns} {self.late_us}")
+
+    def should_start(self):
+        """True once a waiting trajectory has enough points queued to start the timer."""
+        return self.state == WAITING and (self.queued() >= self.prefill or self.ended)
+
+    def start(self):
+        self.state = RUNNING
+        self.start_us = None  # taken at the first tick
+
+    def tick(self, targets):
+        """Timer callback: write the next point into `targets` ({servo: angle})."""
+        if self.state != RUNNING:
+            return False
+        now = ticks_us()
+        if self.start_us is None:
+            self.start_us = now
+        if self.written == self.executed:
+            if self.ended:
+                self.state = DONE
+            else:
+                self.underruns += 1
+            return False
+        due = ticks_add(self.start_us, (self.executed + self.underruns) * self.period_us)
+        late = ticks_diff(now, due)
+        if late > self.late_us:
+            self.late_us = late
+        slot = (self.executed % self.capacity) * self.max_joints
+        for joint in range(len(self.servos)):
+            targets[self.servos[joint]] = self.points[slot + joint]
+        self.executed += 1
+        if self.written == self.executed and self.ended:
+            self.state = DONE
+        return True
+
+    def handle(self, arguments):
+        """Run one TRAJ command (the words after TRAJ) and return the reply line."""
+        try:
+            return self._handle(arguments)
+        except (IndexError, ValueError) as e:
+            return f"ERR:traj {e}"
+
+    def _handle(self, arguments):
+        command = arguments[0] if arguments else ""
+        if command == "BEGIN":
+            servos = tuple(int(servo) for servo in arguments[3].split(","))
+            if not servos or len(servos) > self.max_joints:
+                raise ValueError(f"1 to {self.max_joints} servos")
+            period_us = int(arguments[2])
+            if period_us < 1000:
+                raise ValueError("period below 1 ms")
+            self.reset()
+            self.traj_id = int(arguments[1])
+            self.period_us = period_us
+            self.servos = servos
+            self.prefill = min(int(arguments[4]) if len(arguments) > 4 else 1, self.capacity)
+            self.state = WAITING
+        elif command == "PTS":
+            self._check_id(arguments[1])
+            if self.ended or self.state not in (WAITING, RUNNING):
+                raise ValueError("no open trajectory")
+            chunk = int(arguments[2])
+            if chunk != self.next_chunk:
+                raise ValueError(f"expected chunk {self.next_chunk}, got {chunk}")
+            joints = len(self.servos)
+            rows = [row.split(",") for row in arguments[3].split(";")]
+            if any(len(values) != joints for values in rows):
+                raise ValueError(f"{joints} angles per point expected")
+            if self.queued() + len(rows) > self.capacity:
+                raise ValueError("queue full")
+            angles = [min(max(float(value), 0.0), 180.0) for values in rows for value in values]
+            for point in range(len(rows)):
+                slot = (self.written % self.capacity) * self.max_joints
+                for joint in range(joints):
+                    self.points[slot + joint] = angles[point * joints + joint]
+                self.written += 1
+            self.next_chunk += 1
+        elif command == "END":
+            self._check_id(arguments[1])
+            self.ended = True
+            if self.state == RUNNING and not self.queued():
+                self.state = DONE
+        elif command == "ABORT":
+            traj_id = self.traj_id
+            self.reset()
+            self.traj_id = traj_id
+        elif command != "STATUS":
+            raise ValueError(f"unknown command {command}")
+        return self.status()
+
+    def _check_id(self, traj_id):
+        if int(traj_id) != self.traj_id:
+            raise ValueError(f"trajectory {traj_id} is not open")
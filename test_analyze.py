@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# test_analyze.py
+"""Offline analysis of a small synthetic recording: timing, depth statistics and alignment."""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tools import analyze
+from utils.recording import RecordingWriter
+
+HEIGHT, WIDTH = 30, 60
+PERIOD = 1 / 30
+CODEC = {"backend": "zlib", "key_interval": 4, "max_pending": 64}  # room for the whole burst: nothing dropped
+
+
+def write_recording(path, depth_codec=None):
+    """24 color frames; depth misses frames 10 and 11 (one gap, two dropped); gyro at 200 Hz; telemetry."""
+    writer = RecordingWriter(path, depth_codec, camera={"depth_scale": 0.001})
+    depth = np.zeros((HEIGHT, WIDTH), np.uint16)
+    color = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    for frame in range(24):
+        timestamp = 100.0 + frame * PERIOD
+        writer.write("color", color, timestamp)
+        if frame not in (10, 11):
+            depth[:, :WIDTH // 2] = 1000 + frame  # about 1 m on the left half, no depth on the right
+            writer.write("depth", depth, timestamp)
+    gyro_times = np.arange(99.9, 101.0, 1 / 200)
+    writer.write_many("gyro", np.zeros((len(gyro_times), 3), np.float32), gyro_times)
+    device = np.arange(0.0, 1.0, 0.01)
+    writer.write_many("telemetry", np.stack([device, np.zeros_like(device)], axis=1), 100.0 + 0.002 + device)
+    writer.close()
+
+
+class AnalyzeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="kozy-analyze-test-")
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, "session")
+        write_recording(self.path)
+
+    def test_frame_timing(self):
+        timestamps = 100.0 + np.array([0, 1, 2, 5, 6, 5.5]) * PERIOD
+        timing = analyze.frame_timing(timestamps)
+        self.assertAlmostEqual(timing["fps"], 30.0)
+        self.assertEqual((timing["gaps"], timing["dropped_estimate"], timing["backwards"]), (1, 2, 1))
+        self.assertEqual(analyze.frame_timing(np.array([1.0]))["fps"], 0.0)
+
+    def test_report(self):
+        report, rows = analyze.analyze(self.path, workers=1, grid=(1, 2))
+        depth = report["streams"]["depth"]
+        self.assertEqual((depth["frames"], depth["gaps"], depth["dropped_estimate"]), (22, 1, 2))
+        self.assertEqual(depth["missing_vs_color"], 2)
+        self.assertEqual(report["streams"]["color"]["gaps"], 0)
+        self.assertAlmostEqual(report["depth"]["fill"]["mean"], 0.5)
+        self.assertEqual(report["depth"]["fill"]["low_fill_frames"], 0)
+        left, right = report["depth"]["regions"]
+        self.assertEqual((left["fill"], right["fill"]), (1.0, 0.0))
+        self.assertAlmostEqual(left["p50_m"], 1.0, delta=0.05)
+        self.assertIsNone(right["p50_m"])
+        self.assertEqual(report["imu"]["gyro"]["covered"], 1.0)
+        self.assertLessEqual(report["imu"]["gyro"]["nearest_ms"]["max"], 2.5)
+        self.assertAlmostEqual(report["telemetry"]["clock"]["host_seconds_per_tick"], 1.0)
+        self.assertEqual([row["frame"] for row in rows], list(range(22)))
+        self.assertAlmostEqual(rows[10]["interval_ms"], 3 * PERIOD * 1000)
+
+    def test_workers_and_codec_give_the_same_statistics(self):
+        single, _ = analyze.analyze(self.path, workers=1, chunk_frames=5)
+        parallel, _ = analyze.analyze(self.path, workers=2, chunk_frames=5)
+        coded_path = os.path.join(self.directory, "coded")
+        write_recording(coded_path, depth_codec=CODEC)
+        coded, _ = analyze.analyze(coded_path, workers=2, chunk_frames=5)
+        self.assertGreater(parallel["chunks"], 1)
+        for report in (parallel, coded):
+            self.assertEqual(report["depth"], single["depth"])
+
+    def test_depth_chunks_start_on_key_frames(self):
+        coded_path = os.path.join(self.directory, "coded")
+        write_recording(coded_path, depth_codec=CODEC)
+        frames = analyze.open_recording(coded_path)["depth"][0]
+        chunks = analyze.depth_chunks(frames, 5)
+        self.assertEqual(chunks, [(0, 8), (8, 12), (12, 16), (16, 20), (20, 22)])
+
+    def test_printed_summary(self):
+        report, _ = analyze.analyze(self.path, workers=1)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            analyze.print_report(report)
+        text = output.getvalue()
+        self.assertIn("22 depth frames", text)
+        self.assertIn("1 gaps, ~2 dropped", text)
+        self.assertIn("2 fewer than color", text)
+        self.assertIn("depth fill mean 50.0%", text)
+        self.assertIn("gyro: 100.0% of frames bracketed", text)
+
+    def test_bad_input(self):
+        with self.assertRaisesRegex(ValueError, "no 'ir' stream"):
+            analyze.analyze(self.path, depth_stream="ir")
+        with mock.patch.object(sys, "argv", ["analyze", self.path, "--grid", "3by3"]), \
+                contextlib.redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+            analyze.main()
+        self.assertIn("--grid must look like 3x3", errors.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# test_capabilities.py
+"""Capability cache: persistence, firmware changes and stream mode checks, with a fake librealsense."""
+import json
+import logging
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from devices.capabilities import CACHE_VERSION, DEFAULT_FPS, DEFAULT_RESOLUTIONS, CapabilityCache
+
+PROFILES = [
+    ["color", "rgb8", 640, 480, 30], ["color", "rgb8", 640, 480, 60], ["color", "rgb8", 1280, 720, 30],
+    ["depth", "z16", 640, 480, 30], ["depth", "z16", 640, 480, 60], ["depth", "z16", 1280, 720, 15],
+    ["color", "yuyv", 1280, 720, 15],
+]
+
+
+class FakeDevice:
+    def __init__(self, serial, firmware):
+        self.info = {"serial": serial, "firmware": firmware, "name": "Intel RealSense D435"}
+
+    def get_info(self, key):
+        return self.info[key]
+
+
+class FakeContext:
+    devices = []
+
+    def query_devices(self):
+        return list(self.devices)
+
+    def set_devices_changed_callback(self, callback):
+        self.callback = callback
+
+
+FAKE_RS = SimpleNamespace(camera_info=SimpleNamespace(serial_number="serial", firmware_version="firmware",
+                                                      name="name"),
+                          context=FakeContext)
+
+
+class CapabilityCacheTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "device_cache.json")
+        self.queries = []
+        for target, replacement in [("devices.capabilities.load_realsense", lambda: FAKE_RS),
+                                    ("devices.capabilities.query_stream_profiles", self.query)]:
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.connect(FakeDevice("123", "5.13.0"))
+
+    def query(self, device):
+        self.queries.append(device.info["serial"])
+        return PROFILES
+
+    def connect(self, *devices):
+        FakeContext.devices = list(devices)
+
+    def test_round_trip(self):
+        cache = CapabilityCache(self.path)
+        self.assertEqual(cache.devices()[0]["firmware"], "5.13.0")
+        with open(self.path) as cache_file:
+            self.assertEqual(json.load(cache_file)["version"], CACHE_VERSION)
+
+        reloaded = CapabilityCache(self.path)
+        self.assertEqual(reloaded.profiles("123"), PROFILES)  # from disk, nothing enumerated yet
+        reloaded.refresh()
+        self.assertEqual(self.queries, ["123"])  # known serial and firmware: not queried again
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_firmware_change_drops_the_old_entry(self):
+        CapabilityCache(self.path).devices()
+        self.connect(FakeDevice("123", "5.15.1"), FakeDevice("456", "5.13.0"))
+        cache = CapabilityCache(self.path)
+        cache.devices()
+        self.assertEqual(self.queries, ["123", "123", "456"])
+        self.assertEqual(sorted(cache.entries), ["123@5.15.1", "456@5.13.0"])
+        with open(self.path) as cache_file:
+            self.assertEqual(sorted(json.load(cache_file)["devices"]), ["123@5.15.1", "456@5.13.0"])
+
+    def test_unreadable_or_old_caches_are_ignored(self):
+        for content in ['{"version": 0, "devices": {"x@1": {}}}', "{truncated"]:
+            with self.subTest(content=content):
+                with open(self.path, "w") as cache_file:
+                    cache_file.write(content)
+                self.assertEqual(CapabilityCache(self.path).entries, {})
+
+    def test_supported_modes(self):
+        cache = CapabilityCache(self.path)
+        cache.devices()
+        self.assertEqual(cache.stream_modes(), [(640, 480, 30), (640, 480, 60)])
+        self.assertTrue(cache.supports("640x480", 60))
+        self.assertFalse(cache.supports("1280x720", 30))  # color only
+        self.assertFalse(cache.supports("1280x720", 15))  # depth only; yuyv color does not count
+        self.assertFalse(cache.supports("1920x1080", 30))
+        self.assertEqual(cache.resolutions(), ["640x480"])
+        self.assertEqual(cache.fps_options("640x480"), [30, 60])
+
+    def test_defaults_without_a_camera(self):
+        self.connect()
+        cache = CapabilityCache(self.path)
+        self.assertEqual(cache.devices(), [])
+        self.assertEqual(cache.resolutions(), DEFAULT_RESOLUTIONS)
+        self.assertEqual(cache.fps_options("1280x720"), DEFAULT_FPS)
+        self.assertTrue(cache.supports("1920x1080", 15))
+        self.assertFalse(cache.supports("1920x1080", 90))
+
+
+if __name__ == "__main__":
+    unittest.main()
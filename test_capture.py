@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# test_capture.py
+"""Reading capture buffers while the capture thread keeps rewriting them."""
+import time
+import unittest
+
+import numpy as np
+
+from devices.realsense import CapturedFrames
+from devices.synthetic import SyntheticCapture
+
+WIDTH, HEIGHT = 320, 240
+
+
+class RewrittenDuringCopy:
+    """Array stand-in whose contents the capture thread "rewrites" while they are copied."""
+
+    def __init__(self, frames, array):
+        self.frames, self.array, self.shape = frames, array, array.shape
+
+    def __array__(self, dtype=None, copy=None):
+        self.frames.seq += 1
+        return self.array
+
+
+class CapturedFramesTest(unittest.TestCase):
+    def setUp(self):
+        self.frames = CapturedFrames(np.full((4, 5, 3), 7, np.uint8), np.full((4, 5), 900, np.uint16))
+        self.frames.seq, self.frames.timestamp, self.frames.captured = 3, 12.5, 100.0
+
+    def test_copy(self):
+        copied = self.frames.copy()
+        self.assertIsNot(copied.depth, self.frames.depth)
+        np.testing.assert_array_equal(copied.depth, self.frames.depth)
+        self.assertEqual((copied.seq, copied.timestamp, copied.captured), (3, 12.5, 100.0))
+        self.assertIs(self.frames.copy(copied), copied)  # the same shape reuses `out`
+
+    def test_buffer_being_rewritten(self):
+        self.frames.seq = 0
+        self.assertIsNone(self.frames.copy())
+
+    def test_rewritten_during_copy(self):
+        out = self.frames.copy()
+        self.frames.depth = RewrittenDuringCopy(self.frames, self.frames.depth)
+        self.assertIsNone(self.frames.copy(out))
+
+
+class CaptureReadTest(unittest.TestCase):
+    def setUp(self):
+        self.capture = SyntheticCapture()
+        self.addCleanup(self.capture.stop)
+
+    def box_column(self, frames):
+        """Where the moving box was drawn for `frames.seq`, and where its depth actually is."""
+        box = HEIGHT // 6
+        expected = ((frames.seq - 1) * 4) % (WIDTH - box)
+        columns = np.flatnonzero(frames.depth[HEIGHT // 2] == 700)
+        return expected, int(columns[0]) if len(columns) else None
+
+    def test_reads_are_whole_pairs(self):
+        self.capture.start(WIDTH, HEIGHT, 1000)  # faster than it can render: buffers are rewritten constantly
+        out, reads = None, 0
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            frames = self.capture.read(out)
+            if frames is None:
+                continue
+            out, reads = frames, reads + 1
+            expected, column = self.box_column(frames)
+            self.assertEqual(column, expected)
+            self.assertTrue(np.all(frames.color[HEIGHT // 2, column] == (255, 80, 40)))
+            self.assertGreater(frames.captured, 0.0)
+        self.assertGreater(reads, 10)
+
+    def test_published_buffers_are_stamped(self):
+        self.capture.start(WIDTH, HEIGHT, 200)
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            frames = self.capture.latest()
+            if frames is not None and frames.seq:
+                self.assertGreater(frames.captured, 0.0)
+
+    def test_nothing_before_the_first_frame(self):
+        self.assertIsNone(self.capture.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# test_changedetect.py
+"""Scene-change detection and the per-consumer gates that skip unchanged frames."""
+import unittest
+from collections import namedtuple
+
+import numpy as np
+
+from utils.changedetect import ChangeDetector, ChangeGate
+
+Frames = namedtuple("Frames", "seq depth color")
+HEIGHT, WIDTH = 96, 128
+
+
+class Scene:
+    """Synthetic frame pairs: a depth ramp and a gray image, numbered like a capture."""
+
+    def __init__(self):
+        self.depth = np.tile(np.linspace(800, 3000, WIDTH).astype(np.uint16), (HEIGHT, 1))
+        self.color = np.full((HEIGHT, WIDTH, 3), 100, np.uint8)
+        self.seq = 0
+
+    def frames(self):
+        self.seq += 1
+        return Frames(self.seq, self.depth.copy(), self.color.copy())
+
+
+class ChangeDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene()
+        self.detector = ChangeDetector({"hold_s": 0.0})
+        self.assertEqual(self.detector.update(self.scene.frames()), 1.0)  # no reference yet
+
+    def test_still_scene_is_unchanged(self):
+        rng = np.random.default_rng(1)
+        for _ in range(5):
+            frames = self.scene.frames()
+            frames.depth[:] += rng.integers(0, 5, frames.depth.shape).astype(np.uint16)  # sensor noise
+            self.assertEqual(self.detector.update(frames), 0.0)
+        self.assertEqual((self.detector.change_seq, self.detector.checked_seq), (1, 6))
+
+    def test_moving_object_is_a_change(self):
+        self.scene.depth[20:60, 30:70] = 600  # something stepped in front of the camera
+        self.assertGreater(self.detector.update(self.scene.frames()), 0.1)
+        self.assertEqual(self.detector.change_seq, 2)
+        self.assertEqual(self.detector.update(self.scene.frames()), 0.0)  # the new scene is the reference
+
+    def test_depth_change_must_pass_both_thresholds(self):
+        self.scene.depth[:, :] = 3000
+        self.detector.reset()
+        self.detector.update(self.scene.frames())
+        self.scene.depth[:, :] = 3050  # 50 mm is within 3 % at 3 m
+        self.assertEqual(self.detector.update(self.scene.frames()), 0.0)
+        self.scene.depth[:, :] = 3200
+        self.assertEqual(self.detector.update(self.scene.frames()), 1.0)
+
+    def test_holes_are_not_motion(self):
+        self.scene.depth[::2, :] = 0
+        self.assertEqual(self.detector.update(self.scene.frames()), 0.0)
+
+    def test_slow_drift_adds_up(self):
+        scores = []
+        for _ in range(5):
+            self.scene.color[:] += 5  # each step is below color_level, the sum is not
+            scores.append(self.detector.update(self.scene.frames()))
+        self.assertEqual(scores, [0.0, 0.0, 0.0, 1.0, 0.0])
+
+    def test_hold_keeps_frames_after_a_change(self):
+        self.detector.configure(hold_s=60.0)
+        self.scene.color[:] = 200
+        self.detector.update(self.scene.frames())
+        self.scene.color[:] = 100  # put back; scored against the changed frame this moves too
+        self.detector.update(self.scene.frames())
+        self.assertEqual(self.detector.update(self.scene.frames()), 0.0)  # still, but within hold_s
+        self.assertEqual(self.detector.change_seq, 4)
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(ValueError):
+            self.detector.configure(level=3)
+
+
+class ChangeGateTest(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene()
+        self.detector = ChangeDetector({"hold_s": 0.0})
+
+    def run_frames(self, gate, count, change_every=None, start=0.0, period=0.1):
+        admitted = []
+        for index in range(count):
+            if change_every and index % change_every == 0:
+                self.scene.color[:] = 100 + 50 * (self.scene.seq % 2)
+            frames = self.scene.frames()
+            self.detector.update(frames)
+            admitted.append(gate.admit(frames, now=start + index * period))
+        return admitted
+
+    def test_skips_unchanged_frames_down_to_min_refresh(self):
+        gate = ChangeGate("display", self.detector, min_refresh_hz=2.0)
+        admitted = self.run_frames(gate, 20)  # 10 fps, still scene
+        self.assertEqual([index for index, admit in enumerate(admitted) if admit], [0, 5, 10, 15])
+        self.assertEqual((gate.processed, gate.skipped), (4, 16))
+
+    def test_changes_are_always_admitted(self):
+        gate = ChangeGate("occupancy", self.detector, min_refresh_hz=0)
+        admitted = self.run_frames(gate, 12, change_every=3)
+        self.assertEqual([index for index, admit in enumerate(admitted) if admit], [0, 3, 6, 9])
+
+    def test_unscored_frames_pass(self):
+        gate = ChangeGate("preview", self.detector, min_refresh_hz=0)
+        self.run_frames(gate, 2)
+        self.assertTrue(gate.admit(self.scene.frames(), now=1.0))  # the detector has not seen it yet
+
+    def test_saved_time_is_credited_per_skip(self):
+        gate = ChangeGate("bus", self.detector, min_refresh_hz=0)
+        gate.record(0.004)
+        self.run_frames(gate, 6)
+        self.assertEqual(gate.skipped, 5)
+        self.assertAlmostEqual(gate.stats()["saved_s"], 0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
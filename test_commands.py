@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# test_commands.py
+"""Console command parsing, lookup, scripts and the worker-thread runner."""
+import logging
+import threading
+import unittest
+
+from utils.commands import CommandContext, CommandError, CommandRegistry, CommandRunner, parse_command
+
+
+class ParseTest(unittest.TestCase):
+    def test_words_quotes_and_comments(self):
+        self.assertEqual(parse_command('cam set "My Camera" 30  # comment'), ["cam", "set", "My Camera", "30"])
+        self.assertEqual(parse_command("   "), [])
+        self.assertEqual(parse_command("# only a comment"), [])
+
+    def test_unbalanced_quotes(self):
+        with self.assertRaisesRegex(CommandError, "cannot parse"):
+            parse_command('echo "unterminated')
+
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = CommandRegistry()
+        self.status = lambda context, args: "status"
+        self.registry.register("cam", lambda context, args: "cam")
+        self.registry.register("cam set fps", lambda context, args: "fps")
+        self.registry.register("cam status", self.status)
+        self.registry.register("status", self.status)  # the same handler under a second path
+
+    def test_longest_prefix_wins(self):
+        command, args = self.registry.resolve(["cam", "set", "fps", "30"])
+        self.assertEqual((command.path, args), ("cam set fps", ["30"]))
+        command, args = self.registry.resolve(["cam", "set", "resolution"])
+        self.assertEqual((command.path, args), ("cam", ["set", "resolution"]))
+
+    def test_aliases(self):
+        first, _ = self.registry.resolve(["cam", "status"])
+        second, _ = self.registry.resolve(["status"])
+        self.assertIs(first.handler, second.handler)
+
+    def test_unknown_command(self):
+        with self.assertRaisesRegex(CommandError, "unknown command 'pico move'"):
+            self.registry.resolve(["pico", "move"])
+
+    def test_help_lines(self):
+        self.assertEqual(len(self.registry.help_lines(["cam"])), 3)
+        self.assertEqual(self.registry.help_lines(["pico"]), [])
+
+
+class RunnerTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)  # handler exceptions are logged with tracebacks
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.runner = CommandRunner(CommandRegistry(), max_workers=2)
+        self.addCleanup(self.runner.shutdown)
+        self.calls = []
+        self.runner.registry.register("count", lambda context, args: self.calls.append(args) or len(self.calls))
+        self.runner.registry.register("fail", self.fail_command)
+        self.runner.registry.register("crash", lambda context, args: 1 / 0)
+        self.output = []
+        self.context = CommandContext(self.output.append)
+
+    @staticmethod
+    def fail_command(context, args):
+        raise CommandError("device missing")
+
+    def test_results(self):
+        result = self.runner.execute("count a", self.context)
+        self.assertTrue(result.ok)
+        self.assertEqual(self.output, ["1"])
+        result = self.runner.execute("nothing here", self.context)
+        self.assertFalse(result.ok)
+        self.assertIn("unknown command", result.error)
+        result = self.runner.execute("crash", self.context)
+        self.assertEqual(result.error, "ZeroDivisionError: division by zero")
+        self.assertIn("cannot parse", self.runner.execute("echo 'x", self.context).error)
+
+    def test_script_stops_at_first_failure(self):
+        lines = ["count 1", "", "# comment", "count 2", "fail", "count 3"]
+        with self.assertRaisesRegex(CommandError, "stopped at a failing command"):
+            self.runner.run_script(lines, self.context, name="setup.txt")
+        self.assertEqual(self.calls, [["1"], ["2"]])
+        timings = [line for line in self.output if line.startswith("[")]
+        self.assertEqual(len(timings), 3)
+        self.assertRegex(timings[0], r"^\[ +\d+\.\d ms\] ok  count 1$")
+        self.assertRegex(timings[2], r"^\[ +\d+\.\d ms\] ERR fail$")
+        self.assertIn("setup.txt:5: device missing", self.output)
+        self.assertEqual(self.output[-1].split(" in ")[0], "setup.txt: 3 command(s)")
+        self.assertTrue(self.output[-1].endswith(", 1 failed"))
+
+    def test_script_results(self):
+        results = self.runner.run_script(["count", "count"], self.context)
+        self.assertEqual([result.ok for result in results], [True, True])
+        self.assertTrue(all(result.seconds >= 0 for result in results))
+
+    def test_timeout_on_a_worker_is_reported(self):
+        never = threading.Event()
+        self.runner.registry.register("wait", lambda context, args: context.wait(never, 0.2, "the Pico"))
+        done = []
+        future = self.runner.submit("wait", self.output.append, on_done=done.append)
+        result = future.result(timeout=5.0)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, "timed out after 0.2 s waiting for the Pico")
+        self.assertEqual(done, [result])
+
+    def test_cancel_wakes_a_waiting_command(self):
+        self.runner.registry.register("block", lambda context, args: context.wait(threading.Event(), 60.0))
+        started = threading.Event()
+        self.runner.registry.register("started", lambda context, args: started.set())
+        future = self.runner.submit("started\nblock", self.output.append)
+        self.assertTrue(started.wait(5.0))
+        self.runner.cancel_all()
+        result = future.result(timeout=5.0)
+        self.assertFalse(result.ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# test_config.py
+"""Config and session files: round trips, and falling back to defaults on old or damaged files."""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "session.json")
+        self.session = {"theme": "raw_cyber", "graph": None,
+                        "modules": [{"id": "RS1", "type": "RealSense Camera", "enabled": True,
+                                     "settings": {"resolution": "640x480", "fps": 60}}]}
+
+    def write(self, text):
+        with open(self.path, "w") as session_file:
+            session_file.write(text)
+
+    def test_round_trip(self):
+        self.assertTrue(config.save_session(self.session, self.path))
+        self.assertEqual(config.load_session(self.path), {"version": config.SESSION_VERSION, **self.session})
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_missing_old_or_damaged_sessions_give_none(self):
+        self.assertIsNone(config.load_session(self.path))
+        full = json.dumps({"version": config.SESSION_VERSION, **self.session})
+        for text in [json.dumps({"version": 0, **self.session}), json.dumps(self.session),
+                     full[:len(full) // 2], ""]:
+            with self.subTest(text=text[:40]):
+                self.write(text)
+                self.assertIsNone(config.load_session(self.path))  # the window then starts with defaults
+
+    def test_failed_save_keeps_the_old_session(self):
+        config.save_session(self.session, self.path)
+        with mock.patch("config.json.dump", side_effect=TypeError("not serializable")):
+            self.assertFalse(config.save_session({"theme": object()}, self.path))
+        self.assertEqual(config.load_session(self.path)["theme"], "raw_cyber")
+
+
+class ConfigTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch("config.CONFIG_FILE", os.path.join(directory.name, "config.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_defaults(self):
+        self.assertEqual(config.load_config(), config.DEFAULT_CONFIG)
+        with open(config.CONFIG_FILE, "w") as config_file:
+            config_file.write('{"resolution": "640x')
+        self.assertEqual(config.load_config(), config.DEFAULT_CONFIG)
+
+    def test_overrides_are_kept(self):
+        config.write_json_atomic(config.CONFIG_FILE, {"fps": 15, "watchdog": {"camera": 2.0}})
+        self.assertEqual(config.load_config(), {"fps": 15, "watchdog": {"camera": 2.0}})
+
+    def test_validate(self):
+        supported = {("640x480", 30), ("1280x720", 30)}
+        supports = lambda resolution, fps: (resolution, fps) in supported
+        settings = {"resolution": "640x480", "fps": 30, "theme": "dark"}
+        self.assertEqual(config.validate_config(settings, supports), (settings, []))
+        validated, problems = config.validate_config({"resolution": "640x480", "fps": 90, "theme": "dark"}, supports)
+        self.assertEqual(validated, {"resolution": "1280x720", "fps": 30, "theme": "dark"})
+        self.assertEqual(len(problems), 1)
+        validated, _ = config.validate_config({"resolution": "4096x2160", "fps": 30}, lambda *mode: False)
+        self.assertEqual(validated, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# test_depthcodec.py
+"""KZD1 depth codec: lossless round trips, temporal frames and the encoder pool."""
+import unittest
+
+import numpy as np
+
+from utils.depthcodec import (
+    DepthDecoder, DepthEncoderPool, available_backends, decode_depth, encode_depth, frame_info
+)
+
+
+def noisy_depth(rng, shape=(48, 64), holes=0.15):
+    depth = (1500 + 300 * np.sin(np.arange(shape[1]) / 9.0) + rng.normal(0, 8, shape)).astype(np.uint16)
+    depth[rng.random(shape) < holes] = 0
+    return depth
+
+
+class DepthCodecTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(3)
+
+    def assertRoundTrip(self, depth, previous=None, backend="zlib"):
+        data = encode_depth(depth, previous, backend)
+        np.testing.assert_array_equal(decode_depth(data, previous), depth)
+        return data
+
+    def test_round_trip_every_backend(self):
+        depth = noisy_depth(self.rng)
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                data = self.assertRoundTrip(depth, backend=backend)
+                self.assertEqual(frame_info(data), (64, 48, False, backend))
+                self.assertLess(len(data), depth.nbytes)
+
+    def test_round_trip_edge_frames(self):
+        frames = {
+            "empty": np.zeros((4, 5), np.uint16),
+            "full": np.full((4, 5), 65535, np.uint16),
+            "wrapping deltas": np.tile(np.array([1, 65535], np.uint16), (3, 4)),
+            "hole first": np.array([[0, 0, 7], [8, 0, 9]], np.uint16),
+            "single pixel": np.array([[42]], np.uint16),
+            "random": self.rng.integers(0, 65536, (17, 23)).astype(np.uint16),
+        }
+        for name, depth in frames.items():
+            with self.subTest(name):
+                self.assertRoundTrip(depth)
+
+    def test_static_scene_uses_temporal_prediction(self):
+        first = noisy_depth(self.rng, holes=0.0)
+        second = first.copy()
+        second[10:20, 10:20] += 50  # something moved
+        data = self.assertRoundTrip(second, previous=first)
+        self.assertTrue(frame_info(data)[2])
+        self.assertLess(len(data), len(encode_depth(second)))
+        with self.assertRaises(ValueError):
+            decode_depth(data)  # the reference frame is required
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            encode_depth(np.zeros((4, 4), np.float32))
+        data = bytearray(encode_depth(noisy_depth(self.rng)))
+        data[0:4] = b"XXXX"
+        with self.assertRaises(ValueError):
+            decode_depth(bytes(data))
+
+    def test_encoder_pool_delivers_in_order_with_key_frames(self):
+        encoded = []
+        pool = DepthEncoderPool(lambda data, timestamp, temporal: encoded.append((data, timestamp, temporal)),
+                                key_interval=4, workers=2, max_pending=64, name="test")
+        scene = noisy_depth(self.rng)
+        frames = []
+        for index in range(10):
+            frame = scene.copy()
+            frame[index:index + 5, :] += 3
+            frames.append(frame)
+            self.assertTrue(pool.submit(frame, timestamp=index))
+        pool.close()
+
+        self.assertEqual([timestamp for _, timestamp, _ in encoded], list(range(10)))
+        self.assertEqual([index for index, (_, _, temporal) in enumerate(encoded) if not temporal], [0, 4, 8])
+        decoder = DepthDecoder()
+        for frame, (data, _, _) in zip(frames, encoded):
+            np.testing.assert_array_equal(decoder.decode(data), frame)
+        self.assertEqual(pool.stats()["frames"], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
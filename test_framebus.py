@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# test_framebus.py
+"""Frame bus: publish/read round trips, the slot seqlock, lapped readers and closed rings."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.framebus import DEFAULT_SLOTS, BusSubscriber, FrameBus
+
+
+class FrameBusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="kozy-bus-test-")
+        self.bus = FrameBus(os.path.join(self.directory, "bus.sock"))
+        self.assertTrue(self.bus.start())
+        self.subscribers = []
+
+    def tearDown(self):
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.bus.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def subscribe(self, topic):
+        subscriber = BusSubscriber(topic, self.bus.socket_path)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def test_round_trip(self):
+        frame = np.arange(12, dtype=np.uint16).reshape(3, 4)
+        self.bus.publish("depth", frame, 1.5)
+        subscriber = self.subscribe("depth")
+        self.assertEqual(subscriber.read(timeout=1.0).seq, 1)  # a new subscriber starts at the latest frame
+        self.bus.publish("depth", frame + 1, 2.5)
+        received = subscriber.read(timeout=1.0)
+        self.assertEqual((received.seq, received.timestamp), (2, 2.5))
+        np.testing.assert_array_equal(received.copy(), frame + 1)
+        self.assertIsNone(subscriber.poll())
+
+    def test_bytes_topic(self):
+        self.bus.publish("pico/telemetry", "TEL:t=1")
+        subscriber = self.subscribe("pico/telemetry")
+        self.assertEqual(subscriber.read(timeout=1.0).copy(), b"TEL:t=1")
+        self.bus.publish("pico/telemetry", "TEL:t=2")
+        self.assertEqual(subscriber.read(timeout=1.0).copy(), b"TEL:t=2")
+
+    def test_overwritten_slot_is_invalid(self):
+        frame = np.zeros((2, 2), np.uint8)
+        self.bus.publish("t", frame)
+        subscriber = self.subscribe("t")
+        self.bus.publish("t", frame)
+        received = subscriber.read(timeout=1.0)
+        self.assertTrue(received.valid())
+        for _ in range(DEFAULT_SLOTS):  # the publisher wraps around onto the same slot
+            self.bus.publish("t", frame)
+        self.assertFalse(received.valid())
+        self.assertIsNone(received.copy())
+
+    def test_lapped_subscriber_skips_to_newest(self):
+        self.bus.publish("t", np.zeros(4, np.int32))
+        subscriber = self.subscribe("t")
+        for value in range(1, 3 * DEFAULT_SLOTS):
+            self.bus.publish("t", np.full(4, value, np.int32))
+        received = subscriber.read(timeout=1.0)
+        self.assertEqual(received.seq, 3 * DEFAULT_SLOTS)
+        self.assertEqual(int(received.data[0]), 3 * DEFAULT_SLOTS - 1)
+        self.assertGreater(subscriber.skipped, 0)
+
+    def test_readvertise_closes_old_frames(self):
+        self.bus.publish("t", np.zeros((3, 4), np.uint16))
+        subscriber = self.subscribe("t")
+        self.bus.publish("t", np.ones((3, 4), np.uint16))
+        old = subscriber.read(timeout=1.0)
+        self.bus.publish("t", np.full((5, 5), 7, np.uint8))  # new layout, new ring
+        new = subscriber.read(timeout=1.0)
+        self.assertEqual(new.data.shape, (5, 5))
+        self.assertFalse(old.valid())
+        self.assertIsNone(old.copy())
+        del old.data  # release the view so the old mapping can close
+
+    def test_publish_after_unadvertise_is_dropped(self):
+        publisher = self.bus.advertise("t", (2,), np.float32)
+        self.bus.unadvertise("t")
+        self.assertIsNone(publisher.publish(np.zeros(2, np.float32)))
+        self.assertNotIn("t", self.bus.topics())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# test_graph.py
+"""Pipeline graphs: spec validation, edge queue policies and a thread -> process -> sink run."""
+import logging
+import threading
+import time
+import unittest
+
+from utils.graph import Edge, Node, build_graph, register_node
+
+ITEMS = 200
+
+
+@register_node("test_counter")
+class CounterSource(Node):
+    """Emits 0, 1, ... params.count - 1, then nothing."""
+
+    outputs = {"out": "int"}
+
+    def setup(self):
+        self.next = 0
+
+    def produce(self):
+        if self.next >= self.params["count"]:
+            return False
+        self.emit("out", self.next)
+        self.next += 1
+        return True
+
+
+def pipeline(policy="block"):
+    return {"nodes": {
+        "source": {"type": "test_counter", "params": {"count": ITEMS}},
+        "negate": {"type": "function", "executor": "process", "params": {"function": "operator:neg"},
+                   "inputs": {"in": "source.out"}, "queue": 8, "policy": policy},
+        "sink": {"type": "display", "inputs": {"image": "negate.out"}, "queue": 8, "policy": policy},
+    }}
+
+
+class BuildGraphTest(unittest.TestCase):
+    def test_cycle_is_rejected(self):
+        spec = {"nodes": {
+            "a": {"type": "function", "params": {"function": "operator:neg"}, "inputs": {"in": "b.out"}},
+            "b": {"type": "function", "params": {"function": "operator:neg"}, "inputs": {"in": "a.out"}},
+        }}
+        with self.assertRaisesRegex(ValueError, "cycle through: a, b"):
+            build_graph(spec)
+
+    def test_dangling_edges_are_rejected(self):
+        for inputs, message in [({"image": "camera.color"}, "unknown node 'camera'"),
+                                ({"image": "source.missing"}, "no output port 'missing'"),
+                                ({"image": "source"}, "must look like node.port")]:
+            with self.subTest(inputs=inputs):
+                spec = {"nodes": {"source": {"type": "test_counter", "params": {"count": 1}},
+                                  "sink": {"type": "display", "inputs": inputs}}}
+                with self.assertRaisesRegex(ValueError, message):
+                    build_graph(spec)
+
+    def test_bad_node_and_policy(self):
+        with self.assertRaisesRegex(ValueError, "unknown node type"):
+            build_graph({"nodes": {"x": {"type": "teleporter"}}})
+        with self.assertRaisesRegex(ValueError, "unknown executor"):
+            build_graph({"nodes": {"x": {"type": "test_counter", "executor": "gpu"}}})
+        with self.assertRaisesRegex(ValueError, "Unknown queue policy"):
+            build_graph(pipeline(policy="drop_random"))
+
+
+class EdgePolicyTest(unittest.TestCase):
+    def fill(self, policy, items=5):
+        edge = Edge("a.out", "b.in", "int", maxsize=2, policy=policy)
+        stop = threading.Event()
+        for item in range(items):
+            edge.put(item, stop)
+        return edge, [edge.queue.get_nowait() for _ in range(edge.depth())]
+
+    def full_blocking_edge(self):
+        edge = Edge("a.out", "b.in", "int", maxsize=2, policy="block")
+        edge.queue.put_nowait(0)
+        edge.queue.put_nowait(1)
+        return edge
+
+    def test_drop_oldest_keeps_the_newest(self):
+        edge, queued = self.fill("drop_oldest")
+        self.assertEqual(queued, [3, 4])
+        self.assertEqual(edge.dropped.value, 3)
+
+    def test_drop_newest_keeps_the_oldest(self):
+        edge, queued = self.fill("drop_newest")
+        self.assertEqual(queued, [0, 1])
+        self.assertEqual(edge.dropped.value, 3)
+
+    def test_block_waits_for_room(self):
+        edge = self.full_blocking_edge()
+        stop = threading.Event()
+        producer = threading.Thread(target=edge.put, args=(2, stop))
+        producer.start()
+        producer.join(0.3)
+        self.assertTrue(producer.is_alive())  # full: the producer waits
+        self.assertEqual(edge.queue.get_nowait(), 0)
+        producer.join(2.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual([edge.queue.get_nowait(), edge.queue.get_nowait()], [1, 2])
+        self.assertEqual(edge.dropped.value, 0)
+
+    def test_block_gives_up_on_shutdown(self):
+        edge = self.full_blocking_edge()
+        stop = threading.Event()
+        stop.set()
+        edge.put(2, stop)  # returns instead of waiting forever
+        self.assertEqual(edge.depth(), 2)
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_thread_process_sink_delivers_in_order(self):
+        received = []
+        done = threading.Event()
+
+        def display(name, item):
+            received.append(item)
+            if len(received) == ITEMS:
+                done.set()
+
+        graph = build_graph(pipeline(), {"display": display})
+        self.assertEqual(graph.dependency_order(), ["source", "negate", "sink"])
+        graph.start()
+        try:
+            self.assertTrue(done.wait(10.0))
+        finally:
+            graph.stop()
+        self.assertEqual(received, [-item for item in range(ITEMS)])
+
+        stats = graph.stats()
+        self.assertFalse(any(node["alive"] for node in stats["nodes"].values()))
+        self.assertEqual(stats["nodes"]["sink"]["processed"], ITEMS)
+        self.assertEqual(stats["nodes"]["negate"]["executor"], "process")
+        self.assertEqual(sum(edge["dropped"] for edge in stats["edges"].values()), 0)
+        self.assertFalse(graph.running)
+
+    def test_stop_is_prompt(self):
+        graph = build_graph(pipeline(), {"display": lambda name, item: time.sleep(0.01)})
+        graph.start()
+        time.sleep(0.2)
+        start = time.monotonic()
+        graph.stop()  # a blocked producer and a busy sink must not hold it up
+        self.assertLess(time.monotonic() - start, 3.0)
+        self.assertTrue(all(runner.worker is None for runner in graph.runners.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
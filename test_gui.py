@@ -1,26 +1,29 @@
 #!/usr/bin/env python3
 # Test script to verify the GUI changes work correctly
 
+import os
 import sys
 import importlib.util
 
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
 def test_imports():
     """Test that all modules can be imported without errors."""
     try:
         # Test importing main window
-        spec = importlib.util.spec_from_file_location("main_window", "/workspace/gui/main_window.py")
+        spec = importlib.util.spec_from_file_location("main_window", os.path.join(REPO_ROOT, "gui", "main_window.py"))
         main_window_module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(main_window_module)
         print("✓ Successfully imported main_window module")
         
         # Test importing dialogs
-        spec = importlib.util.spec_from_file_location("dialogs", "/workspace/gui/dialogs.py")
+        spec = importlib.util.spec_from_file_location("dialogs", os.path.join(REPO_ROOT, "gui", "dialogs.py"))
         dialogs_module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(dialogs_module)
         print("✓ Successfully imported dialogs module")
         
         # Test importing styles
-        spec = importlib.util.spec_from_file_location("styles", "/workspace/gui/styles.py")
+        spec = importlib.util.spec_from_file_location("styles", os.path.join(REPO_ROOT, "gui", "styles.py"))
         styles_module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(styles_module)
         print("✓ Successfully imported styles module")
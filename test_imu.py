@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# test_imu.py
+"""IMU sample rings: wrap-around, interpolation, and lost or out-of-order samples."""
+import unittest
+
+import numpy as np
+
+from devices.imu import ImuRing, ImuStore
+
+
+class ImuRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = ImuRing(16)
+        for number in range(40):  # wraps the ring twice; 100 Hz, x = time
+            self.ring.write(number * 0.01, number * 0.01, 1.0, -number, frame_number=number)
+
+    def test_keeps_the_newest_samples_in_order(self):
+        times, values = self.ring.samples()
+        np.testing.assert_allclose(times, np.arange(24, 40) * 0.01)
+        np.testing.assert_allclose(values[:, 2], -np.arange(24, 40))
+        times, _ = self.ring.samples(since=0.355)
+        np.testing.assert_allclose(times, np.arange(36, 40) * 0.01)
+        timestamp, xyz = self.ring.latest()
+        self.assertAlmostEqual(timestamp, 0.39)
+        self.assertEqual(float(xyz[2]), -39.0)
+
+    def test_interpolate(self):
+        xyz = self.ring.interpolate(0.3025)
+        np.testing.assert_allclose(xyz, [0.3025, 1.0, -30.25], rtol=1e-5)
+        np.testing.assert_allclose(self.ring.interpolate(0.24), [0.24, 1.0, -24.0], rtol=1e-5)  # oldest sample
+        self.assertIsNone(self.ring.interpolate(0.2399))  # already overwritten
+        self.assertIsNone(self.ring.interpolate(0.3901))
+
+    def test_interpolate_many_agrees_with_interpolate(self):
+        timestamps = np.linspace(0.2, 0.42, 45)
+        many = self.ring.interpolate_many(timestamps)
+        for timestamp, row in zip(timestamps, many):
+            single = self.ring.interpolate(timestamp)
+            if single is None:
+                self.assertTrue(np.isnan(row).all())
+            else:
+                np.testing.assert_allclose(row, single, rtol=1e-5, atol=1e-6)
+
+    def test_rate(self):
+        self.assertAlmostEqual(self.ring.rate(window=0.1), 100.0, places=3)
+
+    def test_lost_and_out_of_order(self):
+        self.ring.write(0.5, 0, 0, 0, frame_number=45)  # numbers 40-44 never arrived
+        self.ring.write(0.45, 0, 0, 0, frame_number=46)  # older than the newest sample
+        self.assertEqual((self.ring.lost, self.ring.out_of_order, self.ring.count), (5, 1, 41))
+
+
+class ImuStoreTest(unittest.TestCase):
+    def test_streams_are_separate(self):
+        store = ImuStore(capacity=8)
+        store.write("accel", 1.0, 0, 0, 9.8)
+        store.write("accel", 2.0, 0, 0, 9.6)
+        store.write("gyro", 1.5, 0.1, 0, 0)
+        self.assertAlmostEqual(float(store.interpolate("accel", 1.5)[2]), 9.7, places=5)
+        self.assertIsNone(store.interpolate("gyro", 1.5))  # a single sample cannot be interpolated
+        stats = store.stats()
+        self.assertEqual((stats["accel"]["count"], stats["gyro"]["count"]), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# test_logstore.py
+"""Log store queries against a brute-force scan of the same records."""
+import itertools
+import random
+import unittest
+
+from utils.logstore import LEVELS, LogStore
+
+SOURCES = ["pico", "realsense", "console", "watchdog", "graph"]
+WORDS = ["frame", "Frame", "timeout", "PING", "pong", "servo", "İstanbul", "a\x00b", "queue", "full", "ok"]
+
+
+class LogStoreTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.store = LogStore(capacity=500, chunk_size=64)
+        self.records = []  # (row, timestamp, level, source, message) as stored
+        for row in range(1300):
+            level = rng.choices(LEVELS, weights=[5, 60, 20, 10, 1])[0]
+            source = rng.choices(SOURCES, weights=[40, 40, 10, 5, 1])[0]
+            message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+            self.store.append(float(row), level, source, message)
+            self.records.append((row, float(row), level, source, message.replace("\x00", " ")))
+
+    def brute_force(self, levels=None, sources=None, text=None, start=0, end=None):
+        rows = []
+        for row, _, level, source, message in self.records[self.store.first:]:
+            if row < start or (end is not None and row >= end):
+                continue
+            if levels is not None and level not in levels:
+                continue
+            if sources is not None and source not in sources:
+                continue
+            if text:
+                haystack = message.lower() if text == text.lower() else message
+                if text.replace("\x00", " ") not in haystack:
+                    continue
+            rows.append(row)
+        return rows
+
+    def test_oldest_chunks_are_dropped(self):
+        self.assertGreater(self.store.first, 0)
+        self.assertEqual(self.store.first % 64, 0)
+        self.assertGreaterEqual(len(self.store), 500)
+        self.assertIsNone(self.store.record(self.store.first - 1))
+        self.assertEqual(self.store.stats()["dropped"], self.store.first)
+
+    def test_records(self):
+        for row in (self.store.first, self.store.first + 63, self.store.first + 64, 1299):
+            self.assertEqual(self.store.record(row), self.records[row][1:])
+        self.assertIsNone(self.store.record(1300))
+
+    def test_queries_match_brute_force(self):
+        level_filters = [None, ["ERROR"], ["WARNING", "ERROR", "CRITICAL"], LEVELS, ["NOTSET"]]
+        source_filters = [None, ["pico"], ["graph"], ["console", "watchdog"], SOURCES]
+        texts = [None, "frame", "Frame", "PING", "ping", "i̇stanbul", "İstanbul", "a b", "a\x00b", "missing"]
+        for levels, sources, text in itertools.product(level_filters, source_filters, texts):
+            with self.subTest(levels=levels, sources=sources, text=text):
+                rows = self.store.query(levels, sources, text)
+                self.assertEqual(rows.tolist(), self.brute_force(levels, sources, text))
+
+    def test_ranges_match_brute_force(self):
+        for start, end in [(0, None), (900, 1000), (1250, None), (1299, 1300), (1000, 900), (0, 10)]:
+            for levels, text in [(None, None), (["INFO"], "servo"), (None, "timeout")]:
+                with self.subTest(start=start, end=end, levels=levels, text=text):
+                    rows = self.store.query(levels, None, text, start, end)
+                    self.assertEqual(rows.tolist(), self.brute_force(levels, None, text, start, end))
+
+    def test_stats(self):
+        stats = self.store.stats()
+        stored = self.records[self.store.first:]
+        self.assertEqual(stats["records"], len(stored))
+        for source in SOURCES:
+            self.assertEqual(stats["sources"].get(source, 0), sum(record[3] == source for record in stored))
+        for level, count in stats["levels"].items():
+            self.assertEqual(count, sum(record[2] == level for record in stored))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# test_metrics.py
+"""Metrics: per-thread cells summed on read, Prometheus text output and the HTTP endpoint."""
+import re
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from utils.metrics import MetricsRegistry, MetricsServer
+
+THREADS, UPDATES = 8, 5000
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+                    r'(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*\})? (NaN|[+-]Inf|-?[0-9.e+-]+)$')
+
+
+def run_threads(target, count=THREADS):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class CollectTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counters_from_many_threads(self):
+        counter = self.registry.counter("kozy_test_total")
+        barrier = threading.Barrier(THREADS)
+
+        def work(index):
+            barrier.wait()
+            for _ in range(UPDATES):
+                counter.inc()
+            counter.inc(index)
+        run_threads(work)
+        self.assertEqual(counter.value(), THREADS * UPDATES + sum(range(THREADS)))
+        self.assertEqual(counter.value(), THREADS * UPDATES + sum(range(THREADS)))  # retired cells count once
+
+    def test_histograms_from_many_threads(self):
+        histogram = self.registry.histogram("kozy_test_seconds", buckets=(0.01, 0.1, 1.0))
+
+        def work(index):
+            for value in (0.005, 0.05, 0.5, 5.0):
+                for _ in range(index + 1):
+                    histogram.observe(value)
+        histogram.observe(0.05)  # this thread's cell stays live; the workers' are retired
+        run_threads(work)
+        per_value = sum(range(1, THREADS + 1))
+        cumulative, count, total = histogram.value()
+        self.assertEqual(cumulative, [per_value, 2 * per_value + 1, 3 * per_value + 1, 4 * per_value + 1])
+        self.assertEqual(count, 4 * per_value + 1)
+        self.assertAlmostEqual(total, 5.555 * per_value + 0.05)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+
+    def test_same_name_and_labels_share_a_metric(self):
+        self.assertIs(self.registry.counter("kozy_a", stage="x"), self.registry.counter("kozy_a", stage="x"))
+        self.assertIsNot(self.registry.counter("kozy_a", stage="x"), self.registry.counter("kozy_a", stage="y"))
+        with self.assertRaises(ValueError):
+            self.registry.gauge("kozy_a")
+
+
+class RenderTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.counter("kozy_frames_total", "Frames\ncaptured", camera='D435 "front"\\left').inc(3)
+        self.registry.gauge("kozy_temperature", "Board temperature", function=lambda: 1 / 0)
+        histogram = self.registry.histogram("kozy_copy_seconds", "Copy time", buckets=(0.001, 0.01), stage="rgb")
+        for value in (0.0005, 0.005, 0.05):
+            histogram.observe(value)
+        self.registry.add_collector(lambda: [("kozy_watchdog_state", "gauge", "Watchdog", {"device": "pico"}, 1)])
+        self.text = self.registry.render()
+        self.lines = self.text.splitlines()
+
+    def test_every_line_is_valid(self):
+        self.assertTrue(self.text.endswith("\n"))
+        for line in self.lines:
+            with self.subTest(line=line):
+                if line.startswith("#"):
+                    self.assertRegex(line, r"^# (HELP [a-zA-Z_:][a-zA-Z0-9_:]* ([^\n\\]|\\[\\n])*"
+                                           r"|TYPE [a-zA-Z_:][a-zA-Z0-9_:]* (counter|gauge|histogram))$")
+                else:
+                    self.assertRegex(line, SAMPLE)
+
+    def test_help_and_type_precede_samples(self):
+        index = self.lines.index("# HELP kozy_frames_total Frames\\ncaptured")
+        self.assertEqual(self.lines[index + 1], "# TYPE kozy_frames_total counter")
+        self.assertEqual(self.lines[index + 2], 'kozy_frames_total{camera="D435 \\"front\\"\\\\left"} 3')
+        self.assertEqual(sum(line.startswith("# TYPE kozy_copy_seconds ") for line in self.lines), 1)
+        self.assertIn('kozy_watchdog_state{device="pico"} 1', self.lines)
+        self.assertIn("kozy_temperature NaN", self.lines)  # a failing gauge function does not break the page
+
+    def test_histogram_series(self):
+        self.assertEqual([line for line in self.lines if line.startswith("kozy_copy_seconds")], [
+            'kozy_copy_seconds_bucket{stage="rgb",le="0.001"} 1',
+            'kozy_copy_seconds_bucket{stage="rgb",le="0.01"} 2',
+            'kozy_copy_seconds_bucket{stage="rgb",le="+Inf"} 3',
+            'kozy_copy_seconds_sum{stage="rgb"} 0.0555',
+            'kozy_copy_seconds_count{stage="rgb"} 3',
+        ])
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.counter("kozy_requests_total", "Requests").inc(7)
+        self.server = MetricsServer(self.registry, port=0).start()
+        self.addCleanup(self.server.stop)
+
+    def test_serves_the_rendered_text(self):
+        with urllib.request.urlopen(self.server.url, timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+            self.assertEqual(response.read().decode("utf-8"), self.registry.render())
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(f"http://127.0.0.1:{self.server.port}/other", timeout=5)
+        self.assertEqual(raised.exception.code, 404)
+        raised.exception.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# test_modules.py
+"""Module list model: stable IDs across add/remove, and coalesced status updates."""
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+
+from gui.modules import (
+    EnabledRole, ModuleDelegate, ModuleIdRole, ModuleListModel, StateRole, StatusLevelRole, StatusRole
+)
+from gui.styles import DEFAULT_THEME, PALETTES
+
+
+class ModuleListModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.model = ModuleListModel()
+        self.changes = []
+        self.model.dataChanged.connect(lambda top, bottom, roles: self.changes.append((top.row(), bottom.row())))
+
+    def column(self, role):
+        return [self.model.data(self.model.index(row), role) for row in range(self.model.rowCount())]
+
+    def test_ids_and_names(self):
+        self.assertEqual([self.model.add_module("Servo Drives") for _ in range(3)], ["servo-1", "servo-2", "servo-3"])
+        self.assertEqual(self.model.add_module("RPi Pico"), "pico-1")
+        self.assertEqual(self.column(Qt.DisplayRole), ["Servo Drives", "Servo Drives #2", "Servo Drives #3", "RPi Pico"])
+        self.assertEqual(self.model.ids("Servo Drives"), ["servo-1", "servo-2", "servo-3"])
+
+    def test_remove_keeps_ids_stable(self):
+        for _ in range(3):
+            self.model.add_module("Servo Drives")
+        self.assertTrue(self.model.remove_module("servo-2"))
+        self.assertFalse(self.model.remove_module("servo-2"))
+        self.assertEqual(self.column(ModuleIdRole), ["servo-1", "servo-3"])
+        self.assertEqual(self.model.index_of("servo-3").row(), 1)
+        self.assertFalse(self.model.index_of("servo-2").isValid())
+        self.assertEqual(self.model.add_module("Servo Drives"), "servo-4")  # a removed ID is not reused
+
+    def test_restored_ids(self):
+        self.assertEqual(self.model.add_module("Servo Drives", "servo-7"), "servo-7")
+        self.assertEqual(self.model.add_module("Servo Drives", "servo-7"), "servo-8")  # taken: a new one
+        self.assertEqual(self.model.add_module("Servo Drives"), "servo-9")
+
+    def test_status_updates_are_coalesced(self):
+        for _ in range(5):
+            self.model.add_module("Servo Drives")
+        self.model.set_status("servo-2", "Connected", "ok")
+        self.model.set_status("servo-4", "Timed out", "error")
+        self.model.set_state("servo-2", "streaming")
+        self.model.set_status("servo-2", "Connected", "ok")  # unchanged: not an update
+        self.model.set_status("missing-1", "Connected", "ok")
+        self.assertEqual(self.changes, [])
+        self.model.flush()
+        self.assertEqual(self.changes, [(1, 3)])
+        self.assertEqual(self.model.updates_requested, 3)
+        self.assertEqual(self.column(StatusRole)[1:4], ["Connected", "Unknown", "Timed out"])
+        self.assertEqual(self.column(StatusLevelRole)[3], "error")
+        self.assertEqual(self.column(StateRole)[1], "streaming")
+        self.model.flush()
+        self.assertEqual(len(self.changes), 1)  # nothing pending
+
+    def test_removal_shifts_pending_rows(self):
+        for _ in range(4):
+            self.model.add_module("Servo Drives")
+        self.model.set_status("servo-4", "Connected", "ok")
+        self.model.remove_module("servo-1")
+        self.model.flush()
+        self.assertEqual(self.changes, [(2, 2)])
+
+    def test_enable_and_disable(self):
+        self.model.add_module("RPi Pico")
+        self.model.set_enabled("pico-1", False)
+        self.assertEqual((self.column(EnabledRole), self.column(StateRole)), ([False], ["disabled"]))
+        self.model.set_enabled("pico-1", True)
+        self.assertEqual(self.column(StateRole), ["enabled"])
+
+    def test_delegate_theme_fallback(self):
+        delegate = ModuleDelegate()
+        delegate.set_theme("no-such-theme")
+        self.assertEqual(delegate.colors["ok"].name(), PALETTES[DEFAULT_THEME]["ok"])
+        delegate.set_theme("light")
+        self.assertEqual(delegate.colors["ok"].name(), PALETTES["light"]["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# test_occupancy.py
+"""Occupancy grid: projection against a per-point reference, decay, and grid lookups."""
+import math
+import unittest
+
+import numpy as np
+
+from utils.occupancy import OccupancyGrid, camera_rotation, default_intrinsics
+
+WIDTH, HEIGHT = 80, 60
+
+
+def reference_counts(depth, intrinsics, depth_scale, params):
+    """Votes per cell, projecting one pixel at a time."""
+    fx, fy, cx, cy = intrinsics
+    rotation = camera_rotation(params["pitch"], params["roll"], params["yaw"])
+    cell, span = params["cell_size"], params["span"]
+    nx, ny = math.ceil(params["range"] / cell), math.ceil(span / cell)
+    counts = np.zeros((nx, ny), np.int64)
+    stride = params["stride"]
+    for v in range(0, depth.shape[0], stride):
+        for u in range(0, depth.shape[1], stride):
+            z = depth[v, u] * depth_scale
+            if z <= 0:
+                continue
+            x, y, height = rotation @ np.array([(u - cx) / fx * z, (v - cy) / fy * z, z])
+            row = (x + params["camera_x"]) / cell
+            column = (y + params["camera_y"] + span / 2) / cell
+            height += params["camera_height"]
+            if params["min_height"] <= height < params["max_height"] and 0 <= row < nx and 0 <= column < ny:
+                counts[int(row), int(column)] += 1
+    return counts
+
+
+class OccupancyGridTest(unittest.TestCase):
+    def setUp(self):
+        self.intrinsics = default_intrinsics(WIDTH, HEIGHT)
+
+    def test_matches_reference_projection(self):
+        rng = np.random.default_rng(7)
+        depth = rng.integers(0, 5000, (HEIGHT, WIDTH)).astype(np.uint16)
+        depth[rng.random(depth.shape) < 0.2] = 0
+        params = dict(pitch=15.0, roll=-5.0, yaw=10.0, camera_x=0.1, camera_y=-0.2, stride=1, min_points=2)
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, **params)
+        grid.update(depth)
+        counts = reference_counts(depth, self.intrinsics, 0.001, grid.params)
+
+        self.assertAlmostEqual(grid.points, counts.sum(), delta=counts.sum() * 0.002)
+        expected = (counts >= 2) * np.float32(1 - grid.params["decay"])
+        mismatched = np.count_nonzero(grid.grid != expected)
+        self.assertLessEqual(mismatched, 2)  # float32 rounding may move a point across a cell border
+
+    def test_wall_ahead(self):
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, stride=1, decay=0.0)
+        grid.update(np.full((HEIGHT, WIDTH), 2020, np.uint16))
+        points = grid.occupied()
+        self.assertGreater(len(points), 10)
+        np.testing.assert_allclose(points[:, 0], 2.025)  # every hit lies in the row 2.02 m ahead
+        half_width = 2.02 * math.tan(math.radians(87.0) / 2)
+        self.assertTrue(np.all(np.abs(points[:, 1]) < half_width + grid.cell_size))
+
+    def test_floor_and_overhead_are_ignored(self):
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, stride=1, min_height=2.0, max_height=3.0)
+        grid.update(np.full((HEIGHT, WIDTH), 2000, np.uint16))  # the wall tops out below 2 m
+        self.assertEqual(grid.points, 0)
+        self.assertFalse(grid.grid.any())
+
+    def test_decay(self):
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, decay=0.5)
+        wall = np.full((HEIGHT, WIDTH), 1500, np.uint16)
+        for _ in range(3):
+            grid.update(wall)
+        self.assertAlmostEqual(float(grid.grid.max()), 1 - 0.5 ** 3)
+        grid.update(np.zeros_like(wall))
+        self.assertAlmostEqual(float(grid.grid.max()), (1 - 0.5 ** 3) * 0.5)
+        seq, _, published = grid.snapshot()
+        self.assertEqual(seq, 4)
+        np.testing.assert_array_equal(published, grid.grid)
+
+    def test_cell_of(self):
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, cell_size=0.1, range=2.0, span=2.0)
+        self.assertEqual(grid.cell_of(0.05, 0.0), (0, 10))
+        self.assertEqual(grid.cell_of(1.95, 0.95), (19, 19))
+        self.assertEqual(grid.cell_of(1.0, -1.0), (10, 0))
+        self.assertIsNone(grid.cell_of(-0.01, 0.0))
+        self.assertIsNone(grid.cell_of(1.0, 1.0))
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            OccupancyGrid(WIDTH, HEIGHT, self.intrinsics, cell=0.1)
+        grid = OccupancyGrid(WIDTH, HEIGHT, self.intrinsics)
+        with self.assertRaises(ValueError):
+            grid.update(np.zeros((WIDTH, HEIGHT), np.uint16))
+
+
+if __name__ == "__main__":
+    unittest.main()
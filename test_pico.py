@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# test_pico.py
+"""Pico link requests against the simulated board: each reply reaches the command that caused it."""
+import threading
+import unittest
+
+from devices.pico import PicoLink
+from devices.synthetic import PicoSimulator
+
+
+class PicoLinkTest(unittest.TestCase):
+    def setUp(self):
+        self.simulator = PicoSimulator(telemetry_hz=50).start()
+        self.addCleanup(self.simulator.stop)
+        self.link = PicoLink(port=self.simulator.port)
+        self.assertTrue(self.link.open())
+        self.addCleanup(self.link.close)
+
+    def test_request(self):
+        self.assertEqual(self.link.request("MOVE 1 45"), ("ACK", "MOVE 1 45"))
+        self.assertEqual(self.link.request("MOVE 1")[0], "ERR")
+
+    def test_concurrent_requests_get_their_own_replies(self):
+        replies = {}
+
+        def move(servo):
+            for angle in range(10, 60, 10):
+                replies[servo, angle] = self.link.request(f"MOVE {servo} {angle}", timeout=5.0)
+
+        threads = [threading.Thread(target=move, args=(servo,)) for servo in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for (servo, angle), reply in replies.items():
+            self.assertEqual(reply, ("ACK", f"MOVE {servo} {angle}"))
+        self.assertEqual(len(replies), 20)
+
+    def test_timeout(self):
+        self.simulator.mute(0.5)
+        self.assertIsNone(self.link.request("MOVE 1 45", timeout=0.1))
+
+
+if __name__ == "__main__":
+    unittest.main()
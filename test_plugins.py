@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# test_plugins.py
+"""Device plugins: discovery from a plugin directory, in-process and isolated hosts, and dead drivers."""
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import textwrap
+import time
+import unittest
+
+import numpy as np
+
+from devices.plugins import DriverError, PluginRegistry, create_driver_host
+from utils.framebus import BusSubscriber, FrameBus
+
+PLUGIN = textwrap.dedent('''
+    import os
+    import time
+
+    import numpy as np
+
+    from devices.plugins import DeviceDriver
+
+
+    class CounterDevice(DeviceDriver):
+        name = "Counter Device"
+        id_prefix = "counter"
+        isolate = True
+
+        @classmethod
+        def detect(cls, settings):
+            if settings.get("hang"):
+                time.sleep(60)
+            return True, f"counter at {settings.get('start', 0)}"
+
+        def open(self):
+            self.count = self.settings.get("start", 0)
+            return (4,), np.uint16
+
+        def read(self, timeout):
+            time.sleep(0.01)
+            self.count += 1
+            return np.full(4, self.count, np.uint16), float(self.count)
+
+        def stats(self):
+            return {"count": self.count, "pid": os.getpid()}
+
+
+    class NotADriver:
+        name = "Ignored"
+''')
+
+
+class PluginTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)  # killed drivers are logged
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.directory = tempfile.mkdtemp(prefix="kozy-plugins-test-")
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        with open(os.path.join(self.directory, "counter_device.py"), "w") as plugin_file:
+            plugin_file.write(PLUGIN)
+        self.registry = PluginRegistry()
+        self.specs = self.registry.discover([self.directory])
+        self.bus = FrameBus(os.path.join(self.directory, "bus.sock"))
+        self.assertTrue(self.bus.start())
+        self.addCleanup(self.bus.stop)
+
+    def host(self, settings=None, isolate=True, call_timeout=5.0):
+        host = create_driver_host(self.specs["Counter Device"], settings, self.bus, "device/counter-1/frame",
+                                  isolate=isolate, call_timeout=call_timeout)
+        if not isolate:
+            host.registry = self.registry
+        self.addCleanup(host.close)
+        return host
+
+    def read_frames(self, count=3):
+        subscriber = BusSubscriber("device/counter-1/frame", self.bus.socket_path)
+        self.addCleanup(subscriber.close)
+        frames = []
+        while len(frames) < count:
+            frame = subscriber.read(timeout=5.0)
+            self.assertIsNotNone(frame)
+            frames.append((frame.timestamp, frame.copy()))
+        return frames
+
+    def test_discovery_reads_metadata_only(self):
+        self.assertEqual(list(self.specs), ["Counter Device"])
+        spec = self.specs["Counter Device"]
+        self.assertEqual((spec.id_prefix, spec.isolate, spec.source), ("counter", True, "file"))
+        self.assertNotIn("Counter Device", self.registry.classes)  # not imported yet
+
+    def round_trip(self, host):
+        self.assertEqual(tuple(host.detect()), (True, "counter at 10"))
+        self.assertEqual(host.open(), ([4], "<u2"))
+        host.start()
+        frames = self.read_frames()
+        for timestamp, data in frames:
+            np.testing.assert_array_equal(data, np.full(4, timestamp, np.uint16))
+        self.assertGreater(frames[0][0], 10)
+        self.assertGreater(host.stats()["count"], 10)
+
+    def test_in_process_round_trip(self):
+        host = self.host({"start": 10}, isolate=False)
+        self.round_trip(host)
+        self.assertEqual(host.stats()["pid"], os.getpid())
+
+    def test_isolated_round_trip(self):
+        host = self.host({"start": 10})
+        self.round_trip(host)
+        stats = host.stats()
+        self.assertTrue(stats["isolated"])
+        self.assertNotEqual(stats["pid"], os.getpid())
+        host.close()
+        self.assertFalse(host.alive())
+
+    def test_killed_driver_is_reported(self):
+        host = self.host()
+        host.open()
+        host.start()
+        os.kill(host.process.pid, signal.SIGKILL)
+        host.process.wait(5.0)
+        start = time.monotonic()
+        with self.assertRaisesRegex(DriverError, "driver process exited"):
+            host.call("stats")
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(host.exit_code, -signal.SIGKILL)
+        self.assertEqual(tuple(host.detect()), (True, "counter at 0"))  # the next call starts a fresh child
+
+    def test_hung_call_is_reported(self):
+        host = self.host({"hang": True}, call_timeout=0.5)
+        start = time.monotonic()
+        with self.assertRaisesRegex(DriverError, r"detect\(\) did not answer within 0.5 s"):
+            host.detect()
+        self.assertLess(time.monotonic() - start, 3.0)
+        self.assertFalse(host.alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# test_preview.py
+"""MJPEG preview server on localhost, fed by the synthetic camera."""
+import json
+import logging
+import socket
+import time
+import unittest
+import urllib.request
+
+from devices.synthetic import SyntheticCapture
+from utils.preview import BOUNDARY, PreviewServer
+
+
+class MjpegReader:
+    """Minimal multipart/x-mixed-replace client over a raw socket."""
+
+    def __init__(self, port, path="/color.mjpg", receive_buffer=None):
+        self.socket = socket.socket()
+        if receive_buffer:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.socket.settimeout(5.0)
+        self.socket.connect(("127.0.0.1", port))
+        self.socket.sendall(f"GET {path} HTTP/1.0\r\n\r\n".encode("ascii"))
+        self.file = self.socket.makefile("rb")
+
+    def headers(self):
+        headers = {}
+        while True:
+            line = self.file.readline().decode("latin-1").strip()
+            if not line:
+                return headers
+            name, _, value = line.partition(":")
+            headers[name.lower()] = value.strip()
+
+    def status(self):
+        status = self.file.readline().decode("latin-1").split()[1]
+        return int(status), self.headers()
+
+    def frame(self):
+        """(seq, jpeg bytes) of the next part, or None at the end of the stream."""
+        line = self.file.readline()
+        if not line:
+            return None
+        assert line == f"--{BOUNDARY}\r\n".encode("ascii"), line
+        headers = self.headers()
+        assert headers["content-type"] == "image/jpeg"
+        jpeg = self.file.read(int(headers["content-length"]))
+        assert self.file.read(2) == b"\r\n"
+        return int(headers["x-frame-seq"]), jpeg
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+class PreviewServerTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.capture = SyntheticCapture()
+        self.capture.start(320, 240, 30)
+        self.addCleanup(self.capture.stop)
+        self.server = PreviewServer(self.capture.read, port=0, fps=10, workers=1).start()
+        self.addCleanup(self.server.stop)
+
+    def reader(self, **options):
+        reader = MjpegReader(self.server.port, **options)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_mjpeg_stream(self):
+        reader = self.reader()
+        status, headers = reader.status()
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        seqs = []
+        for _ in range(3):
+            seq, jpeg = reader.frame()
+            self.assertEqual(jpeg[:2], b"\xff\xd8")  # JPEG start and end markers
+            self.assertEqual(jpeg[-2:], b"\xff\xd9")
+            seqs.append(seq)
+        self.assertEqual(seqs, sorted(set(seqs)))
+
+    def test_snapshot_and_stats(self):
+        with urllib.request.urlopen(f"{self.server.url}depth.jpg", timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], "image/jpeg")
+            self.assertEqual(response.read()[:2], b"\xff\xd8")
+        with urllib.request.urlopen(f"{self.server.url}stats", timeout=5) as response:
+            self.assertEqual(json.load(response)["clients"], [])
+
+    def test_slow_client_does_not_hold_up_others(self):
+        slow = self.reader(receive_buffer=4096)
+        self.assertEqual(slow.status()[0], 200)  # then never reads again
+        fast = self.reader()
+        fast.status()
+        received = 0
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline:
+            self.assertIsNotNone(fast.frame())
+            received += 1
+            clients = sorted(self.server.stats()["clients"], key=lambda client: client["dropped"])
+            if clients[-1]["dropped"] >= 3 and received >= 20:
+                break
+        self.assertGreaterEqual(received, 20)
+        self.assertEqual(clients[0]["dropped"], 0)
+        self.assertGreaterEqual(clients[-1]["dropped"], 3)
+        self.assertGreater(clients[-1]["level"], 0)  # the slow one stepped down to cheaper frames
+
+    def test_stop_releases_the_port(self):
+        reader = self.reader()
+        reader.status()
+        self.assertIsNotNone(reader.frame())
+        port = self.server.port
+        self.server.stop()
+        while reader.frame() is not None:  # the stream ends instead of hanging
+            pass
+        with socket.socket() as probe:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe.bind(("127.0.0.1", port))
+        again = PreviewServer(self.capture.read, port=port).start()
+        again.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# test_startup.py
+"""The GUI import must leave numpy and the device libraries to lazy loading."""
+import unittest
+
+from tools.startup_report import eager_imports
+
+
+class StartupImportTest(unittest.TestCase):
+    def test_main_window_import_loads_no_heavy_modules(self):
+        self.assertEqual(eager_imports("gui.main_window"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
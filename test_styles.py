@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# test_styles.py
+"""Theme stylesheets: every palette fills the template, unknown themes fall back to the default."""
+import os
+import re
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtWidgets import QApplication, QLabel
+
+from gui.styles import DEFAULT_THEME, PALETTES, STYLESHEET_TEMPLATE, get_stylesheet, set_style_state, theme_names
+
+
+class StylesTest(unittest.TestCase):
+    def test_palettes_fill_the_template(self):
+        placeholders = {match[1] or match[2] for match in STYLESHEET_TEMPLATE.pattern.findall(
+            STYLESHEET_TEMPLATE.template)}
+        self.assertIn(DEFAULT_THEME, theme_names())
+        for name in theme_names():
+            with self.subTest(theme=name):
+                self.assertLessEqual(placeholders, set(PALETTES[name]))
+                self.assertEqual(set(PALETTES[name]), set(PALETTES[DEFAULT_THEME]))
+                stylesheet = get_stylesheet(name)
+                self.assertNotIn("$", stylesheet)
+                self.assertIn(f"background-color: {PALETTES[name]['bg']};", stylesheet)
+
+    def test_colors_are_hex(self):
+        for name, palette in PALETTES.items():
+            for key, value in palette.items():
+                with self.subTest(theme=name, key=key):
+                    self.assertRegex(value, re.compile(r"^#[0-9a-f]{6}$"))
+
+    def test_unknown_theme_falls_back_to_default(self):
+        self.assertEqual(get_stylesheet("no-such-theme"), get_stylesheet(DEFAULT_THEME))
+        self.assertIs(get_stylesheet("dark"), get_stylesheet("dark"))  # built once per theme
+        self.assertNotEqual(get_stylesheet("dark"), get_stylesheet("light"))
+
+    def test_style_state(self):
+        app = QApplication.instance() or QApplication([])
+        app.setStyleSheet(get_stylesheet(DEFAULT_THEME))
+        label = QLabel("status")
+        self.assertTrue(set_style_state(label, "status", "error"))
+        self.assertEqual(label.property("status"), "error")
+        self.assertFalse(set_style_state(label, "status", "error"))  # unchanged: no repolish
+        self.assertTrue(set_style_state(label, "status", "warning"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# test_trajectory.py
+"""Trajectory planner limits, and streaming plans to the simulated Pico's queue."""
+import logging
+import time
+import unittest
+
+import numpy as np
+
+from devices.pico import PicoLink
+from devices.synthetic import PicoSimulator
+from devices.trajectory import PROFILES, TrajectoryStreamer, min_jerk, parse_buffer_report, plan
+
+RATE = 100.0
+
+
+def limits(path, start):
+    """Peak |velocity| and |acceleration| of a sampled path, by finite differences."""
+    angles = np.vstack([start, path])
+    velocity = np.diff(angles, axis=0) * RATE
+    acceleration = np.diff(np.vstack([np.zeros(angles.shape[1]), velocity]), axis=0) * RATE
+    return np.abs(velocity).max(), np.abs(acceleration).max()
+
+
+class PlannerTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.waypoints = rng.uniform(0, 180, (12, 6))
+
+    def test_limits_are_respected(self):
+        for profile in PROFILES:
+            for max_velocity, max_acceleration in [(90.0, 360.0), (30.0, 1000.0), (500.0, 100.0)]:
+                with self.subTest(profile=profile, velocity=max_velocity, acceleration=max_acceleration):
+                    path = plan(self.waypoints, RATE, profile, max_velocity, max_acceleration)
+                    velocity, acceleration = limits(path, self.waypoints[0])
+                    self.assertLessEqual(velocity, max_velocity * 1.01)
+                    self.assertLessEqual(acceleration, max_acceleration * 1.01)
+
+    def test_limits_are_reached(self):
+        # One long move: a shortest-time plan runs at the binding limit
+        waypoints = [[0.0, 0.0], [180.0, 90.0]]
+        velocity, _ = limits(plan(waypoints, RATE, "trapezoid", 90.0, 360.0), waypoints[0])
+        self.assertGreater(velocity, 90.0 * 0.98)
+        velocity, _ = limits(plan(waypoints, RATE, "minjerk", 90.0, 360.0), waypoints[0])
+        self.assertGreater(velocity, 90.0 * 0.98)
+
+    def test_passes_through_every_waypoint(self):
+        for profile in PROFILES:
+            with self.subTest(profile=profile):
+                path = plan(self.waypoints, RATE, profile)
+                for waypoint in self.waypoints[1:]:
+                    self.assertLess(np.abs(path - waypoint).max(axis=1).min(), 1e-6)
+                np.testing.assert_allclose(path[-1], self.waypoints[-1])
+
+    def test_durations_stretch_segments(self):
+        waypoints = [[0.0], [10.0], [20.0]]
+        self.assertEqual(len(plan(waypoints, RATE, durations=[2.0, 0.0])), 200 + len(plan(waypoints[1:], RATE)))
+        path = plan(waypoints, RATE, durations=[0.5, 0.5])
+        self.assertEqual(len(path), 100)
+        np.testing.assert_allclose(path[49], [10.0])
+
+    def test_standing_still(self):
+        path = plan([[45.0, 90.0], [45.0, 90.0]], RATE)
+        np.testing.assert_allclose(path, [[45.0, 90.0]])
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            plan([[0.0], [10.0]], profile="cubic")
+        with self.assertRaises(ValueError):
+            plan([[0.0]])
+
+    def test_min_jerk_and_reports(self):
+        self.assertEqual((min_jerk(0.0), min_jerk(0.5), min_jerk(1.0)), (0.0, 0.5, 1.0))
+        self.assertEqual(parse_buffer_report("3 play 120 256 800 0 1500"),
+                         {"id": 3, "state": "play", "queued": 120, "capacity": 256, "executed": 800,
+                          "underruns": 0, "late_us": 1500})
+
+
+class StreamerTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.simulator = PicoSimulator(telemetry_hz=0).start()
+        self.addCleanup(self.simulator.stop)
+        self.link = PicoLink(port=self.simulator.port)
+        self.assertTrue(self.link.open())
+        self.addCleanup(self.link.close)
+
+    def stream(self, positions, **options):
+        streamer = TrajectoryStreamer(self.link, [0, 1], positions, RATE, capacity=64, **options).start()
+        self.addCleanup(streamer.cancel)
+        return streamer
+
+    def wait_running(self, streamer, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while (streamer.report or {}).get("state") != "run":
+            self.assertLess(time.monotonic(), deadline, "playback did not start")
+            time.sleep(0.01)
+
+    def test_plan_is_played_completely(self):
+        positions = plan([[0.0, 90.0], [60.0, 45.0], [30.0, 120.0], [90.0, 90.0]], RATE, "minjerk", 360.0, 2000.0)
+        streamer = self.stream(positions)
+        self.assertTrue(streamer.wait(len(positions) / RATE + 5.0))
+        self.assertIsNone(streamer.error)
+        self.assertEqual(streamer.report["state"], "done")
+        self.assertEqual(streamer.report["executed"], len(positions))
+        self.assertEqual(streamer.report["underruns"], 0)
+        self.assertEqual(streamer.sent, len(positions))
+        self.assertEqual(self.simulator.trajectory.state, "done")
+
+    def test_stalled_link_underruns(self):
+        positions = np.linspace([0.0, 0.0], [90.0, 180.0], 300)
+        streamer = self.stream(positions)
+        self.wait_running(streamer)
+        time.sleep(0.2)
+        lag_before = streamer.max_timing_error()
+        self.simulator.stall_link(1.0)  # longer than the 0.64 s a full queue lasts
+        self.assertTrue(streamer.wait(10.0))
+        self.assertIsNone(streamer.error)
+        self.assertGreater(streamer.report["underruns"], 0)
+        self.assertGreater(streamer.max_timing_error(), lag_before + 0.1)
+        self.assertEqual(streamer.report["executed"], len(positions))
+
+    def test_cancel_aborts_playback(self):
+        streamer = self.stream(np.linspace([0.0, 0.0], [90.0, 180.0], 500))
+        self.wait_running(streamer)
+        streamer.cancel()
+        self.assertTrue(streamer.wait(2.0))
+        self.assertEqual(streamer.error, "cancelled")
+        deadline = time.monotonic() + 1.0
+        while self.simulator.trajectory.state != "idle" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn("TRAJ ABORT", self.simulator.commands)
+        self.assertEqual(self.simulator.trajectory.state, "idle")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# test_watchdog.py
+"""Device watchdog: stalls, restarts with backoff, and recovery, on an injected clock."""
+import logging
+import time
+import unittest
+
+from utils.watchdog import DEFAULT_BACKOFF, MAX_BACKOFF, Watchdog
+
+
+class FakeDevice:
+    def __init__(self):
+        self.counter = 0
+        self.restarts = 0
+        self.probes = 0
+        self.link_up = True
+
+    def progress(self):
+        return self.counter
+
+    def restart(self):
+        self.restarts += 1
+
+    def probe(self):
+        self.probes += 1
+
+
+class WatchdogTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)  # stalls and restarts are logged as warnings
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.device = FakeDevice()
+        self.watchdog = Watchdog()
+        self.health = self.watchdog.watch("cam", self.device.progress, self.device.restart, deadline=2.0,
+                                          alive=lambda: self.device.link_up, restart_grace=5.0)
+        self.start = time.monotonic()  # DeviceHealth starts its clock at creation
+        self.watchdog.check(self.start)  # first reading starts the clock
+
+    def at(self, seconds):
+        return self.watchdog.check(self.start + seconds)
+
+    def test_progress_keeps_device_healthy(self):
+        for second in range(1, 10):
+            self.device.counter += 1
+            self.assertEqual(self.at(second), [])
+        self.assertEqual(self.health.state, "healthy")
+        self.assertEqual(self.device.restarts, 0)
+
+    def test_stall_restarts_after_deadline(self):
+        self.assertEqual(self.at(1.9), [])
+        self.assertEqual(self.at(2.1), ["cam"])
+        self.assertEqual((self.health.state, self.health.stalls, self.device.restarts), ("restarting", 1, 1))
+        self.assertTrue(self.health.last_reason.startswith("no progress"))
+
+    def test_failed_restarts_back_off(self):
+        self.at(2.1)  # stall and first restart
+        now, backoff, attempts = 2.1, DEFAULT_BACKOFF, []
+        for _ in range(8):
+            now += 5.0 + 0.01  # restart grace passes without progress
+            self.assertEqual(self.at(now), [])
+            self.assertEqual(self.health.state, "stalled")
+            self.assertEqual(self.at(now + backoff - 0.02), [])  # still waiting
+            now += backoff
+            self.assertEqual(self.at(now), ["cam"])
+            attempts.append(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+        self.assertEqual(attempts, [1, 2, 4, 8, 16, 30, 30, 30])
+        self.assertEqual(self.device.restarts, 9)
+        self.assertEqual(self.health.stalls, 1)
+
+    def test_recovery_records_downtime_and_resets_backoff(self):
+        self.at(2.1)
+        self.at(7.2)  # restart failed; backoff doubles
+        self.at(8.3)  # second restart
+        self.device.counter = 5
+        self.at(9.0)  # first reading after a restart only starts the clock
+        self.assertEqual(self.health.state, "restarting")
+        self.device.counter = 6
+        self.at(9.5)
+        self.assertEqual((self.health.state, self.health.recoveries), ("healthy", 1))
+        self.assertAlmostEqual(self.health.last_downtime, 9.5 - 2.1)
+        self.assertEqual(self.health.backoff, DEFAULT_BACKOFF)
+        self.assertEqual(self.health.metrics(self.start + 9.5)["downtime_s"], self.health.downtime)
+
+    def test_lost_link_restarts_at_once(self):
+        self.device.link_up = False
+        self.assertEqual(self.at(0.1), ["cam"])
+        self.assertEqual(self.health.last_reason, "link lost")
+
+    def test_quiet_device_is_probed_once_before_the_deadline(self):
+        self.health.probe = self.device.probe
+        self.at(0.9)
+        self.assertEqual(self.device.probes, 0)
+        self.at(1.1)
+        self.at(1.5)
+        self.assertEqual(self.device.probes, 1)
+        self.device.counter += 1  # the probe got an answer
+        self.at(1.8)
+        self.at(3.0)
+        self.assertEqual(self.device.probes, 2)
+        self.assertEqual(self.device.restarts, 0)
+
+    def test_error_burst_restarts(self):
+        self.health.max_errors = 3
+        for _ in range(3):
+            self.watchdog.error("cam", "frame timeout")
+        self.assertEqual(self.watchdog.check(time.monotonic()), ["cam"])
+        self.assertIn("errors", self.health.last_reason)
+
+    def test_rewatch_keeps_counters(self):
+        self.at(2.1)
+        health = self.watchdog.watch("cam", self.device.progress, self.device.restart, deadline=2.0)
+        self.assertIsNot(health, self.health)
+        self.assertEqual((health.stalls, health.restarts, health.state), (1, 1, "restarting"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+# tools/analyze.py
+"""Offline statistics for a recorded session, computed on all cores.
+
+    python -m tools.analyze recordings/20261019-101500
+    python -m tools.analyze recordings/20261019-101500 --workers 8 --json report.json --csv frames.csv
+    python -m tools.analyze recordings/20261019-101500 --grid 4x4 --chunk-frames 600
+
+Reports, per stream, frame drops and timestamp gaps; for depth, the fill rate
+(pixels with depth) and distance distributions per region of a grid; and how
+well IMU samples and Pico telemetry line up with the depth frames.
+
+Depth is split into chunks of frames that start on key frames, so each chunk
+decodes on its own. Chunks run in a process pool; every worker maps the
+recording itself, so frames are never copied between processes and only
+small histograms come back. The statistics are the same functions the live
+`cam status` uses (devices/realsense.py), and histograms add up, so merging
+the chunks gives exactly the single-process result.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from devices.realsense import DISTANCE_BIN_WIDTH, DISTANCE_BINS, depth_region_histograms, summarize_distance_histogram
+from utils.depthcodec import FLAG_TEMPORAL
+from utils.recording import CodedFrames, open_recording
+
+IMU_STREAMS = ("accel", "gyro")
+LOW_FILL = 0.5  # frames with less depth than this are counted as low-fill
+
+_worker = {}  # per worker process: the opened recording and the analysis parameters
+
+
+def frame_timing(timestamps):
+    """Rate, drops and gaps of one stream from its timestamps (seconds)."""
+    count = len(timestamps)
+    timing = {"frames": count, "duration_s": 0.0, "fps": 0.0, "gaps": 0, "dropped_estimate": 0,
+              "max_gap_ms": 0.0, "backwards": 0}
+    if count < 2:
+        return timing
+    intervals = np.diff(timestamps)
+    nominal = float(np.median(intervals))
+    timing["duration_s"] = float(timestamps[-1] - timestamps[0])
+    timing["fps"] = 1.0 / nominal if nominal > 0 else 0.0
+    timing["backwards"] = int((intervals <= 0).sum())
+    timing["max_gap_ms"] = float(intervals.max() * 1000)
+    if nominal > 0:
+        # A gap of k nominal intervals means k - 1 frames never made it into the recording
+        gaps = intervals[intervals > 1.5 * nominal]
+        timing["gaps"] = len(gaps)
+        timing["dropped_estimate"] = int(np.rint(gaps / nominal).sum() - len(gaps))
+    return timing
+
+
+def alignment(frame_times, sample_times):
+    """How closely samples of another stream bracket each frame timestamp."""
+    result = {"samples": len(sample_times), "covered": 0.0, "nearest_ms": None, "bracket_ms": None}
+    if not len(frame_times) or len(sample_times) < 2:
+        return result
+    position = np.searchsorted(sample_times, frame_times)
+    after = sample_times[np.minimum(position, len(sample_times) - 1)]
+    before = sample_times[np.maximum(position - 1, 0)]
+    nearest = np.minimum(np.abs(frame_times - before), np.abs(after - frame_times)) * 1000
+    # Frames with samples on both sides can be interpolated
+    covered = (position > 0) & (position < len(sample_times))
+    bracket = (after - before)[covered] * 1000
+    result["covered"] = float(covered.mean())
+    result["nearest_ms"] = _distribution(nearest)
+    result["bracket_ms"] = _distribution(bracket) if len(bracket) else None
+    return result
+
+
+def clock_fit(device_times, host_times):
+    """Linear fit of host arrival time against the device's own clock, and its residual."""
+    valid = np.isfinite(device_times)
+    if valid.sum() < 3:
+        return None
+    device, host = device_times[valid], host_times[valid]
+    slope, offset = np.polyfit(device - device[0], host, 1)
+    residual = (host - (offset + slope * (device - device[0]))) * 1000
+    return {"host_seconds_per_tick": float(slope), "residual_ms": _distribution(np.abs(residual))}
+
+
+def _distribution(values):
+    return {"mean": float(values.mean()), "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+
+
+def depth_chunks(frames, chunk_frames):
+    """[(start, end)] covering the stream; encoded streams are cut at key frames only."""
+    count = len(frames)
+    if isinstance(frames, CodedFrames):
+        starts = np.flatnonzero((frames.index["flags"] & FLAG_TEMPORAL) == 0)
+        if not len(starts) or starts[0] != 0:
+            starts = np.concatenate([[0], starts])
+    else:
+        starts = np.arange(count)
+    cuts = [0]
+    for target in range(chunk_frames, count, chunk_frames):
+        cut = int(starts[np.searchsorted(starts, target)]) if target <= starts[-1] else count
+        if cut > cuts[-1] and cut < count:
+            cuts.append(cut)
+    cuts.append(count)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _init_worker(path, stream, depth_scale, grid):
+    _worker.update(frames=open_recording(path)[stream][0], depth_scale=depth_scale, grid=grid)
+
+
+def _analyze_chunk(start, end):
+    """Worker: histograms summed over frames [start, end) and per-frame fill and mean distance."""
+    frames, depth_scale, grid = _worker["frames"], _worker["depth_scale"], _worker["grid"]
+    histograms = np.zeros((*grid, DISTANCE_BINS + 1), np.int64)
+    fill = np.empty(end - start, np.float32)
+    mean = np.full(end - start, np.nan, np.float32)
+    centers = (np.arange(DISTANCE_BINS) + 0.5) * DISTANCE_BIN_WIDTH
+    for position in range(start, end):
+        frame_histograms = depth_region_histograms(frames[position], depth_scale, grid)
+        histograms += frame_histograms
+        whole = frame_histograms.sum(axis=(0, 1))
+        valid = whole[1:].sum()
+        fill[position - start] = valid / whole.sum()
+        if valid:
+            mean[position - start] = whole[1:] @ centers / valid
+    return start, histograms, fill, mean
+
+
+def analyze(path, workers=None, chunk_frames=300, grid=(3, 3), depth_stream="depth", progress=None):
+    """Analyze a recording; returns (report dict, per-frame rows for CSV)."""
+    started = time.perf_counter()
+    with open(os.path.join(path, "meta.json"), "r") as meta_file:
+        meta = json.load(meta_file)
+    streams = open_recording(path)
+    if depth_stream not in streams:
+        raise ValueError(f"{path} has no '{depth_stream}' stream; streams: {', '.join(streams)}")
+    depth_frames, depth_index = streams[depth_stream]
+    depth_times = depth_index["timestamp"]
+    depth_scale = (meta.get("camera") or {}).get("depth_scale") or 0.001
+    workers = workers or os.cpu_count() or 1
+    chunks = depth_chunks(depth_frames, chunk_frames)
+
+    report = {"recording": os.path.abspath(path), "workers": workers, "chunks": len(chunks),
+              "depth_scale": depth_scale, "grid": list(grid), "streams": {}}
+    for name, (frames, index) in streams.items():
+        report["streams"][name] = frame_timing(index["timestamp"])
+    if "color" in streams and depth_stream != "color":
+        # Every color frame was recorded with a depth frame; missing ones were dropped by the encoder
+        report["streams"][depth_stream]["missing_vs_color"] = max(0, len(streams["color"][1]) - len(depth_times))
+
+    results = []
+    done_frames = 0
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(path, depth_stream, depth_scale, grid)
+        for start, end in chunks:
+            results.append(_analyze_chunk(start, end))
+            done_frames += end - start
+            if progress:
+                progress(done_frames, len(depth_frames))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(path, depth_stream, depth_scale, grid)) as pool:
+            futures = {pool.submit(_analyze_chunk, start, end): end - start for start, end in chunks}
+            for future in as_completed(futures):
+                results.append(future.result())
+                done_frames += futures[future]
+                if progress:
+                    progress(done_frames, len(depth_frames))
+    results.sort(key=lambda result: result[0])
+
+    histograms = np.zeros((*grid, DISTANCE_BINS + 1), np.int64)
+    for _, chunk_histograms, _, _ in results:
+        histograms += chunk_histograms
+    fill = np.concatenate([result[2] for result in results]) if results else np.empty(0, np.float32)
+    mean = np.concatenate([result[3] for result in results]) if results else np.empty(0, np.float32)
+    depth = {"frames": len(fill), "overall": summarize_distance_histogram(histograms.sum(axis=(0, 1))),
+             "fill": None, "regions": []}
+    if len(fill):
+        depth["fill"] = {"mean": float(fill.mean()), "min": float(fill.min()),
+                         "p5": float(np.percentile(fill, 5)), "low_fill_frames": int((fill < LOW_FILL).sum())}
+    for row in range(grid[0]):
+        for col in range(grid[1]):
+            depth["regions"].append({"row": row, "col": col, **summarize_distance_histogram(histograms[row, col])})
+    report["depth"] = depth
+
+    for name in IMU_STREAMS:
+        if name in streams:
+            report.setdefault("imu", {})[name] = alignment(depth_times, streams[name][1]["timestamp"])
+    if "telemetry" in streams:
+        telemetry, telemetry_index = streams["telemetry"]
+        report["telemetry"] = alignment(depth_times, telemetry_index["timestamp"])
+        report["telemetry"]["clock"] = clock_fit(np.asarray(telemetry[:, 0], np.float64),
+                                                 telemetry_index["timestamp"])
+
+    seconds = time.perf_counter() - started
+    report["seconds"] = seconds
+    report["frames_per_s"] = len(fill) / seconds if seconds else 0.0
+
+    intervals = np.concatenate([[np.nan], np.diff(depth_times)]) * 1000
+    rows = [{"frame": position, "timestamp": float(depth_times[position]),
+             "interval_ms": float(intervals[position]), "fill": float(fill[position]),
+             "mean_m": float(mean[position])} for position in range(len(fill))]
+    return report, rows
+
+
+def print_report(report):
+    print(f"{report['recording']}: {report['depth']['frames']} depth frames in {report['seconds']:.1f} s "
+          f"({report['frames_per_s']:.0f} frames/s, {report['workers']} workers, {report['chunks']} chunks)")
+    for name, timing in report["streams"].items():
+        line = (f"  {name:<10} {timing['frames']:>8} frames  {timing['fps']:7.1f}/s  {timing['gaps']} gaps, "
+                f"~{timing['dropped_estimate']} dropped, max gap {timing['max_gap_ms']:.1f} ms")
+        if timing.get("backwards"):
+            line += f", {timing['backwards']} out of order"
+        if timing.get("missing_vs_color"):
+            line += f", {timing['missing_vs_color']} fewer than color"
+        print(line)
+    depth = report["depth"]
+    if depth["fill"]:
+        fill = depth["fill"]
+        print(f"  depth fill mean {fill['mean']:.1%}, min {fill['min']:.1%}, p5 {fill['p5']:.1%}, "
+              f"{fill['low_fill_frames']} frames below {LOW_FILL:.0%}")
+    print("  region       fill    mean     p5    p50    p95 (m)")
+    for region in depth["regions"]:
+        distances = [region[key] for key in ("mean_m", "p5_m", "p50_m", "p95_m")]
+        print(f"  r{region['row']}c{region['col']}       {region['fill']:6.1%} " +
+              " ".join("     -" if value is None else f"{value:6.2f}" for value in distances))
+    aligned = dict(report.get("imu", {}))
+    if "telemetry" in report:
+        aligned["telemetry"] = report["telemetry"]
+    for name, result in aligned.items():
+        if result["nearest_ms"] is None:
+            print(f"  {name}: {result['samples']} samples, too few to align")
+            continue
+        line = (f"  {name}: {result['covered']:.1%} of frames bracketed, nearest sample mean "
+                f"{result['nearest_ms']['mean']:.2f} ms, max {result['nearest_ms']['max']:.2f} ms")
+        clock = result.get("clock")
+        if clock:
+            line += f"; clock fit residual p99 {clock['residual_ms']['p99']:.2f} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel statistics for a recorded RGB-D session")
+    parser.add_argument("recording", help="recording directory (with meta.json)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-frames", type=int, default=300, help="depth frames per chunk of work")
+    parser.add_argument("--grid", default="3x3", help="regions for distance statistics, ROWSxCOLS")
+    parser.add_argument("--depth-stream", default="depth")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--csv", help="write per-frame depth statistics to this file")
+    args = parser.parse_args()
+    try:
+        grid = tuple(int(value) for value in args.grid.lower().split("x"))
+        if len(grid) != 2 or min(grid) < 1:
+            raise ValueError
+    except ValueError:
+        parser.error(f"--grid must look like 3x3, not {args.grid}")
+
+    def progress(done, total):
+        print(f"\r{done}/{total} frames", end="", file=sys.stderr, flush=True)
+
+    report, rows = analyze(args.recording, args.workers, args.chunk_frames, grid, args.depth_stream,
+                           progress if sys.stderr.isatty() else None)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+    if args.csv:
+        with open(args.csv, "w", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=["frame", "timestamp", "interval_ms", "fill", "mean_m"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+# tools/bench.py
+"""Benchmarks for the hot paths, on synthetic data (no camera or Pico needed).
+
+    python -m tools.bench                          # run everything, write bench_results.json
+    python -m tools.bench -k depth                 # only benchmarks whose name contains "depth"
+    python -m tools.bench --save-baseline base.json
+    python -m tools.bench --baseline base.json --threshold 0.15
+
+With --baseline, any benchmark more than `threshold` slower than the baseline
+is reported and the exit code is 1.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from devices.synthetic import synthetic_color, synthetic_depth
+
+# Depth modes of D400-series cameras that are common in practice
+BENCH_RESOLUTIONS = [(424, 240), (640, 360), (640, 480), (848, 480), (1280, 720)]
+
+_benchmarks = []
+
+
+def benchmark(name, units_per_call=1, unit="ops", size_bytes=0):
+    """Register `setup() -> callable`; the callable is what gets timed."""
+    def decorator(setup):
+        _benchmarks.append({"name": name, "setup": setup, "units": units_per_call,
+                            "unit": unit, "bytes": size_bytes})
+        return setup
+    return decorator
+
+
+def time_call(function, min_time=0.2, repeats=5):
+    """Median seconds per call over `repeats` batches of at least `min_time` each."""
+    function()  # warm up caches and lazy imports
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples), min(samples)
+
+
+def _register_depth_benchmarks():
+    from devices.realsense import normalize_depth_for_display, colorize_depth, depth_region_histograms
+    for width, height in BENCH_RESOLUTIONS:
+        pixels = width * height
+
+        @benchmark(f"depth.normalize.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_normalize(width=width, height=height):
+            depth = synthetic_depth(width, height)
+            return lambda: normalize_depth_for_display(depth)
+
+        @benchmark(f"depth.colorize.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_colorize(width=width, height=height):
+            depth = synthetic_depth(width, height)
+            return lambda: colorize_depth(depth)
+
+        @benchmark(f"depth.region_histograms.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_histograms(width=width, height=height):
+            depth = synthetic_depth(width, height)
+            return lambda: depth_region_histograms(depth)
+
+
+def _register_occupancy_benchmarks():
+    from utils.occupancy import OccupancyGrid, default_intrinsics
+    for width, height in BENCH_RESOLUTIONS:
+        pixels = width * height
+        for stride in (1, 2):
+
+            @benchmark(f"occupancy.update.{width}x{height}.stride{stride}", pixels, "px", pixels * 2)
+            def setup_occupancy(width=width, height=height, stride=stride):
+                depth = synthetic_depth(width, height)
+                grid = OccupancyGrid(width, height, default_intrinsics(width, height), stride=stride)
+                return lambda: grid.update(depth)
+
+
+def _register_change_benchmarks():
+    from devices.realsense import CapturedFrames
+    from utils.changedetect import ChangeDetector
+    for width, height in BENCH_RESOLUTIONS:
+        pixels = width * height
+
+        @benchmark(f"change.detect.{width}x{height}", pixels, "px", pixels * 5)
+        def setup_change(width=width, height=height):
+            frames = CapturedFrames(synthetic_color(width, height), synthetic_depth(width, height))
+            detector = ChangeDetector()
+            detector.update(frames)  # sets the reference; later frames are compared with it
+
+            def detect():
+                frames.seq += 1
+                detector.update(frames)
+            return detect
+
+
+def _register_depth_codec_benchmarks():
+    from utils.depthcodec import encode_depth, decode_depth
+    for width, height in ((848, 480), (1280, 720)):
+        pixels = width * height
+
+        @benchmark(f"depthcodec.encode.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_encode(width=width, height=height):
+            depth = synthetic_depth(width, height)
+            return lambda: encode_depth(depth)
+
+        @benchmark(f"depthcodec.encode_temporal.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_encode_temporal(width=width, height=height):
+            previous, depth = synthetic_depth(width, height, seed=1), synthetic_depth(width, height, seed=2)
+            return lambda: encode_depth(depth, previous)
+
+        @benchmark(f"depthcodec.decode.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_decode(width=width, height=height):
+            data = encode_depth(synthetic_depth(width, height))
+            return lambda: decode_depth(data)
+
+
+def _register_imu_benchmarks():
+    from devices.imu import ImuStore
+
+    def filled_store():
+        store = ImuStore()
+        for index in range(store.rings["gyro"].capacity + 100):
+            store.write("gyro", index * 0.0025, 0.1, 0.2, 0.3, index)
+        return store
+
+    @benchmark("imu.write", 1, "samples")
+    def setup_imu_write():
+        store = ImuStore()
+        clock = iter(range(1, 1 << 62))
+        return lambda: store.write("gyro", next(clock) * 0.0025, 0.1, 0.2, 0.3)
+
+    @benchmark("imu.interpolate", 1, "lookups")
+    def setup_imu_interpolate():
+        store = filled_store()
+        return lambda: store.interpolate("gyro", 15.00123)
+
+    @benchmark("imu.interpolate_many.30", 30, "lookups")
+    def setup_imu_interpolate_many():
+        store = filled_store()
+        timestamps = [15.0 + index / 30 for index in range(30)]
+        return lambda: store.interpolate_many("gyro", timestamps)
+
+
+def _qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([sys.argv[0]])
+
+
+def _register_qimage_benchmarks():
+    for width, height in BENCH_RESOLUTIONS:
+        pixels = width * height
+
+        @benchmark(f"qimage.rgb_to_pixmap_scaled.{width}x{height}", pixels, "px", pixels * 3)
+        def setup_rgb(width=width, height=height):
+            from PySide6.QtGui import QImage, QPixmap
+            from PySide6.QtCore import Qt, QSize
+            _qt_app()
+            rgb = synthetic_color(width, height)
+            target = QSize(640, 360)
+
+            def convert():
+                image = QImage(rgb.data, width, height, width * 3, QImage.Format_RGB888)
+                return QPixmap.fromImage(image).scaled(target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            return convert
+
+        @benchmark(f"qimage.depth_to_pixmap_scaled.{width}x{height}", pixels, "px", pixels * 2)
+        def setup_depth(width=width, height=height):
+            from PySide6.QtGui import QImage, QPixmap
+            from PySide6.QtCore import Qt, QSize
+            from devices.realsense import normalize_depth_for_display
+            _qt_app()
+            depth = synthetic_depth(width, height)
+            target = QSize(640, 360)
+
+            def convert():
+                gray = normalize_depth_for_display(depth)
+                image = QImage(gray.data, width, height, width, QImage.Format_Grayscale8)
+                return QPixmap.fromImage(image).scaled(target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            return convert
+
+
+def _register_pico_benchmarks():
+    lines = [f"TEL:t={i},servo={i % 12},pos={i * 7 % 180},cur={i % 900}".encode() for i in range(1000)]
+    stream = b"\n".join(lines) + b"\n"
+    chunk_size = 64  # roughly what a USB CDC read returns at 115200 baud
+
+    @benchmark("pico.parse_lines", len(lines), "lines", len(stream))
+    def setup_parse():
+        from devices.pico import parse_pico_line
+        decoded = [line.decode() for line in lines]
+        return lambda: [parse_pico_line(line) for line in decoded]
+
+    @benchmark("pico.reassemble_and_parse", len(lines), "lines", len(stream))
+    def setup_reassemble():
+        from devices.pico import PicoLineBuffer, parse_pico_line
+        chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+        def run():
+            line_buffer = PicoLineBuffer()
+            for chunk in chunks:
+                for line in line_buffer.feed(chunk):
+                    parse_pico_line(line)
+        return run
+
+
+def _register_trajectory_benchmarks():
+    # 200 waypoints for 6 servos, about 2 minutes of motion at 100 Hz
+    waypoints = [[(segment * 37 + joint * 53) % 180 for joint in range(6)] for segment in range(201)]
+
+    for profile in ("minjerk", "trapezoid"):
+        @benchmark(f"trajectory.plan.{profile}", 200, "segments")
+        def setup_plan(profile=profile):
+            from devices.trajectory import plan
+            return lambda: plan(waypoints, 100.0, profile)
+
+
+def _register_logging_benchmarks():
+    @benchmark("logging.store_handler", 1000, "records")
+    def setup_store_handler():
+        from utils.logger import LogStoreHandler
+        from utils.logstore import LogStore
+        handler = LogStoreHandler(LogStore(capacity=100_000))
+        logger = logging.getLogger("bench.store")
+        logger.propagate = False
+        logger.handlers = [handler]
+        logger.setLevel(logging.INFO)
+
+        def run():
+            for i in range(1000):
+                logger.info("frame %d processed", i)
+        return run
+
+    stores = {}
+
+    def filled_store(count=1_000_000):
+        import random
+        from utils.logstore import LogStore
+        if count in stores:
+            return stores[count]
+        rng = random.Random(0)
+        words = ["frame", "camera", "stream", "pico", "servo", "moved", "timeout", "restarting", "depth", "ok"]
+        levels = ["INFO"] * 90 + ["WARNING"] * 8 + ["ERROR"] * 2
+        sources = ["realsense", "pico", "main_window", "imu", "watchdog", "console"]
+        store = LogStore(capacity=count)
+        for i in range(count):
+            store.append(i * 0.001, rng.choice(levels), rng.choice(sources),
+                         f"{rng.choice(words)} {rng.choice(words)} {i} value={rng.random():.4f}")
+        stores[count] = store
+        return store
+
+    for name, filters in (("level", {"levels": ["ERROR", "CRITICAL"]}),
+                          ("level_source", {"levels": ["WARNING", "ERROR", "CRITICAL"], "sources": ["pico"]}),
+                          ("text", {"text": "timeout restarting"}),
+                          ("text_common", {"text": "camera"})):
+        @benchmark(f"logging.query.{name}.1M", 1, "queries")
+        def setup_query(filters=filters):
+            store = filled_store()
+            return lambda: store.query(**filters)
+
+
+def _register_theme_benchmarks():
+    panel_count = 50
+
+    def build_panels(app):
+        from PySide6.QtWidgets import QWidget, QVBoxLayout
+        from gui.panels import DevicePanel
+        root = QWidget()
+        layout = QVBoxLayout(root)
+        panels = []
+        for i in range(panel_count):
+            panel = DevicePanel(f"Module {i}")
+            panel_layout = QVBoxLayout(panel)
+            panel_layout.addWidget(panel.status_label)
+            layout.addWidget(panel)
+            panels.append(panel)
+        root.show()
+        app.processEvents()
+        return root, panels
+
+    @benchmark(f"theme.switch.{panel_count}_panels", 1, "switches")
+    def setup_switch():
+        from gui.styles import get_stylesheet, theme_names
+        app = _qt_app()
+        root, _ = build_panels(app)
+        themes = theme_names()
+        state = {"index": 0}
+
+        def switch():
+            state["index"] += 1
+            root.setStyleSheet(get_stylesheet(themes[state["index"] % len(themes)]))
+            app.processEvents()
+        switch.root = root
+        return switch
+
+    @benchmark(f"theme.status_update.{panel_count}_panels", panel_count, "updates")
+    def setup_status():
+        from gui.styles import get_stylesheet
+        app = _qt_app()
+        root, panels = build_panels(app)
+        root.setStyleSheet(get_stylesheet("raw_cyber"))
+        levels = ("ok", "warning")
+        state = {"index": 0}
+
+        def update():
+            state["index"] += 1
+            for panel in panels:
+                panel.set_status("Streaming", levels[state["index"] % 2])
+            app.processEvents()
+        update.root = root
+        return update
+
+
+def _register_config_benchmarks():
+    import config
+
+    @benchmark("config.save_load", 1, "round trips")
+    def setup_config():
+        directory = tempfile.mkdtemp(prefix="kozy-bench-")
+        config.CONFIG_FILE = os.path.join(directory, "config.json")
+
+        def run():
+            config.write_json_atomic(config.CONFIG_FILE, {"resolution": "1280x720", "fps": 30})
+            config.load_config()
+        return run
+
+    @benchmark("config.session_save_load", 1, "round trips")
+    def setup_session():
+        directory = tempfile.mkdtemp(prefix="kozy-bench-")
+        path = os.path.join(directory, "session.json")
+        session = {
+            "theme": "raw_cyber",
+            "graph": None,
+            "modules": [{"type": "Servo Drives", "enabled": True, "settings": {"initialized": True}}] * 50,
+        }
+
+        def run():
+            config.save_session(session, path)
+            config.load_session(path)
+        return run
+
+
+def machine_info():
+    info = {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "cpu_model": platform.processor(),
+    }
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    info["cpu_model"] = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    try:
+        import PySide6
+        info["pyside6"] = PySide6.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(pattern=None, min_time=0.2, repeats=5):
+    results = {}
+    for entry in _benchmarks:
+        if pattern and pattern not in entry["name"]:
+            continue
+        try:
+            function = entry["setup"]()
+            median, best = time_call(function, min_time, repeats)
+        except ImportError as e:
+            print(f"  skip  {entry['name']}: {e}")
+            continue
+        result = {
+            "seconds": median,
+            "best_seconds": best,
+            "throughput": entry["units"] / median,
+            "unit": f"{entry['unit']}/s",
+        }
+        if entry["bytes"]:
+            result["mb_per_s"] = entry["bytes"] / median / 1e6
+        results[entry["name"]] = result
+        rate = f"  {result['mb_per_s']:9.1f} MB/s" if "mb_per_s" in result else ""
+        print(f"  {median * 1000:9.3f} ms  {result['throughput']:14,.0f} {result['unit']:<14}{rate}  {entry['name']}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Names of benchmarks slower than baseline by more than `threshold` (fraction)."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        change = result["seconds"] / previous["seconds"] - 1.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"  {change * 100:+7.1f}%  {name}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kozy hot-path benchmarks")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", default="bench_results.json", help="where to write results")
+    parser.add_argument("--baseline", help="baseline results to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here as a new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown vs baseline as a fraction (default 0.10)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds of timing per benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for register in (_register_depth_benchmarks, _register_occupancy_benchmarks, _register_change_benchmarks,
+                     _register_depth_codec_benchmarks,
+                     _register_imu_benchmarks, _register_qimage_benchmarks, _register_pico_benchmarks,
+                     _register_trajectory_benchmarks, _register_logging_benchmarks, _register_theme_benchmarks,
+                     _register_config_benchmarks):
+        try:
+            register()
+        except ImportError as e:
+            print(f"  skip  {register.__name__}: {e}")
+
+    print("Running benchmarks...")
+    report = {"created": time.time(), "machine": machine_info(),
+              "results": run_benchmarks(args.pattern, args.min_time, args.repeats)}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("machine", {}).get("cpu_model") != report["machine"].get("cpu_model"):
+            print("  note: baseline was recorded on a different CPU")
+        print(f"Compared with {args.baseline} (threshold {args.threshold * 100:.0f}%):")
+        regressions = compare(report["results"], baseline, args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} benchmark(s) regressed")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
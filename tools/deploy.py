@@ -0,0 +1,83 @@
+# tools/deploy.py
+"""Deploy rpip_firmware to one or more Picos, uploading only the files that changed.
+
+    python -m tools.deploy                                   # every Pico found by USB ID
+    python -m tools.deploy --port /dev/ttyACM0 --port /dev/ttyACM1
+    python -m tools.deploy --check                           # only list what differs
+    python -m tools.deploy --force --chunk 8192 --json deploy.json
+    python -m tools.deploy --simulate 4 --sim-rate 100000    # pty stand-ins, no hardware
+
+Boards are updated in parallel over the MicroPython raw REPL (see
+devices/deploy.py). Close the GUI's Pico link first, or use the console's
+`pico deploy`. Prints one line per board with upload throughput, then the
+totals. Exits with 1 if any board failed.
+"""
+import argparse
+import json
+import sys
+import time
+
+from devices.deploy import DEFAULT_CHUNK_SIZE, FIRMWARE_DIRECTORY, deploy_boards, firmware_files, format_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental firmware deploy to Picos over the raw REPL")
+    parser.add_argument("--port", action="append", default=[], help="serial port of a board (repeatable)")
+    parser.add_argument("--source", default=FIRMWARE_DIRECTORY, help="firmware directory")
+    parser.add_argument("--check", action="store_true", help="compare hashes, upload nothing")
+    parser.add_argument("--force", action="store_true", help="upload every file")
+    parser.add_argument("--no-reset", action="store_true", help="stay in the REPL instead of soft-resetting")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_SIZE, help="file bytes per REPL call")
+    parser.add_argument("--workers", type=int, help="boards deployed at once (default: all)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for a board's reply")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="deploy to N simulated boards on pseudo-terminals instead")
+    parser.add_argument("--sim-rate", type=float, help="bytes/s a simulated board reads (default: unlimited)")
+    parser.add_argument("--json", help="write the reports to this file")
+    args = parser.parse_args()
+    if args.chunk < 64:
+        parser.error("--chunk must be at least 64 bytes")
+
+    files = firmware_files(args.source)
+    if not files:
+        parser.error(f"no .py files in {args.source}")
+    simulators = []
+    if args.simulate:
+        from devices.synthetic import MicroPythonBoardSimulator
+        simulators = [MicroPythonBoardSimulator(bytes_per_second=args.sim_rate).start() for _ in range(args.simulate)]
+        ports = [simulator.port for simulator in simulators]
+    elif args.port:
+        ports = args.port
+    else:
+        from devices.pico import find_pico_ports
+        ports = find_pico_ports()
+        if not ports:
+            print("No Pico found; pass --port", file=sys.stderr)
+            sys.exit(1)
+
+    total_size = sum(len(data) for data in files.values())
+    print(f"Deploying {len(files)} file(s), {total_size / 1024:.1f} KB, to {len(ports)} board(s)")
+    start = time.perf_counter()
+    try:
+        reports = deploy_boards(ports, files, args.workers, chunk_size=args.chunk, force=args.force,
+                                check=args.check, reset=not args.no_reset, timeout=args.timeout)
+        seconds = time.perf_counter() - start
+    finally:
+        for simulator in simulators:
+            simulator.stop()
+
+    for report in reports:
+        print(format_report(report))
+    uploaded = sum(report["uploaded_bytes"] for report in reports)
+    failed = [report["port"] for report in reports if report["error"]]
+    print(f"{len(reports) - len(failed)}/{len(reports)} board(s) OK; {uploaded / 1024:.1f} KB uploaded in "
+          f"{seconds:.2f} s ({uploaded / 1024 / seconds:.1f} KB/s across boards)")
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump({"seconds": seconds, "uploaded_bytes": uploaded, "boards": reports}, report_file, indent=4)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
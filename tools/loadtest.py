@@ -0,0 +1,385 @@
+# tools/loadtest.py
+"""End-to-end GUI load test on the offscreen platform, with synthetic devices.
+
+    python -m tools.loadtest --duration 30 --resolution 848x480 --fps 30 --pico-hz 200
+    python -m tools.loadtest --json loadtest.json --max-latency-ms 50 --max-rss-slope 5
+    python -m tools.loadtest --servos 200 --status-hz 20     # module list scaling
+
+Runs the real RobotGUI against a synthetic RGB-D capture and a simulated Pico
+on a pseudo-terminal, while a script adds, removes and toggles modules and
+switches themes. Reports event-loop latency (post to delivery), frames shown
+and painted per second, and memory growth. Exits with 1 if a threshold given
+with --max-*/--min-* is not met.
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (method on RobotGUI, argument), run one after another in a loop
+DEFAULT_SCRIPT = [
+    ["add_module", "Servo Drives"],
+    ["toggle_module", "Servo Drives"],
+    ["change_theme", "dark"],
+    ["toggle_module", "Servo Drives"],
+    ["toggle_module", "RPi Pico"],
+    ["change_theme", "light"],
+    ["toggle_module", "RPi Pico"],
+    ["remove_module", "Servo Drives"],
+    ["toggle_module", "RealSense Camera"],
+    ["change_theme", "raw_cyber"],
+    ["toggle_module", "RealSense Camera"],
+]
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux), or peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def slope_per_minute(samples):
+    """Least-squares slope of [(seconds, value)] in value per minute."""
+    if len(samples) < 2:
+        return 0.0
+    times = [t for t, _ in samples]
+    values = [v for _, v in samples]
+    mean_t, mean_v = statistics.fmean(times), statistics.fmean(values)
+    variance = sum((t - mean_t) ** 2 for t in times)
+    if not variance:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / variance * 60.0
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+    return {"count": len(ordered), "mean": statistics.fmean(ordered), "p50": pick(0.50),
+            "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+class LatencyProbe:
+    """Posts events to the GUI thread from a side thread and times their delivery.
+
+    Posting from outside the GUI thread means the measured delay includes time
+    the event loop spends busy in handlers, paints and timers.
+    """
+
+    def __init__(self, interval=0.01):
+        from PySide6.QtCore import QObject, QEvent, QCoreApplication
+        self.event_type = QEvent.Type(QEvent.registerEventType())
+        self.interval = interval
+        self.posted = collections.deque()
+        self.samples = []
+        self.recording = False
+        self.running = False
+        probe = self
+
+        class Receiver(QObject):
+            def event(self, event):
+                if event.type() == probe.event_type:
+                    posted_at = probe.posted.popleft()
+                    if probe.recording:
+                        probe.samples.append((time.perf_counter() - posted_at) * 1000.0)
+                    return True
+                return super().event(event)
+
+        self.receiver = Receiver()
+        self._post = lambda: QCoreApplication.postEvent(self.receiver, QEvent(self.event_type))
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="latency-probe", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            # Events are delivered in posting order, so a FIFO of timestamps is enough
+            self.posted.append(time.perf_counter())
+            self._post()
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1)
+
+
+def paint_counter(widgets):
+    """Event filter counting paint events per widget; returns (filter, counts)."""
+    from PySide6.QtCore import QObject, QEvent
+    counts = collections.Counter()
+    names = {id(widget): name for name, widget in widgets.items()}
+
+    class PaintCounter(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint:
+                counts[names.get(id(watched))] += 1
+            return False
+
+    counter = PaintCounter()
+    for widget in widgets.values():
+        widget.installEventFilter(counter)
+    return counter, counts
+
+
+def select_stream_mode(window, width, height, fps):
+    """Put the requested mode in the combo boxes, even if no camera offers it."""
+    resolution = f"{width}x{height}"
+    if window.resolution_combo.findText(resolution) < 0:
+        window.resolution_combo.addItem(resolution)
+    window.resolution_combo.setCurrentText(resolution)
+    if window.fps_combo.findText(str(fps)) < 0:
+        window.fps_combo.addItem(str(fps))
+    window.fps_combo.setCurrentText(str(fps))
+
+
+def run_loadtest(args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, REPO_ROOT)
+    # Config, session and device cache files land in a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="kozy-loadtest-"))
+
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+    from gui.main_window import RobotGUI
+    from devices.synthetic import SyntheticCapture, PicoSimulator
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    width, height = map(int, args.resolution.split("x"))
+
+    simulator = PicoSimulator(telemetry_hz=args.pico_hz).start()
+    window = RobotGUI()
+    window.capture_factory = SyntheticCapture
+    window.pico_port = simulator.port
+    window.show()
+    for module_name in ("RealSense Camera", "RPi Pico"):
+        window.add_module(module_name)
+    select_stream_mode(window, width, height, args.fps)
+    servo_ids = [window.add_module("Servo Drives") for _ in range(args.servos)]
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as script_file:
+            script = json.load(script_file)
+
+    probe = LatencyProbe()
+    paint_filter, paints = paint_counter({"rgb": window.video_label_rgb, "depth": window.video_label_depth})
+    action_times = collections.defaultdict(list)
+    action_errors = []
+    memory = []
+    state = {"step": 0, "measure_start": None, "ready": set()}
+
+    def run_action():
+        method, argument = script[state["step"] % len(script)]
+        state["step"] += 1
+        start = time.perf_counter()
+        try:
+            getattr(window, method)(argument)
+        except Exception as e:
+            action_errors.append(f"{method}({argument}): {e}")
+        action_times[method].append((time.perf_counter() - start) * 1000.0)
+
+    def sample_memory():
+        if state["measure_start"] is not None:
+            memory.append((time.perf_counter() - state["measure_start"], rss_mb()))
+
+    def begin_measuring():
+        state["measure_start"] = time.perf_counter()
+        state["frames_at_start"] = window.capture.seq if window.capture else 0
+        state["displayed_at_start"] = window.frames_displayed
+        state["updates_at_start"] = window.module_list.updates_requested
+        state["changes_at_start"] = window.module_list.changes_emitted
+        paints.clear()
+        probe.recording = True
+        sample_memory()
+        action_timer.start(args.action_interval)
+        QTimer.singleShot(int(args.duration * 1000), finish)
+
+    def finish():
+        # Read the devices before quitting: quit() closes the window, which stops them
+        state["elapsed"] = time.perf_counter() - state["measure_start"]
+        state["frames_captured"] = window.capture.seq - state["frames_at_start"] if window.capture else 0
+        state["frames_displayed"] = window.frames_displayed - state["displayed_at_start"]
+        state["paints"] = dict(paints)
+        state["pico_bytes"] = window.pico_link.bytes_received if window.pico_link else 0
+        state["modules"] = window.module_list.rowCount()
+        state["status_updates"] = window.module_list.updates_requested - state["updates_at_start"]
+        state["data_changed"] = window.module_list.changes_emitted - state["changes_at_start"]
+        probe.recording = False
+        sample_memory()
+        app.quit()
+
+    def device_ready(name, ok):
+        if not ok:
+            print(f"  warning: {name} did not come up")
+        state["ready"].add(name)
+        if state["ready"] == {"camera", "pico"}:
+            QTimer.singleShot(int(args.warmup * 1000), begin_measuring)
+
+    action_timer = QTimer()
+    action_timer.timeout.connect(run_action)
+    memory_timer = QTimer()
+    memory_timer.timeout.connect(sample_memory)
+    memory_timer.start(1000)
+
+    status_batches = []
+
+    def update_servo_statuses():
+        # Stands in for telemetry-driven status changes on every servo
+        start = time.perf_counter()
+        state["status_tick"] = state.get("status_tick", 0) + 1
+        for module_id in window.module_list.ids("Servo Drives"):
+            window.module_list.set_status(module_id, f"pos {state['status_tick'] % 180}", "ok")
+        if state["measure_start"] is not None:
+            status_batches.append((time.perf_counter() - start) * 1000.0)
+
+    def scroll_modules():
+        scroll_bar = window.module_view.verticalScrollBar()
+        step = state.setdefault("scroll_step", 12)
+        if not scroll_bar.minimum() < scroll_bar.value() + step < scroll_bar.maximum():
+            state["scroll_step"] = -step
+        scroll_bar.setValue(scroll_bar.value() + step)
+
+    status_timer = QTimer()
+    status_timer.timeout.connect(update_servo_statuses)
+    scroll_timer = QTimer()
+    scroll_timer.timeout.connect(scroll_modules)
+    if servo_ids and args.status_hz:
+        status_timer.start(int(1000 / args.status_hz))
+    if servo_ids:
+        scroll_timer.start(33)
+
+    probe.start()
+    window.start_realsense(lambda ok: device_ready("camera", ok))
+    window.connect_pico(lambda ok: device_ready("pico", ok))
+    app.exec()
+
+    probe.stop()
+    action_timer.stop()
+    status_timer.stop()
+    scroll_timer.stop()
+    memory_timer.stop()
+    window.close()
+    simulator.stop()
+    elapsed = state.get("elapsed", 0.0)
+    paints = state.get("paints", {})
+
+    def per_second(count):
+        return count / elapsed if elapsed else 0.0
+
+    rss = [value for _, value in memory]
+    return {
+        "config": {"duration_s": args.duration, "resolution": args.resolution, "fps": args.fps,
+                   "pico_hz": args.pico_hz, "action_interval_ms": args.action_interval},
+        "measured_s": elapsed,
+        "event_loop_latency_ms": percentiles(probe.samples),
+        "frames": {
+            "captured_per_s": per_second(state.get("frames_captured", 0)),
+            "displayed_per_s": per_second(state.get("frames_displayed", 0)),
+            "rgb_paint_events_per_s": per_second(paints.get("rgb", 0)),
+            "depth_paint_events_per_s": per_second(paints.get("depth", 0)),
+        },
+        "modules": {
+            "count": state.get("modules", 0),
+            "status_updates_per_s": per_second(state.get("status_updates", 0)),
+            "data_changed_per_s": per_second(state.get("data_changed", 0)),
+            "status_batch_ms": percentiles(status_batches),
+        },
+        "pico": {"lines_sent": simulator.lines_sent, "bytes_received": state.get("pico_bytes", 0)},
+        "actions": {method: percentiles(times) for method, times in action_times.items()},
+        "action_errors": action_errors,
+        "memory": {
+            "rss_start_mb": rss[0] if rss else None,
+            "rss_end_mb": rss[-1] if rss else None,
+            "rss_peak_mb": max(rss) if rss else None,
+            "rss_slope_mb_per_min": slope_per_minute(memory),
+        },
+    }
+
+
+def print_report(report):
+    latency = report["event_loop_latency_ms"]
+    frames = report["frames"]
+    memory = report["memory"]
+    config = report["config"]
+    print(f"Load test: {config['resolution']} @ {config['fps']} FPS, Pico {config['pico_hz']} Hz, "
+          f"{report['measured_s']:.1f} s measured")
+    if latency:
+        print(f"  event loop latency  p50 {latency['p50']:.2f} ms  p95 {latency['p95']:.2f} ms  "
+              f"p99 {latency['p99']:.2f} ms  max {latency['max']:.2f} ms  ({latency['count']} probes)")
+    print(f"  frames/s            captured {frames['captured_per_s']:.1f}  displayed {frames['displayed_per_s']:.1f}  "
+          f"(paint events rgb {frames['rgb_paint_events_per_s']:.1f}, depth {frames['depth_paint_events_per_s']:.1f})")
+    print(f"  pico                {report['pico']['lines_sent']} lines sent, "
+          f"{report['pico']['bytes_received']} bytes received")
+    modules = report["modules"]
+    print(f"  modules             {modules['count']} rows, {modules['status_updates_per_s']:.0f} status updates/s "
+          f"-> {modules['data_changed_per_s']:.1f} dataChanged/s")
+    for method, times in sorted(report["actions"].items()):
+        print(f"  {method:<18}  p50 {times['p50']:.2f} ms  max {times['max']:.2f} ms  ({times['count']}x)")
+    if memory["rss_start_mb"] is not None:
+        print(f"  rss                 {memory['rss_start_mb']:.1f} -> {memory['rss_end_mb']:.1f} MB  "
+              f"(peak {memory['rss_peak_mb']:.1f}, slope {memory['rss_slope_mb_per_min']:+.2f} MB/min)")
+    for error in report["action_errors"]:
+        print(f"  action error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen GUI load test with synthetic devices")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds to wait after devices are up")
+    parser.add_argument("--resolution", default="848x480", help="synthetic camera resolution, WxH")
+    parser.add_argument("--fps", type=int, default=30, help="synthetic camera frame rate")
+    parser.add_argument("--pico-hz", type=int, default=100, help="simulated Pico telemetry lines per second")
+    parser.add_argument("--servos", type=int, default=0, help="extra servo modules to add (list scaling)")
+    parser.add_argument("--status-hz", type=float, default=10.0, help="status updates per second for every servo")
+    parser.add_argument("--action-interval", type=int, default=250, help="ms between scripted UI actions")
+    parser.add_argument("--script", help="JSON list of [method, argument] UI actions to cycle through")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--max-latency-ms", type=float, help="fail if p99 event-loop latency exceeds this")
+    parser.add_argument("--min-display-fps", type=float, help="fail if frames displayed per second fall below this")
+    parser.add_argument("--max-rss-slope", type=float, help="fail if RSS grows faster than this many MB/min")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    if args.script:
+        args.script = os.path.abspath(args.script)
+
+    report = run_loadtest(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+
+    failures = []
+    latency = report["event_loop_latency_ms"]
+    if args.max_latency_ms is not None and latency and latency["p99"] > args.max_latency_ms:
+        failures.append(f"p99 latency {latency['p99']:.1f} ms > {args.max_latency_ms} ms")
+    if args.min_display_fps is not None and report["frames"]["displayed_per_s"] < args.min_display_fps:
+        failures.append(f"displayed {report['frames']['displayed_per_s']:.1f} FPS < {args.min_display_fps}")
+    if args.max_rss_slope is not None and report["memory"]["rss_slope_mb_per_min"] > args.max_rss_slope:
+        failures.append(f"RSS slope {report['memory']['rss_slope_mb_per_min']:.2f} MB/min > {args.max_rss_slope}")
+    if report["action_errors"]:
+        failures.append(f"{len(report['action_errors'])} scripted action(s) failed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# tools/soak.py
+"""Soak test: run the frame path for hours and fail if memory keeps growing.
+
+    python -m tools.soak --duration 14400 --interval 60             # offscreen GUI, 4 hours
+    python -m tools.soak --headless --duration 3600 --json soak.json
+    python -m tools.soak --duration 600 --interval 10 --warmup 30 --max-rss-slope 5
+
+Runs the real RobotGUI on the offscreen platform (or, with --headless, the
+capture, frame bus, occupancy grid and Pico link without any window) against
+synthetic devices. At each interval it records RSS, memory traced by
+`tracemalloc`, and Qt object counts (widgets, children of the window, live
+PySide wrappers by type). The report lists the allocation sites that grew
+most since the end of warm-up. Exits with 1 if the least-squares slope of RSS,
+traced memory or Qt objects passes its --max-* threshold (per hour), so a
+leak in the frame path is caught before deployment.
+"""
+import argparse
+import collections
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from tools.loadtest import REPO_ROOT, rss_mb, select_stream_mode, slope_per_minute, DEFAULT_SCRIPT
+
+# Allocations of the measuring machinery itself, not of the code under test
+TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, "*/linecache.py"),
+    tracemalloc.Filter(False, "*/fnmatch.py"),
+    tracemalloc.Filter(False, "*/re/*.py"),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadtest.py")),
+]
+
+
+def qt_object_counts(window=None):
+    """Widgets, children of `window` and live PySide wrappers per type."""
+    from PySide6.QtCore import QObject
+    from PySide6.QtWidgets import QApplication
+    wrappers = collections.Counter(type(obj).__name__ for obj in gc.get_objects()
+                                   if str(type(obj).__module__).startswith("PySide6"))
+    app = QApplication.instance()
+    return {
+        "widgets": len(app.allWidgets()) if isinstance(app, QApplication) else 0,
+        "window_children": len(window.findChildren(QObject)) if window is not None else 0,
+        "wrappers": sum(wrappers.values()),
+        "wrapper_types": dict(wrappers),
+    }
+
+
+class MemorySampler:
+    """Periodic memory samples, plus the tracemalloc snapshots to diff at the end.
+
+    Call `trace()` before warm-up, so tracemalloc's own tables are part of the
+    baseline RSS. `begin()` takes the baseline snapshot and first sample once
+    caches and buffers have filled, and `end()` the last ones. Samples in
+    between only read counters: holding a snapshot per sample would itself
+    look like growth.
+    """
+
+    def __init__(self, trace_frames=1, qt_counts=None):
+        self.trace_frames = trace_frames
+        self.qt_counts = qt_counts  # () -> qt_object_counts(...), or None without Qt
+        self.counters = None  # () -> {"frames_captured": n, ...}, read at the moment of each sample
+        self.start = None
+        self.samples = []
+        self.baseline = None
+        self.latest = None
+        self.sample_seconds = []
+
+    def trace(self):
+        if self.trace_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self.snapshot()  # fills fnmatch's and re's caches before the baseline
+
+    def snapshot(self):
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS) if tracemalloc.is_tracing() else None
+
+    def begin(self):
+        if self.qt_counts is not None:
+            self.qt_counts()  # the first count creates wrappers and Qt enum types of its own
+        self.baseline = self.snapshot()
+        self.start = time.perf_counter()
+        self.sample()
+
+    def end(self):
+        sample = self.sample()
+        self.latest = self.snapshot()
+        return sample
+
+    def sample(self):
+        started = time.perf_counter()
+        sample = {"t": started - self.start}
+        if self.counters is not None:
+            sample.update(self.counters())  # before the collection, so counts and "t" match
+        gc.collect()  # uncollected cycles are not leaks
+        sample["rss_mb"] = rss_mb()
+        if tracemalloc.is_tracing():
+            sample["traced_mb"] = tracemalloc.get_traced_memory()[0] / 1e6
+        if self.qt_counts is not None:
+            sample.update(self.qt_counts())
+        self.samples.append(sample)
+        self.sample_seconds.append(time.perf_counter() - started)
+        return sample
+
+    def slope_per_hour(self, key):
+        return slope_per_minute([(sample["t"], sample[key]) for sample in self.samples if key in sample]) * 60.0
+
+    def growing_sites(self, limit=15):
+        """Allocation sites with the largest growth since the baseline."""
+        if self.baseline is None or self.latest is None:
+            return []
+        hours = max(self.samples[-1]["t"] / 3600.0, 1e-9)
+        key = "traceback" if self.trace_frames > 1 else "lineno"
+        sites = []
+        for stat in self.latest.compare_to(self.baseline, key):
+            if stat.size_diff <= 0:
+                continue
+            sites.append({
+                "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_kb": stat.size / 1e3,
+                "growth_kb": stat.size_diff / 1e3,
+                "growth_kb_per_hour": stat.size_diff / 1e3 / hours,
+                "blocks": stat.count,
+                "block_growth": stat.count_diff,
+            })
+            if len(sites) == limit:
+                break
+        return sites
+
+    def growing_wrapper_types(self, limit=10):
+        """PySide wrapper types whose live count grew between the first and last sample."""
+        if len(self.samples) < 2 or "wrapper_types" not in self.samples[0]:
+            return {}
+        first, last = self.samples[0]["wrapper_types"], self.samples[-1]["wrapper_types"]
+        growth = {name: count - first.get(name, 0) for name, count in last.items() if count > first.get(name, 0)}
+        return dict(sorted(growth.items(), key=lambda item: -item[1])[:limit])
+
+
+def run_gui(args, sampler):
+    """The full window with synthetic camera and Pico; returns frame counters."""
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+    from gui.main_window import RobotGUI
+    from devices.synthetic import SyntheticCapture, PicoSimulator
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    width, height = map(int, args.resolution.split("x"))
+    simulator = PicoSimulator(telemetry_hz=args.pico_hz).start()
+    window = RobotGUI()
+    window.capture_factory = SyntheticCapture
+    window.pico_port = simulator.port
+    window.show()
+    for module_name in ("RealSense Camera", "RPi Pico"):
+        window.add_module(module_name)
+    select_stream_mode(window, width, height, args.fps)
+    sampler.qt_counts = lambda: qt_object_counts(window)
+    sampler.counters = lambda: {"frames_captured": window.capture.seq if window.capture else 0,
+                                "frames_displayed": window.frames_displayed}
+    state = {"step": 0, "ready": set(), "errors": []}
+
+    def run_action():
+        method, argument = DEFAULT_SCRIPT[state["step"] % len(DEFAULT_SCRIPT)]
+        state["step"] += 1
+        try:
+            getattr(window, method)(argument)
+        except Exception as e:
+            state["errors"].append(f"{method}({argument}): {e}")
+
+    def report_progress():
+        print_progress(sampler.sample(), args.duration)
+
+    def begin():
+        sampler.begin()
+        sample_timer.start(int(args.interval * 1000))
+        if args.action_interval:
+            action_timer.start(args.action_interval)
+        QTimer.singleShot(int(args.duration * 1000), finish)
+
+    def finish():
+        sample_timer.stop()
+        action_timer.stop()
+        print_progress(sampler.end(), args.duration)
+        app.quit()
+
+    def device_ready(name, ok):
+        if not ok:
+            print(f"  warning: {name} did not come up")
+        state["ready"].add(name)
+        if state["ready"] == {"camera", "pico"}:
+            QTimer.singleShot(int(args.warmup * 1000), begin)
+
+    sample_timer = QTimer()
+    sample_timer.timeout.connect(report_progress)
+    action_timer = QTimer()
+    action_timer.timeout.connect(run_action)
+    window.start_realsense(lambda ok: device_ready("camera", ok))
+    window.connect_pico(lambda ok: device_ready("pico", ok))
+    app.exec()
+
+    window.close()
+    simulator.stop()
+    return {"action_errors": state["errors"]}
+
+
+def run_headless(args, sampler):
+    """Capture, bus, occupancy and Pico link without Qt; the main thread converts depth for display."""
+    from devices.pico import PicoLink
+    from devices.realsense import normalize_depth_for_display
+    from devices.synthetic import SyntheticCapture, PicoSimulator
+    from utils.framebus import FrameBus
+    from utils.occupancy import OccupancyMapper
+
+    width, height = map(int, args.resolution.split("x"))
+    simulator = PicoSimulator(telemetry_hz=args.pico_hz).start()
+    bus = FrameBus()
+    bus.start()
+    link = PicoLink(port=simulator.port, on_message=lambda kind, payload: bus.publish("pico/telemetry",
+                                                                                       f"{kind}:{payload}"))
+    capture = SyntheticCapture()
+    occupancy = OccupancyMapper(lambda: capture)
+    capture.add_consumer(lambda frames: (bus.publish(f"camera/{capture.serial}/color", frames.color, frames.timestamp),
+                                         bus.publish(f"camera/{capture.serial}/depth", frames.depth, frames.timestamp)))
+    capture.add_consumer(occupancy.notify)
+    stop = threading.Event()
+    displayed = [0]
+    sampler.counters = lambda: {"frames_captured": capture.seq, "frames_displayed": displayed[0]}
+
+    def display_loop():
+        last_seq = 0
+        while not stop.wait(1.0 / args.fps):
+            frames = capture.latest()
+            if frames is not None and frames.seq != last_seq:
+                frames = capture.read()
+                if frames is None:
+                    continue
+                last_seq = frames.seq
+                normalize_depth_for_display(frames.depth)
+                displayed[0] += 1
+
+    if not link.open():
+        print("  warning: Pico link did not come up")
+    capture.start(width, height, args.fps)
+    occupancy.start()
+    display = threading.Thread(target=display_loop, name="display", daemon=True)
+    display.start()
+    try:
+        time.sleep(args.warmup)
+        sampler.begin()
+        end = time.perf_counter() + args.duration
+        while time.perf_counter() + args.interval < end:
+            time.sleep(args.interval)
+            print_progress(sampler.sample(), args.duration)
+        time.sleep(max(end - time.perf_counter(), 0.0))
+        print_progress(sampler.end(), args.duration)
+    finally:
+        stop.set()
+        display.join(timeout=2)
+        occupancy.stop()
+        capture.stop()
+        link.close()
+        bus.stop()
+        simulator.stop()
+    return {"action_errors": []}
+
+
+def print_progress(sample, duration):
+    traced = f", traced {sample['traced_mb']:.1f} MB" if "traced_mb" in sample else ""
+    qt = f", {sample['wrappers']} Qt wrappers, {sample['widgets']} widgets" if "wrappers" in sample else ""
+    print(f"  {sample['t']:7.0f}/{duration:.0f} s  rss {sample['rss_mb']:.1f} MB{traced}{qt}", flush=True)
+
+
+def run_soak(args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, REPO_ROOT)
+    # Config, session and device cache files land in a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="kozy-soak-"))
+    sampler = MemorySampler(trace_frames=args.trace_frames)
+    sampler.trace()
+    counters = (run_headless if args.headless else run_gui)(args, sampler)
+    samples = sampler.samples
+    measured = samples[-1]["t"] - samples[0]["t"] if samples else 0.0
+    slopes = {key: sampler.slope_per_hour(key) for key in ("rss_mb", "traced_mb", "wrappers", "widgets",
+                                                           "window_children")
+              if any(key in sample for sample in samples)}
+    return {
+        "config": {"mode": "headless" if args.headless else "gui", "duration_s": args.duration,
+                   "interval_s": args.interval, "warmup_s": args.warmup, "resolution": args.resolution,
+                   "fps": args.fps, "pico_hz": args.pico_hz, "trace_frames": args.trace_frames},
+        "measured_s": measured,
+        "frames": {key: (samples[-1][key] - samples[0][key]) / measured if measured else 0.0
+                   for key in ("frames_captured", "frames_displayed") if samples and key in samples[-1]},
+        "slopes_per_hour": slopes,
+        "growing_sites": sampler.growing_sites(args.top),
+        "growing_qt_types": sampler.growing_wrapper_types(),
+        "sample_ms": max(sampler.sample_seconds, default=0.0) * 1000.0,
+        "action_errors": counters["action_errors"],
+        "samples": [{key: value for key, value in sample.items() if key != "wrapper_types"} for sample in samples],
+    }
+
+
+def print_report(report):
+    config = report["config"]
+    samples = report["samples"]
+    print(f"Soak test ({config['mode']}): {config['resolution']} @ {config['fps']} FPS, "
+          f"{report['measured_s'] / 60:.1f} min measured, {len(samples)} samples "
+          f"(slowest {report['sample_ms']:.0f} ms)")
+    frames = report["frames"]
+    print(f"  frames/s            captured {frames['frames_captured']:.1f}  displayed {frames['frames_displayed']:.1f}")
+    units = {"rss_mb": "MB", "traced_mb": "MB"}
+    for key, slope in report["slopes_per_hour"].items():
+        first, last = samples[0].get(key), samples[-1].get(key)
+        print(f"  {key:<18}  {first:.1f} -> {last:.1f}  slope {slope:+.2f} {units.get(key, 'objects')}/h")
+    if report["growing_qt_types"]:
+        print("  Qt wrappers grown:  " + ", ".join(f"{name} +{count}" for name, count in
+                                                  report["growing_qt_types"].items()))
+    if report["growing_sites"]:
+        print("  top growing allocation sites:")
+    for site in report["growing_sites"]:
+        print(f"    {site['growth_kb']:+10.1f} KB ({site['growth_kb_per_hour']:+.1f} KB/h, "
+              f"{site['block_growth']:+d} blocks)  {site['site'][-1]}")
+        for frame in reversed(site["site"][:-1]):
+            print(f"{'':38}{frame}")
+    for error in report["action_errors"]:
+        print(f"  action error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running memory soak test with synthetic devices")
+    parser.add_argument("--duration", type=float, default=3600.0, help="seconds to measure (hours: 3600 each)")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between memory samples")
+    parser.add_argument("--warmup", type=float, default=60.0, help="seconds to run before the baseline sample")
+    parser.add_argument("--headless", action="store_true", help="devices, bus and occupancy only, no window")
+    parser.add_argument("--resolution", default="848x480", help="synthetic camera resolution, WxH")
+    parser.add_argument("--fps", type=int, default=30, help="synthetic camera frame rate")
+    parser.add_argument("--pico-hz", type=int, default=100, help="simulated Pico telemetry lines per second")
+    parser.add_argument("--action-interval", type=int, default=0,
+                        help="ms between scripted UI actions (module and theme churn); 0 for frames only")
+    parser.add_argument("--trace-frames", type=int, default=1,
+                        help="stack frames kept per allocation (more shows callers, costs more); 0 turns "
+                             "tracemalloc off")
+    parser.add_argument("--top", type=int, default=15, help="allocation sites to report")
+    parser.add_argument("--json", help="write the report, with every sample, to this file")
+    parser.add_argument("--max-rss-slope", type=float, default=20.0, help="fail if RSS grows faster (MB/h)")
+    parser.add_argument("--max-traced-slope", type=float, default=5.0,
+                        help="fail if memory traced by tracemalloc grows faster (MB/h)")
+    parser.add_argument("--max-qt-slope", type=float, default=100.0,
+                        help="fail if live Qt wrappers or widgets grow faster (objects/h)")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    report = run_soak(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+
+    failures = []
+    slopes = report["slopes_per_hour"]
+    if len(report["samples"]) < 3:
+        failures.append(f"only {len(report['samples'])} samples; lower --interval or raise --duration")
+    for key, limit, unit in (("rss_mb", args.max_rss_slope, "MB/h"), ("traced_mb", args.max_traced_slope, "MB/h"),
+                             ("wrappers", args.max_qt_slope, "objects/h"), ("widgets", args.max_qt_slope, "objects/h")):
+        if key in slopes and slopes[key] > limit:
+            failures.append(f"{key} slope {slopes[key]:.2f} {unit} > {limit}")
+    if report["action_errors"]:
+        failures.append(f"{len(report['action_errors'])} scripted action(s) failed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
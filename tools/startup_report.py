@@ -0,0 +1,120 @@
+# tools/startup_report.py
+"""Measure GUI cold start: per-module import times plus time to first paint.
+
+    python -m tools.startup_report [--top 20] [--json out.json] [--max-first-paint-ms 1500]
+
+Runs main.py under `-X importtime` on the offscreen Qt platform and exits after
+the first paint, so it works on headless machines and in CI. Fails if a plain
+`import gui.main_window` loads numpy, pyrealsense2, serial or yaml.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from utils.startup import FIRST_PAINT_MARKER
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "pyrealsense2", "serial", "yaml")  # loaded lazily or in the background
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+TIMELINE_LINE = re.compile(r"^\s+(\w+)\s+([\d.]+) ms")
+
+
+def run_startup(platform):
+    """Launch main.py once and return (import records, startup marks in ms)."""
+    env = dict(os.environ, QT_QPA_PLATFORM=platform)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", "--exit-after-paint"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    imports = []
+    before_paint = result.stderr.split(FIRST_PAINT_MARKER)[0]
+    for line in before_paint.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000.0,
+                "cumulative_ms": int(cumulative_us) / 1000.0,
+                "depth": len(indent) // 2,
+            })
+    marks = {}
+    for line in result.stdout.splitlines():
+        match = TIMELINE_LINE.match(line)
+        if match:
+            marks[match.group(1)] = float(match.group(2))
+    if "first_paint" not in marks:
+        raise RuntimeError(f"main.py did not report a first paint:\n{result.stderr[-2000:]}")
+    return imports, marks
+
+
+def eager_imports(module="gui.main_window"):
+    """HEAVY_MODULES that a plain `import module` loads, checked in a fresh interpreter."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    code = (f"import sys, {module}; "
+            f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True,
+                            text=True, timeout=120)
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    return result.stdout.split()
+
+
+def top_level_imports(imports, top):
+    """Slowest imports triggered directly by our code, by cumulative time."""
+    direct = [record for record in imports if record["depth"] == 0]
+    return sorted(direct, key=lambda record: record["cumulative_ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report GUI startup time")
+    parser.add_argument("--top", type=int, default=15, help="number of imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="runs to take the best of")
+    parser.add_argument("--platform", default="offscreen", help="QT_QPA_PLATFORM to use")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--max-first-paint-ms", type=float,
+                        help="exit with an error if time to first paint exceeds this")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        imports, marks = run_startup(args.platform)
+        if best is None or marks["first_paint"] < best[1]["first_paint"]:
+            best = (imports, marks)
+    imports, marks = best
+
+    slowest = top_level_imports(imports, args.top)
+    print(f"Slowest top-level imports (best of {args.runs} runs):")
+    for record in slowest:
+        print(f"  {record['cumulative_ms']:8.1f} ms  {record['module']}")
+    print("Startup timeline:")
+    for name, elapsed in marks.items():
+        print(f"  {name:<24} {elapsed:8.1f} ms")
+
+    loaded = {record["module"] for record in imports}
+    for heavy in HEAVY_MODULES:
+        if heavy in loaded:
+            print(f"  warning: {heavy} is imported before the first paint")
+    # The preload thread may win the race to the paint; a plain import of the window must not need them
+    eager = eager_imports()
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump({"marks_ms": marks, "imports": slowest}, report_file, indent=4)
+
+    failed = False
+    if eager:
+        print(f"FAIL: importing gui.main_window loads {', '.join(eager)}")
+        failed = True
+    if args.max_first_paint_ms and marks["first_paint"] > args.max_first_paint_ms:
+        print(f"FAIL: first paint {marks['first_paint']:.1f} ms > {args.max_first_paint_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
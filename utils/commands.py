@@ -0,0 +1,268 @@
+# utils/commands.py
+"""Console command layer: parser, registry of device commands, and off-thread runner.
+
+A command is a path of words ("cam set fps") bound to a handler
+`handler(context, args)`, where `args` are the remaining words. Handlers run
+on worker threads; they stream text with `context.write()`, reach GUI objects
+through `context.gui()`, and signal expected failures with CommandError.
+
+Several lines entered at once, `run <file>` or `File -> Run Script...` run as a
+batch script that prints the time of each command and stops at the first one
+that fails. `cancel` aborts running commands; `help` lists them all.
+"""
+import logging
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import get_metrics
+
+
+class CommandError(Exception):
+    """Expected command failure (bad arguments, device missing); shown without a traceback."""
+
+
+def parse_command(text):
+    """Split a command line into words, honouring quotes; blank lines and # comments give []."""
+    try:
+        return shlex.split(text, comments=True)
+    except ValueError as e:
+        raise CommandError(f"cannot parse '{text.strip()}': {e}")
+
+
+def expect_args(args, minimum, maximum=None, usage=""):
+    """Raise CommandError unless minimum <= len(args) <= maximum."""
+    maximum = minimum if maximum is None else maximum
+    if not minimum <= len(args) <= maximum:
+        raise CommandError(f"usage: {usage}" if usage else f"expected {minimum} argument(s), got {len(args)}")
+
+
+def parse_number(text, kind=float, name="value", low=None, high=None):
+    try:
+        value = kind(text)
+    except ValueError:
+        raise CommandError(f"{name} must be a number, got '{text}'")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise CommandError(f"{name} must be between {low} and {high}, got {value}")
+    return value
+
+
+class Command:
+    __slots__ = ("words", "handler", "usage", "help")
+
+    def __init__(self, words, handler, usage, help):
+        self.words = words
+        self.handler = handler
+        self.usage = usage
+        self.help = help
+
+    @property
+    def path(self):
+        return " ".join(self.words)
+
+
+class CommandRegistry:
+    """Commands by word path; the longest registered prefix of the input wins."""
+
+    def __init__(self):
+        self.commands = {}
+
+    def register(self, path, handler, usage="", help=""):
+        words = tuple(path.split())
+        self.commands[words] = Command(words, handler, usage, help)
+
+    def resolve(self, words):
+        for length in range(len(words), 0, -1):
+            command = self.commands.get(tuple(words[:length]))
+            if command is not None:
+                return command, list(words[length:])
+        raise CommandError(f"unknown command '{' '.join(words)}' (try 'help')")
+
+    def help_lines(self, prefix=()):
+        prefix = tuple(prefix)
+        lines = []
+        for words, command in sorted(self.commands.items()):
+            if words[:len(prefix)] == prefix:
+                lines.append(f"{' '.join(filter(None, (command.path, command.usage))):<32} {command.help}")
+        return lines
+
+
+class CommandContext:
+    """Handed to every handler: output streaming, cancellation and GUI-thread calls."""
+
+    def __init__(self, output, call_in_gui=None):
+        self.output = output
+        self.cancelled = threading.Event()
+        self._call_in_gui = call_in_gui
+
+    def write(self, text):
+        self.output(str(text))
+
+    def gui(self, function, *args, **kwargs):
+        """Run `function` on the GUI thread, wait, and return its result (or raise its error)."""
+        if self._call_in_gui is None:
+            return function(*args, **kwargs)
+        return self._call_in_gui(function, *args, **kwargs)
+
+    def sleep(self, seconds):
+        """Sleep, but wake up and fail as soon as the command is cancelled."""
+        if self.cancelled.wait(seconds):
+            raise CommandError("cancelled")
+
+    def wait(self, event, timeout, what="reply"):
+        """Wait for a threading.Event set by a callback; CommandError on timeout or cancel."""
+        deadline = time.monotonic() + timeout
+        while not event.wait(min(0.05, max(deadline - time.monotonic(), 0))):
+            if self.cancelled.is_set():
+                raise CommandError("cancelled")
+            if time.monotonic() >= deadline:
+                raise CommandError(f"timed out after {timeout:g} s waiting for {what}")
+
+
+class CommandResult:
+    __slots__ = ("text", "ok", "seconds", "error")
+
+    def __init__(self, text, ok, seconds, error=None):
+        self.text = text
+        self.ok = ok
+        self.seconds = seconds
+        self.error = error
+
+
+class CommandRunner:
+    """Runs command lines on a small worker pool so the GUI thread never waits on them."""
+
+    def __init__(self, registry, call_in_gui=None, max_workers=4):
+        self.registry = registry
+        self.call_in_gui = call_in_gui
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="command")
+        self.active = set()
+        self.lock = threading.Lock()
+        metrics = get_metrics()
+        self.ok_counter = metrics.counter("kozy_commands_total", "Console commands run", result="ok")
+        self.error_counter = metrics.counter("kozy_commands_total", "Console commands run", result="error")
+        self.duration_histogram = metrics.histogram("kozy_command_seconds", "Console command run time")
+        register_builtin_commands(registry, self)
+
+    def execute(self, text, context):
+        """Run one command line on the calling thread and return a CommandResult."""
+        result = self._execute(text, context)
+        (self.ok_counter if result.ok else self.error_counter).inc()
+        self.duration_histogram.observe(result.seconds)
+        return result
+
+    def _execute(self, text, context):
+        start = time.perf_counter()
+        try:
+            words = parse_command(text)
+            if words:
+                command, args = self.registry.resolve(words)
+                value = command.handler(context, args)
+                if value is not None:
+                    context.write(value)
+            return CommandResult(text, True, time.perf_counter() - start)
+        except CommandError as e:
+            return CommandResult(text, False, time.perf_counter() - start, str(e))
+        except Exception as e:
+            logging.exception(f"Command '{text}' failed")
+            return CommandResult(text, False, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+    def submit(self, text, output, on_done=None):
+        """Run `text` (several lines run as a script) on a worker.
+
+        `output(line)` and `on_done(result)` are called on that worker thread.
+        """
+        context = CommandContext(output, self.call_in_gui)
+
+        def job():
+            with self.lock:
+                self.active.add(context)
+            try:
+                lines = text.splitlines()
+                result = self.execute(text, context) if len(lines) == 1 else self.execute_script(lines, context)
+            finally:
+                with self.lock:
+                    self.active.discard(context)
+            if on_done:
+                on_done(result)
+            return result
+        return self.executor.submit(job)
+
+    def execute_script(self, lines, context, name="console"):
+        """run_script() wrapped into a single CommandResult."""
+        start = time.perf_counter()
+        try:
+            self.run_script(lines, context, name)
+            return CommandResult(name, True, time.perf_counter() - start)
+        except CommandError as e:
+            return CommandResult(name, False, time.perf_counter() - start, str(e))
+
+    def run_script(self, lines, context, name="script"):
+        """Run lines in order with per-command timing; stops at the first failure."""
+        results = []
+        start = time.perf_counter()
+        for number, line in enumerate(lines, 1):
+            if context.cancelled.is_set():
+                context.write(f"{name}: cancelled before line {number}")
+                break
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            result = self.execute(line, context)
+            results.append(result)
+            context.write(f"[{result.seconds * 1000:9.1f} ms] {'ok ' if result.ok else 'ERR'} {line.strip()}")
+            if not result.ok:
+                context.write(f"{name}:{number}: {result.error}")
+                break
+        failed = sum(1 for result in results if not result.ok)
+        context.write(f"{name}: {len(results)} command(s) in {time.perf_counter() - start:.3f} s"
+                      f"{f', {failed} failed' if failed else ''}")
+        if failed:
+            raise CommandError(f"{name} stopped at a failing command")
+        return results
+
+    def cancel_all(self, keep=None):
+        with self.lock:
+            contexts = [context for context in self.active if context is not keep]
+        for context in contexts:
+            context.cancelled.set()
+        return len(contexts)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def register_builtin_commands(registry, runner):
+    def help_command(context, args):
+        lines = registry.help_lines(args)
+        if not lines:
+            raise CommandError(f"no commands start with '{' '.join(args)}'")
+        return "\n".join(lines)
+
+    def echo(context, args):
+        return " ".join(args)
+
+    def sleep(context, args):
+        expect_args(args, 1, usage="sleep <seconds>")
+        context.sleep(parse_number(args[0], name="seconds", low=0))
+
+    def run(context, args):
+        expect_args(args, 1, usage="run <script file>")
+        path = os.path.expanduser(args[0])
+        try:
+            with open(path, "r") as script_file:
+                lines = script_file.read().splitlines()
+        except OSError as e:
+            raise CommandError(f"cannot read {path}: {e.strerror}")
+        runner.run_script(lines, context, name=os.path.basename(path))
+
+    def cancel(context, args):
+        return f"cancelled {runner.cancel_all(keep=context)} running command(s)"
+
+    registry.register("help", help_command, "[command]", "List commands")
+    registry.register("echo", echo, "<text>", "Print text")
+    registry.register("sleep", sleep, "<seconds>", "Wait (useful in scripts)")
+    registry.register("run", run, "<file>", "Run a batch script, one command per line")
+    registry.register("cancel", cancel, "", "Cancel all running commands")
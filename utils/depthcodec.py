@@ -0,0 +1,352 @@
+# utils/depthcodec.py
+"""Lossless codec for z16 depth frames ("KZD1"), for recordings and frame transport.
+
+A frame is coded in three steps:
+- Invalid (0) pixels become alternating valid/invalid run lengths, so holes cost a few bytes.
+- Valid pixels are predicted either from the previous valid pixel in raster order (row
+  delta) or from the same pixel of the previous frame (temporal delta). The choice is made
+  per frame from a sample of both residuals.
+- Residuals are zigzag-mapped (small +/- become small unsigned) and split into a low and a
+  high byte plane, where the high plane is almost all zeros. Everything then goes through
+  an entropy stage: zlib with the RLE strategy by default, lzma, or zstandard/lz4 when
+  installed.
+
+All steps are vectorised NumPy. zlib and lzma release the GIL, so DepthEncoderPool scales
+across cores with plain threads.
+
+Recordings store depth this way (`depth.kzd`) and open_recording() decodes it
+transparently; `rec status` shows the live ratio. With "bus" set in the
+control panel's DEPTH_CODEC, every frame is also published, coded on its own,
+as `camera/<serial>/depth.kzd`; read it with `decode_depth(bytes(frame.data))`.
+
+    python -m utils.depthcodec [recording] [--workers N]   # ratio and MB/s per core per backend
+"""
+import argparse
+import importlib
+import logging
+import lzma
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.lazy import lazy_import
+from utils.metrics import get_metrics
+
+np = lazy_import("numpy")
+
+MAGIC = b"KZD1"
+VERSION = 1
+# magic, version, flags, backend id, width, height, runs, valid pixels, body bytes
+HEADER = struct.Struct("<4sBBBxHHIII")
+FLAG_TEMPORAL = 1
+
+BACKEND_IDS = {"zlib": 1, "lzma": 2, "zstd": 3, "lz4": 4}
+DEFAULT_LEVELS = {"zlib": 1, "lzma": 0, "zstd": 1, "lz4": 0}
+
+
+def _zlib_compress(data, level):
+    # Z_RLE: residual planes are dominated by short repeats; about twice as fast as the default strategy
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, zlib.Z_RLE)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _load_backend(name):
+    """(compress(data, level), decompress(data)) for a backend, or None if it is not installed."""
+    if name == "zlib":
+        return _zlib_compress, zlib.decompress
+    if name == "lzma":
+        return (lambda data, level: lzma.compress(data, preset=level)), lzma.decompress
+    try:
+        if name == "zstd":
+            zstandard = importlib.import_module("zstandard")
+            return ((lambda data, level: zstandard.ZstdCompressor(level=level).compress(data)),
+                    lambda data: zstandard.ZstdDecompressor().decompress(data))
+        if name == "lz4":
+            lz4_frame = importlib.import_module("lz4.frame")
+            return ((lambda data, level: lz4_frame.compress(data, compression_level=level)),
+                    lz4_frame.decompress)
+    except ImportError:
+        return None
+    raise ValueError(f"unknown depth codec backend '{name}', expected one of {', '.join(BACKEND_IDS)}")
+
+
+def available_backends():
+    return [name for name in BACKEND_IDS if _load_backend(name) is not None]
+
+
+def _zigzag(residual):
+    signed = residual.view(np.int16)
+    return ((signed << 1) ^ (signed >> 15)).view(np.uint16)
+
+
+def _unzigzag(mapped):
+    return (mapped >> 1) ^ np.negative(mapped & 1)
+
+
+def _runs(valid):
+    """Run lengths of a flat bool mask, alternating valid/invalid and starting with valid."""
+    changes = np.flatnonzero(valid[1:] != valid[:-1]) + 1
+    lengths = np.diff(np.concatenate(([0], changes, [valid.size])))
+    if valid.size and not valid[0]:
+        lengths = np.concatenate(([0], lengths))
+    return lengths.astype("<u4")
+
+
+def _estimate(residual):
+    """Rough cost of a residual stream: mean magnitude over a sample."""
+    sample = residual[::16].view(np.int16)
+    return float(np.abs(sample.astype(np.int32)).mean()) if sample.size else 0.0
+
+
+def encode_depth(depth, previous=None, backend="zlib", level=None):
+    """Encode one uint16 depth frame; with `previous` (the prior frame), temporal prediction may be used."""
+    if depth.dtype != np.uint16 or depth.ndim != 2:
+        raise ValueError(f"expected a 2-D uint16 depth frame, got {depth.dtype} {depth.shape}")
+    codec = _load_backend(backend)
+    if codec is None:
+        raise ValueError(f"depth codec backend '{backend}' is not installed")
+    level = DEFAULT_LEVELS[backend] if level is None else level
+    height, width = depth.shape
+    flat = depth.ravel()
+    valid = flat != 0
+    values = flat[valid]
+
+    residual = np.empty_like(values)
+    if values.size:
+        residual[0] = values[0]
+        np.subtract(values[1:], values[:-1], out=residual[1:])
+    flags = 0
+    if previous is not None and previous.shape == depth.shape and values.size:
+        temporal = values - previous.ravel()[valid]
+        if _estimate(temporal) < _estimate(residual):
+            residual, flags = temporal, FLAG_TEMPORAL
+
+    mapped = _zigzag(residual)
+    runs = _runs(valid)
+    body = b"".join((runs.tobytes(), (mapped & 0xFF).astype(np.uint8).tobytes(),
+                     (mapped >> 8).astype(np.uint8).tobytes()))
+    header = HEADER.pack(MAGIC, VERSION, flags, BACKEND_IDS[backend], width, height,
+                         len(runs), values.size, len(body))
+    return header + codec[0](body, level)
+
+
+def frame_info(data):
+    """(width, height, temporal, backend name) from an encoded frame's header."""
+    magic, version, flags, backend_id, width, height, _, _, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a KZD1 depth frame")
+    backend = next((name for name, code in BACKEND_IDS.items() if code == backend_id), None)
+    return width, height, bool(flags & FLAG_TEMPORAL), backend
+
+
+def decode_depth(data, previous=None):
+    """Decode one frame; temporal frames need the previously decoded frame as `previous`."""
+    magic, version, flags, backend_id, width, height, run_count, valid_count, body_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a KZD1 depth frame")
+    backend = next((name for name, code in BACKEND_IDS.items() if code == backend_id), None)
+    codec = _load_backend(backend) if backend else None
+    if codec is None:
+        raise ValueError(f"depth frame needs codec backend '{backend or backend_id}', which is not installed")
+    body = codec[1](bytes(data[HEADER.size:]))
+    if len(body) != body_size:
+        raise ValueError("corrupt depth frame: body size mismatch")
+    runs = np.frombuffer(body, "<u4", run_count)
+    low = np.frombuffer(body, np.uint8, valid_count, 4 * run_count)
+    high = np.frombuffer(body, np.uint8, valid_count, 4 * run_count + valid_count)
+    if int(runs.sum()) != width * height:
+        raise ValueError("corrupt depth frame: runs do not cover the frame")
+
+    pattern = np.zeros(run_count, bool)
+    pattern[0::2] = True
+    valid = np.repeat(pattern, runs)
+    residual = _unzigzag(low.astype(np.uint16) | (high.astype(np.uint16) << 8))
+    if flags & FLAG_TEMPORAL:
+        if previous is None:
+            raise ValueError("temporal depth frame needs the previous frame")
+        values = residual + previous.ravel()[valid]
+    else:
+        values = np.cumsum(residual, dtype=np.uint16)
+    depth = np.zeros(width * height, np.uint16)
+    depth[valid] = values
+    return depth.reshape(height, width)
+
+
+class DepthDecoder:
+    """Decodes a stream of frames in order, keeping the reference for temporal frames."""
+
+    def __init__(self):
+        self.previous = None
+
+    def decode(self, data):
+        self.previous = decode_depth(data, self.previous)
+        return self.previous
+
+
+class DepthEncoderPool:
+    """Encodes depth frames on worker threads and delivers them in submission order.
+
+    `submit()` copies the frame (capture buffers are reused) and returns at
+    once; `on_encoded(data, timestamp, temporal)` is called on a delivery
+    thread in order. When `max_pending` frames are in flight the new frame is
+    dropped rather than blocking the caller. Every `key_interval`-th frame is
+    coded without temporal prediction, so a reader can start there; with
+    `key_interval=1` every frame stands alone (for lossy transports).
+    """
+
+    def __init__(self, on_encoded, backend="zlib", level=None, key_interval=30, workers=None, max_pending=None,
+                 name="depth"):
+        if _load_backend(backend) is None:
+            raise ValueError(f"depth codec backend '{backend}' is not installed")
+        self.on_encoded = on_encoded
+        self.backend = backend
+        self.level = level
+        self.key_interval = max(1, int(key_interval))
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 1) - 1))
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 2 + 2)
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f"{name}-encode")
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.previous = None
+        self.since_key = 0
+        self.frames = 0
+        self.temporal_frames = 0
+        self.dropped = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.cpu_seconds = 0.0
+        self.started = time.monotonic()
+        metrics = get_metrics()
+        self.encode_histogram = metrics.histogram("kozy_depth_encode_seconds", "Encoding one depth frame", use=name)
+        self.frames_counter = metrics.counter("kozy_depth_codec_frames_total", "Depth frames encoded", use=name)
+        self.dropped_counter = metrics.counter("kozy_depth_codec_dropped_total",
+                                               "Depth frames dropped because the encoders were busy", use=name)
+        self.raw_counter = metrics.counter("kozy_depth_codec_raw_bytes_total", "Depth bytes before encoding",
+                                           use=name)
+        self.compressed_counter = metrics.counter("kozy_depth_codec_compressed_bytes_total",
+                                                  "Depth bytes after encoding", use=name)
+        self.delivery = threading.Thread(target=self._deliver, name=f"{name}-encode-delivery", daemon=True)
+        self.delivery.start()
+
+    def submit(self, depth, timestamp=None):
+        """Queue a frame for encoding; returns False if it was dropped."""
+        if not self.slots.acquire(blocking=False):
+            self.dropped += 1
+            self.dropped_counter.inc()
+            return False
+        frame = np.array(depth, copy=True)
+        with self.lock:
+            previous = self.previous
+            if previous is None or previous.shape != frame.shape or self.since_key + 1 >= self.key_interval:
+                previous, self.since_key = None, 0
+            else:
+                self.since_key += 1
+            self.previous = frame
+            # Queued under the lock so results are delivered in submission order
+            self.results.put((self.executor.submit(self._encode, frame, previous), timestamp, frame.nbytes))
+        return True
+
+    def _encode(self, frame, previous):
+        cpu_start, start = time.thread_time(), time.perf_counter()
+        data = encode_depth(frame, previous, self.backend, self.level)
+        self.encode_histogram.observe(time.perf_counter() - start)
+        return data, time.thread_time() - cpu_start
+
+    def _deliver(self):
+        while True:
+            item = self.results.get()
+            if item is None:
+                return
+            future, timestamp, raw_size = item
+            try:
+                data, cpu = future.result()
+                temporal = bool(data[5] & FLAG_TEMPORAL)
+                self.frames += 1
+                self.temporal_frames += temporal
+                self.raw_bytes += raw_size
+                self.compressed_bytes += len(data)
+                self.cpu_seconds += cpu
+                self.frames_counter.inc()
+                self.raw_counter.inc(raw_size)
+                self.compressed_counter.inc(len(data))
+                self.on_encoded(data, timestamp, temporal)
+            except Exception as e:
+                logging.error(f"Depth encoding failed: {e}")
+            finally:
+                self.slots.release()
+
+    def close(self):
+        """Encode and deliver everything submitted, then stop the workers."""
+        self.results.put(None)
+        self.delivery.join()
+        self.executor.shutdown(wait=True)
+
+    def stats(self):
+        """Frames, drops, compression ratio and encoder throughput (MB/s per core)."""
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "frames": self.frames,
+            "temporal_frames": self.temporal_frames,
+            "dropped": self.dropped,
+            "raw_mb": self.raw_bytes / 1e6,
+            "compressed_mb": self.compressed_bytes / 1e6,
+            "ratio": self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0,
+            "mb_per_core_s": self.raw_bytes / 1e6 / self.cpu_seconds if self.cpu_seconds else 0.0,
+            "mb_s": self.raw_bytes / 1e6 / (time.monotonic() - self.started),
+        }
+
+
+def _sample_frames(path, count):
+    if path:
+        from utils.recording import open_recording
+        frames, _ = open_recording(path)["depth"]
+        return [np.array(frames[index]) for index in range(min(count, len(frames)))]
+    from devices.synthetic import synthetic_depth
+    frames = []
+    for index in range(count):
+        depth = synthetic_depth(1280, 720, seed=index)
+        depth[300:420, 100 + index * 8:300 + index * 8] = 900  # a moving box
+        frames.append(depth)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the depth codec: compression ratio and MB/s per core.")
+    parser.add_argument("recording", nargs="?", help="recording directory with a depth stream (default: synthetic)")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--key-interval", type=int, default=30)
+    args = parser.parse_args()
+
+    frames = _sample_frames(args.recording, args.frames)
+    height, width = frames[0].shape
+    print(f"{len(frames)} frames of {width}x{height} depth "
+          f"({frames[0].nbytes * 30 / 1e6:.1f} MB/s raw at 30 FPS)")
+    for backend in available_backends():
+        pool = DepthEncoderPool(lambda data, timestamp, temporal: None, backend,
+                                key_interval=args.key_interval, workers=args.workers,
+                                max_pending=len(frames) + 1, name="bench")
+        for depth in frames:
+            pool.submit(depth)
+        pool.close()
+        stats = pool.stats()
+
+        decoder = DepthDecoder()
+        encoded = [encode_depth(depth, None, backend) for depth in frames[:5]]
+        start = time.perf_counter()
+        for data, depth in zip(encoded, frames):
+            if not np.array_equal(decoder.decode(data), depth):
+                raise SystemExit(f"{backend}: decoded frame differs from the original")
+        decode_ms = (time.perf_counter() - start) / len(encoded) * 1000
+        print(f"  {backend:5s} ratio {stats['ratio']:.2f}  encode {stats['mb_per_core_s']:.0f} MB/s per core, "
+              f"{stats['mb_s']:.0f} MB/s with {stats['workers']} workers  decode {decode_ms:.1f} ms/frame  "
+              f"temporal {stats['temporal_frames']}/{stats['frames']}")
+
+
+if __name__ == "__main__":
+    main()
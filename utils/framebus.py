@@ -0,0 +1,530 @@
+# utils/framebus.py
+"""Local shared-memory bus for camera frames and Pico messages (Linux).
+
+While the control panel runs it publishes `camera/<serial>/color`,
+`camera/<serial>/depth` and `pico/telemetry`. Other Python processes read them
+without copying:
+
+    from utils.framebus import BusSubscriber
+
+    depth = BusSubscriber("camera/<serial>/depth")
+    frame = depth.read(timeout=1.0)  # frame.seq, frame.timestamp, frame.data (numpy view)
+
+`python -m utils.framebus` lists the topics; `python -m utils.framebus <topic>`
+reports its rate. A subscriber that falls a full ring behind skips ahead to the newest
+frame and counts what it missed in `subscriber.skipped`. The publisher never
+waits for subscribers.
+"""
+import json
+import logging
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Ring layout inside one shared memory block per topic:
+#   header | slot 0 header | slot 0 payload | slot 1 header | slot 1 payload | ...
+# The writer bumps a slot's begin sequence, copies the payload, then sets the end
+# sequence (a seqlock). Readers validate both before and after touching a slot,
+# so a subscriber that falls a full ring behind is detected and skipped forward
+# instead of ever making the publisher wait.
+HEADER_FORMAT = "<IIIIQQd"  # magic, version, slots, closed, slot_size, write_seq, created
+HEADER_SIZE = 64
+SLOT_HEADER_FORMAT = "<QQdQ"  # seq_begin, seq_end, timestamp, nbytes
+SLOT_HEADER_SIZE = 32
+BUS_MAGIC = 0x4B5A4246  # "KZBF"
+BUS_VERSION = 1
+DEFAULT_SLOTS = 8
+_created_blocks = set()  # names of the blocks this process created (and will unlink)
+
+
+def default_socket_path():
+    """Return the per-user control socket path for the local frame bus."""
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"kozy-bus-{uid}.sock")
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing block without letting this process unlink it on exit."""
+    shm = shared_memory.SharedMemory(name=name)
+    if shm._name in _created_blocks:
+        return shm  # the tracker entry belongs to our own publisher, which unlinks it
+    try:
+        # Python < 3.13 registers attached blocks with the resource tracker too
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class BusFrame:
+    """A frame read from the bus; `data` is a view into shared memory."""
+
+    __slots__ = ("topic", "seq", "timestamp", "data", "_ring", "_slot")
+
+    def __init__(self, topic, seq, timestamp, data, ring, slot):
+        self.topic = topic
+        self.seq = seq
+        self.timestamp = timestamp
+        self.data = data
+        self._ring = ring
+        self._slot = slot
+
+    def valid(self):
+        """Return True if the publisher has not overwritten this slot yet (False once the ring is closed)."""
+        buf = self._ring.buf
+        if buf is None:
+            return False
+        seq_begin, seq_end, _, _ = struct.unpack_from(SLOT_HEADER_FORMAT, buf, self._ring.slot_offset(self._slot))
+        return seq_begin == self.seq and seq_end == self.seq
+
+    def copy(self):
+        """Return a private copy of the payload, or None if it was overwritten or the ring closed."""
+        if self._ring.buf is None:
+            return None
+        data = self.data.copy() if isinstance(self.data, np.ndarray) else bytes(self.data)
+        return data if self.valid() else None
+
+
+class _Ring:
+    """Shared memory ring buffer used by both publishers and subscribers."""
+
+    def __init__(self, shm, slots, slot_size):
+        self.shm = shm
+        self.buf = shm.buf
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stride = SLOT_HEADER_SIZE + slot_size
+
+    @classmethod
+    def create(cls, name, slots, slot_size):
+        size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + slot_size)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created_blocks.add(shm._name)
+        ring = cls(shm, slots, slot_size)
+        struct.pack_into(HEADER_FORMAT, shm.buf, 0,
+                         BUS_MAGIC, BUS_VERSION, slots, 0, slot_size, 0, time.time())
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        shm = _attach_shared_memory(name)
+        magic, version, slots, _, slot_size, _, _ = struct.unpack_from(HEADER_FORMAT, shm.buf, 0)
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            shm.close()
+            raise ValueError(f"{name} is not a frame bus ring")
+        return cls(shm, slots, slot_size)
+
+    def write_seq(self):
+        return struct.unpack_from("<Q", self.buf, 24)[0]
+
+    def closed(self):
+        return struct.unpack_from("<I", self.buf, 12)[0] != 0
+
+    def mark_closed(self):
+        struct.pack_into("<I", self.buf, 12, 1)
+
+    def slot_offset(self, slot):
+        return HEADER_SIZE + slot * self.stride
+
+    def read_slot_header(self, slot):
+        return struct.unpack_from(SLOT_HEADER_FORMAT, self.buf, self.slot_offset(slot))
+
+    def write(self, seq, payload, timestamp):
+        slot = seq % self.slots
+        offset = self.slot_offset(slot)
+        nbytes = len(payload)
+        struct.pack_into("<Q", self.buf, offset, seq)
+        start = offset + SLOT_HEADER_SIZE
+        self.buf[start:start + nbytes] = payload
+        struct.pack_into("<QdQ", self.buf, offset + 8, seq, timestamp, nbytes)
+        struct.pack_into("<Q", self.buf, 24, seq)
+
+    def payload_view(self, slot, nbytes):
+        start = self.slot_offset(slot) + SLOT_HEADER_SIZE
+        return self.buf[start:start + nbytes]
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds a zero-copy view; the mapping goes away with it
+            pass
+
+
+class Publisher:
+    """Write side of a single topic. Publishing never blocks on subscribers."""
+
+    def __init__(self, bus, topic, shape=None, dtype=None, slots=DEFAULT_SLOTS, max_bytes=None):
+        self.bus = bus
+        self.topic = topic
+        self.shape = tuple(shape) if shape is not None else None
+        self.dtype = np.dtype(dtype).str if dtype is not None else None
+        if self.shape is not None:
+            slot_size = int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+        else:
+            slot_size = int(max_bytes or 4096)
+        self.shm_name = f"kozy_{uuid.uuid4().hex[:12]}"
+        self.ring = _Ring.create(self.shm_name, slots, slot_size)
+        self.seq = 0
+        self.published = 0
+        self.lock = threading.Lock()
+
+    def describe(self):
+        return {
+            "shm": self.shm_name,
+            "shape": list(self.shape) if self.shape is not None else None,
+            "dtype": self.dtype,
+            "slots": self.ring.slots,
+            "slot_size": self.ring.slot_size,
+        }
+
+    def publish(self, data, timestamp=None):
+        """Copy one frame into the ring; returns its sequence number, or None once closed."""
+        if isinstance(data, np.ndarray):
+            if self.shape is not None and data.shape != self.shape:
+                raise ValueError(f"{self.topic}: expected shape {self.shape}, got {data.shape}")
+            payload = memoryview(np.ascontiguousarray(data)).cast("B")
+        elif isinstance(data, str):
+            payload = data.encode("utf-8")
+        else:
+            payload = memoryview(data).cast("B")
+        if len(payload) > self.ring.slot_size:
+            raise ValueError(f"{self.topic}: payload of {len(payload)} bytes exceeds slot size")
+
+        with self.lock:
+            if self.ring.buf is None:
+                return None  # unadvertised while this frame was on its way
+            self.seq += 1
+            self.ring.write(self.seq, payload, timestamp if timestamp is not None else time.time())
+            self.published += 1
+            return self.seq
+
+    def close(self):
+        with self.lock:  # not in the middle of a write
+            self.ring.mark_closed()
+            self.ring.close()
+        _created_blocks.discard(self.ring.shm._name)
+        try:
+            self.ring.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameBus:
+    """Local publish/subscribe bus: shared memory rings plus a Unix socket control channel."""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.publishers = {}
+        self.subscribers = {}  # client id -> {"topic", "skipped", "last_seen"}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        """Start serving the control channel. Returns False if unsupported or busy."""
+        if not hasattr(socket, "AF_UNIX"):
+            logging.warning("Frame bus disabled: Unix sockets are not supported on this platform")
+            return False
+        try:
+            if os.path.exists(self.socket_path):
+                # A stale socket from a crashed run is safe to replace, a live one is not
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.socket_path)
+                    probe.close()
+                    logging.warning(f"Frame bus already running at {self.socket_path}")
+                    return False
+                except OSError:
+                    os.unlink(self.socket_path)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.socket_path)
+            self.server.listen(16)
+            self.server.settimeout(0.5)
+        except OSError as e:
+            logging.error(f"Failed to start frame bus: {e}")
+            self.server = None
+            return False
+
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, name="framebus-control", daemon=True)
+        self.thread.start()
+        logging.info(f"Frame bus listening on {self.socket_path}")
+        return True
+
+    def stop(self):
+        """Stop the control channel and release every topic."""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.server:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self.lock:
+            for publisher in self.publishers.values():
+                publisher.close()
+            self.publishers.clear()
+
+    def advertise(self, topic, shape=None, dtype=None, slots=DEFAULT_SLOTS, max_bytes=None):
+        """Create or reuse the publisher for a topic.
+
+        Frame topics pass `shape`/`dtype`; byte topics pass `max_bytes`. A topic
+        re-advertised with a different layout gets a fresh ring and the old one
+        is marked closed so attached subscribers re-resolve it.
+        """
+        with self.lock:
+            existing = self.publishers.get(topic)
+            if existing is not None:
+                same_layout = (
+                    existing.shape == (tuple(shape) if shape is not None else None)
+                    and existing.dtype == (np.dtype(dtype).str if dtype is not None else None)
+                    and (shape is not None or existing.ring.slot_size >= int(max_bytes or 4096))
+                )
+                if same_layout:
+                    return existing
+                existing.close()
+            publisher = Publisher(self, topic, shape, dtype, slots, max_bytes)
+            self.publishers[topic] = publisher
+            return publisher
+
+    def publish(self, topic, data, timestamp=None):
+        """Publish an array or bytes payload, advertising the topic on first use."""
+        with self.lock:
+            publisher = self.publishers.get(topic)
+        if isinstance(data, np.ndarray):
+            if publisher is None or publisher.shape != data.shape or publisher.dtype != data.dtype.str:
+                publisher = self.advertise(topic, data.shape, data.dtype)
+        elif publisher is None or publisher.shape is not None:
+            publisher = self.advertise(topic, max_bytes=4096)
+        return publisher.publish(data, timestamp)
+
+    def unadvertise(self, topic):
+        """Stop publishing a topic and release its ring; subscribers see it closed."""
+        with self.lock:
+            publisher = self.publishers.pop(topic, None)
+        if publisher is not None:
+            publisher.close()
+
+    def topics(self):
+        with self.lock:
+            return {topic: publisher.describe() for topic, publisher in self.publishers.items()}
+
+    def slow_subscribers(self, max_skipped=0):
+        """Return subscribers that reported more skipped frames than `max_skipped`."""
+        with self.lock:
+            return {client: dict(info) for client, info in self.subscribers.items()
+                    if info["skipped"] > max_skipped}
+
+    def _serve(self):
+        while self.running:
+            try:
+                connection, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._handle_client, args=(connection,),
+                             name="framebus-client", daemon=True).start()
+
+    def _handle_client(self, connection):
+        client_id = uuid.uuid4().hex[:8]
+        try:
+            with connection, connection.makefile("rwb") as stream:
+                for raw in stream:
+                    try:
+                        request = json.loads(raw)
+                        response = self._handle_request(client_id, request)
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                    stream.write(json.dumps(response).encode("utf-8") + b"\n")
+                    stream.flush()
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.subscribers.pop(client_id, None)
+
+    def _handle_request(self, client_id, request):
+        op = request.get("op")
+        if op == "list":
+            return {"ok": True, "topics": self.topics()}
+        if op == "subscribe":
+            topic = request["topic"]
+            with self.lock:
+                publisher = self.publishers.get(topic)
+                if publisher is None:
+                    return {"ok": False, "error": f"unknown topic {topic}"}
+                self.subscribers[client_id] = {"topic": topic, "skipped": 0, "last_seen": time.time()}
+                return {"ok": True, "client": client_id, "topic": topic, **publisher.describe()}
+        if op == "report":
+            with self.lock:
+                info = self.subscribers.get(client_id)
+                if info is not None:
+                    previous = info["skipped"]
+                    info["skipped"] = int(request.get("skipped", 0))
+                    info["last_seen"] = time.time()
+                    if info["skipped"] > previous:
+                        logging.debug(f"Slow bus subscriber {client_id} on {info['topic']}: "
+                                      f"{info['skipped']} frames skipped")
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op}"}
+
+
+class BusSubscriber:
+    """Read side of a topic, usable from any local process."""
+
+    def __init__(self, topic, socket_path=None, report_interval=1.0):
+        self.topic = topic
+        self.socket_path = socket_path or default_socket_path()
+        self.report_interval = report_interval
+        self.connection = None
+        self.stream = None
+        self.ring = None
+        self.shape = None
+        self.dtype = None
+        self.last_seq = 0
+        self.skipped = 0
+        self.received = 0
+        self.last_report = 0.0
+        self._connect()
+
+    def _request(self, payload):
+        self.stream.write(json.dumps(payload).encode("utf-8") + b"\n")
+        self.stream.flush()
+        response = json.loads(self.stream.readline() or b"{}")
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "frame bus closed the connection"))
+        return response
+
+    def _connect(self):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(self.socket_path)
+        self.stream = self.connection.makefile("rwb")
+        self._resolve()
+
+    def _resolve(self):
+        info = self._request({"op": "subscribe", "topic": self.topic})
+        if self.ring is not None:
+            self.ring.close()
+        self.ring = _Ring.attach(info["shm"])
+        self.shape = tuple(info["shape"]) if info["shape"] is not None else None
+        self.dtype = np.dtype(info["dtype"]) if info["dtype"] is not None else None
+        # Start from whatever is newest; history before subscribing is not replayed
+        self.last_seq = max(self.ring.write_seq() - 1, 0)
+
+    def poll(self):
+        """Return the next frame without waiting, or None if nothing new arrived."""
+        if self.ring.closed():
+            self._resolve()
+        latest = self.ring.write_seq()
+        if latest <= self.last_seq:
+            return None
+
+        seq = self.last_seq + 1
+        if latest - seq >= self.ring.slots - 1:
+            # Lapped: jump to the newest frame instead of reading torn slots
+            self.skipped += latest - seq
+            seq = latest
+
+        slot = seq % self.ring.slots
+        seq_begin, seq_end, timestamp, nbytes = self.ring.read_slot_header(slot)
+        if seq_begin != seq or seq_end != seq:
+            # Overwritten between the checks above; the next poll picks up the newest
+            self.skipped += 1
+            self.last_seq = seq
+            return None
+
+        view = self.ring.payload_view(slot, nbytes)
+        data = np.frombuffer(view, dtype=self.dtype).reshape(self.shape) if self.shape else view
+        self.last_seq = seq
+        self.received += 1
+        self._maybe_report()
+        return BusFrame(self.topic, seq, timestamp, data, self.ring, slot)
+
+    def read(self, timeout=1.0, poll_interval=0.001):
+        """Wait up to `timeout` seconds for the next frame."""
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self.poll()
+            if frame is not None or time.monotonic() >= deadline:
+                return frame
+            time.sleep(poll_interval)
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self.last_report >= self.report_interval:
+            self.last_report = now
+            try:
+                self._request({"op": "report", "skipped": self.skipped})
+            except (OSError, RuntimeError):
+                pass
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.stream is not None:
+            self.stream.close()
+            self.connection.close()
+            self.stream = None
+
+
+def list_topics(socket_path=None):
+    """Return the topics currently published on the local bus."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path or default_socket_path())
+        with connection.makefile("rwb") as stream:
+            stream.write(b'{"op": "list"}\n')
+            stream.flush()
+            return json.loads(stream.readline())["topics"]
+
+
+def main():
+    """Small CLI for inspecting the bus: list topics or print a topic's frame rate."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the Kozy frame bus")
+    parser.add_argument("topic", nargs="?", help="topic to subscribe to, e.g. camera/<serial>/color")
+    parser.add_argument("--socket", default=None, help="control socket path")
+    args = parser.parse_args()
+
+    if not args.topic:
+        for topic, info in list_topics(args.socket).items():
+            print(f"{topic}: shape={info['shape']} dtype={info['dtype']} slots={info['slots']}")
+        return
+
+    subscriber = BusSubscriber(args.topic, args.socket)
+    window_start, count = time.monotonic(), 0
+    try:
+        while True:
+            if subscriber.read(timeout=1.0) is not None:
+                count += 1
+            elapsed = time.monotonic() - window_start
+            if elapsed >= 1.0:
+                print(f"{args.topic}: {count / elapsed:.1f} fps, seq={subscriber.last_seq}, "
+                      f"skipped={subscriber.skipped}")
+                window_start, count = time.monotonic(), 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+# utils/graph.py
+"""Processing pipelines described in YAML (see graphs/depth_preview.yaml).
+
+Load one from `Program -> Load Graph...` or with `graph load <file>` in the
+console. Each node runs on its own thread or process (`executor: thread|process`)
+and is fed through a bounded queue (`queue: <size>`) with a `block`,
+`drop_oldest` or `drop_newest` policy. Built-in node types: `realsense`, `pico`,
+`depth_normalize`, `occupancy`, `function` (any `module:function`), `display`,
+`bus` and `recorder`; register_node adds more. `Program -> Graph Stats` logs
+per-node CPU time and per-edge queue depth.
+"""
+import importlib
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+import yaml
+
+# Edge policies when a consumer falls behind
+POLICIES = ("block", "drop_oldest", "drop_newest")
+EXECUTORS = ("thread", "process")
+ANY = "any"
+
+NODE_TYPES = {}
+
+
+def register_node(type_name):
+    """Class decorator making a node type available to graph files."""
+    def decorator(cls):
+        NODE_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+class Edge:
+    """Bounded queue between one output port and one input port."""
+
+    def __init__(self, source, target, data_type, maxsize=4, policy="drop_oldest", interprocess=False):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', expected one of {POLICIES}")
+        self.source = source  # "node.port"
+        self.target = target
+        self.data_type = data_type
+        self.maxsize = maxsize
+        self.policy = policy
+        self.interprocess = interprocess
+        if interprocess:
+            self.queue = multiprocessing.Queue(maxsize)
+            self.dropped = multiprocessing.Value("q", 0)
+        else:
+            self.queue = queue.Queue(maxsize)
+            self.dropped = _Counter()
+
+    def put(self, item, stop_event):
+        """Queue an item according to the edge policy; never blocks past shutdown."""
+        if self.policy == "block":
+            while not stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                pass
+        with self.dropped.get_lock():
+            self.dropped.value += 1
+
+    def depth(self):
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            # multiprocessing queues cannot report their size on macOS
+            return -1
+
+
+class _Counter:
+    """Thread-side stand-in for multiprocessing.Value with the same interface."""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def get_lock(self):
+        return self.lock
+
+
+class Node:
+    """Base class for graph nodes.
+
+    Sources override `produce()`; filters and sinks override `process(port, item)`.
+    Both hand results downstream with `emit(port, item)`.
+    """
+
+    inputs = {}   # port -> data type
+    outputs = {}  # port -> data type
+
+    def __init__(self, name, params=None, context=None):
+        self.name = name
+        self.params = params or {}
+        self.context = context or {}
+        self._outputs = {}
+        self._stop_event = None
+
+    def setup(self):
+        """Acquire resources; runs on the node's own executor."""
+
+    def produce(self):
+        """Sources: emit new data, return False if nothing was available."""
+        return False
+
+    def process(self, port, item):
+        """Filters and sinks: handle one item arriving on an input port."""
+
+    def teardown(self):
+        """Release resources; runs on the node's own executor."""
+
+    def emit(self, port, item):
+        for edge in self._outputs.get(port, ()):
+            edge.put(item, self._stop_event)
+
+
+class NodeRunner:
+    """Runs one node on a thread or child process and tracks its statistics."""
+
+    def __init__(self, name, node_type, params, executor, context):
+        if executor not in EXECUTORS:
+            raise ValueError(f"{name}: unknown executor '{executor}', expected one of {EXECUTORS}")
+        self.name = name
+        self.node_type = node_type
+        self.params = params
+        self.executor = executor
+        self.context = context if executor == "thread" else {}
+        self.in_edges = {}   # port -> [Edge]
+        self.out_edges = {}  # port -> [Edge]
+        self.worker = None
+        if executor == "process":
+            self.stop_event = multiprocessing.Event()
+            self.cpu_time = multiprocessing.Value("d", 0.0, lock=False)
+            self.processed = multiprocessing.Value("q", 0, lock=False)
+        else:
+            self.stop_event = threading.Event()
+            self.cpu_time = _Counter()
+            self.cpu_time.value = 0.0
+            self.processed = _Counter()
+
+    def start(self):
+        self.stop_event.clear()
+        args = (self.name, self.node_type, self.params, self.context, self.in_edges,
+                self.out_edges, self.stop_event, self.cpu_time, self.processed, self.executor)
+        if self.executor == "process":
+            self.worker = multiprocessing.Process(target=_run_node, args=args,
+                                                  name=f"node-{self.name}", daemon=True)
+        else:
+            self.worker = threading.Thread(target=_run_node, args=args,
+                                           name=f"node-{self.name}", daemon=True)
+        self.worker.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.worker is None:
+            return
+        self.worker.join(timeout)
+        if self.worker.is_alive():
+            if self.executor == "process":
+                logging.warning(f"Graph node {self.name} did not stop in time, terminating")
+                self.worker.terminate()
+            else:
+                logging.warning(f"Graph node {self.name} did not stop in time")
+        self.worker = None
+
+
+def _run_node(name, node_type, params, context, in_edges, out_edges, stop_event,
+              cpu_time, processed, executor):
+    """Executor body shared by thread and process nodes."""
+    clock = time.thread_time if executor == "thread" else time.process_time
+    node = NODE_TYPES[node_type](name, params, context)
+    node._outputs = out_edges
+    node._stop_event = stop_event
+    inputs = [(port, edge) for port, edges in in_edges.items() for edge in edges]
+
+    try:
+        node.setup()
+    except Exception as e:
+        logging.error(f"Graph node {name} failed to start: {e}")
+        return
+
+    try:
+        while not stop_event.is_set():
+            if not inputs:
+                if not node.produce():
+                    time.sleep(0.001)
+                else:
+                    processed.value += 1
+            elif len(inputs) == 1:
+                port, edge = inputs[0]
+                try:
+                    item = edge.queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                node.process(port, item)
+                processed.value += 1
+            else:
+                received = False
+                for port, edge in inputs:
+                    try:
+                        item = edge.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    node.process(port, item)
+                    processed.value += 1
+                    received = True
+                if not received:
+                    time.sleep(0.001)
+            cpu_time.value = clock()
+    except Exception as e:
+        logging.error(f"Graph node {name} crashed: {e}")
+    finally:
+        try:
+            node.teardown()
+        except Exception as e:
+            logging.error(f"Graph node {name} teardown failed: {e}")
+        cpu_time.value = clock()
+
+
+class Graph:
+    """A validated set of nodes and edges that starts and stops as one unit."""
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.runners = {}
+        self.edges = []
+        self.running = False
+
+    def add_node(self, name, node_type, params=None, executor="thread"):
+        if name in self.runners:
+            raise ValueError(f"Duplicate graph node '{name}'")
+        if node_type not in NODE_TYPES:
+            raise ValueError(f"{name}: unknown node type '{node_type}'")
+        runner = NodeRunner(name, node_type, params or {}, executor, self.context)
+        self.runners[name] = runner
+        return runner
+
+    def connect(self, source, target, maxsize=4, policy="drop_oldest"):
+        """Connect "node.port" to "node.port", checking that the port types agree."""
+        source_node, source_port = _split_endpoint(source)
+        target_node, target_port = _split_endpoint(target)
+        for node in (source_node, target_node):
+            if node not in self.runners:
+                raise ValueError(f"Edge {source} -> {target}: unknown node '{node}'")
+
+        source_runner = self.runners[source_node]
+        target_runner = self.runners[target_node]
+        output_type = NODE_TYPES[source_runner.node_type].outputs.get(source_port)
+        input_type = NODE_TYPES[target_runner.node_type].inputs.get(target_port)
+        if output_type is None:
+            raise ValueError(f"Node '{source_node}' has no output port '{source_port}'")
+        if input_type is None:
+            raise ValueError(f"Node '{target_node}' has no input port '{target_port}'")
+        if ANY not in (output_type, input_type) and output_type != input_type:
+            raise ValueError(f"Edge {source} -> {target}: {output_type} does not match {input_type}")
+
+        interprocess = "process" in (source_runner.executor, target_runner.executor)
+        edge = Edge(source, target, output_type, maxsize, policy, interprocess)
+        source_runner.out_edges.setdefault(source_port, []).append(edge)
+        target_runner.in_edges.setdefault(target_port, []).append(edge)
+        self.edges.append(edge)
+        return edge
+
+    def dependency_order(self):
+        """Node names with every producer before its consumers."""
+        upstream = {name: set() for name in self.runners}
+        for edge in self.edges:
+            upstream[_split_endpoint(edge.target)[0]].add(_split_endpoint(edge.source)[0])
+
+        order, ready = [], sorted(name for name, deps in upstream.items() if not deps)
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in upstream.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps and other not in order and other not in ready:
+                        ready.append(other)
+        if len(order) != len(self.runners):
+            cycle = sorted(set(self.runners) - set(order))
+            raise ValueError(f"Graph has a cycle through: {', '.join(cycle)}")
+        return order
+
+    def start(self):
+        """Start consumers before producers so nothing is emitted into a dead queue."""
+        for name in reversed(self.dependency_order()):
+            self.runners[name].start()
+        self.running = True
+        logging.info(f"Graph started with {len(self.runners)} nodes and {len(self.edges)} edges")
+
+    def stop(self):
+        """Stop producers first so downstream nodes see their last items."""
+        for name in self.dependency_order():
+            self.runners[name].stop()
+        for edge in self.edges:
+            if edge.interprocess:
+                # Nobody reads these any more; don't let leftovers block interpreter exit
+                edge.queue.cancel_join_thread()
+        self.running = False
+        logging.info("Graph stopped")
+
+    def stats(self):
+        """Per-node CPU time and item counts plus per-edge queue depth and drops."""
+        return {
+            "nodes": {
+                name: {
+                    "executor": runner.executor,
+                    "alive": bool(runner.worker and runner.worker.is_alive()),
+                    "cpu_time": round(runner.cpu_time.value, 4),
+                    "processed": runner.processed.value,
+                }
+                for name, runner in self.runners.items()
+            },
+            "edges": {
+                f"{edge.source} -> {edge.target}": {
+                    "depth": edge.depth(),
+                    "maxsize": edge.maxsize,
+                    "policy": edge.policy,
+                    "dropped": edge.dropped.value,
+                }
+                for edge in self.edges
+            },
+        }
+
+
+def _split_endpoint(endpoint):
+    node, separator, port = endpoint.partition(".")
+    if not separator:
+        raise ValueError(f"Endpoint '{endpoint}' must look like node.port")
+    return node, port
+
+
+def build_graph(spec, context=None):
+    """Build a graph from a parsed spec (see load_graph for the format)."""
+    graph = Graph(context)
+    nodes = spec.get("nodes") or {}
+    for name, node_spec in nodes.items():
+        graph.add_node(name, node_spec["type"], node_spec.get("params"),
+                       node_spec.get("executor", "thread"))
+    for name, node_spec in nodes.items():
+        for port, source in (node_spec.get("inputs") or {}).items():
+            sources = source if isinstance(source, list) else [source]
+            for endpoint in sources:
+                graph.connect(endpoint, f"{name}.{port}",
+                              node_spec.get("queue", 4), node_spec.get("policy", "drop_oldest"))
+    graph.dependency_order()
+    return graph
+
+
+def load_graph(path, context=None):
+    """Load a graph from YAML.
+
+    Example:
+        nodes:
+          camera:
+            type: realsense
+            params: {width: 848, height: 480, fps: 30}
+          depth_view:
+            type: depth_normalize
+            executor: process
+            inputs: {depth: camera.depth}
+            queue: 2
+            policy: drop_oldest
+          display:
+            type: display
+            inputs: {image: depth_view.image}
+    """
+    with open(path, "r") as graph_file:
+        spec = yaml.safe_load(graph_file) or {}
+    return build_graph(spec, context)
+
+
+# ---------------------------------------------------------------------------
+# Built-in nodes
+# ---------------------------------------------------------------------------
+
+@register_node("realsense")
+class RealSenseSource(Node):
+    """Color and depth frames from a RealSense camera."""
+
+    outputs = {"color": "color", "depth": "depth"}
+
+    def setup(self):
+        from devices.realsense import rs
+        width = self.params.get("width", 1280)
+        height = self.params.get("height", 720)
+        fps = self.params.get("fps", 30)
+        self.pipeline = rs.pipeline()
+        config = rs.config()
+        if self.params.get("serial"):
+            config.enable_device(str(self.params["serial"]))
+        config.enable_stream(rs.stream.color, width, height, rs.format.rgb8, fps)
+        config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
+        self.pipeline.start(config)
+
+    def produce(self):
+        import numpy as np
+        frames = self.pipeline.poll_for_frames()
+        if not frames:
+            return False
+        color_frame = frames.get_color_frame()
+        depth_frame = frames.get_depth_frame()
+        if color_frame:
+            self.emit("color", (color_frame.get_timestamp() / 1000.0,
+                                np.array(color_frame.get_data(), copy=True)))
+        if depth_frame:
+            self.emit("depth", (depth_frame.get_timestamp() / 1000.0,
+                                np.array(depth_frame.get_data(), copy=True)))
+        return True
+
+    def teardown(self):
+        self.pipeline.stop()
+
+
+@register_node("pico")
+class PicoSource(Node):
+    """Lines received from the Pico as (timestamp, kind, payload) tuples."""
+
+    outputs = {"telemetry": "telemetry"}
+
+    def setup(self):
+        from devices.pico import PicoLink
+        self.messages = queue.Queue()
+        self.link = PicoLink(self.params.get("port"), self.params.get("baudrate", 115200),
+                             on_message=lambda kind, payload: self.messages.put((time.time(), kind, payload)))
+        if not self.link.open():
+            raise RuntimeError("Pico link could not be opened")
+
+    def produce(self):
+        try:
+            message = self.messages.get(timeout=0.05)
+        except queue.Empty:
+            return False
+        self.emit("telemetry", message)
+        return True
+
+    def teardown(self):
+        self.link.close()
+
+
+@register_node("depth_normalize")
+class DepthNormalize(Node):
+    """Depth frame to an 8-bit image for display."""
+
+    inputs = {"depth": "depth"}
+    outputs = {"image": "image"}
+
+    def process(self, port, item):
+        from devices.realsense import normalize_depth_for_display
+        timestamp, depth = item
+        self.emit("image", (timestamp, normalize_depth_for_display(depth, self.params.get("max_distance_mm", 3000))))
+
+
+@register_node("occupancy")
+class OccupancyNode(Node):
+    """Depth frames to a robot-centric occupancy grid (float32, rows forward, columns right to left).
+
+    Params are those of utils.occupancy.OccupancyGrid, plus optional
+    `intrinsics` [fx, fy, cx, cy] and `depth_scale`; without intrinsics a
+    RealSense-like field of view is assumed.
+    """
+
+    inputs = {"depth": "depth"}
+    outputs = {"grid": "occupancy"}
+
+    def setup(self):
+        self.grid = None
+
+    def process(self, port, item):
+        from utils.occupancy import OccupancyGrid, default_intrinsics
+        timestamp, depth = item
+        height, width = depth.shape
+        if self.grid is None or (self.grid.width, self.grid.height) != (width, height):
+            params = dict(self.params)
+            intrinsics = params.pop("intrinsics", None) or default_intrinsics(width, height)
+            depth_scale = params.pop("depth_scale", 0.001)
+            self.grid = OccupancyGrid(width, height, intrinsics, depth_scale, **params)
+        self.grid.update(depth, timestamp)
+        self.emit("grid", (timestamp, self.grid.grid.copy()))
+
+
+@register_node("function")
+class FunctionNode(Node):
+    """Apply an importable "module:function" to every item (inference, custom filters)."""
+
+    inputs = {"in": ANY}
+    outputs = {"out": ANY}
+
+    def setup(self):
+        module_name, _, function_name = self.params["function"].partition(":")
+        self.function = getattr(importlib.import_module(module_name), function_name)
+
+    def process(self, port, item):
+        result = self.function(item)
+        if result is not None:
+            self.emit("out", result)
+
+
+@register_node("display")
+class DisplaySink(Node):
+    """Hand items to the GUI through the `display` callable in the graph context."""
+
+    inputs = {"image": ANY}
+
+    def setup(self):
+        self.display = self.context.get("display")
+        if self.display is None:
+            raise RuntimeError("display node needs a GUI context; use the thread executor")
+
+    def process(self, port, item):
+        self.display(self.name, item)
+
+
+@register_node("bus")
+class BusSink(Node):
+    """Publish (timestamp, array) items on the frame bus under `params.topic`."""
+
+    inputs = {"frame": ANY}
+
+    def setup(self):
+        self.bus = self.context.get("frame_bus")
+        self.owns_bus = self.bus is None
+        if self.owns_bus:
+            from utils.framebus import FrameBus
+            self.bus = FrameBus(self.params.get("socket"))
+            self.bus.start()
+
+    def process(self, port, item):
+        timestamp, data = item[0], item[-1]
+        self.bus.publish(self.params["topic"], data, timestamp)
+
+    def teardown(self):
+        if self.owns_bus:
+            self.bus.stop()
+
+
+@register_node("recorder")
+class RecorderSink(Node):
+    """Write (timestamp, array) items from each input to a recording directory."""
+
+    inputs = {"color": "color", "depth": "depth"}
+
+    def setup(self):
+        from utils.recording import RecordingWriter
+        path = self.params.get("path") or time.strftime("recordings/%Y%m%d-%H%M%S")
+        self.writer = RecordingWriter(path)
+
+    def process(self, port, item):
+        timestamp, data = item
+        self.writer.write(port, data, timestamp)
+
+    def teardown(self):
+        self.writer.close()
@@ -0,0 +1,56 @@
+# utils/lazy.py
+import importlib
+import logging
+import threading
+import time
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for `name` that defers the real import until it is used."""
+    return LazyModule(name)
+
+
+def preload_modules(names, on_done=None):
+    """Import modules on a background thread so first use doesn't stall the GUI.
+
+    Missing optional modules are skipped quietly; `on_done` receives
+    {name: seconds or None} once everything has been tried.
+    """
+    def worker():
+        timings = {}
+        for name in names:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+                timings[name] = time.perf_counter() - start
+            except ImportError:
+                timings[name] = None
+            except Exception as e:
+                timings[name] = None
+                logging.warning(f"Preloading {name} failed: {e}")
+        if on_done:
+            on_done(timings)
+
+    thread = threading.Thread(target=worker, name="module-preload", daemon=True)
+    thread.start()
+    return thread
@@ -1,20 +1,44 @@
 # utils/logger.py
 import logging
-from PySide6.QtWidgets import QPlainTextEdit
 
-class QLogHandler(logging.Handler):
-    def __init__(self, text_edit: QPlainTextEdit):
+from utils.logstore import LogStore
+from utils.metrics import get_metrics
+
+_exception_formatter = logging.Formatter()
+
+class LogStoreHandler(logging.Handler):
+    """Appends every record to a LogStore.
+
+    Records can come from device and worker threads; the store takes its own
+    short lock and the console polls it, so nothing is queued per record and
+    no Qt signal is emitted.
+    """
+
+    def __init__(self, store: LogStore):
         super().__init__()
-        self.text_edit = text_edit
+        self.store = store
+
+    def handle(self, record):
+        # The store is thread-safe, so skip the handler lock Handler.handle() would take
+        if self.filter(record):
+            self.emit(record)
+        return record
 
     def emit(self, record):
-        message = self.format(record)
-        self.text_edit.appendPlainText(message)
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message = f"{message}\n{_exception_formatter.formatException(record.exc_info)}"
+            # `extra={"source": "pico"}` names the source; otherwise the emitting module does
+            source = getattr(record, "source", None) or record.module
+            self.store.append(record.created, record.levelname, source, message)
+        except Exception:
+            self.handleError(record)
 
-def setup_logger(text_edit: QPlainTextEdit):
-    handler = QLogHandler(text_edit)
-    formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
-    handler.setFormatter(formatter)
+def setup_logger(store: LogStore):
+    handler = LogStoreHandler(store)
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     root_logger.addHandler(handler)
+    get_metrics().gauge("kozy_log_records", "Log records held by the console", function=store.__len__)
+    return handler
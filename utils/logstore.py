@@ -0,0 +1,234 @@
+# utils/logstore.py
+"""In-memory log store behind the System Console.
+
+Records are kept column-wise rather than as objects:
+- timestamps go in an array of doubles
+- level and source are small codes into interned name tables
+- messages are grouped in chunks
+
+A full chunk is sealed into one joined string, a lowercased copy and an
+offsets array. A million records therefore cost little more than their text,
+and a substring search is a scan of a few large strings.
+
+Every level and source also keeps the rows it occurs in, so selective
+filters ("errors from pico") only look at those rows. Rows are numbered from
+the first record ever appended. Over capacity, whole chunks are dropped from
+the front.
+"""
+import bisect
+import threading
+from array import array
+
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+SEPARATOR = "\x00"  # between messages of a sealed chunk; never part of a message
+
+
+class _Chunk:
+    __slots__ = ("text", "lower", "offsets", "lower_offsets")
+
+    def __init__(self, messages):
+        self.text = SEPARATOR.join(messages)
+        self.offsets = _offsets(messages)
+        self.lower = self.text.lower()
+        # Lowercasing a few characters changes their length (e.g. "İ")
+        self.lower_offsets = self.offsets if len(self.lower) == len(self.text) else \
+            _offsets([message.lower() for message in messages])
+
+    def message(self, position):
+        return self.text[self.offsets[position]:self.offsets[position + 1] - 1]
+
+    def matches(self, needle, lowercase):
+        """Boolean mask over the chunk's messages: which ones contain `needle`."""
+        text, offsets = (self.lower, self.lower_offsets) if lowercase else (self.text, self.offsets)
+        starts = []
+        position = text.find(needle)
+        while position >= 0:
+            starts.append(position)
+            end = text.find(SEPARATOR, position + len(needle))  # one hit per message is enough
+            if end < 0:
+                break
+            position = text.find(needle, end + 1)
+        mask = np.zeros(len(offsets) - 1, bool)
+        mask[np.searchsorted(offsets, starts, side="right") - 1] = True
+        return mask
+
+
+def _offsets(messages):
+    """Start of each message in the joined text, plus one past the end."""
+    offsets = np.zeros(len(messages) + 1, np.int64)
+    np.cumsum(np.fromiter((len(message) + 1 for message in messages), np.int64, len(messages)), out=offsets[1:])
+    return offsets
+
+
+class LogStore:
+    """Append-only, thread-safe log store with level and source indexes.
+
+    `append` is cheap and never waits on readers for long; `query` copies
+    what it needs under the lock and searches outside it.
+    """
+
+    def __init__(self, capacity=1_000_000, chunk_size=8192):
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.times = array("d")
+        self.level_codes = array("B")
+        self.source_codes = array("H")
+        self.level_names, self.source_names = [], []
+        self.level_lookup, self.source_lookup = {}, {}
+        self.level_rows, self.source_rows = [], []  # code -> array of rows
+        self.chunks = []  # sealed _Chunk objects, oldest first
+        self.pending = []  # messages of the open chunk
+        self.first = 0  # row number of the oldest stored record
+        self.total = 0  # records ever appended; the next row number
+        for level in LEVELS:
+            self._intern(level, self.level_names, self.level_lookup, self.level_rows)
+
+    @staticmethod
+    def _intern(name, names, lookup, rows):
+        code = lookup.get(name)
+        if code is None:
+            code = lookup[name] = len(names)
+            names.append(name)
+            rows.append(array("Q"))
+        return code
+
+    def append(self, timestamp, level, source, message):
+        """Store one record; `level` and `source` are short names ("INFO", "pico")."""
+        if SEPARATOR in message:
+            message = message.replace(SEPARATOR, " ")
+        with self.lock:
+            level_code = self.level_lookup.get(level)
+            if level_code is None:
+                level_code = self._intern(level, self.level_names, self.level_lookup, self.level_rows)
+            source_code = self.source_lookup.get(source)
+            if source_code is None:
+                source_code = self._intern(source, self.source_names, self.source_lookup, self.source_rows)
+            row = self.total
+            self.times.append(timestamp)
+            self.level_codes.append(level_code)
+            self.source_codes.append(source_code)
+            self.level_rows[level_code].append(row)
+            self.source_rows[source_code].append(row)
+            self.pending.append(message)
+            self.total = row + 1
+            if len(self.pending) >= self.chunk_size:
+                self.chunks.append(_Chunk(self.pending))
+                self.pending = []
+                if self.total - self.first > self.capacity + self.chunk_size:
+                    self._drop_oldest_chunk()
+
+    def _drop_oldest_chunk(self):
+        """Forget the oldest sealed chunk; call with the lock held."""
+        del self.chunks[0]
+        del self.times[:self.chunk_size]
+        del self.level_codes[:self.chunk_size]
+        del self.source_codes[:self.chunk_size]
+        self.first += self.chunk_size
+        for rows in self.level_rows + self.source_rows:
+            del rows[:bisect.bisect_left(rows, self.first)]
+
+    def __len__(self):
+        return self.total - self.first
+
+    def levels(self):
+        return list(self.level_names)
+
+    def sources(self):
+        """Names of every source seen so far, sorted."""
+        with self.lock:
+            return sorted(self.source_names)
+
+    def stats(self):
+        """Stored and dropped record counts, and stored records per level and per source."""
+        with self.lock:
+            return {"records": self.total - self.first, "dropped": self.first,
+                    "levels": {name: len(rows) for name, rows in zip(self.level_names, self.level_rows) if rows},
+                    "sources": {name: len(rows) for name, rows in zip(self.source_names, self.source_rows)}}
+
+    def record(self, row):
+        """(timestamp, level, source, message) of a row, or None once it has been dropped."""
+        with self.lock:
+            index = row - self.first
+            if not 0 <= index < self.total - self.first:
+                return None
+            chunk_number, position = divmod(index, self.chunk_size)
+            if chunk_number < len(self.chunks):
+                message = self.chunks[chunk_number].message(position)
+            else:
+                message = self.pending[position]
+            return (self.times[index], self.level_names[self.level_codes[index]],
+                    self.source_names[self.source_codes[index]], message)
+
+    def query(self, levels=None, sources=None, text=None, start=0, end=None):
+        """Sorted int64 array of the rows in [start, end) that match every filter given.
+
+        `levels` and `sources` are collections of names. `text` is a substring,
+        matched case-insensitively unless it contains capitals.
+        """
+        with self.lock:
+            start = max(start, self.first)
+            end = self.total if end is None else min(max(end, start), self.total)
+            rows = self._select(levels, self.level_lookup, self.level_rows, self.level_codes, start, end)
+            by_source = self._select(sources, self.source_lookup, self.source_rows, self.source_codes, start, end)
+            chunks, pending, first = list(self.chunks), list(self.pending), self.first
+        if by_source is not None:
+            rows = by_source if rows is None else np.intersect1d(rows, by_source, assume_unique=True)
+        if rows is None:
+            rows = np.arange(start, end, dtype=np.int64)
+        if text:
+            rows = self._search(rows, text, chunks, pending, first)
+        return rows
+
+    def _select(self, names, lookup, index, codes, start, end):
+        """Rows in [start, end) whose code is one of `names`, or None for no filter.
+
+        Uses the per-name row index when it selects few rows, else a pass
+        over the code column; call with the lock held.
+        """
+        if names is None:
+            return None
+        wanted = [lookup[name] for name in names if name in lookup]
+        if len(wanted) == len(lookup):
+            return None
+        parts = []
+        for code in wanted:
+            rows = index[code]
+            parts.append(rows[bisect.bisect_left(rows, start):bisect.bisect_left(rows, end)])
+        selected = sum(len(part) for part in parts)
+        if not selected:
+            return np.empty(0, np.int64)
+        if selected * 8 < end - start or len(parts) == 1:
+            result = np.concatenate([np.frombuffer(part, np.uint64) for part in parts]).astype(np.int64)
+            if len(parts) > 1:
+                result.sort()
+            return result
+        column = np.frombuffer(codes[start - self.first:end - self.first], np.dtype(codes.typecode))
+        return np.flatnonzero(np.isin(column, wanted)) + start
+
+    def _search(self, rows, text, chunks, pending, first):
+        lowercase = text == text.lower()
+        needle = text.replace(SEPARATOR, " ")
+        keep = np.zeros(len(rows), bool)
+        chunk_of = (rows - first) // self.chunk_size
+        bounds = np.searchsorted(chunk_of, np.arange(len(chunks) + 2))
+        for number in range(len(chunks) + 1):
+            lo, hi = bounds[number], bounds[number + 1]
+            if lo == hi:
+                continue
+            positions = rows[lo:hi] - first - number * self.chunk_size
+            if number < len(chunks):
+                chunk = chunks[number]
+                if (hi - lo) * 16 < self.chunk_size:  # a few candidates: check them one by one
+                    keep[lo:hi] = [needle in (chunk.message(p).lower() if lowercase else chunk.message(p))
+                                   for p in positions.tolist()]
+                else:
+                    keep[lo:hi] = chunk.matches(needle, lowercase)[positions]
+            else:
+                keep[lo:hi] = [needle in (pending[p].lower() if lowercase else pending[p])
+                               for p in positions.tolist()]
+        return rows[keep]
@@ -0,0 +1,327 @@
+# utils/metrics.py
+"""Process-wide metrics: counters, gauges and histograms, rendered in Prometheus text format.
+
+Counters and histograms are updated on hot paths (capture thread, serial
+reader, GUI timer), so each thread writes its own cell without locking and
+cells are only summed when the metrics are read. Cells of finished threads
+are folded into a retired total on read. Gauges are a single attribute store,
+or a function evaluated on read. Collectors add samples computed on read
+(e.g. per-device watchdog state).
+
+The control panel's `Stats` tab shows them live. `Program -> Metrics Endpoint
+(localhost)` or `metrics serve [port]` serves them at
+http://127.0.0.1:9108/metrics, and setting "metrics_port" in the config file
+starts the endpoint on launch. `metrics show [filter]` prints them in the console.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; suits per-frame stages from a memcpy to a slow consumer
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class _PerThread:
+    """One mutable cell per writing thread; only the owning thread writes it."""
+
+    def __init__(self, make):
+        self.make = make
+        self.local = threading.local()
+        self.cells = []  # (thread, cell)
+        self.retired = make()
+        self.lock = threading.Lock()  # taken on a thread's first write and on read, never per update
+
+    def cell(self):
+        try:
+            return self.local.cell
+        except AttributeError:
+            cell = self.make()
+            with self.lock:
+                self.cells.append((threading.current_thread(), cell))
+            self.local.cell = cell
+            return cell
+
+    def collect(self):
+        """Element-wise sum over all cells, folding in those of finished threads."""
+        with self.lock:
+            alive = []
+            for thread, cell in self.cells:
+                if thread.is_alive():
+                    alive.append((thread, cell))
+                else:
+                    for index, value in enumerate(cell):
+                        self.retired[index] += value
+            self.cells = alive
+            total = list(self.retired)
+            for _, cell in alive:
+                for index, value in enumerate(cell):
+                    total[index] += value
+        return total
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.values = _PerThread(lambda: [0])
+
+    def inc(self, amount=1):
+        self.values.cell()[0] += amount
+
+    def value(self):
+        return self.values.collect()[0]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, function=None):
+        self.function = function
+        self.current = 0
+
+    def set(self, value):
+        self.current = value
+
+    def value(self):
+        if self.function is None:
+            return self.current
+        try:
+            return self.function()
+        except Exception:
+            return float("nan")
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        size = len(self.bounds) + 1  # last bucket is +Inf
+        # cell: [count per bucket..., sum]
+        self.values = _PerThread(lambda: [0] * size + [0.0])
+
+    def observe(self, value):
+        cell = self.values.cell()
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+
+    def value(self):
+        """(cumulative bucket counts incl. +Inf, count, sum)."""
+        total = self.values.collect()
+        cumulative = []
+        running = 0
+        for count in total[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, total[-1]
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        cumulative, count, _ = self.value()
+        if not count:
+            return None
+        rank = q * count
+        for bound, seen in zip(self.bounds + (float("inf"),), cumulative):
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Metric families by name; each child is one label combination."""
+
+    def __init__(self):
+        self.families = {}  # name -> [kind, help, {labels: metric}]
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def _get(self, factory, kind, name, help, labels, **options):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.setdefault(name, [kind, help, {}])
+            if family[0] != kind:
+                raise ValueError(f"metric {name} is already a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory(**options)
+        return metric
+
+    def counter(self, name, help="", **labels):
+        """Get or create a counter; the same name and labels return the same object."""
+        return self._get(Counter, "counter", name, help, labels)
+
+    def gauge(self, name, help="", function=None, **labels):
+        gauge = self._get(Gauge, "gauge", name, help, labels)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, "histogram", name, help, labels, buckets=buckets)
+
+    def add_collector(self, function):
+        """`function()` returns [(name, kind, help, labels dict, value)] computed at read time.
+
+        Collectors report counters and gauges only.
+        """
+        self.collectors.append(function)
+
+    def remove_collector(self, function):
+        if function in self.collectors:
+            self.collectors.remove(function)
+
+    def samples(self):
+        """[(name, kind, help, labels tuple, value)] for every metric, collectors included."""
+        with self.lock:
+            families = [(name, family[0], family[1], list(family[2].items()))
+                        for name, family in self.families.items()]
+        samples = [(name, kind, help, labels, metric.value())
+                   for name, kind, help, children in families for labels, metric in children]
+        for collector in list(self.collectors):
+            try:
+                for name, kind, help, labels, value in collector():
+                    samples.append((name, kind, help, tuple(sorted(labels.items())), value))
+            except Exception as e:
+                logging.debug(f"metrics collector failed: {e}")
+        return samples
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        described = set()
+        for name, kind, help, labels, value in sorted(self.samples(), key=lambda sample: sample[0]):
+            if name not in described:
+                described.add(name)
+                help_text = help.replace("\\", "\\\\").replace("\n", "\\n")
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                cumulative, count, total = value
+                bounds = self.families[name][2][labels].bounds + (float("inf"),)
+                for bound, seen in zip(bounds, cumulative):
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', _number(bound)),))} {seen}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+            else:
+                lines.append(f"{name}{_label_text(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = None
+
+
+def get_metrics():
+    """Process-wide metrics registry."""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+        register_process_metrics(_registry)
+    return _registry
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux), or peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def register_process_metrics(registry):
+    start = time.time()
+    registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes", function=rss_bytes)
+    registry.gauge("process_start_time_seconds", "Start time of the process since the epoch",
+                   function=lambda: start)
+    registry.gauge("kozy_threads", "Live Python threads", function=threading.active_count)
+
+
+class MetricsServer:
+    """Serves a registry at http://host:port/metrics."""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        """Bind and serve; raises OSError if the port is taken."""
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        logging.info(f"Metrics on {self.url}")
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
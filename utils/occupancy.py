@@ -0,0 +1,268 @@
+# utils/occupancy.py
+"""Robot-centric 2D occupancy grid from depth frames.
+
+Robot frame: x forward, y left, z up, origin on the floor below the camera
+mount. Each depth pixel's ray is fixed by the intrinsics and the camera pose,
+so the per-pixel coefficients are computed once; a frame is then a handful of
+in-place vector operations on preallocated buffers and a single np.bincount.
+Points inside the height band vote for their cell; a cell's occupancy is an
+exponentially decayed average of "had enough votes" over recent frames.
+
+In the control panel the grid follows the camera: the `Occupancy` tab draws
+it, and it is published on the frame bus as `occupancy/grid` (float32, rows
+forward, columns right to left). DEFAULT_PARAMS can be overridden with
+"occupancy" in the config file or `occupancy set <parameter> <value>` in the
+console. Graphs use it through the `occupancy` node. `python -m tools.bench -k
+occupancy` times an update.
+"""
+import logging
+import math
+import threading
+import time
+
+from utils.lazy import lazy_import
+from utils.metrics import get_metrics
+
+np = lazy_import("numpy")
+
+DEFAULT_PARAMS = {
+    "cell_size": 0.05,      # m
+    "range": 4.0,           # m ahead of the robot covered by the grid
+    "span": 4.0,            # m across, centred on the robot
+    "min_height": 0.05,     # m; below is floor
+    "max_height": 1.5,      # m; above is overhead
+    "camera_x": 0.0,        # camera position in the robot frame, m
+    "camera_y": 0.0,
+    "camera_height": 0.3,
+    "pitch": 0.0,           # degrees, positive tilts the camera down
+    "roll": 0.0,
+    "yaw": 0.0,             # degrees, positive turns it left
+    "decay": 0.7,           # weight of the previous grid per frame
+    "min_points": 3,        # points a cell needs in one frame to count as hit
+    "stride": 2,            # use every n-th pixel in both directions
+}
+
+
+def default_intrinsics(width, height, hfov=87.0, vfov=58.0):
+    """(fx, fy, cx, cy) from a field of view; D435/D455 depth is about 87 x 58 degrees."""
+    fx = width / 2 / math.tan(math.radians(hfov) / 2)
+    fy = height / 2 / math.tan(math.radians(vfov) / 2)
+    return fx, fy, (width - 1) / 2, (height - 1) / 2
+
+
+def camera_rotation(pitch=0.0, roll=0.0, yaw=0.0):
+    """3x3 rotation from the camera's optical frame (x right, y down, z forward) to the robot frame."""
+    optical_to_body = np.array([[0, 0, 1], [-1, 0, 0], [0, -1, 0]], dtype=np.float64)
+    p, r, y = (math.radians(angle) for angle in (pitch, roll, yaw))
+    rot_yaw = np.array([[math.cos(y), -math.sin(y), 0], [math.sin(y), math.cos(y), 0], [0, 0, 1]])
+    rot_pitch = np.array([[math.cos(p), 0, math.sin(p)], [0, 1, 0], [-math.sin(p), 0, math.cos(p)]])
+    rot_roll = np.array([[1, 0, 0], [0, math.cos(r), -math.sin(r)], [0, math.sin(r), math.cos(r)]])
+    return rot_yaw @ rot_pitch @ rot_roll @ optical_to_body
+
+
+class OccupancyGrid:
+    """Occupancy grid for one depth resolution; `update(depth)` folds in a frame."""
+
+    def __init__(self, width, height, intrinsics, depth_scale=0.001, **params):
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"unknown occupancy parameters: {', '.join(sorted(unknown))}")
+        self.params = {**DEFAULT_PARAMS, **params}
+        p = self.params
+        self.width, self.height = width, height
+        self.intrinsics = tuple(intrinsics)
+        self.depth_scale = depth_scale
+        self.cell_size = p["cell_size"]
+        self.nx = int(math.ceil(p["range"] / self.cell_size))
+        self.ny = int(math.ceil(p["span"] / self.cell_size))
+        self.stride = max(1, int(p["stride"]))
+
+        # Per-pixel coefficients: robot xyz = raw_depth * coefficient + camera position
+        fx, fy, cx, cy = self.intrinsics
+        u = np.arange(0, width, self.stride, dtype=np.float64)
+        v = np.arange(0, height, self.stride, dtype=np.float64)
+        rays = np.stack([np.broadcast_to((u - cx) / fx, (len(v), len(u))),
+                         np.broadcast_to(((v - cy) / fy)[:, None], (len(v), len(u))),
+                         np.ones((len(v), len(u)))], axis=-1)
+        coefficients = rays @ camera_rotation(p["pitch"], p["roll"], p["yaw"]).T * depth_scale
+        inverse_cell = 1.0 / self.cell_size
+        # Fold the cell scaling and grid origin into the coefficients, so x/y come out in cells
+        self.coef_x = np.ascontiguousarray(coefficients[..., 0] * inverse_cell, dtype=np.float32)
+        self.coef_y = np.ascontiguousarray(coefficients[..., 1] * inverse_cell, dtype=np.float32)
+        self.coef_z = np.ascontiguousarray(coefficients[..., 2], dtype=np.float32)
+        self.offset_x = p["camera_x"] * inverse_cell
+        self.offset_y = (p["camera_y"] + p["span"] / 2) * inverse_cell
+        self.offset_z = p["camera_height"]
+
+        shape = self.coef_x.shape
+        self.depth = np.empty(shape, np.float32)
+        self.cell_x = np.empty(shape, np.float32)
+        self.cell_y = np.empty(shape, np.float32)
+        self.point_z = np.empty(shape, np.float32)
+        self.valid = np.empty(shape, bool)
+        self.check = np.empty(shape, bool)
+        self.index = np.empty(shape, np.int64)
+        self.index_y = np.empty(shape, np.int64)
+        self.dump_cell = self.nx * self.ny  # invalid points are counted here and discarded
+
+        self.grid = np.zeros((self.nx, self.ny), np.float32)
+        self.published = np.zeros_like(self.grid)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.timestamp = None
+        self.points = 0
+
+    def update(self, depth, timestamp=None):
+        """Fold one raw depth frame (uint16, width x height) into the grid."""
+        if depth.shape != (self.height, self.width):
+            raise ValueError(f"depth is {depth.shape[1]}x{depth.shape[0]}, grid expects {self.width}x{self.height}")
+        p = self.params
+        np.copyto(self.depth, depth[::self.stride, ::self.stride], casting="unsafe")
+
+        np.multiply(self.depth, self.coef_x, out=self.cell_x)
+        self.cell_x += self.offset_x
+        np.multiply(self.depth, self.coef_y, out=self.cell_y)
+        self.cell_y += self.offset_y
+        np.multiply(self.depth, self.coef_z, out=self.point_z)
+        self.point_z += self.offset_z
+
+        valid, check = self.valid, self.check
+        np.greater(self.depth, 0, out=valid)
+        for array, low, high in ((self.point_z, p["min_height"], p["max_height"]),
+                                 (self.cell_x, 0, self.nx), (self.cell_y, 0, self.ny)):
+            np.greater_equal(array, low, out=check)
+            valid &= check
+            np.less(array, high, out=check)
+            valid &= check
+
+        np.copyto(self.index, self.cell_x, casting="unsafe")
+        self.index *= self.ny
+        np.copyto(self.index_y, self.cell_y, casting="unsafe")
+        self.index += self.index_y
+        np.logical_not(valid, out=check)
+        np.copyto(self.index, self.dump_cell, where=check)
+        counts = np.bincount(self.index.ravel(), minlength=self.dump_cell + 1)
+        self.points = int(counts[:self.dump_cell].sum())
+
+        decay = p["decay"]
+        self.grid *= decay
+        self.grid += (counts[:self.dump_cell].reshape(self.nx, self.ny) >= p["min_points"]) * np.float32(1 - decay)
+        with self.lock:
+            np.copyto(self.published, self.grid)
+            self.seq += 1
+            self.timestamp = timestamp if timestamp is not None else time.time()
+        return self.grid
+
+    def snapshot(self):
+        """(seq, timestamp, copy of the grid) as of the last completed update; safe from any thread."""
+        with self.lock:
+            return self.seq, self.timestamp, self.published.copy()
+
+    def cell_of(self, x, y):
+        """Grid (row, column) of a robot-frame point in metres, or None outside the grid."""
+        row = int(math.floor(x / self.cell_size))
+        column = int(math.floor((y + self.params["span"] / 2) / self.cell_size))
+        if 0 <= row < self.nx and 0 <= column < self.ny:
+            return row, column
+        return None
+
+    def occupied(self, threshold=0.5):
+        """Robot-frame (x, y) centres of cells above `threshold`, as an (N, 2) array."""
+        _, _, grid = self.snapshot()
+        rows, columns = np.nonzero(grid > threshold)
+        return np.stack([(rows + 0.5) * self.cell_size,
+                         (columns + 0.5) * self.cell_size - self.params["span"] / 2], axis=1)
+
+
+class OccupancyMapper:
+    """Keeps an OccupancyGrid up to date from a capture on its own thread.
+
+    `capture()` returns the running capture (or None); its newest depth frame is
+    read after each `notify()` (register it as a capture consumer), so frames
+    that arrive while the grid is busy are skipped, never queued.
+    """
+
+    def __init__(self, capture, params=None, on_update=None):
+        self.capture = capture
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.on_update = on_update
+        self.grid = None
+        self.event = threading.Event()
+        self.thread = None
+        self.running = False
+        self.rebuild = True
+        self.last_seq = 0
+        self.frames = None  # the mapper's copy of the pair being mapped
+        self.failing = False
+        self.gate = None  # ChangeGate: skip frames the scene did not change in
+        metrics = get_metrics()
+        self.update_histogram = metrics.histogram("kozy_occupancy_update_seconds", "Folding one depth frame into the grid")
+        self.frames_counter = metrics.counter("kozy_occupancy_frames_total", "Depth frames folded into the grid")
+        self.skipped_counter = metrics.counter("kozy_occupancy_frames_skipped_total",
+                                               "Depth frames skipped while the grid was busy")
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="occupancy", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def notify(self, frames=None):
+        """Capture consumer: a new frame is available."""
+        self.event.set()
+
+    def configure(self, **params):
+        """Change parameters; the grid is rebuilt before the next frame."""
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"unknown occupancy parameters: {', '.join(sorted(unknown))}")
+        self.params.update(params)
+        self.rebuild = True
+
+    def _run(self):
+        while self.running:
+            self.event.wait(0.1)
+            self.event.clear()
+            capture = self.capture()
+            frames = capture.latest() if capture else None
+            if frames is None or frames.seq == self.last_seq:
+                continue
+            frames = self.frames = capture.read(self.frames)
+            if frames is None:
+                continue
+            if self.last_seq and frames.seq > self.last_seq + 1:
+                self.skipped_counter.inc(frames.seq - self.last_seq - 1)
+            self.last_seq = frames.seq
+            gate = self.gate
+            if gate is not None and not gate.admit(frames):
+                continue
+            try:
+                height, width = frames.depth.shape
+                grid = self.grid
+                if self.rebuild or grid is None or (grid.width, grid.height) != (width, height):
+                    intrinsics = getattr(capture, "depth_intrinsics", None) or default_intrinsics(width, height)
+                    grid = OccupancyGrid(width, height, intrinsics, getattr(capture, "depth_scale", 0.001),
+                                         **self.params)
+                    self.grid, self.rebuild = grid, False
+                start = time.perf_counter()
+                grid.update(frames.depth, frames.timestamp)
+                elapsed = time.perf_counter() - start
+                self.update_histogram.observe(elapsed)
+                if gate is not None:
+                    gate.record(elapsed)
+                self.frames_counter.inc()
+                if self.on_update:
+                    self.on_update(grid)
+                self.failing = False
+            except Exception as e:
+                if not self.failing:
+                    logging.error(f"Occupancy update failed: {e}")
+                self.failing = True
+                time.sleep(0.5)
@@ -0,0 +1,366 @@
+# utils/preview.py
+"""Localhost preview server: the camera's color and colorized depth streams as MJPEG over HTTP.
+
+A tick thread takes the newest frame pair at the preview rate and hands a copy
+to a small encoder pool, which JPEG-encodes it once per quality level in use;
+every client of a stream shares those bytes. Clients have a short send queue:
+when it backs up the client drops to a smaller/lower quality level, and when it
+stays empty it climbs back up. Nothing here runs on the capture thread.
+
+Endpoints: /  /color.mjpg  /depth.mjpg  /color.jpg  /depth.jpg  /stats
+(`?level=N` pins a stream to one of QUALITY_LEVELS).
+
+Start it with `Program -> Preview Server (localhost)` or `preview start [port]`
+in the console; it listens on 127.0.0.1:8090 unless the config file sets
+"preview_port". To watch from another machine, tunnel it, e.g.
+`ssh -L 8090:localhost:8090 robot`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from utils.lazy import lazy_import
+from utils.metrics import get_metrics
+
+np = lazy_import("numpy")
+
+STREAMS = ("color", "depth")
+# (downscale step, JPEG quality), best first
+QUALITY_LEVELS = [(1, 85), (1, 65), (2, 70), (2, 50), (4, 50)]
+BOUNDARY = "kozyframe"
+QUEUE_DEPTH = 2  # frames a client may have waiting before older ones are dropped
+UPGRADE_AFTER = 2.0  # seconds of empty send queue before trying a better level
+
+INDEX_PAGE = """<!doctype html>
+<html><head><title>Kozy preview</title></head>
+<body style="background:#111;color:#ccc;font-family:monospace">
+<h3>Kozy preview</h3>
+<img src="/color.mjpg" style="max-width:49%"> <img src="/depth.mjpg" style="max-width:49%">
+<p><a href="/stats" style="color:#9cf">stats</a></p>
+</body></html>
+"""
+
+
+def encode_jpeg(image, quality):
+    """JPEG-encode an RGB uint8 array (Qt's encoder releases the GIL while it works)."""
+    from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+    from PySide6.QtGui import QImage
+    image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    qt_image = QImage(image.data, width, height, width * 3, QImage.Format_RGB888)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if not qt_image.save(buffer, "JPG", quality):
+        raise RuntimeError("JPEG encoding failed")
+    return bytes(data)
+
+
+def preview_image(stream, frame):
+    """RGB image for a stream from a copied frame (color as is, depth through the colormap)."""
+    if stream == "color":
+        return frame
+    from devices.realsense import colorize_depth
+    return colorize_depth(frame)
+
+
+class PreviewClient:
+    """One MJPEG viewer: its quality level and a short queue of encoded frames."""
+
+    def __init__(self, stream, address, level=0, pinned=False, dropped_counter=None):
+        self.stream = stream
+        self.address = address
+        self.level = level
+        self.pinned = pinned
+        self.queue = deque()
+        self.ready = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.dropped_counter = dropped_counter
+        self.bytes_sent = 0
+        self.backlog = 0
+        self.idle_since = time.monotonic()
+        self.connected = time.monotonic()
+
+    def push(self, seq, encoded):
+        """Queue the encoding for this client's level and adapt the level to the queue depth."""
+        jpeg = encoded.get(self.level)
+        if jpeg is None:
+            # Level changed since this frame was encoded: use the nearest one we have
+            jpeg = encoded[min(encoded, key=lambda level: abs(level - self.level))]
+        with self.ready:
+            depth = len(self.queue)
+            while len(self.queue) >= QUEUE_DEPTH:
+                self.queue.popleft()
+                self.dropped += 1
+                if self.dropped_counter:
+                    self.dropped_counter.inc()
+            self.queue.append((seq, jpeg))
+            self.ready.notify()
+        if not self.pinned:
+            self._adapt(depth)
+
+    def _adapt(self, depth):
+        now = time.monotonic()
+        if depth:
+            self.idle_since = now
+            self.backlog += 1
+            if self.backlog >= 2 and self.level < len(QUALITY_LEVELS) - 1:
+                self.level += 1
+                self.backlog = 0
+        else:
+            self.backlog = 0
+            if now - self.idle_since > UPGRADE_AFTER and self.level > 0:
+                self.level -= 1
+                self.idle_since = now
+
+    def next_frame(self, timeout=1.0):
+        with self.ready:
+            if not self.queue and not self.closed:
+                self.ready.wait(timeout)
+            return self.queue.popleft() if self.queue else None
+
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+    def stats(self):
+        return {"stream": self.stream, "address": self.address, "level": self.level,
+                "scale": 1 / QUALITY_LEVELS[self.level][0], "quality": QUALITY_LEVELS[self.level][1],
+                "sent": self.sent, "dropped": self.dropped, "queued": len(self.queue),
+                "bytes_sent": self.bytes_sent, "seconds": round(time.monotonic() - self.connected, 1)}
+
+
+class PreviewServer:
+    """Serves `source()` (a CapturedFrames-like object with seq/color/depth, or None) on localhost."""
+
+    def __init__(self, source, host="127.0.0.1", port=8090, fps=15, workers=None):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.fps = fps
+        # Leave cores for capture and the GUI
+        self.workers = workers or max(1, min(2, (os.cpu_count() or 1) // 2))
+        self.clients = []
+        self.clients_lock = threading.Lock()
+        self.encoder = None
+        self.httpd = None
+        self.threads = []
+        self.running = False
+        self.busy = {stream: False for stream in STREAMS}
+        self.latest = {stream: None for stream in STREAMS}  # (seq, {level: jpeg})
+        self.last_seq = None
+        self.frames_encoded = 0
+        self.encodings = 0
+        self.encode_seconds = 0.0
+        self.skipped_busy = 0
+        self.gate = None  # ChangeGate: skip frames the scene did not change in
+        metrics = get_metrics()
+        self.encode_histogram = metrics.histogram("kozy_preview_encode_seconds",
+                                                  "Preparing and JPEG-encoding one preview frame at one level")
+        self.dropped_counter = metrics.counter("kozy_preview_frames_dropped_total",
+                                               "Preview frames dropped from slow clients' queues")
+        metrics.gauge("kozy_preview_clients", "Connected preview clients", function=lambda: len(self.clients))
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self):
+        """Bind the HTTP port and start serving; raises OSError if the port is taken."""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.encoder = ThreadPoolExecutor(self.workers, thread_name_prefix="preview-encode")
+        self.running = True
+        for target, name in ((self.httpd.serve_forever, "preview-http"), (self._tick_loop, "preview-tick")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"Preview server on {self.url}")
+        return self
+
+    def stop(self):
+        self.running = False
+        with self.clients_lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.close()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.threads = []
+        if self.encoder:
+            self.encoder.shutdown(wait=True, cancel_futures=True)
+            self.encoder = None
+
+    # Encoding
+
+    def _tick_loop(self):
+        interval = 1.0 / self.fps
+        next_tick = time.perf_counter()
+        while self.running:
+            try:
+                self._tick()
+            except Exception as e:
+                logging.error(f"Preview tick failed: {e}")
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+    def _tick(self):
+        frames = self.source()
+        if frames is None or frames.seq == self.last_seq:
+            return
+        with self.clients_lock:
+            wanted = {stream: {client.level for client in self.clients if client.stream == stream}
+                      for stream in STREAMS}
+        if not any(wanted.values()):
+            return
+        self.last_seq = frames.seq
+        gate = self.gate
+        if gate is not None and not gate.admit(frames):
+            return
+        self.frames_encoded += 1
+        for stream, levels in wanted.items():
+            if not levels:
+                continue
+            if self.busy[stream]:
+                self.skipped_busy += 1  # Encoder still on the previous frame; don't pile up
+                continue
+            self.busy[stream] = True
+            # Copy now: the capture reuses its buffers while the encoder works
+            frame = getattr(frames, stream).copy()
+            self.encoder.submit(self._encode, stream, frames.seq, frame, sorted(levels))
+
+    def _encode(self, stream, seq, frame, levels):
+        try:
+            start = time.perf_counter()
+            image = preview_image(stream, frame)
+            encoded = {}
+            for level in levels:
+                step, quality = QUALITY_LEVELS[level]
+                encoded[level] = encode_jpeg(image[::step, ::step], quality)
+            elapsed = time.perf_counter() - start
+            self.encode_seconds += elapsed
+            self.encode_histogram.observe(elapsed / len(levels))
+            if self.gate is not None:
+                self.gate.record(elapsed)
+            self.encodings += len(encoded)
+            self.latest[stream] = (seq, encoded)
+            with self.clients_lock:
+                clients = [client for client in self.clients if client.stream == stream]
+            for client in clients:
+                client.push(seq, encoded)
+        except Exception as e:
+            logging.error(f"Preview encoding failed: {e}")
+        finally:
+            self.busy[stream] = False
+
+    def snapshot(self, stream):
+        """Newest full-quality JPEG of a stream, encoding one if no viewer asked for it."""
+        latest = self.latest[stream]
+        frames = self.source()
+        if latest and 0 in latest[1] and (frames is None or latest[0] == frames.seq):
+            return latest[1][0]
+        if frames is None:
+            return None
+        return encode_jpeg(preview_image(stream, getattr(frames, stream).copy()), QUALITY_LEVELS[0][1])
+
+    def stats(self):
+        with self.clients_lock:
+            clients = [client.stats() for client in self.clients]
+        return {
+            "url": self.url,
+            "fps": self.fps,
+            "frames_encoded": self.frames_encoded,
+            "encodings": self.encodings,
+            "encode_ms_avg": self.encode_seconds / self.encodings * 1000 if self.encodings else None,
+            "skipped_busy": self.skipped_busy,
+            "clients": clients,
+        }
+
+    # HTTP
+
+    def _handler_class(self):
+        server = self
+
+        class PreviewHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"
+
+            def log_message(self, format, *args):
+                logging.debug(f"preview {self.address_string()}: {format % args}")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                name, _, extension = url.path.strip("/").partition(".")
+                if url.path == "/":
+                    self._send(200, "text/html; charset=utf-8", INDEX_PAGE.encode("utf-8"))
+                elif url.path == "/stats":
+                    self._send(200, "application/json", json.dumps(server.stats(), indent=2).encode("utf-8"))
+                elif name in STREAMS and extension == "jpg":
+                    jpeg = server.snapshot(name)
+                    if jpeg is None:
+                        self._send(503, "text/plain", b"no frames yet")
+                    else:
+                        self._send(200, "image/jpeg", jpeg)
+                elif name in STREAMS and extension == "mjpg":
+                    self._stream(name, parse_qs(url.query).get("level"))
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, stream, level):
+                try:
+                    pinned = level is not None
+                    level = min(max(int(level[0]), 0), len(QUALITY_LEVELS) - 1) if pinned else 0
+                except ValueError:
+                    self._send(400, "text/plain", b"level must be a number")
+                    return
+                client = PreviewClient(stream, self.address_string(), level, pinned, server.dropped_counter)
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with server.clients_lock:
+                    server.clients.append(client)
+                try:
+                    while server.running and not client.closed:
+                        item = client.next_frame()
+                        if item is None:
+                            continue
+                        seq, jpeg = item
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\nX-Frame-Seq: {seq}\r\n\r\n".encode("ascii"))
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                        client.sent += 1
+                        client.bytes_sent += len(jpeg)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server.clients_lock:
+                        server.clients.remove(client)
+
+        return PreviewHandler
@@ -0,0 +1,203 @@
+# utils/recording.py
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+# A recording is a directory with one pair of files per stream:
+#   <stream>.bin  fixed-size frames appended back to back (memory-mappable)
+#   <stream>.idx  one (seq, timestamp) record per frame
+# plus meta.json describing each stream's shape and dtype. Depth streams written
+# with a codec use <stream>.kzd instead: KZD1 frames back to back, located by an
+# index that also holds each frame's offset, size and flags.
+# The control panel records color, depth, the IMU's accel and gyro, and
+# telemetry (the Pico's clock `t=` stamped with its host arrival time);
+# `python -m tools.analyze <recording>` reports on them.
+INDEX_DTYPE = np.dtype([("seq", "<u8"), ("timestamp", "<f8")])
+CODED_INDEX_DTYPE = np.dtype([("seq", "<u8"), ("timestamp", "<f8"), ("offset", "<u8"), ("size", "<u4"),
+                              ("flags", "<u4")])
+
+
+class RecordingWriter:
+    """Append frames from any number of streams to a recording directory.
+
+    With `depth_codec` (options for utils.depthcodec.DepthEncoderPool, e.g.
+    {"backend": "zlib", "key_interval": 30}), 2-D uint16 streams are encoded
+    losslessly on worker threads; `write()` then only copies the frame.
+    """
+
+    def __init__(self, path, depth_codec=None, camera=None):
+        self.path = path
+        self.depth_codec = depth_codec
+        self.streams = {}
+        self.meta = {"created": time.time(), "streams": {}}
+        if camera:
+            self.meta["camera"] = camera  # e.g. serial, depth_scale, depth_intrinsics
+        os.makedirs(path, exist_ok=True)
+
+    def _open_stream(self, name, array):
+        self.meta["streams"][name] = {"shape": list(array.shape), "dtype": array.dtype.str}
+        coded = self.depth_codec is not None and array.dtype == np.uint16 and array.ndim == 2
+        stream = {"seq": 0, "shape": array.shape, "dtype": array.dtype, "pool": None}
+        if coded:
+            from utils.depthcodec import DepthEncoderPool
+            stream["pool"] = DepthEncoderPool(lambda data, timestamp, temporal: self._write_coded(stream, data,
+                                                                                                 timestamp, temporal),
+                                              name=f"record-{name}", **self.depth_codec)
+            stream["offset"] = 0
+            self.meta["streams"][name]["codec"] = {"format": "kzd1", "backend": stream["pool"].backend,
+                                                   "key_interval": stream["pool"].key_interval}
+        self._write_meta()
+        stream["data"] = open(os.path.join(self.path, f"{name}.kzd" if coded else f"{name}.bin"), "ab")
+        stream["index"] = open(os.path.join(self.path, f"{name}.idx"), "ab")
+        self.streams[name] = stream
+        return stream
+
+    def _write_meta(self):
+        temp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(temp_path, "w") as meta_file:
+            json.dump(self.meta, meta_file, indent=4)
+        os.replace(temp_path, os.path.join(self.path, "meta.json"))
+
+    def write(self, name, array, timestamp=None):
+        """Append one frame; every frame of a stream must have the same shape and dtype."""
+        stream = self.streams.get(name) or self._open_stream(name, array)
+        if array.shape != stream["shape"] or array.dtype != stream["dtype"]:
+            raise ValueError(f"{name}: frame layout changed mid-recording")
+        if stream["pool"] is not None:
+            stream["pool"].submit(array, timestamp if timestamp is not None else time.time())
+            return
+        stream["seq"] += 1
+        stream["data"].write(np.ascontiguousarray(array).data)
+        record = np.array([(stream["seq"], timestamp if timestamp is not None else time.time())],
+                          dtype=INDEX_DTYPE)
+        stream["index"].write(record.tobytes())
+
+    def write_many(self, name, arrays, timestamps):
+        """Append a block of small frames at once, e.g. IMU samples; `arrays` is (N, *frame shape)."""
+        arrays = np.ascontiguousarray(arrays)
+        if not len(arrays):
+            return
+        stream = self.streams.get(name) or self._open_stream(name, arrays[0])
+        if arrays.shape[1:] != stream["shape"] or arrays.dtype != stream["dtype"]:
+            raise ValueError(f"{name}: frame layout changed mid-recording")
+        if stream["pool"] is not None:
+            raise ValueError(f"{name}: write_many() is for raw streams")
+        records = np.empty(len(arrays), dtype=INDEX_DTYPE)
+        records["seq"] = np.arange(stream["seq"] + 1, stream["seq"] + 1 + len(arrays))
+        records["timestamp"] = timestamps
+        stream["seq"] += len(arrays)
+        stream["data"].write(arrays.data)
+        stream["index"].write(records.tobytes())
+
+    def _write_coded(self, stream, data, timestamp, temporal):
+        """Encoder delivery thread: append one encoded frame in order."""
+        stream["seq"] += 1
+        stream["data"].write(data)
+        record = np.array([(stream["seq"], timestamp, stream["offset"], len(data), int(temporal))],
+                          dtype=CODED_INDEX_DTYPE)
+        stream["index"].write(record.tobytes())
+        stream["offset"] += len(data)
+
+    def codec_stats(self):
+        """{stream: DepthEncoderPool stats} for encoded streams."""
+        return {name: stream["pool"].stats() for name, stream in list(self.streams.items())
+                if stream["pool"] is not None}
+
+    def close(self):
+        for name, stream in self.streams.items():
+            detail = ""
+            if stream["pool"] is not None:
+                stream["pool"].close()
+                stats = stream["pool"].stats()
+                detail = (f" (ratio {stats['ratio']:.2f}, {stats['mb_per_core_s']:.0f} MB/s per core, "
+                          f"{stats['dropped']} dropped)")
+            stream["data"].close()
+            stream["index"].close()
+            logging.info(f"Recorded {stream['seq']} frames of {name} to {self.path}{detail}")
+        self.streams.clear()
+
+
+class CodedFrames:
+    """Read-only, array-like view of a KZD1-encoded stream; frames are decoded on access.
+
+    Temporal frames are decoded forward from the nearest preceding key frame, and the
+    last frame decoded is kept, so reading in order costs one decode per frame.
+    """
+
+    def __init__(self, path, index, shape, dtype):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if len(index) else np.empty(0, np.uint8)
+        self.index = index
+        self.shape = (len(index), *shape)
+        self.dtype = dtype
+        self.cached = None  # (position, frame)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _raw(self, position):
+        record = self.index[position]
+        return self.data[record["offset"]:record["offset"] + record["size"]]
+
+    def frame(self, position):
+        from utils.depthcodec import decode_depth, FLAG_TEMPORAL
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        if self.cached is not None and self.cached[0] == position:
+            return self.cached[1]
+        start = position
+        while start > 0 and self.index[start]["flags"] & FLAG_TEMPORAL:
+            start -= 1
+        previous = None
+        if self.cached is not None and start <= self.cached[0] < position:
+            start, previous = self.cached[0] + 1, self.cached[1]
+        for current in range(start, position + 1):
+            previous = decode_depth(self._raw(current), previous)
+        self.cached = (position, previous)
+        return previous
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            positions = range(*key.indices(len(self)))
+            if not positions:
+                return np.empty((0, *self.shape[1:]), self.dtype)
+            return np.stack([self.frame(position) for position in positions])
+        return self.frame(int(key))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.frame(position)
+
+
+def open_recording(path):
+    """Open a recording read-only; returns {stream: (frames, index array)}.
+
+    Frames are a memmap for raw streams and a CodedFrames view for encoded ones;
+    both index by frame number.
+    """
+    with open(os.path.join(path, "meta.json"), "r") as meta_file:
+        meta = json.load(meta_file)
+
+    streams = {}
+    for name, info in meta["streams"].items():
+        shape = tuple(info["shape"])
+        dtype = np.dtype(info["dtype"])
+        if info.get("codec"):
+            index = np.fromfile(os.path.join(path, f"{name}.idx"), dtype=CODED_INDEX_DTYPE)
+            data_path = os.path.join(path, f"{name}.kzd")
+            size = os.path.getsize(data_path)
+            index = index[index["offset"] + index["size"] <= size]  # drop a frame cut off mid-write
+            streams[name] = (CodedFrames(data_path, index, shape, dtype), index)
+            continue
+        index = np.fromfile(os.path.join(path, f"{name}.idx"), dtype=INDEX_DTYPE)
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        data_path = os.path.join(path, f"{name}.bin")
+        count = min(len(index), os.path.getsize(data_path) // frame_bytes)
+        frames = np.memmap(data_path, dtype=dtype, mode="r", shape=(count, *shape)) if count else \
+            np.empty((0, *shape), dtype=dtype)
+        streams[name] = (frames, index[:count])
+    return streams
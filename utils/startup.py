@@ -0,0 +1,44 @@
+# utils/startup.py
+import time
+
+# Imported first thing in main.py, so this is as close to process start as we get
+_START = time.perf_counter()
+_marks = []
+FIRST_PAINT_MARKER = "kozy-startup: first paint"
+
+
+def mark(name):
+    """Record a named startup milestone (seconds since startup began)."""
+    _marks.append((name, time.perf_counter() - _START))
+
+
+def marks():
+    return list(_marks)
+
+
+def report():
+    """Human-readable startup timeline."""
+    lines = ["Startup timeline:"]
+    previous = 0.0
+    for name, elapsed in _marks:
+        lines.append(f"  {name:<24} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)")
+        previous = elapsed
+    return "\n".join(lines)
+
+
+def watch_first_paint(app, callback=None):
+    """Mark "first_paint" when the first paint event is delivered anywhere in the app."""
+    from PySide6.QtCore import QObject, QEvent
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint:
+                app.removeEventFilter(self)
+                mark("first_paint")
+                if callback:
+                    callback()
+            return False
+
+    paint_filter = FirstPaintFilter(app)
+    app.installEventFilter(paint_filter)
+    return paint_filter
@@ -0,0 +1,237 @@
+# utils/watchdog.py
+"""Device health monitor: heartbeats, stall deadlines and restarts with exponential backoff.
+
+Each watched device exposes a progress counter (frames captured, serial bytes
+received). The watchdog notes when the counter last moved; a device whose
+counter stands still past its deadline, whose link reports itself dead, or
+whose error rate gets too high is restarted on its own, leaving the others
+alone. `check()` is meant to be called periodically from the GUI thread, so
+restart callbacks may touch widgets.
+
+Failed restarts are retried after 1, 2, 4 ... up to 30 s. The control panel's
+deadlines are WATCHDOG_DEADLINES in gui/main_window.py; in the console,
+`watchdog` shows stalls, restarts and downtime, and `watchdog deadline`
+changes a deadline.
+"""
+import logging
+import time
+from collections import deque
+
+DEFAULT_DEADLINE = 2.0  # seconds without progress before a device counts as stalled
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+ERROR_WINDOW = 5.0  # seconds over which errors are counted
+
+
+class DeviceHealth:
+    """Heartbeat, state and recovery metrics of one watched device."""
+
+    def __init__(self, name, progress, restart, deadline, alive=None, probe=None,
+                 max_errors=20, restart_grace=5.0):
+        self.name = name
+        self.progress = progress  # () -> counter that grows while the device works
+        self.restart = restart  # () -> None; restarts this device only
+        self.alive = alive  # () -> False when the device knows it is dead
+        self.probe = probe  # () -> None; nudges a quiet device into answering
+        self.deadline = deadline
+        self.max_errors = max_errors
+        self.restart_grace = restart_grace
+
+        self.state = "healthy"  # healthy, stalled, restarting
+        self.last_value = None
+        self.last_progress = time.monotonic()
+        self.probed = False
+        self.errors = deque()
+        self.error_streak = 0
+        self.stalled_since = None
+        self.backoff = DEFAULT_BACKOFF
+        self.next_restart = 0.0
+        self.restart_deadline = 0.0
+
+        self.stalls = 0
+        self.restarts = 0
+        self.recoveries = 0
+        self.errors_total = 0
+        self.downtime = 0.0
+        self.last_downtime = None
+        self.last_reason = None
+
+    def metrics(self, now=None):
+        now = time.monotonic() if now is None else now
+        current = now - self.stalled_since if self.stalled_since is not None else 0.0
+        return {
+            "state": self.state,
+            "deadline_s": self.deadline,
+            "since_progress_s": now - self.last_progress,
+            "error_rate": len(self.errors) / ERROR_WINDOW,
+            "errors": self.errors_total,
+            "stalls": self.stalls,
+            "restarts": self.restarts,
+            "recoveries": self.recoveries,
+            "downtime_s": self.downtime + current,
+            "last_downtime_s": self.last_downtime,
+            "last_reason": self.last_reason,
+        }
+
+
+class Watchdog:
+    """Watches devices by name and restarts the ones that stop making progress."""
+
+    def __init__(self, max_events=200):
+        self.devices = {}
+        self.events = deque(maxlen=max_events)  # (wall time, device, event, detail)
+
+    def watch(self, name, progress, restart, deadline=DEFAULT_DEADLINE, **options):
+        """Start watching a device (replacing any previous entry of that name)."""
+        health = self.devices.get(name)
+        device = DeviceHealth(name, progress, restart, deadline, **options)
+        if health is not None:
+            # Keep counters across re-registration (e.g. after a restart made a new capture)
+            for key in ("stalls", "restarts", "recoveries", "errors_total", "downtime", "last_downtime",
+                        "last_reason", "state", "stalled_since", "backoff", "next_restart", "restart_deadline"):
+                setattr(device, key, getattr(health, key))
+        self.devices[name] = device
+        return device
+
+    def unwatch(self, name):
+        """Stop watching a device (it was stopped on purpose)."""
+        health = self.devices.pop(name, None)
+        if health is not None and health.stalled_since is not None:
+            self._record(health, "abandoned", f"down {time.monotonic() - health.stalled_since:.1f} s")
+
+    def beat(self, name):
+        """Report explicit proof of life (e.g. a successful handshake)."""
+        health = self.devices.get(name)
+        if health is None:
+            return
+        now = time.monotonic()
+        health.last_progress = now
+        health.probed = False
+        if health.state != "healthy":
+            self._recovered(health, now)
+
+    def error(self, name, message):
+        """Report a device error; only the first of a streak is logged."""
+        health = self.devices.get(name)
+        if health is None:
+            logging.error(f"{name}: {message}")
+            return
+        health.errors.append(time.monotonic())
+        health.errors_total += 1
+        health.error_streak += 1
+        if health.error_streak == 1:
+            logging.error(f"{name}: {message} (repeats are counted, not logged)")
+
+    def fail(self, name, reason):
+        """Report that a device failed outright (e.g. a connect attempt); it is restarted with backoff."""
+        health = self.devices.get(name)
+        if health is None:
+            return
+        now = time.monotonic()
+        if health.state == "restarting":
+            health.restart_deadline = now
+        elif health.state == "healthy":
+            self._stall(health, now, reason)
+
+    def check(self, now=None):
+        """Update every device's health and restart those that are due. Returns the names restarted."""
+        now = time.monotonic() if now is None else now
+        restarted = []
+        for health in list(self.devices.values()):
+            if self._check_device(health, now):
+                restarted.append(health.name)
+        return restarted
+
+    def _check_device(self, health, now):
+        try:
+            value = health.progress()
+        except Exception:
+            value = None
+        if value is not None and value != health.last_value:
+            moved = health.last_value is not None  # the first reading only starts the clock
+            health.last_value = value
+            health.last_progress = now
+            health.probed = False
+            if moved and health.state != "healthy":
+                self._recovered(health, now)
+        while health.errors and now - health.errors[0] > ERROR_WINDOW:
+            health.errors.popleft()
+        if not health.errors:
+            health.error_streak = 0
+
+        if health.state == "healthy":
+            reason = self._fault(health, now)
+            if reason is None:
+                return False
+            self._stall(health, now, reason)
+
+        if health.state == "restarting":
+            if now < health.restart_deadline:
+                return False
+            health.state = "stalled"
+            health.next_restart = now + health.backoff
+            self._record(health, "restart failed", f"next attempt in {health.backoff:.0f} s")
+            logging.warning(f"{health.name} did not recover; retrying in {health.backoff:.0f} s")
+            health.backoff = min(health.backoff * 2, MAX_BACKOFF)
+            return False
+
+        if now < health.next_restart:
+            return False
+        health.state = "restarting"
+        health.restarts += 1
+        health.restart_deadline = now + health.restart_grace
+        health.last_progress = now
+        health.last_value = None
+        health.errors.clear()
+        self._record(health, "restart", f"attempt {health.restarts}")
+        try:
+            health.restart()
+        except Exception as e:
+            logging.error(f"{health.name} restart failed: {e}")
+            health.restart_deadline = now
+        return True
+
+    def _fault(self, health, now):
+        """Why a healthy device should be restarted, or None."""
+        if health.alive is not None and not health.alive():
+            return "link lost"
+        if len(health.errors) >= health.max_errors:
+            return f"{len(health.errors)} errors in {ERROR_WINDOW:g} s"
+        silent = now - health.last_progress
+        if health.probe is not None and not health.probed and silent > health.deadline / 2:
+            health.probed = True
+            try:
+                health.probe()
+            except Exception as e:
+                return f"probe failed: {e}"
+        if silent > health.deadline:
+            return f"no progress for {silent:.1f} s"
+        return None
+
+    def _stall(self, health, now, reason):
+        health.state = "stalled"
+        health.stalls += 1
+        health.stalled_since = now
+        health.last_reason = reason
+        health.next_restart = now
+        self._record(health, "stalled", reason)
+        logging.warning(f"{health.name} stalled: {reason}")
+
+    def _recovered(self, health, now):
+        downtime = now - health.stalled_since
+        health.downtime += downtime
+        health.last_downtime = downtime
+        health.recoveries += 1
+        health.state = "healthy"
+        health.stalled_since = None
+        health.backoff = DEFAULT_BACKOFF
+        self._record(health, "recovered", f"down {downtime:.2f} s")
+        logging.info(f"{health.name} recovered after {downtime:.2f} s")
+
+    def _record(self, health, event, detail):
+        self.events.append((time.time(), health.name, event, detail))
+
+    def metrics(self):
+        """{device: metrics} for every watched device."""
+        now = time.monotonic()
+        return {name: health.metrics(now) for name, health in self.devices.items()}